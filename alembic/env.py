@@ -6,6 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 from app.config import DB_URL
 from app.infrestructure import Base
+from app.infrestructure.migrations import include_object
 from app.models import *
 
 # this is the Alembic Config object, which provides
@@ -14,15 +15,17 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# Skipped when the application runs the migrations, it has its own logging setup
+if config.config_file_name is not None and "connection" not in config.attributes:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
 
+# Tables owned by other libraries sharing the database
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -41,10 +44,11 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option(DB_URL)
+    url = DB_URL
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -60,15 +64,28 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Connection handed over by app.infrestructure.migrations
+        context.configure(connection=connection, target_metadata=target_metadata,
+                          include_object=include_object)
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    # The database URL comes from .env, not from alembic.ini
+    section = config.get_section(config.config_ini_section, {})
+    section["sqlalchemy.url"] = DB_URL
     connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
+        section,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=Base.metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 
 # revision identifiers, used by Alembic.
@@ -17,16 +18,198 @@ down_revision: Union[str, None] = None
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+TRANSACTION_STATUSES = ('pending', 'awaiting_acceptance', 'completed', 'failed', 'cancelled', 'denied', 'accepted')
+ENUM_TYPES = ('user_status', 'card_type', 'design_patterns', 'deposit_method', 'deposit_type', 'deposit_status',
+              'transaction_status', 'withdrawal_type', 'withdrawal_method', 'withdrawal_status', 'recurring_interval')
+
 
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.create_table('currencies',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('phone_number', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.Column('reserved_balance', sa.Float(), nullable=False),
+    sa.Column('admin', sa.Boolean(), nullable=False),
+    sa.Column('avatar', sa.String(), nullable=True),
+    sa.Column('status', sa.Enum('email_verification', 'blocked', 'deactivated', 'reactivation', 'pending', 'active', name='user_status'), nullable=False),
+    sa.Column('email_key', sa.String(), nullable=True),
+    sa.Column('forced_password_reset', sa.Boolean(), nullable=False),
+    sa.Column('stripe_customer_id', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('phone_number'),
+    sa.UniqueConstraint('stripe_customer_id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('cards',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('stripe_payment_method_id', sa.String(length=255), nullable=False),
+    sa.Column('stripe_customer_id', sa.String(length=255), nullable=True),
+    sa.Column('stripe_card_fingerprint', sa.String(length=255), nullable=True),
+    sa.Column('last_four', sa.String(length=4), nullable=False),
+    sa.Column('brand', sa.String(length=50), nullable=False),
+    sa.Column('exp_month', sa.Integer(), nullable=False),
+    sa.Column('exp_year', sa.Integer(), nullable=False),
+    sa.Column('cardholder_name', sa.String(length=255), nullable=False),
+    sa.Column('type', sa.Enum('credit', 'debit', 'unknown', name='card_type'), nullable=False),
+    sa.Column('is_default', sa.Boolean(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('stripe_payment_method_id')
+    )
+    op.create_table('categories',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('contacts',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['contact_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('card_designs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('card_id', sa.Integer(), nullable=False),
+    sa.Column('pattern', sa.Enum('grid', 'stripes', 'dots', 'waves', 'triangles', 'hexagons', name='design_patterns'), nullable=False),
+    sa.Column('color', sa.String(), nullable=False),
+    sa.Column('params', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['card_id'], ['cards.id'], name='card_designs_card_id_fk'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('card_id')
+    )
+    op.create_index(op.f('ix_card_designs_id'), 'card_designs', ['id'], unique=False)
+    op.create_table('deposits',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('card_id', sa.Integer(), nullable=True),
+    sa.Column('payment_method_last_four', sa.String(length=4), nullable=False),
+    sa.Column('currency_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('amount_cents', sa.Integer(), nullable=False),
+    sa.Column('method', sa.Enum('stripe', 'manual', 'bank', name='deposit_method'), nullable=False),
+    sa.Column('deposit_type', sa.Enum('card_payment', 'bank_transfer', 'cash', 'other', name='deposit_type'), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'processing', 'completed', 'failed', 'cancelled', name='deposit_status'), nullable=False),
+    sa.Column('stripe_payment_intent_id', sa.String(length=255), nullable=True),
+    sa.Column('stripe_payment_intent_secret', sa.String(length=255), nullable=True),
+    sa.Column('stripe_charge_id', sa.String(length=255), nullable=True),
+    sa.Column('stripe_customer_id', sa.String(length=255), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('failure_reason', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('failed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ),
+    sa.ForeignKeyConstraint(['currency_id'], ['currencies.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('stripe_payment_intent_id')
+    )
+    op.create_table('transactions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.Enum(*TRANSACTION_STATUSES, name='transaction_status'), nullable=False),
+    sa.Column('recurring', sa.Boolean(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('currency_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['currency_id'], ['currencies.id'], ),
+    sa.ForeignKeyConstraint(['receiver_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('withdrawals',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('card_id', sa.Integer(), nullable=True),
+    sa.Column('currency_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('amount_cents', sa.Integer(), nullable=False),
+    sa.Column('withdrawal_type', sa.Enum('refund', 'payout', 'bank_transfer', name='withdrawal_type'), nullable=False),
+    sa.Column('method', sa.Enum('card', 'bank_account', 'instant', 'standard', name='withdrawal_method'), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'processing', 'completed', 'failed', 'cancelled', name='withdrawal_status'), nullable=False),
+    sa.Column('stripe_payout_id', sa.String(length=255), nullable=True),
+    sa.Column('stripe_refund_id', sa.String(length=255), nullable=True),
+    sa.Column('stripe_payment_intent_id', sa.String(length=255), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('failure_reason', sa.Text(), nullable=True),
+    sa.Column('estimated_arrival', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('failed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ),
+    sa.ForeignKeyConstraint(['currency_id'], ['currencies.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('recurring_transactions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=True),
+    sa.Column('interval', sa.Enum('day', 'week', 'month', name='recurring_interval'), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('recurring_transaction_history',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('execution_date', sa.DateTime(), nullable=False),
+    # transaction_status already exists on PostgreSQL, it was created with the transactions table
+    sa.Column('status', sa.Enum(*TRANSACTION_STATUSES, name='transaction_status').with_variant(
+        postgresql.ENUM(*TRANSACTION_STATUSES, name='transaction_status', create_type=False), 'postgresql'),
+        nullable=False),
+    sa.Column('reason', sa.String(), nullable=True),
+    sa.Column('recurring_transaction_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['recurring_transaction_id'], ['recurring_transactions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.drop_table('recurring_transaction_history')
+    op.drop_table('recurring_transactions')
+    op.drop_table('withdrawals')
+    op.drop_table('transactions')
+    op.drop_table('deposits')
+    op.drop_index(op.f('ix_card_designs_id'), table_name='card_designs')
+    op.drop_table('card_designs')
+    op.drop_table('contacts')
+    op.drop_table('categories')
+    op.drop_table('cards')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_table('currencies')
     # ### end Alembic commands ###
+    for enum_name in ENUM_TYPES:
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,48 @@
+"""Hot path indexes on transactions and users.email_key
+
+Revision ID: 4c2a9e7d1b60
+Revises: 18ff05f451e9
+Create Date: 2026-10-17 09:12:41.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2a9e7d1b60'
+down_revision: Union[str, None] = '18ff05f451e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING = sa.text("status = 'pending'")
+AWAITING_ACCEPTANCE = sa.text("status = 'awaiting_acceptance'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_sender_id_date', 'transactions', ['sender_id', 'date'], unique=False)
+    op.create_index('ix_transactions_receiver_id_date', 'transactions', ['receiver_id', 'date'], unique=False)
+    op.create_index('ix_transactions_pending_sender_id', 'transactions', ['sender_id'], unique=False,
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+    op.create_index('ix_transactions_pending_receiver_id', 'transactions', ['receiver_id'], unique=False,
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+    op.create_index('ix_transactions_awaiting_sender_id', 'transactions', ['sender_id'], unique=False,
+                    postgresql_where=AWAITING_ACCEPTANCE, sqlite_where=AWAITING_ACCEPTANCE)
+    op.create_index('ix_transactions_awaiting_receiver_id_date', 'transactions', ['receiver_id', 'date'],
+                    unique=False, postgresql_where=AWAITING_ACCEPTANCE, sqlite_where=AWAITING_ACCEPTANCE)
+    # Databases built by create_all after email_key got its index already have it
+    op.create_index(op.f('ix_users_email_key'), 'users', ['email_key'], unique=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_email_key'), table_name='users')
+    op.drop_index('ix_transactions_awaiting_receiver_id_date', table_name='transactions')
+    op.drop_index('ix_transactions_awaiting_sender_id', table_name='transactions')
+    op.drop_index('ix_transactions_pending_receiver_id', table_name='transactions')
+    op.drop_index('ix_transactions_pending_sender_id', table_name='transactions')
+    op.drop_index('ix_transactions_receiver_id_date', table_name='transactions')
+    op.drop_index('ix_transactions_sender_id_date', table_name='transactions')
@@ -0,0 +1,52 @@
+"""Notification outbox
+
+Revision ID: 7d3f1a9c5e21
+Revises: 4c2a9e7d1b60
+Create Date: 2026-10-17 11:02:17.284503
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f1a9c5e21'
+down_revision: Union[str, None] = '4c2a9e7d1b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING = sa.text("status = 'pending'")
+SENDING = sa.text("status = 'sending'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('event', sa.String(length=64), nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('status', sa.Enum('pending', 'sending', 'sent', 'failed', name='outbox_status'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_outbox_pending', 'notification_outbox', ['available_at'], unique=False,
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+    op.create_index('ix_notification_outbox_sending', 'notification_outbox', ['claimed_at'], unique=False,
+                    postgresql_where=SENDING, sqlite_where=SENDING)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notification_outbox_sending', table_name='notification_outbox')
+    op.drop_index('ix_notification_outbox_pending', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
+    sa.Enum(name='outbox_status').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,70 @@
+"""Append-only ledger with balance snapshots
+
+Revision ID: a6c1e9f5d382
+Revises: f3b8d2a6c417
+Create Date: 2026-10-17 22:05:12.804127
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c1e9f5d382'
+down_revision: Union[str, None] = 'f3b8d2a6c417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ledger_entries',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('user_id', sa.Integer(), nullable=True),
+                    sa.Column('account', sa.String(length=32), nullable=False),
+                    sa.Column('kind', sa.String(length=32), nullable=False),
+                    sa.Column('reference_id', sa.Integer(), nullable=True),
+                    sa.Column('amount', sa.Float(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(), nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index('ix_ledger_entries_user_id_id', 'ledger_entries', ['user_id', 'id'], unique=False)
+    op.create_table('ledger_snapshots',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('entry_id', sa.Integer(), nullable=False),
+                    sa.Column('balance', sa.Float(), nullable=False),
+                    sa.Column('taken_at', sa.DateTime(), nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index('ix_ledger_snapshots_user_id_entry_id', 'ledger_snapshots', ['user_id', 'entry_id'],
+                    unique=True)
+
+    # Open every wallet with its current balance, including credits still in balance shards,
+    # against an equity account so the journal stays balanced
+    users = sa.table('users', sa.column('id'), sa.column('balance'))
+    shards = sa.table('balance_shards', sa.column('user_id'), sa.column('amount'))
+    entries = sa.table('ledger_entries', sa.column('user_id'), sa.column('account'), sa.column('kind'),
+                       sa.column('reference_id'), sa.column('amount'), sa.column('created_at'))
+    opening = users.c.balance + (sa.select(sa.func.coalesce(sa.func.sum(shards.c.amount), 0))
+                                 .where(shards.c.user_id == users.c.id)
+                                 .scalar_subquery())
+    now = sa.literal(datetime.now(), sa.DateTime())
+    columns = ['user_id', 'account', 'kind', 'reference_id', 'amount', 'created_at']
+    op.execute(entries.insert().from_select(columns, sa.select(users.c.id, sa.literal('wallet'), sa.literal('opening'),
+                                                               users.c.id, opening, now)
+                                            .where(opening != 0)))
+    op.execute(entries.insert().from_select(columns, sa.select(sa.null(), sa.literal('equity'), sa.literal('opening'),
+                                                               users.c.id, -opening, now)
+                                            .where(opening != 0)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ledger_snapshots_user_id_entry_id', table_name='ledger_snapshots')
+    op.drop_table('ledger_snapshots')
+    op.drop_index('ix_ledger_entries_user_id_id', table_name='ledger_entries')
+    op.drop_table('ledger_entries')
@@ -0,0 +1,28 @@
+"""Per-user data version for conditional GETs
+
+Revision ID: a7c3e9f1b5d8
+Revises: e5b9c1d7a3f4
+Create Date: 2026-10-18 07:26:53.104928
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f1b5d8'
+down_revision: Union[str, None] = 'e5b9c1d7a3f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'data_version')
@@ -0,0 +1,29 @@
+"""Index recurring transaction history by schedule and execution date
+
+Revision ID: a9e4c3b7f2d8
+Revises: 7d3f1a9c5e21
+Create Date: 2026-10-17 14:05:22.318764
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4c3b7f2d8'
+down_revision: Union[str, None] = '7d3f1a9c5e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_recurring_transaction_history_rid_date', 'recurring_transaction_history',
+                    ['recurring_transaction_id', 'execution_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_recurring_transaction_history_rid_date', table_name='recurring_transaction_history')
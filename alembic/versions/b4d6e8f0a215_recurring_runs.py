@@ -0,0 +1,41 @@
+"""Checkpointed recurring transaction runs
+
+Revision ID: b4d6e8f0a215
+Revises: e1f7b2c4d903
+Create Date: 2026-10-17 19:03:27.551904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d6e8f0a215'
+down_revision: Union[str, None] = 'e1f7b2c4d903'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('recurring_runs',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('scheduled_for', sa.DateTime(), nullable=False),
+                    sa.Column('window_ends_at', sa.DateTime(), nullable=False),
+                    sa.Column('rate', sa.Float(), nullable=False),
+                    sa.Column('due', sa.Integer(), nullable=False),
+                    sa.Column('completed', sa.Integer(), nullable=False),
+                    sa.Column('failed', sa.Integer(), nullable=False),
+                    sa.Column('skipped', sa.Integer(), nullable=False),
+                    sa.Column('started_at', sa.DateTime(), nullable=False),
+                    sa.Column('checkpoint_at', sa.DateTime(), nullable=True),
+                    sa.Column('finished_at', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('scheduled_for'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('recurring_runs')
@@ -0,0 +1,28 @@
+"""Auto-accept of transfers from trusted contacts
+
+Revision ID: b4e8a2d6f1c9
+Revises: a6c1e9f5d382
+Create Date: 2026-10-17 23:41:09.274815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8a2d6f1c9'
+down_revision: Union[str, None] = 'a6c1e9f5d382'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('auto_accept', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('contacts', 'auto_accept')
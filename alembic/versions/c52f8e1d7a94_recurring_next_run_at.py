@@ -0,0 +1,64 @@
+"""Precomputed next_run_at on recurring transactions
+
+Revision ID: c52f8e1d7a94
+Revises: a9e4c3b7f2d8
+Create Date: 2026-10-17 16:40:09.772035
+
+"""
+from datetime import datetime, time, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52f8e1d7a94'
+down_revision: Union[str, None] = 'a9e4c3b7f2d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEDULED = sa.text("next_run_at IS NOT NULL")
+INTERVAL_DAYS = {"day": 1, "week": 7, "month": 30}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('recurring_transactions', sa.Column('next_run_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_recurring_transactions_next_run_at', 'recurring_transactions', ['next_run_at'],
+                    unique=False, postgresql_where=SCHEDULED, sqlite_where=SCHEDULED)
+
+    # Active schedules run one interval after their last execution, or today if they never ran.
+    # Runs already missed stay in the past so the catch-up mode replays them.
+    recurring = sa.table('recurring_transactions', sa.column('id'), sa.column('interval'),
+                         sa.column('is_active'), sa.column('next_run_at'))
+    history = sa.table('recurring_transaction_history', sa.column('recurring_transaction_id'),
+                       sa.column('execution_date'))
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(recurring.c.id, recurring.c.interval, sa.func.max(history.c.execution_date))
+                        .select_from(recurring.outerjoin(history,
+                                                         history.c.recurring_transaction_id == recurring.c.id))
+                        .where(recurring.c.is_active == sa.true())
+                        .group_by(recurring.c.id, recurring.c.interval)).all()
+
+    today = datetime.combine(datetime.now().date(), time.min)
+    values = []
+    for recurring_id, interval, last_execution in rows:
+        if last_execution is None:
+            next_run_at = today
+        else:
+            if isinstance(last_execution, str):
+                last_execution = datetime.fromisoformat(last_execution)
+            next_run_at = datetime.combine(last_execution.date(), time.min) + timedelta(days=INTERVAL_DAYS[interval])
+        values.append({"recurring_id": recurring_id, "next_run_at": next_run_at})
+
+    if values:
+        bind.execute(recurring.update()
+                     .where(recurring.c.id == sa.bindparam('recurring_id'))
+                     .values(next_run_at=sa.bindparam('next_run_at')), values)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_recurring_transactions_next_run_at', table_name='recurring_transactions')
+    op.drop_column('recurring_transactions', 'next_run_at')
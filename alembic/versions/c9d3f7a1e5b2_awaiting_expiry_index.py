@@ -0,0 +1,31 @@
+"""Index for expiring transfers awaiting acceptance
+
+Revision ID: c9d3f7a1e5b2
+Revises: b4e8a2d6f1c9
+Create Date: 2026-10-18 00:27:51.936204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d3f7a1e5b2'
+down_revision: Union[str, None] = 'b4e8a2d6f1c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+AWAITING_ACCEPTANCE = sa.text("status = 'awaiting_acceptance'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_awaiting_date', 'transactions', ['date'], unique=False,
+                    postgresql_where=AWAITING_ACCEPTANCE, sqlite_where=AWAITING_ACCEPTANCE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_awaiting_date', table_name='transactions')
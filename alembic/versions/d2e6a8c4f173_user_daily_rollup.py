@@ -0,0 +1,56 @@
+"""Per-user daily rollups of transactions
+
+Revision ID: d2e6a8c4f173
+Revises: c9d3f7a1e5b2
+Create Date: 2026-10-18 02:14:36.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e6a8c4f173'
+down_revision: Union[str, None] = 'c9d3f7a1e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_rollup',
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('day', sa.Date(), nullable=False),
+                    sa.Column('direction', sa.String(length=3), nullable=False),
+                    sa.Column('status', sa.String(length=32), nullable=False),
+                    sa.Column('transaction_count', sa.Integer(), server_default='0', nullable=False),
+                    sa.Column('amount', sa.Float(), server_default='0', nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+                    sa.PrimaryKeyConstraint('user_id', 'day', 'direction', 'status'))
+
+    # Same rows as UserDailyRollup.collect produces for every existing transaction: an "out" row for the sender
+    # and an "in" row for the receiver of transfers between two users
+    transactions = sa.table('transactions', sa.column('sender_id'), sa.column('receiver_id'), sa.column('date'),
+                            sa.column('status'), sa.column('amount'))
+    rollups = sa.table('user_daily_rollup', sa.column('user_id'), sa.column('day'), sa.column('direction'),
+                       sa.column('status'), sa.column('transaction_count'), sa.column('amount'))
+    if op.get_bind().dialect.name == 'sqlite':
+        day = sa.func.date(transactions.c.date)
+    else:
+        day = sa.cast(transactions.c.date, sa.Date)
+    status = sa.cast(transactions.c.status, sa.String)
+    columns = ['user_id', 'day', 'direction', 'status', 'transaction_count', 'amount']
+    for user_id, direction, where in ((transactions.c.sender_id, 'out', sa.true()),
+                                      (transactions.c.receiver_id, 'in',
+                                       transactions.c.receiver_id != transactions.c.sender_id)):
+        op.execute(rollups.insert().from_select(columns, sa.select(user_id, day, sa.literal(direction), status,
+                                                                   sa.func.count(), sa.func.sum(transactions.c.amount))
+                                                .where(where)
+                                                .group_by(user_id, day, status)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_rollup')
@@ -0,0 +1,59 @@
+"""Execution counters on recurring transactions
+
+Revision ID: d7a1c9e3f4b6
+Revises: b4d6e8f0a215
+Create Date: 2026-10-17 19:48:15.230417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a1c9e3f4b6'
+down_revision: Union[str, None] = 'b4d6e8f0a215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('recurring_transactions',
+                  sa.Column('execution_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('recurring_transactions',
+                  sa.Column('failure_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('recurring_transactions', sa.Column('last_executed_at', sa.DateTime(), nullable=True))
+    op.add_column('recurring_transactions',
+                  sa.Column('total_transferred', sa.Float(), server_default='0', nullable=False))
+
+    # Same aggregates as RecurringCountersService.backfill, which can be re-run on a live database
+    recurring = sa.table('recurring_transactions', sa.column('id'), sa.column('transaction_id'),
+                         sa.column('execution_count'), sa.column('failure_count'),
+                         sa.column('last_executed_at'), sa.column('total_transferred'))
+    history = sa.table('recurring_transaction_history', sa.column('recurring_transaction_id'),
+                       sa.column('execution_date'), sa.column('status'))
+    transactions = sa.table('transactions', sa.column('id'), sa.column('amount'))
+
+    def count(status: str):
+        return (sa.select(sa.func.count())
+                .where(history.c.recurring_transaction_id == recurring.c.id, history.c.status == status)
+                .scalar_subquery())
+
+    amount = sa.select(transactions.c.amount).where(transactions.c.id == recurring.c.transaction_id).scalar_subquery()
+    op.execute(recurring.update().values(
+        execution_count=count('completed'),
+        failure_count=count('failed'),
+        last_executed_at=(sa.select(sa.func.max(history.c.execution_date))
+                          .where(history.c.recurring_transaction_id == recurring.c.id)
+                          .scalar_subquery()),
+        total_transferred=sa.func.coalesce(count('completed') * amount, 0)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('recurring_transactions', 'total_transferred')
+    op.drop_column('recurring_transactions', 'last_executed_at')
+    op.drop_column('recurring_transactions', 'failure_count')
+    op.drop_column('recurring_transactions', 'execution_count')
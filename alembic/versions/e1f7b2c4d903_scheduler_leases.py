@@ -0,0 +1,36 @@
+"""Scheduler leader lease
+
+Revision ID: e1f7b2c4d903
+Revises: c52f8e1d7a94
+Create Date: 2026-10-17 18:12:44.108215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f7b2c4d903'
+down_revision: Union[str, None] = 'c52f8e1d7a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    leases = op.create_table('scheduler_leases',
+                             sa.Column('name', sa.String(length=64), nullable=False),
+                             sa.Column('holder', sa.String(length=255), nullable=True),
+                             sa.Column('acquired_at', sa.DateTime(), nullable=True),
+                             sa.Column('renewed_at', sa.DateTime(), nullable=True),
+                             sa.Column('expires_at', sa.DateTime(), nullable=True),
+                             sa.PrimaryKeyConstraint('name'))
+    # Workers only ever update the row, so racing first heartbeats cannot collide on insert
+    op.bulk_insert(leases, [{'name': 'scheduler'}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scheduler_leases')
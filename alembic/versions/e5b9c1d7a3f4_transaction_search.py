@@ -0,0 +1,63 @@
+"""Full-text search over transaction descriptions
+
+Revision ID: e5b9c1d7a3f4
+Revises: d2e6a8c4f173
+Create Date: 2026-10-18 04:41:09.372815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c1d7a3f4'
+down_revision: Union[str, None] = 'd2e6a8c4f173'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same statements as app.models.transaction_search
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(description, sender_id, receiver_id, "
+    "content='transactions', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions "
+    "WHEN new.description IS NOT NULL BEGIN "
+    "INSERT INTO transactions_fts (rowid, description, sender_id, receiver_id) "
+    "VALUES (new.id, new.description, new.sender_id, new.receiver_id); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions "
+    "WHEN old.description IS NOT NULL BEGIN "
+    "INSERT INTO transactions_fts (transactions_fts, rowid, description, sender_id, receiver_id) "
+    "VALUES ('delete', old.id, old.description, old.sender_id, old.receiver_id); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, sender_id, receiver_id "
+    "ON transactions BEGIN "
+    "INSERT INTO transactions_fts (transactions_fts, rowid, description, sender_id, receiver_id) "
+    "SELECT 'delete', old.id, old.description, old.sender_id, old.receiver_id WHERE old.description IS NOT NULL; "
+    "INSERT INTO transactions_fts (rowid, description, sender_id, receiver_id) "
+    "SELECT new.id, new.description, new.sender_id, new.receiver_id WHERE new.description IS NOT NULL; END",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.create_index('ix_transactions_description_search', 'transactions',
+                        [sa.text("to_tsvector('simple', coalesce(description, ''))")], unique=False,
+                        postgresql_using='gin')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        # Index the descriptions already stored
+        op.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_transactions_description_search', table_name='transactions')
+    elif dialect == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS transactions_fts_{trigger}")
+        op.execute("DROP TABLE IF EXISTS transactions_fts")
@@ -0,0 +1,38 @@
+"""Confirmation time of transfers awaiting acceptance
+
+Revision ID: f3a9d5b7c1e6
+Revises: a7c3e9f1b5d8
+Create Date: 2026-10-18 09:14:37.582016
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9d5b7c1e6'
+down_revision: Union[str, None] = 'a7c3e9f1b5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+AWAITING_ACCEPTANCE = sa.text("status = 'awaiting_acceptance'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transactions', sa.Column('awaiting_since', sa.DateTime(), nullable=True))
+    # The confirmation time of existing transfers is unknown, their creation date is the closest bound
+    op.execute("UPDATE transactions SET awaiting_since = date WHERE status = 'awaiting_acceptance'")
+    op.drop_index('ix_transactions_awaiting_date', table_name='transactions')
+    op.create_index('ix_transactions_awaiting_since', 'transactions', ['awaiting_since'], unique=False,
+                    postgresql_where=AWAITING_ACCEPTANCE, sqlite_where=AWAITING_ACCEPTANCE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_awaiting_since', table_name='transactions')
+    op.create_index('ix_transactions_awaiting_date', 'transactions', ['date'], unique=False,
+                    postgresql_where=AWAITING_ACCEPTANCE, sqlite_where=AWAITING_ACCEPTANCE)
+    op.drop_column('transactions', 'awaiting_since')
@@ -0,0 +1,38 @@
+"""Sharded credit rows for hot receiving accounts
+
+Revision ID: f3b8d2a6c417
+Revises: d7a1c9e3f4b6
+Create Date: 2026-10-17 21:12:40.518372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d2a6c417'
+down_revision: Union[str, None] = 'd7a1c9e3f4b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('credit_shards', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('balance_shards',
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+                    sa.Column('amount', sa.Float(), server_default='0', nullable=False),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+                    sa.PrimaryKeyConstraint('user_id', 'shard'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Pending credits would be lost with the table
+    op.execute("UPDATE users SET balance = balance + "
+               "(SELECT COALESCE(SUM(amount), 0) FROM balance_shards WHERE balance_shards.user_id = users.id)")
+    op.drop_table('balance_shards')
+    op.drop_column('users', 'credit_shards')
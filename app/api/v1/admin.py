@@ -1,16 +1,21 @@
-from typing import Annotated
+from typing import Annotated, Dict
 
 from fastapi import APIRouter, Depends
 from fastapi.params import Query
 from sqlalchemy.orm import Session
 
 from app.business import WithdrawalService
+from app.business.transaction.transaction_forecast import forecast_cache
+from app.business.transaction.transaction_outbox import outbox_dispatcher
+from app.business.user.balance_shards import BalanceShardService
 from app.business.user.user_admin import AdminService
 from app.dependencies import get_db, get_current_admin
+from app.infrestructure import principal_cache, hashing_pool, mail_transport
+from app.infrestructure.scheduler import scheduler_leader
 from app.models import User
 from app.schemas import UserPublicResponse
 from app.schemas.admin import UpdateUserStatus, ListAllUsersResponse, ListAllUserTransactionsResponse, \
-    AdminTransactionResponse
+    AdminTransactionResponse, UpdateCreditShards
 from app.schemas.user import UserResponse
 from app.schemas.router import AdminUserFilter
 from app.schemas.withdrawal import WithdrawalResponse, WithdrawalUpdate
@@ -136,3 +141,88 @@ def promote_user_to_admin(user_id: int,
 
     """
     return AdminService.promote_user_to_admin(db, admin, user_id)
+
+
+@router.put("/users/{user_id}/credit-shards", response_model=Dict,
+            description="Spread the incoming credits of a heavily credited account over several rows.")
+def update_credit_shards(user_id: int,
+                         update_data: UpdateCreditShards,
+                         admin: User = Depends(get_current_admin),
+                         db: Session = Depends(get_db)):
+    """
+    Sets the number of balance shards receiving the credits of a user, 0 credits the balance directly.
+    :param user_id: user to change
+    :param update_data: number of shards
+    :param admin: Current authenticated administrator invoking the request.
+    :param db: database session
+    :return: shard count, balance and credits not folded into the balance yet
+    """
+    return BalanceShardService.set_credit_shards(db, user_id, update_data.shards)
+
+
+@router.get("/metrics/principal-cache", response_model=Dict,
+            description="Get hit/miss counters of the authenticated principal cache for this worker.")
+def get_principal_cache_stats(admin: User = Depends(get_current_admin)):
+    """
+    Returns size, hit and miss counters of the per-process principal cache.
+    :param admin: Current authenticated administrator invoking the request.
+    :return: cache statistics
+    """
+    return principal_cache.stats()
+
+
+@router.get("/metrics/forecast-cache", response_model=Dict,
+            description="Get hit/miss counters of the balance forecast cache for this worker.")
+def get_forecast_cache_stats(admin: User = Depends(get_current_admin)):
+    """
+    Returns size, hit and miss counters of the per-process balance forecast cache.
+    :param admin: Current authenticated administrator invoking the request.
+    :return: cache statistics
+    """
+    return forecast_cache.stats()
+
+
+@router.get("/metrics/hashing", response_model=Dict,
+            description="Get queue depth and throughput counters of the password hashing pool for this worker.")
+def get_hashing_pool_stats(admin: User = Depends(get_current_admin)):
+    """
+    Returns queue depth, submitted, completed and rejected counters of the hashing process pool.
+    :param admin: Current authenticated administrator invoking the request.
+    :return: hashing pool statistics
+    """
+    return hashing_pool.stats()
+
+
+@router.get("/metrics/mail", response_model=Dict,
+            description="Get connection pool and throughput counters of the mail transport for this worker.")
+def get_mail_transport_stats(admin: User = Depends(get_current_admin)):
+    """
+    Returns in-flight, sent and error counters of the pooled mail transport.
+    :param admin: Current authenticated administrator invoking the request.
+    :return: mail transport statistics
+    """
+    return mail_transport.stats()
+
+
+@router.get("/metrics/outbox", response_model=Dict,
+            description="Get the notification outbox backlog and the dispatcher counters of this worker.")
+def get_outbox_stats(db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    """
+    Returns outbox rows per status together with the sent, retried and failed counters of the dispatcher.
+    :param db: database session
+    :param admin: Current authenticated administrator invoking the request.
+    :return: outbox statistics
+    """
+    return {**outbox_dispatcher.stats(), "backlog": outbox_dispatcher.backlog(db)}
+
+
+@router.get("/metrics/scheduler", response_model=Dict,
+            description="Get which worker holds the scheduler lease and runs the scheduled jobs.")
+def get_scheduler_status(db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+    """
+    Returns the holder and expiry of the scheduler lease together with the election counters of this worker.
+    :param db: database session
+    :param admin: Current authenticated administrator invoking the request.
+    :return: scheduler leadership status
+    """
+    return scheduler_leader.status(db)
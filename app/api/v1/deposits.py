@@ -1,12 +1,13 @@
+import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi.params import Query
 from sqlalchemy.orm import Session
 
 from app.business.payment import *
 from app.business.stripe import *
-from app.dependencies import get_db, get_user_except_pending_fpr, get_user_except_fpr
+from app.dependencies import get_db, get_user_except_pending_fpr, get_user_except_fpr, conditional_get
 from app.models.user import User
 from app.schemas.deposit import (
     DepositWithCard, DepositResponse, DepositHistoryResponse, DepositStatsResponse, DepositPaymentIntentCreate,
@@ -57,11 +58,15 @@ def get_user_deposits(filter : Annotated[UserDepositsFilter, Query()],
 
 @router.get("/stats", response_model=DepositStatsResponse)
 def get_deposit_stats(
+        request: Request,
+        response: Response,
         user: User = Depends(get_user_except_fpr),
         db: Session = Depends(get_db)
 ):
-    """Get deposit statistics for the current user"""
-    return DepositService.get_deposit_stats(db, user)
+    """Get deposit statistics for the current user, 304 Not Modified if If-None-Match holds the current ETag"""
+    # Monthly figures are counted from the current date, so the ETag changes daily too
+    return (conditional_get(request, response, user, datetime.date.today())
+            or DepositService.get_deposit_stats(db, user))
 
 
 @router.get("/{deposit_id}", response_model=DepositResponse)
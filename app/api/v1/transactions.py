@@ -1,19 +1,28 @@
 from typing import List, Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from starlette import status
 
 from app.business import CategoryService
-from app.business.transaction import TransactionService
-from app.dependencies import get_db, get_user_except_pending_fpr, getValidUser
+from app.business.transaction import (TransactionService, ForecastService, TransactionBulkService,
+                                      TransactionBatchService)
+from app.dependencies import get_db, get_user_except_pending_fpr, getValidUser, conditional_get
 from app.models import User
-from app.schemas.router import TransactionHistoryFilter
+from app.schemas.router import TransactionHistoryFilter, TransactionForecastFilter
 from app.schemas.transaction import (
     TransactionHistoryResponse,
     TransactionResponse,
     TransactionCreate,
-    TransactionStatusUpdate
+    TransactionStatusUpdate,
+    TransactionForecastResponse,
+    BulkTransferCreate,
+    BulkTransferResponse,
+    DirectTransferCreate,
+    TransactionBatchUpdate,
+    TransactionBatchResponse
 )
 
 router = APIRouter(tags=["Transactions"])
@@ -22,6 +31,8 @@ router = APIRouter(tags=["Transactions"])
 @router.get("/", response_model=TransactionHistoryResponse)
 def get_transaction_history(
         filter_params: Annotated[TransactionHistoryFilter, Query()],
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
         user: User = Depends(getValidUser)
 ):
@@ -33,18 +44,25 @@ def get_transaction_history(
     - **Users**: Filter by specific sender_id or receiver_id
     - **Direction**: Filter by 'in' (received) or 'out' (sent) transactions
     - **Status**: Filter by transaction status (pending, completed, etc.)
-    - **Sorting**: Sort by date or amount, ascending or descending
-    - **Pagination**: Use limit and offset for pagination
+    - **Search**: q matches transactions whose description contains all of its words
+    - **Sorting**: Sort by date or amount, ascending or descending, or by relevance to q
+    - **Pagination**: Use limit and page for pagination, or pagination=cursor and pass back
+      next_cursor as cursor for constant-cost paging through long histories
 
     Returns paginated transaction history with summary statistics including
     total transactions, outgoing total, and incoming total amounts.
     Only COMPLETED transactions are included in financial totals.
+
+    Responses carry an ETag, send it back in If-None-Match to get 304 Not Modified while nothing changed.
     """
-    return TransactionService.get_user_transaction_history(db, user, filter_params)
+    return (conditional_get(request, response, user)
+            or TransactionService.get_user_transaction_history(db, user, filter_params))
 
 
 @router.get("/pending/received", response_model=List[TransactionResponse])
-def get_pending_received_transactions(db: Session = Depends(get_db),
+def get_pending_received_transactions(request: Request,
+                                      response: Response,
+                                      db: Session = Depends(get_db),
                                       user: User = Depends(get_user_except_pending_fpr)):
     """
     Get all transactions awaiting acceptance where the user is the receiver.
@@ -54,8 +72,10 @@ def get_pending_received_transactions(db: Session = Depends(get_db),
     receiver can accept or decline with real financial commitment.
 
     Note: Does NOT include PENDING transactions (sender created but not confirmed).
+    Supports conditional requests with If-None-Match, like the history.
     """
-    return TransactionService.get_pending_received_transactions(db, user)
+    return (conditional_get(request, response, user)
+            or TransactionService.get_pending_received_transactions(db, user))
 
 
 @router.get("/pending/sent", response_model=List[TransactionResponse])
@@ -70,6 +90,22 @@ def get_pending_sent_transactions(db: Session = Depends(get_db),
     return TransactionService.get_pending_sent_transactions(db, user)
 
 
+@router.get("/forecast", response_model=TransactionForecastResponse)
+def get_balance_forecast(forecast_params: Annotated[TransactionForecastFilter, Query()],
+                         db: Session = Depends(get_db),
+                         user: User = Depends(get_user_except_pending_fpr)):
+    """
+    Project the available balance of the authenticated user up to 24 months ahead.
+
+    - **Recurring transactions**: every active schedule, sent or received, on the days it will run
+    - **Everything else**: the average daily net of recent one-off transfers, deposits and withdrawals
+    - **Granularity**: one point per day, week or calendar month
+
+    Also returns the lowest projected balance and the first day the balance would turn negative.
+    """
+    return ForecastService.forecast(db, user, forecast_params.months, forecast_params.granularity)
+
+
 @router.post("/", response_model=TransactionResponse,
              description="Create a new pending transaction for the authenticated user.")
 def create_transaction(transaction_data: TransactionCreate,
@@ -90,6 +126,81 @@ def create_transaction(transaction_data: TransactionCreate,
     return TransactionService.create_pending_transaction(db, user, transaction_data)
 
 
+@router.post("/direct", response_model=TransactionResponse,
+             description="Send money to a trusted contact, completed in one call.")
+def create_direct_transaction(transfer: DirectTransferCreate,
+                              db: Session = Depends(get_db),
+                              user: User = Depends(get_user_except_pending_fpr)):
+    """
+    Send money to a trusted contact without the confirm and accept steps.
+
+    The receiver must be in the sender's contacts and must have enabled auto-accept for the sender with
+    `PUT /users/contacts/{contact_id}/auto-accept`. The balances move and the transaction is COMPLETED at once.
+
+    :param transfer: Receiver identifier, amount and optional description and category.
+    :param db: The SQLAlchemy session dependency.
+    :param user: The currently authenticated user (sender).
+    :return: The completed transaction.
+    """
+    return TransactionService.create_direct_transaction(db, user, transfer)
+
+
+@router.post("/bulk", response_model=BulkTransferResponse,
+             description="Create and confirm a batch of transactions from a JSON or CSV list of recipients and amounts.",
+             openapi_extra={"requestBody": {"required": True, "content": {
+                 "application/json": {"schema": BulkTransferCreate.model_json_schema()},
+                 "text/csv": {"schema": {"type": "string",
+                                         "example": "identifier,amount,description\nalice,120.50,March salary"}}}}})
+async def create_bulk_transactions(request: Request,
+                                   currency_id: int = 1,
+                                   db: Session = Depends(get_db),
+                                   user: User = Depends(get_user_except_pending_fpr)):
+    """
+    Create a batch of transactions awaiting acceptance, e.g. a payroll.
+
+    The body is either JSON (`{"transfers": [{"identifier", "amount", "description"}], "currency_id"}`) or, with
+    `Content-Type: text/csv`, rows under an `identifier,amount[,description][,category_id]` header.
+    The total of the valid rows is reserved at once; invalid rows are skipped and reported.
+
+    :param request: The raw request, read as JSON or CSV.
+    :param currency_id: Currency of CSV batches.
+    :param db: The SQLAlchemy session dependency.
+    :param user: The currently authenticated user (sender).
+    :return: Per-row report with the id of every created transaction.
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        items, errors = TransactionBulkService.parse_csv(body.decode("utf-8-sig"))
+    else:
+        try:
+            batch = BulkTransferCreate.model_validate_json(body)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+        items, errors, currency_id = batch.transfers, {}, batch.currency_id
+    return await run_in_threadpool(TransactionBulkService.create_bulk, db, user, items, currency_id, errors)
+
+
+@router.put("/status", response_model=TransactionBatchResponse,
+            description="Update the status of many transactions at once.")
+def update_transaction_statuses(batch: TransactionBatchUpdate,
+                                db: Session = Depends(get_db),
+                                user: User = Depends(get_user_except_pending_fpr)):
+    """
+    Apply confirm, accept, decline or cancel to many transactions in one request, e.g. accept every pending
+    request at once.
+
+    Items are applied in order and in one database transaction. Items that cannot be applied, because the
+    transaction does not exist, belongs to someone else or is not in a status the action applies to, are skipped.
+    Recurring transactions must be updated one at a time.
+
+    :param batch: (transaction_id, action) pairs.
+    :param db: The SQLAlchemy session dependency.
+    :param user: The currently authenticated user.
+    :return: The outcome and resulting status of every item.
+    """
+    return TransactionBatchService.update_statuses(db, user, batch.items)
+
+
 @router.put("/{transaction_id}/status", response_model=TransactionResponse,
             description="Update the status of a transaction.")
 def update_transaction_status(transaction_id: int,
@@ -1,18 +1,20 @@
 from typing import List, Dict
 import time
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from starlette import status
 
 from app.business import UAuth, UVal
+from app.business.payment.ledger import LedgerService
 from app.business.user.user_contacts import UserContacts
 from app.dependencies import get_db, get_user_except_pending_fpr, get_user_except_fpr, get_user_even_with_fpr, \
-    get_current_admin, get_active_user_except_blocked, getValidUser
+    get_current_admin, get_active_user_except_blocked, getValidUser, conditional_get
 from app.models import User, Contact
-from app.schemas.contact import ContactResponse, ContactPublicResponse, ContactCreate
-from app.schemas.user import UserCreate, UserPublicResponse, UserResponse, UserUpdate, PasswordResetRequest, PasswordResetConfirm
+from app.schemas.contact import ContactResponse, ContactPublicResponse, ContactCreate, ContactAutoAccept
+from app.schemas.user import UserCreate, UserPublicResponse, UserResponse, UserUpdate, PasswordResetRequest, PasswordResetConfirm, \
+    BalanceAtResponse
 import cloudinary
 import cloudinary.uploader
 from app.config import CLOUDINARY_URL, SECRET_KEY, ALGORITHM
@@ -30,7 +32,7 @@ cloudinary.config()
 router = APIRouter(tags=["Users"])
 
 @router.post("/", response_model=UserPublicResponse)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     Create a new user in the database.
 
@@ -46,7 +48,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     UserPrivateResponse
         Newly created user based on the `UserPrivateResponse` schema, excluding the `balance` field.
     """
-    return UAuth.register(user, db)
+    return await UAuth.register(user, db)
 
 
 @router.put("/email/{key}", response_model=Dict)
@@ -75,7 +77,7 @@ def update_user(update_data: UserUpdate,
 
 
 @router.post("/token", response_model=None)
-def login(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
     Verifies user login credentials and returns an access token if successful.
 
@@ -91,16 +93,21 @@ def login(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get
     response : Dict
         A dictionary containing the access token, token type and username.
     """
-    return UAuth.login(db, user)
+    return await UAuth.login(db, user)
 
 
 @router.get("/me", response_model=UserResponse)
-def get_user(user: User = Depends(get_user_except_fpr)):
+def get_user(request: Request, response: Response, user: User = Depends(get_user_except_fpr),
+             db: Session = Depends(get_db)):
     """
     Retrieves user details based on the provided access token if the user isn't forced to reset password.
 
     Parameters
     ----------
+    request : Request (automatically fetched)
+        Its If-None-Match header is compared with the ETag of the current data version of the user.
+    response : Response (automatically fetched)
+        Receives the ETag header.
     user : Current logged in user (automatically fetched)
         User details based on the `UserResponse` schema.
     db : Session (automatically fetched)
@@ -109,11 +116,37 @@ def get_user(user: User = Depends(get_user_except_fpr)):
     Returns
     -------
     user : UserResponse
-        A response containing the user details.
+        A response containing the user details, or 304 Not Modified if the client already has them.
     """
+    # Show credits collected in balance shards as part of the balance. Shard credits leave the data version alone,
+    # folding them advances it, so this runs before the ETag is computed
+    if user.fold_credit_shards():
+        db.commit()
+    not_modified = conditional_get(request, response, user)
+    if not_modified:
+        return not_modified
     return user
 
 
+@router.get("/me/balance", response_model=BalanceAtResponse)
+def get_balance_at(at: datetime.datetime, user: User = Depends(get_user_except_fpr), db: Session = Depends(get_db)):
+    """
+    Retrieves the balance the user had at a point in time, from the ledger.
+
+    Parameters
+    ----------
+    at : Point in time
+    user : Current logged in user (automatically fetched)
+    db : Session (automatically fetched)
+
+    Returns
+    -------
+    BalanceAtResponse
+        The balance at `at`, including credits not yet folded from balance shards.
+    """
+    return BalanceAtResponse(at=at, balance=round(LedgerService.balance_at(db, user.id, at), 2))
+
+
 @router.get("/contacts", response_model=List[ContactPublicResponse])
 def get_contacts(db: ContactResponse = Depends(get_db), user: User = Depends(get_user_except_pending_fpr)):
     """
@@ -133,6 +166,20 @@ def create_contact(contact: ContactCreate,
     return UserContacts.add_contact(db, user, contact)
 
 
+@router.put("/contacts/{contact_id}/auto-accept", response_model=ContactPublicResponse)
+def set_contact_auto_accept(contact_id: int,
+                            settings: ContactAutoAccept,
+                            db: Session = Depends(get_db),
+                            user: User = Depends(get_user_except_pending_fpr)):
+    """
+    Accept transfers from a contact automatically.
+
+    Contacts who also have the authenticated user in their contacts can then send money with
+    `POST /transactions/direct`, which completes the transfer in one call.
+    """
+    return UserContacts.set_auto_accept(db, user, contact_id, settings.auto_accept)
+
+
 @router.delete("/contacts/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 def remove_contact(contact_id: int,
                    db: Session = Depends(get_db),
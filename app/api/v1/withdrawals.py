@@ -1,11 +1,12 @@
+import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from app.business import StripeWithdrawalService
 from app.business.payment.payment_withdrawal import WithdrawalService
-from app.dependencies import get_db, get_user_except_pending_fpr
+from app.dependencies import get_db, get_user_except_pending_fpr, conditional_get
 from app.models.user import User
 from app.schemas.withdrawal import (
     WithdrawalCreate, WithdrawalResponse,
@@ -50,11 +51,18 @@ def get_user_withdrawals(
 
 @router.get("/stats", response_model=WithdrawalStatsResponse)
 def get_withdrawal_stats(
+        request: Request,
+        response: Response,
         user: User = Depends(get_user_except_pending_fpr),
         db: Session = Depends(get_db)
 ):
-    """Get comprehensive withdrawal statistics for the current user"""
-    return WithdrawalService.get_withdrawal_stats(db, user)
+    """
+    Get comprehensive withdrawal statistics for the current user, 304 Not Modified if If-None-Match holds the
+    current ETag
+    """
+    # Last month and frequency figures are counted from the current date, so the ETag changes daily too
+    return (conditional_get(request, response, user, datetime.date.today())
+            or WithdrawalService.get_withdrawal_stats(db, user))
 
 
 @router.get("/{withdrawal_id}", response_model=WithdrawalResponse)
@@ -1,3 +1,4 @@
 from .payment_card import CardService
 from .payment_deposit import DepositService
 from .payment_withdrawal import WithdrawalService
+from .ledger import LedgerService
@@ -0,0 +1,173 @@
+import argparse
+import datetime
+import logging
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.config import LEDGER_SNAPSHOT_INTERVAL, LEDGER_SNAPSHOT_MIN_ENTRIES, LEDGER_SNAPSHOT_SETTLE_SECONDS
+from app.infrestructure import SessionLocal
+from app.infrestructure.scheduler import schedule_interval_job
+from app.models import BalanceShard, LedgerEntry, LedgerSnapshot, User
+
+logger = logging.getLogger(__name__)
+
+# Float sums of the ledger and of the balance may differ in the last digits
+TOLERANCE = 0.005
+
+WALLET = "wallet"
+
+
+class LedgerService:
+    """
+    Double-entry journal of every balance movement, written in the DB transaction that moves the balance.
+    Periodic per-user snapshots bound a historical balance to the entries written since the last one.
+    """
+
+    @classmethod
+    def journal(cls, kind: str, reference_id: Optional[int], amount: float, debit: Optional[int],
+                credit: Optional[int], external: str = None, now: datetime.datetime = None) -> List[dict]:
+        """
+        The two entries moving `amount` from the wallet of `debit` to the wallet of `credit`
+        :param debit: paying user, None for the `external` account
+        :param credit: receiving user, None for the `external` account
+        """
+        now = now or datetime.datetime.now()
+        return [{"user_id": debit, "account": WALLET if debit else external, "kind": kind,
+                 "reference_id": reference_id, "amount": -amount, "created_at": now},
+                {"user_id": credit, "account": WALLET if credit else external, "kind": kind,
+                 "reference_id": reference_id, "amount": amount, "created_at": now}]
+
+    @classmethod
+    def record(cls, db: Session, entries: List[dict]) -> None:
+        """Insert journal entries with one statement, the caller commits them with the balance change"""
+        if entries:
+            db.execute(insert(LedgerEntry.__table__), entries)
+
+    @classmethod
+    def record_transfer(cls, db: Session, transaction, kind: str = "transfer") -> None:
+        cls.record(db, cls.journal(kind, transaction.id, transaction.amount,
+                                   transaction.sender_id, transaction.receiver_id))
+
+    @classmethod
+    def record_deposit(cls, db: Session, deposit) -> None:
+        cls.record(db, cls.journal("deposit", deposit.id, deposit.amount, None, deposit.user_id, external="card"))
+
+    @classmethod
+    def record_withdrawal(cls, db: Session, withdrawal, kind: str = "withdrawal") -> None:
+        """Money leaving the wallet, or coming back to it for kind="withdrawal_refund" """
+        if kind == "withdrawal_refund":
+            entries = cls.journal(kind, withdrawal.id, withdrawal.amount, None, withdrawal.user_id, external="payout")
+        else:
+            entries = cls.journal(kind, withdrawal.id, withdrawal.amount, withdrawal.user_id, None, external="payout")
+        cls.record(db, entries)
+
+    @classmethod
+    def balance_at(cls, db: Session, user_id: int, at: datetime.datetime) -> float:
+        """
+        Wallet balance of a user at `at`: the last snapshot taken by then plus the entries written after it
+        """
+        snapshot = db.execute(select(LedgerSnapshot.entry_id, LedgerSnapshot.balance)
+                              .where(LedgerSnapshot.user_id == user_id, LedgerSnapshot.taken_at <= at)
+                              .order_by(LedgerSnapshot.entry_id.desc())
+                              .limit(1)).first()
+        entry_id, balance = snapshot if snapshot else (0, 0.0)
+        since = db.execute(select(func.coalesce(func.sum(LedgerEntry.amount), 0))
+                           .where(LedgerEntry.user_id == user_id,
+                                  LedgerEntry.id > entry_id,
+                                  LedgerEntry.created_at <= at)).scalar()
+        return balance + since
+
+    @classmethod
+    def take_snapshots(cls, db: Session, now: datetime.datetime = None,
+                       min_entries: int = LEDGER_SNAPSHOT_MIN_ENTRIES,
+                       settle_seconds: int = LEDGER_SNAPSHOT_SETTLE_SECONDS) -> int:
+        """
+        Snapshot every user with at least `min_entries` entries since its last snapshot.
+        Entries younger than `settle_seconds` are left for the next run, so an entry whose DB transaction commits
+        after a later one is never skipped.
+        :return: snapshots taken
+        """
+        cutoff = (now or datetime.datetime.now()) - datetime.timedelta(seconds=settle_seconds)
+        last = (select(LedgerSnapshot.user_id, func.max(LedgerSnapshot.entry_id).label("entry_id"))
+                .group_by(LedgerSnapshot.user_id)
+                .subquery())
+        rows = db.execute(select(LedgerEntry.user_id,
+                                 func.max(LedgerEntry.id).label("entry_id"),
+                                 func.sum(LedgerEntry.amount).label("amount"),
+                                 func.max(LedgerEntry.created_at).label("taken_at"))
+                          .outerjoin(last, last.c.user_id == LedgerEntry.user_id)
+                          .where(LedgerEntry.user_id.is_not(None),
+                                 LedgerEntry.id > func.coalesce(last.c.entry_id, 0),
+                                 LedgerEntry.created_at < cutoff)
+                          .group_by(LedgerEntry.user_id)
+                          .having(func.count() >= min_entries)).all()
+        if not rows:
+            return 0
+
+        previous = dict(db.execute(select(LedgerSnapshot.user_id, LedgerSnapshot.balance)
+                                   .join(last, and_(last.c.user_id == LedgerSnapshot.user_id,
+                                                    last.c.entry_id == LedgerSnapshot.entry_id))
+                                   .where(LedgerSnapshot.user_id.in_([row.user_id for row in rows]))).all())
+        db.execute(insert(LedgerSnapshot.__table__),
+                   [{"user_id": row.user_id, "entry_id": row.entry_id, "taken_at": row.taken_at,
+                     "balance": previous.get(row.user_id, 0.0) + row.amount} for row in rows])
+        db.commit()
+        return len(rows)
+
+    @classmethod
+    def check(cls, db: Session, user_ids: Iterable[int] = None, limit: int = None) -> List[dict]:
+        """
+        Users whose balance, plus credits still in balance shards, disagrees with the sum of their wallet entries
+        :param user_ids: only these users, every user by default
+        :param limit: report at most this many
+        """
+        ledger = (select(func.coalesce(func.sum(LedgerEntry.amount), 0))
+                  .where(LedgerEntry.user_id == User.id)
+                  .scalar_subquery())
+        pending = (select(func.coalesce(func.sum(BalanceShard.amount), 0))
+                   .where(BalanceShard.user_id == User.id)
+                   .scalar_subquery())
+        query = (select(User.id, User.balance, pending.label("pending"), ledger.label("ledger"))
+                 .where(func.abs(User.balance + pending - ledger) > TOLERANCE)
+                 .order_by(User.id)
+                 .limit(limit))
+        if user_ids is not None:
+            query = query.where(User.id.in_(list(user_ids)))
+
+        inconsistent = [dict(row._mapping) for row in db.execute(query)]
+        if inconsistent:
+            logger.warning(f"{len(inconsistent)} balances are out of sync with the ledger")
+        return inconsistent
+
+    @classmethod
+    def snapshot_job(cls):
+        """Scheduled snapshot job"""
+        with SessionLocal() as db:
+            taken = cls.take_snapshots(db)
+        if taken:
+            logger.info(f"Took {taken} ledger snapshots")
+
+    @classmethod
+    def register_snapshots(cls):
+        """ Snapshot the ledger every LEDGER_SNAPSHOT_INTERVAL seconds"""
+        schedule_interval_job(func=cls.snapshot_job,
+                              seconds=LEDGER_SNAPSHOT_INTERVAL,
+                              job_id="ledger_snapshots")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Take ledger snapshots or verify balances against the ledger")
+    parser.add_argument("command", choices=["snapshot", "check"])
+    parser.add_argument("--min-entries", type=int, default=LEDGER_SNAPSHOT_MIN_ENTRIES)
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        if args.command == "snapshot":
+            print(f"Took {LedgerService.take_snapshots(session, min_entries=args.min_entries)} snapshots")
+        else:
+            rows = LedgerService.check(session)
+            for row in rows:
+                print(row)
+            print(f"{len(rows)} balances out of sync with the ledger")
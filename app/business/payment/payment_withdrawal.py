@@ -5,6 +5,7 @@ from typing import Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.business.payment.ledger import LedgerService
 from app.models import WStatus, WType
 from app.models.currency import Currency
 from app.models.user import User
@@ -28,6 +29,8 @@ class WithdrawalService:
         try:
             # Validate user has sufficient balance
             withdrawal_amount = withdrawal_request.amount_cents / 100  # Convert cents to dollars
+            if user.balance < withdrawal_amount:
+                user.fold_credit_shards()
             if user.balance < withdrawal_amount:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -104,6 +107,7 @@ class WithdrawalService:
 
             # Update user balance
             user.balance -= withdrawal_amount
+            LedgerService.record_withdrawal(db, withdrawal)
             db.commit()
             db.refresh(withdrawal)
             db.refresh(user)
@@ -265,6 +269,7 @@ class WithdrawalService:
         # Cancel withdrawal and refund balance
         withdrawal.status = WStatus.CANCELLED
         user.balance += withdrawal.amount  # Refund the amount
+        LedgerService.record_withdrawal(db, withdrawal, kind="withdrawal_refund")
 
         db.commit()
         db.refresh(withdrawal)
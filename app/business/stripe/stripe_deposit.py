@@ -6,6 +6,7 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.business.payment import *
+from app.business.payment.ledger import LedgerService
 from app.business.stripe import *
 from app.business.user import *
 from app.models import Card
@@ -290,6 +291,7 @@ class StripeDepositService:
 
                 # Update user balance
                 user.balance += deposit.amount
+                LedgerService.record_deposit(db, deposit)
 
                 # Save card if requested and payment method exists
                 pmethod = payment_intent.get("payment_method")
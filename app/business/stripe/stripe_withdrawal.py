@@ -4,6 +4,7 @@ from datetime import datetime
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.business.payment.ledger import LedgerService
 from app.business.stripe.stripe_service import StripeService
 from app.models.currency import Currency
 from app.models.user import User
@@ -77,6 +78,7 @@ class StripeWithdrawalService:
 
             # Update user balance
             user.balance -= refund_amount
+            LedgerService.record_withdrawal(db, withdrawal, kind="refund")
             db.commit()
             db.refresh(withdrawal)
             db.refresh(user)
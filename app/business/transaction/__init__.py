@@ -1,5 +1,9 @@
 from .transaction_service import TransactionService
 from .transaction_validators import TransactionValidators
 from .transaction_notifications import TransactionNotificationService
+from .transaction_forecast import ForecastService
+from .transaction_bulk import TransactionBulkService
+from .transaction_batch import TransactionBatchService
 
-__all__ = ["TransactionService", "TransactionValidators", "TransactionNotificationService"]
+__all__ = ["TransactionService", "TransactionValidators", "TransactionNotificationService", "ForecastService",
+           "TransactionBulkService", "TransactionBatchService"]
@@ -0,0 +1,117 @@
+import argparse
+import logging
+from typing import List
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.infrestructure import SessionLocal
+from app.models import RecurringTransactionHistory, Transaction
+from app.models.recurring_transation import RecurringTransaction
+from app.models.transaction import TransactionStatus
+
+logger = logging.getLogger(__name__)
+
+# Float sums of the counter and of the history may differ in the last digits
+TOLERANCE = 0.005
+
+
+class RecurringCountersService:
+    """
+    Rebuilds and verifies the execution counters of recurring transactions against their history.
+    The executor maintains the counters with every run; these are the one-off backfill and the consistency check.
+    """
+
+    @classmethod
+    def _aggregates(cls) -> dict:
+        """Per schedule completed and failed executions, last execution and amount transferred, from the history"""
+        history = RecurringTransactionHistory
+        schedule_id = RecurringTransaction.id
+
+        def count(status: TransactionStatus):
+            return (select(func.count())
+                    .where(history.recurring_transaction_id == schedule_id, history.status == status)
+                    .scalar_subquery())
+
+        completed = count(TransactionStatus.COMPLETED)
+        amount = (select(Transaction.amount)
+                  .where(Transaction.id == RecurringTransaction.transaction_id)
+                  .scalar_subquery())
+        return {"execution_count": completed,
+                "failure_count": count(TransactionStatus.FAILED),
+                "last_executed_at": (select(func.max(history.execution_date))
+                                     .where(history.recurring_transaction_id == schedule_id)
+                                     .scalar_subquery()),
+                "total_transferred": func.coalesce(completed * amount, 0)}
+
+    @classmethod
+    def backfill(cls, db: Session, batch_size: int = 10_000, ids: List[int] = None) -> int:
+        """
+        Recompute the counters from the history, one UPDATE per `batch_size` schedules, committed per batch
+        :param ids: only these schedules, every schedule by default
+        :return: schedules updated
+        """
+        if ids is not None:
+            batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        else:
+            last_id = db.execute(select(func.max(RecurringTransaction.id))).scalar() or 0
+            batches = [(low, low + batch_size - 1) for low in range(1, last_id + 1, batch_size)]
+
+        updated = 0
+        for batch in batches:
+            condition = (RecurringTransaction.id.in_(batch) if ids is not None
+                         else RecurringTransaction.id.between(*batch))
+            result = db.execute(update(RecurringTransaction).where(condition).values(**cls._aggregates())
+                                .execution_options(synchronize_session=False))
+            db.commit()
+            updated += result.rowcount
+        logger.info(f"Backfilled the counters of {updated} recurring transactions")
+        return updated
+
+    @classmethod
+    def check(cls, db: Session, fix: bool = False, limit: int = None) -> List[dict]:
+        """
+        Schedules whose counters disagree with their history
+        :param fix: backfill the inconsistent schedules
+        :param limit: report at most this many
+        :return: stored and expected counters of every inconsistent schedule
+        """
+        expected = cls._aggregates()
+        columns = {name: getattr(RecurringTransaction, name) for name in expected}
+        mismatch = [columns["execution_count"] != expected["execution_count"],
+                    columns["failure_count"] != expected["failure_count"],
+                    func.abs(columns["total_transferred"] - expected["total_transferred"]) > TOLERANCE,
+                    columns["last_executed_at"].is_distinct_from(expected["last_executed_at"])]
+        rows = db.execute(select(RecurringTransaction.id,
+                                 *columns.values(),
+                                 *(value.label(f"expected_{name}") for name, value in expected.items()))
+                          .where(or_(*mismatch))
+                          .order_by(RecurringTransaction.id)
+                          .limit(limit)).all()
+
+        inconsistent = [{"id": row.id,
+                         **{name: getattr(row, name) for name in expected},
+                         **{f"expected_{name}": getattr(row, f"expected_{name}") for name in expected}}
+                        for row in rows]
+        if inconsistent:
+            logger.warning(f"{len(inconsistent)} recurring transactions have counters out of sync with their history")
+            if fix:
+                cls.backfill(db, ids=[row["id"] for row in inconsistent])
+        return inconsistent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill or verify the recurring transaction counters")
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--fix", action="store_true", help="backfill the schedules the check finds out of sync")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        if args.command == "backfill":
+            print(f"Updated {RecurringCountersService.backfill(session, args.batch_size)} recurring transactions")
+        else:
+            rows = RecurringCountersService.check(session, fix=args.fix)
+            for row in rows:
+                print(row)
+            print(f"{len(rows)} recurring transactions out of sync" + (", fixed" if args.fix and rows else ""))
@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.config import TRANSACTION_BATCH_MAX_ITEMS
+from app.models import Transaction, User, UserDailyRollup
+from app.models.transaction import TransactionStatus, TransactionUpdateStatus
+from app.schemas.transaction import TransactionBatchItem, TransactionBatchResponse, TransactionBatchResult
+from .transaction_notifications import TransactionNotificationService
+from ..payment.ledger import LedgerService
+
+
+class Transition(NamedTuple):
+    actor: str
+    target: TransactionStatus
+    # (party, users column, sign of the transaction amount)
+    effects: Tuple[Tuple[str, str, int], ...]
+    events: Tuple[str, ...]
+    journal: bool = False
+
+
+# The single-transaction paths of TransactionService, keyed by action and current status
+TRANSITIONS: Dict[Tuple[TransactionUpdateStatus, TransactionStatus], Transition] = {
+    (TransactionUpdateStatus.CONFIRM, TransactionStatus.PENDING): Transition(
+        "sender", TransactionStatus.AWAITING_ACCEPTANCE,
+        (("sender", "reserved_balance", 1),),
+        ("sender_transaction_confirmed", "transaction_awaiting_acceptance")),
+    (TransactionUpdateStatus.ACCEPT, TransactionStatus.AWAITING_ACCEPTANCE): Transition(
+        "receiver", TransactionStatus.COMPLETED,
+        (("sender", "reserved_balance", -1), ("sender", "balance", -1), ("receiver", "balance", 1)),
+        ("sender_transaction_completed", "transaction_completed"),
+        journal=True),
+    (TransactionUpdateStatus.DECLINE, TransactionStatus.AWAITING_ACCEPTANCE): Transition(
+        "receiver", TransactionStatus.DENIED,
+        (("sender", "reserved_balance", -1),),
+        ("transaction_declined",)),
+    (TransactionUpdateStatus.CANCEL, TransactionStatus.PENDING): Transition(
+        "sender", TransactionStatus.CANCELLED,
+        (),
+        ("transaction_cancelled",)),
+    (TransactionUpdateStatus.CANCEL, TransactionStatus.AWAITING_ACCEPTANCE): Transition(
+        "sender", TransactionStatus.CANCELLED,
+        (("sender", "reserved_balance", -1),),
+        ("transaction_cancelled",)),
+}
+
+
+class TransactionBatchService:
+    """Status changes of many transactions by one user, applied with one commit"""
+
+    @classmethod
+    def _plan(cls, user: User, item: TransactionBatchItem, transaction: Optional[Transaction],
+              seen: Set[int]) -> Transition:
+        """
+        The transition `item` makes, checked like the single-transaction path
+        :raises HTTPException: if the user cannot apply the action to the transaction
+        """
+        if transaction is None:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        if transaction.id in seen:
+            raise HTTPException(status_code=400, detail="Transaction appears more than once in the batch")
+        seen.add(transaction.id)
+        if user.id not in (transaction.sender_id, transaction.receiver_id):
+            raise HTTPException(status_code=403, detail="Access denied to this transaction")
+        if transaction.recurring:
+            raise HTTPException(status_code=400, detail="Recurring transactions must be updated one at a time")
+
+        transition = TRANSITIONS.get((item.action, transaction.status))
+        if transition is None:
+            raise HTTPException(status_code=400, detail=f"Cannot {item.action.value} transaction with status: "
+                                                        f"{transaction.status.value}")
+        if getattr(transaction, f"{transition.actor}_id") != user.id:
+            raise HTTPException(status_code=403,
+                                detail=f"Only the {transition.actor} can {item.action.value} this transaction")
+        return transition
+
+    @classmethod
+    def _apply_balances(cls, db: Session, deltas: Dict[int, Dict[str, float]]) -> None:
+        """
+        One conditional UPDATE per user for the summed effects of the batch, guarded like the per-transaction
+        User methods: reserved funds cannot go negative, and the available balance cannot drop below zero
+        :raises HTTPException: 409 if a balance changed since the batch was checked, nothing is applied
+        """
+        # Users in id order, so concurrent batches and transfers lock their rows in the same order
+        for user_id, delta in sorted(deltas.items()):
+            balance, reserved = round(delta["balance"], 2), round(delta["reserved_balance"], 2)
+            if not balance and not reserved:
+                continue
+            conditions = []
+            if reserved < 0:
+                conditions.append(User.reserved_balance >= -reserved)
+            if balance - reserved < 0:
+                conditions.append(User.balance - User.reserved_balance >= reserved - balance)
+
+            result = db.execute(update(User)
+                                .where(User.id == user_id, *conditions)
+                                .values(balance=User.balance + balance,
+                                        reserved_balance=User.reserved_balance + reserved,
+                                        data_version=User.data_version + 1)
+                                .execution_options(synchronize_session=False))
+            if result.rowcount != 1:
+                db.rollback()
+                raise HTTPException(status_code=409,
+                                    detail="Balances changed while the batch was applied, no transaction was updated")
+
+    @classmethod
+    def update_statuses(cls, db: Session, user: User, items: List[TransactionBatchItem]) -> TransactionBatchResponse:
+        """
+        Apply confirm, accept, decline and cancel actions to many transactions at once.
+        The targets are loaded with one query and every item is checked against TRANSITIONS. The status changes are
+        conditional UPDATEs, one per kind of transition, and the balance effects are summed into one UPDATE per
+        user. Ledger entries and notifications are inserted with one statement each, all in one commit.
+        Items that cannot be applied are reported and skipped.
+        :param items: (transaction id, action) pairs in the order they are applied
+        :return: per-item outcome
+        """
+        if not items:
+            raise HTTPException(status_code=400, detail="No transactions to update")
+        if len(items) > TRANSACTION_BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=400,
+                                detail=f"At most {TRANSACTION_BATCH_MAX_ITEMS} transactions can be updated at once")
+
+        transactions = {transaction.id: transaction for transaction in db.execute(
+            select(Transaction).where(Transaction.id.in_({item.transaction_id for item in items}))).scalars()}
+
+        results, planned, seen = [], [], set()
+        for item in items:
+            transaction = transactions.get(item.transaction_id)
+            result = TransactionBatchResult(transaction_id=item.transaction_id, action=item.action,
+                                            outcome="rejected", status=transaction.status if transaction else None)
+            results.append(result)
+            try:
+                planned.append((result, transaction, cls._plan(user, item, transaction, seen)))
+            except HTTPException as e:
+                result.error = e.detail
+
+        # Confirmations reserve funds, take them in request order while the available balance covers them
+        if any(transition.target == TransactionStatus.AWAITING_ACCEPTANCE for _, _, transition in planned):
+            user.fold_credit_shards()
+            db.refresh(user)
+            available = user.available_balance
+            for entry in list(planned):
+                result, transaction, transition = entry
+                if transition.target != TransactionStatus.AWAITING_ACCEPTANCE:
+                    continue
+                if available < transaction.amount:
+                    result.error = (f"Insufficient available balance. Available: ${available:.2f}, "
+                                    f"Required: ${transaction.amount:.2f}")
+                    planned.remove(entry)
+                else:
+                    available -= transaction.amount
+
+        groups = defaultdict(list)
+        for _, transaction, transition in planned:
+            groups[(transaction.status, transition.target)].append(transaction.id)
+        updated, rollups = set(), defaultdict(lambda: [0, 0.0])
+        confirmed_at = datetime.now()
+        for (source, target), transaction_ids in groups.items():
+            # Confirmed transfers start their acceptance TTL now
+            values = {"awaiting_since": confirmed_at} if target == TransactionStatus.AWAITING_ACCEPTANCE else {}
+            changed = set(db.execute(update(Transaction)
+                                     .where(Transaction.id.in_(transaction_ids), Transaction.status == source)
+                                     .values(status=target, **values)
+                                     .returning(Transaction.id)
+                                     .execution_options(synchronize_session=False)).scalars())
+            UserDailyRollup.collect(rollups, (transactions[transaction_id] for transaction_id in changed),
+                                    source, target)
+            updated |= changed
+        UserDailyRollup.apply(db.connection(), rollups)
+
+        deltas = defaultdict(lambda: {"balance": 0.0, "reserved_balance": 0.0})
+        entries, events = [], defaultdict(list)
+        for result, transaction, transition in planned:
+            if transaction.id not in updated:
+                result.error = "Transaction was modified by another request"
+                continue
+            result.outcome, result.status = "applied", transition.target
+            for party, column, sign in transition.effects:
+                deltas[getattr(transaction, f"{party}_id")][column] += sign * transaction.amount
+            if transition.journal:
+                entries += LedgerService.journal("transfer", transaction.id, transaction.amount,
+                                                 transaction.sender_id, transaction.receiver_id)
+            for event in transition.events:
+                events[event].append(transaction.id)
+
+        cls._apply_balances(db, deltas)
+        LedgerService.record(db, entries)
+        for event, transaction_ids in events.items():
+            TransactionNotificationService.enqueue_bulk(db, event, transaction_ids)
+        db.commit()
+
+        applied = sum(result.outcome == "applied" for result in results)
+        return TransactionBatchResponse(applied=applied, rejected=len(results) - applied, results=results)
@@ -0,0 +1,168 @@
+import csv
+import datetime
+import io
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import BULK_TRANSFER_MAX_ROWS
+from app.models import Category, Transaction, User, UserDailyRollup
+from app.models.transaction import TransactionStatus
+from app.schemas.transaction import BulkTransferItem, BulkTransferResponse, BulkTransferResult
+from .transaction_notifications import TransactionNotificationService
+from .transaction_validators import TransactionValidators
+
+CSV_COLUMNS = ("identifier", "amount")
+
+ROW_KEY = (Transaction.receiver_id, Transaction.amount, Transaction.description, Transaction.category_id)
+
+
+class TransactionBulkService:
+    """Payroll-style batches of transfers from one sender, created and confirmed in one DB transaction"""
+
+    @classmethod
+    def parse_csv(cls, text: str) -> Tuple[List[Optional[BulkTransferItem]], Dict[int, str]]:
+        """
+        Read transfers from CSV with an `identifier,amount[,description][,category_id]` header
+        :return: one item per data row, None for unreadable rows, and the error of every unreadable row by index
+        """
+        reader = csv.DictReader(io.StringIO(text))
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"CSV header is missing: {', '.join(missing)}")
+
+        items, errors = [], {}
+        for index, row in enumerate(reader):
+            try:
+                items.append(BulkTransferItem(identifier=(row["identifier"] or "").strip(),
+                                              amount=row["amount"],
+                                              description=row.get("description") or None,
+                                              category_id=row.get("category_id") or None))
+            except ValidationError as e:
+                items.append(None)
+                errors[index] = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                                          for error in e.errors())
+        return items, errors
+
+    @classmethod
+    def resolve_recipients(cls, db: Session, identifiers: Iterable[str]) -> Dict[str, int]:
+        """
+        User ids of the identifiers with one query, matched on username, then e-mail, then phone number
+        like UserValidators.search_user_by_identifier
+        """
+        identifiers = list(set(identifiers))
+        if not identifiers:
+            return {}
+        users = db.execute(select(User.id, User.username, User.email, User.phone_number)
+                           .where(or_(User.username.in_(identifiers),
+                                      User.email.in_(identifiers),
+                                      User.phone_number.in_(identifiers)))).all()
+
+        resolved = {}
+        for field in ("phone_number", "email", "username"):
+            resolved.update({getattr(user, field): user.id for user in users})
+        return {identifier: resolved[identifier] for identifier in identifiers if identifier in resolved}
+
+    @classmethod
+    def resolve_categories(cls, db: Session, user_id: int, category_ids: Iterable[int]) -> Set[int]:
+        """
+        Ids among `category_ids` of categories owned by the user, with one query, like
+        CategoryValidators.validate_category_ownership
+        """
+        category_ids = set(category_ids)
+        if not category_ids:
+            return set()
+        return set(db.execute(select(Category.id).where(Category.id.in_(category_ids),
+                                                        Category.user_id == user_id)).scalars())
+
+    @classmethod
+    def create_bulk(cls, db: Session, sender: User, items: List[Optional[BulkTransferItem]],
+                    currency_id: int = 1, errors: Dict[int, str] = None) -> BulkTransferResponse:
+        """
+        Create a batch of transfers awaiting acceptance.
+        Recipients and categories are resolved with one query each, rows that fail validation are reported and skipped, the total of
+        the others is reserved once and their transactions, daily rollups and notifications are written with one
+        statement each, all in one commit. Nothing is created when the sender cannot cover the total.
+        :param items: transfers in request order, None for rows that could not be read
+        :param errors: error of every unreadable row by index
+        :return: per-row report
+        """
+        errors = errors or {}
+        if not items:
+            raise HTTPException(status_code=400, detail="No transfers to create")
+        if len(items) > BULK_TRANSFER_MAX_ROWS:
+            raise HTTPException(status_code=400,
+                                detail=f"At most {BULK_TRANSFER_MAX_ROWS} transfers can be created at once")
+
+        recipients = cls.resolve_recipients(db, (item.identifier for item in items if item is not None))
+        categories = cls.resolve_categories(db, sender.id, (item.category_id for item in items
+                                                            if item is not None and item.category_id is not None))
+        now = datetime.datetime.now()
+        results, rows, total = [], [], 0.0
+        for index, item in enumerate(items):
+            result = BulkTransferResult(row=index + 1, identifier=item.identifier if item else "",
+                                        amount=item.amount if item else None, status="rejected")
+            results.append(result)
+            if item is None:
+                result.error = errors.get(index, "Unreadable row")
+                continue
+            try:
+                amount = TransactionValidators.validate_transaction_amount(item.amount)
+                receiver_id = recipients.get(item.identifier)
+                if receiver_id is None:
+                    raise HTTPException(status_code=400, detail="User with these details does not exist")
+                TransactionValidators.validate_self_transaction(sender.id, receiver_id)
+                if item.category_id is not None and item.category_id not in categories:
+                    raise HTTPException(status_code=404,
+                                        detail=f"Category with ID {item.category_id} not found or you don't have "
+                                               f"permission to access it.")
+            except HTTPException as e:
+                result.error = e.detail
+                continue
+
+            result.status, result.amount = "created", amount
+            total += amount
+            rows.append({"sender_id": sender.id,
+                         "receiver_id": receiver_id,
+                         "amount": amount,
+                         "description": item.description,
+                         "category_id": item.category_id,
+                         "currency_id": currency_id,
+                         "status": TransactionStatus.AWAITING_ACCEPTANCE,
+                         "recurring": False,
+                         "date": now,
+                         "awaiting_since": now})
+
+        total = round(total, 2)
+        if rows:
+            try:
+                sender.reserve_funds(total)
+            except ValueError as e:
+                db.rollback()
+                raise HTTPException(status_code=400, detail=str(e))
+
+            # RETURNING order is not guaranteed for multi-row inserts, and SQLAlchemy falls back to one INSERT per
+            # row when asked to sort, so rows are matched back on their values. Equal rows are interchangeable.
+            inserted = db.execute(insert(Transaction).returning(Transaction.id, *ROW_KEY), rows).all()
+            UserDailyRollup.record(db, [SimpleNamespace(**row) for row in rows],
+                                   None, TransactionStatus.AWAITING_ACCEPTANCE)
+            TransactionNotificationService.enqueue_bulk(db, "transaction_awaiting_acceptance",
+                                                        [row.id for row in inserted])
+            db.commit()
+
+            ids = defaultdict(list)
+            for row in sorted(inserted, key=lambda row: row.id, reverse=True):
+                ids[tuple(row[1:])].append(row.id)
+            for result, row in zip((result for result in results if result.status == "created"), rows):
+                result.transaction_id = ids[tuple(row[column.key] for column in ROW_KEY)].pop()
+
+        return BulkTransferResponse(rows=len(items),
+                                    created=len(rows),
+                                    rejected=len(items) - len(rows),
+                                    total_amount=total,
+                                    results=results)
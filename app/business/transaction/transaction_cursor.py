@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from app.models import Transaction
+from app.models.transaction import UserTransactionsQuery
+
+invalid_cursor = HTTPException(status_code=400, detail="Invalid or expired pagination cursor")
+
+
+class TransactionCursor:
+    """
+    Opaque keyset cursors for transaction history, ordered by the sort column with id as tie-breaker.
+    The ordering itself is built by UserTransactionsQuery, the cursor only supplies the predicate after a page.
+    """
+
+    SORT_COLUMNS = UserTransactionsQuery.SORT_COLUMNS
+
+    @classmethod
+    def _sort_column(cls, order_by: str, entity=Transaction):
+        """
+        Resolve the sort column and direction of an order_by option
+        :param order_by: one of TransactionHistoryFilter.order_by options
+        :param entity: Transaction or an alias of it
+        :return: (column, descending)
+        """
+        name, descending = cls.SORT_COLUMNS.get(order_by, cls.SORT_COLUMNS["date_desc"])
+        return getattr(entity, name), descending
+
+    @classmethod
+    def predicate(cls, order_by: str, cursor: str, entity=Transaction):
+        """
+        Keyset predicate selecting the rows after the cursor position
+        :param order_by: sort order the cursor must have been issued for
+        :param cursor: opaque cursor from a previous page
+        :param entity: Transaction or an alias of it
+        :return: SQL expression
+        """
+        value, last_id = cls.decode(cursor, order_by)
+        column, descending = cls._sort_column(order_by, entity)
+        if descending:
+            return or_(column < value, and_(column == value, entity.id < last_id))
+        return or_(column > value, and_(column == value, entity.id > last_id))
+
+    @classmethod
+    def encode(cls, order_by: str, transaction: Transaction) -> str:
+        """
+        Build the cursor pointing right after the given transaction
+        :param order_by: sort order of the page
+        :param transaction: last transaction of the page
+        :return: URL-safe opaque cursor
+        """
+        if order_by.startswith("date"):
+            value = transaction.date.isoformat()
+        else:
+            value = transaction.amount
+
+        payload = json.dumps({"o": order_by, "v": value, "id": transaction.id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str, order_by: str) -> tuple:
+        """
+        Decode a cursor into the (sort value, id) keyset position
+        :param cursor: opaque cursor
+        :param order_by: sort order of the current request
+        :return: (sort value, transaction id)
+        :raises HTTPException: if the cursor is malformed or was issued for another sort order
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if payload["o"] != order_by:
+                raise invalid_cursor
+
+            if order_by.startswith("date"):
+                value = datetime.fromisoformat(payload["v"])
+            else:
+                value = float(payload["v"])
+
+            return value, int(payload["id"])
+
+        except HTTPException:
+            raise
+        except Exception:
+            raise invalid_cursor
@@ -0,0 +1,104 @@
+import datetime
+import logging
+from collections import defaultdict
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.config import TRANSACTION_ACCEPT_TTL, TRANSACTION_EXPIRY_BATCH, TRANSACTION_EXPIRY_INTERVAL
+from app.infrestructure import SessionLocal
+from app.infrestructure.scheduler import schedule_interval_job
+from app.models import Transaction, User, UserDailyRollup
+from app.models.transaction import TransactionStatus
+from .transaction_notifications import TransactionNotificationService
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionExpiryService:
+    """Cancels transfers nobody accepted within TRANSACTION_ACCEPT_TTL and gives the senders their reservations back"""
+
+    @classmethod
+    def expire_batch(cls, db: Session, cutoff: datetime.datetime, batch_size: int) -> dict:
+        """
+        Expire the `batch_size` transfers confirmed longest before `cutoff` that still await acceptance, in one commit:
+        a conditional UPDATE cancels the ones nobody accepted or declined meanwhile, one upsert moves them in the daily
+        rollups and one UPDATE advances the data versions of both parties, one executemany releases their amounts per
+        sender and one INSERT queues the notices
+        :return: number of transactions read, expired and amount released
+        """
+        awaiting = db.execute(select(Transaction.id)
+                              .where(Transaction.status == TransactionStatus.AWAITING_ACCEPTANCE,
+                                     Transaction.recurring.is_(False),
+                                     Transaction.awaiting_since < cutoff)
+                              .order_by(Transaction.awaiting_since, Transaction.id)
+                              .limit(batch_size)).scalars().all()
+        if not awaiting:
+            return {"read": 0, "expired": 0, "released": 0.0}
+
+        expired = db.execute(update(Transaction)
+                             .where(Transaction.id.in_(awaiting),
+                                    Transaction.status == TransactionStatus.AWAITING_ACCEPTANCE)
+                             .values(status=TransactionStatus.CANCELLED)
+                             .returning(Transaction.id, Transaction.sender_id, Transaction.amount,
+                                        Transaction.receiver_id, Transaction.date)
+                             .execution_options(synchronize_session=False)).all()
+
+        released = defaultdict(float)
+        for _, sender_id, amount, _, _ in expired:
+            released[sender_id] += amount
+        if released:
+            UserDailyRollup.record(db, expired, TransactionStatus.AWAITING_ACCEPTANCE, TransactionStatus.CANCELLED)
+            users = User.__table__
+            # Senders in id order, so concurrent sweeps and transfers lock their rows in the same order
+            db.execute(users.update()
+                       .where(users.c.id == bindparam("expired_sender"))
+                       .values(reserved_balance=users.c.reserved_balance - bindparam("expired_amount"),
+                               data_version=users.c.data_version + 1),
+                       [{"expired_sender": sender_id, "expired_amount": round(amount, 2)}
+                        for sender_id, amount in sorted(released.items())])
+            TransactionNotificationService.enqueue_bulk(db, "transaction_expired",
+                                                        [transaction.id for transaction in expired])
+        db.commit()
+        return {"read": len(awaiting), "expired": len(expired), "released": sum(released.values())}
+
+    @classmethod
+    def expire(cls, db: Session, now: datetime.datetime = None, ttl: int = TRANSACTION_ACCEPT_TTL,
+               batch_size: int = TRANSACTION_EXPIRY_BATCH) -> dict:
+        """
+        Expire every transfer that has been awaiting acceptance for more than `ttl` seconds, `batch_size` per commit
+        so each batch holds its row locks briefly. Age is counted from the confirmation of the transfer,
+        not from its creation date.
+        :return: number of transactions expired, amount released and batches committed
+        """
+        cutoff = (now or datetime.datetime.now()) - datetime.timedelta(seconds=ttl)
+        expired, released, batches = 0, 0.0, 0
+        while True:
+            result = cls.expire_batch(db, cutoff, batch_size)
+            if not result["read"]:
+                break
+            expired += result["expired"]
+            released += result["released"]
+            batches += 1
+            if result["read"] < batch_size:
+                break
+
+        return {"expired": expired, "released": round(released, 2), "batches": batches}
+
+    @classmethod
+    def expire_job(cls):
+        """Scheduled expiry sweep"""
+        with SessionLocal() as db:
+            result = cls.expire(db)
+        if result["expired"]:
+            logger.info("Expired %d transactions awaiting acceptance, released %.2f",
+                        result["expired"], result["released"])
+
+    @classmethod
+    def register_expiry(cls):
+        """ Sweep expired transfers every TRANSACTION_EXPIRY_INTERVAL seconds, unless TRANSACTION_ACCEPT_TTL is 0"""
+        if not TRANSACTION_ACCEPT_TTL:
+            return
+        schedule_interval_job(func=cls.expire_job,
+                              seconds=TRANSACTION_EXPIRY_INTERVAL,
+                              job_id="expire_awaiting_transactions")
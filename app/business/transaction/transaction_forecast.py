@@ -0,0 +1,236 @@
+import calendar
+import datetime
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Optional
+
+from sqlalchemy import case, func, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.config import FORECAST_CACHE_SIZE, FORECAST_CACHE_TTL, FORECAST_HISTORY_DAYS, FORECAST_MAX_MONTHS
+from app.models import Deposit, RecurringTransaction, Transaction, User, Withdrawal
+from app.models.deposit import DepositStatus
+from app.models.recurring_transation import INTERVAL_DAYS
+from app.models.transaction import TransactionStatus
+from app.models.withdrawal import WithdrawalStatus
+from app.schemas.transaction import TransactionForecastResponse
+
+
+def add_months(day: datetime.date, months: int) -> datetime.date:
+    """Same day of the month `months` later, clamped to the end of shorter months"""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+class Projection:
+    """
+    Recurring money in and out of a user per day from `start` on, plus the average daily net of everything else.
+    Independent of the balance, so it stays valid until a schedule of the user changes.
+    """
+    __slots__ = ("start", "recurring_in", "recurring_out", "average_daily_net", "expires_at")
+
+    def __init__(self, start: datetime.date, recurring_in: array, recurring_out: array,
+                 average_daily_net: float, expires_at: float):
+        self.start = start
+        self.recurring_in = recurring_in
+        self.recurring_out = recurring_out
+        self.average_daily_net = average_daily_net
+        self.expires_at = expires_at
+
+
+class ForecastCache:
+    """
+    Bounded TTL/LRU cache of projections keyed by user id.
+    The cache is per process: schedule changes invalidate the users involved in the process that made them,
+    other workers converge once the entry expires after `ttl` seconds or the day turns.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, Projection] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, start: datetime.date) -> Optional[Projection]:
+        with self._lock:
+            projection = self._entries.get(user_id)
+            if projection is None or projection.start != start or projection.expires_at <= time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return projection
+
+    def put(self, user_id: int, projection: Projection) -> Projection:
+        with self._lock:
+            self._entries[user_id] = projection
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return projection
+
+    def invalidate(self, *user_ids: int) -> None:
+        """
+            Drops the projections of the users on both sides of a changed schedule.
+        """
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries),
+                    "max_size": self.max_size,
+                    "ttl": self.ttl,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+forecast_cache = ForecastCache(max_size=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL)
+
+
+class ForecastService:
+    """Balance projection from the active recurring schedules of a user and the average of the rest of the history"""
+
+    @classmethod
+    def recurring_groups_query(cls, user_id: int):
+        """
+        Active schedules of the user in either direction, summed per (interval, next run).
+        Schedules sharing both fall on the same days, so the projection works on a few groups instead of
+        every schedule.
+        """
+        outgoing = Transaction.sender_id == user_id
+        return (select(RecurringTransaction.interval,
+                       RecurringTransaction.next_run_at,
+                       func.sum(case((outgoing, 0), else_=Transaction.amount)).label("incoming"),
+                       func.sum(case((outgoing, Transaction.amount), else_=0)).label("outgoing"))
+                .join(Transaction, RecurringTransaction.transaction_id == Transaction.id)
+                .where(RecurringTransaction.is_active == True,
+                       RecurringTransaction.next_run_at.is_not(None),
+                       Transaction.recurring == True,
+                       Transaction.status == TransactionStatus.ACCEPTED,
+                       or_(Transaction.sender_id == user_id, Transaction.receiver_id == user_id))
+                .group_by(RecurringTransaction.interval, RecurringTransaction.next_run_at))
+
+    @classmethod
+    def history_net_query(cls, user_id: int, since: datetime.datetime):
+        """Net of completed one-off transfers, deposits and withdrawals of the user since `since`, in one statement"""
+        transfers = (select(func.sum(case((Transaction.receiver_id == user_id, Transaction.amount),
+                                          else_=-Transaction.amount)).label("net"))
+                     .where(or_(Transaction.sender_id == user_id, Transaction.receiver_id == user_id),
+                            Transaction.recurring == False,
+                            Transaction.status == TransactionStatus.COMPLETED,
+                            Transaction.date >= since))
+        deposits = (select(func.sum(Deposit.amount).label("net"))
+                    .where(Deposit.user_id == user_id,
+                           Deposit.status == DepositStatus.COMPLETED,
+                           Deposit.created_at >= since))
+        withdrawals = (select(-func.sum(Withdrawal.amount).label("net"))
+                       .where(Withdrawal.user_id == user_id,
+                              Withdrawal.status == WithdrawalStatus.COMPLETED,
+                              Withdrawal.created_at >= since))
+        flows = union_all(transfers, deposits, withdrawals).subquery()
+        return select(func.coalesce(func.sum(flows.c.net), 0))
+
+    @classmethod
+    def project(cls, db: Session, user_id: int, start: datetime.date, days: int) -> Projection:
+        """
+        Project the recurring flows of a user over `days` days from `start`.
+        Each (interval, next run) group is written into the day arrays with a strided loop over its run days,
+        so the cost grows with groups x days / interval rather than schedules x days.
+        A schedule already overdue runs on `start` and then on its regular days, like the daily job without catch-up.
+        """
+        recurring_in, recurring_out = array("d", bytes(8 * days)), array("d", bytes(8 * days))
+        for interval, next_run_at, incoming, outgoing in db.execute(cls.recurring_groups_query(user_id)):
+            step = INTERVAL_DAYS[interval]
+            first = (next_run_at.date() - start).days
+            if first < 0:
+                recurring_in[0] += incoming
+                recurring_out[0] += outgoing
+                first += step * (-first // step + 1)
+            for day in range(first, days, step):
+                recurring_in[day] += incoming
+                recurring_out[day] += outgoing
+
+        since = datetime.datetime.combine(start - datetime.timedelta(days=FORECAST_HISTORY_DAYS), datetime.time.min)
+        history_net = db.execute(cls.history_net_query(user_id, since)).scalar() or 0.0
+        return Projection(start, recurring_in, recurring_out, history_net / FORECAST_HISTORY_DAYS,
+                          time.monotonic() + forecast_cache.ttl)
+
+    @classmethod
+    def get_projection(cls, db: Session, user_id: int, start: datetime.date) -> Projection:
+        """Projection over FORECAST_MAX_MONTHS, from the cache when the user's schedules did not change"""
+        projection = forecast_cache.get(user_id, start)
+        if projection is None:
+            days = (add_months(start, FORECAST_MAX_MONTHS) - start).days + 1
+            projection = forecast_cache.put(user_id, cls.project(db, user_id, start, days))
+        return projection
+
+    @classmethod
+    def forecast(cls, db: Session, user: User, months: int = 3, granularity: str = "day",
+                 today: datetime.date = None) -> TransactionForecastResponse:
+        """
+        Project the available balance of a user `months` months ahead.
+        Every day adds the recurring money in, takes the recurring money out and adds the average daily net of
+        the last FORECAST_HISTORY_DAYS days of one-off transfers, deposits and withdrawals.
+        :param granularity: one point per day, per week or at the end of every calendar month
+        :return: balance points over the period with the lowest and the first negative balance
+        """
+        start = today or datetime.date.today()
+        end = add_months(start, min(months, FORECAST_MAX_MONTHS))
+        days = (end - start).days + 1
+        projection = cls.get_projection(db, user.id, start)
+
+        recurring_in, recurring_out = projection.recurring_in[:days], projection.recurring_out[:days]
+        available = user.balance - user.reserved_balance
+        average = projection.average_daily_net
+        balances = list(accumulate((i - o + average for i, o in zip(recurring_in, recurring_out)),
+                                   initial=available))[1:]
+
+        lowest = min(range(days), key=balances.__getitem__)
+        negative = next((day for day, balance in enumerate(balances) if balance < 0), None)
+        dates = [start + datetime.timedelta(days=day) for day in range(days)]
+
+        if granularity == "day":
+            ends = range(days)
+        elif granularity == "week":
+            ends = [*range(6, days - 1, 7), days - 1]
+        else:
+            ends = [day for day in range(days - 1)
+                    if dates[day].day == calendar.monthrange(dates[day].year, dates[day].month)[1]] + [days - 1]
+
+        points, first = [], 0
+        for last in ends:
+            points.append({"date": dates[last],
+                           "balance": round(balances[last], 2),
+                           "recurring_in": round(sum(recurring_in[first:last + 1]), 2),
+                           "recurring_out": round(sum(recurring_out[first:last + 1]), 2)})
+            first = last + 1
+
+        return TransactionForecastResponse(available_balance=available,
+                                           start=start,
+                                           end=end,
+                                           granularity=granularity,
+                                           recurring_in=round(sum(recurring_in), 2),
+                                           recurring_out=round(sum(recurring_out), 2),
+                                           average_daily_net=round(average, 2),
+                                           lowest_balance=round(balances[lowest], 2),
+                                           lowest_balance_on=dates[lowest],
+                                           first_negative_on=dates[negative] if negative is not None else None,
+                                           points=points)
@@ -1,5 +1,8 @@
 from app.models.transaction import Transaction
-from typing import Dict, Optional
+from app.models.notification_outbox import NotificationOutbox
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 from app.business.utils import NotificationService, NotificationType
 from app.business.utils.notification_service import EmailTemplates
 import logging
@@ -11,6 +14,61 @@ logger = logging.getLogger(__name__)
 class TransactionNotificationService:
     """Service for handling transaction email notifications"""
 
+    # Events e-mailing both parties are queued as one outbox row per recipient,
+    # so a retry only resends the e-mail that was not accepted
+    BOTH_PARTIES = ("transaction_declined", "transaction_cancelled", "transaction_expired", "transaction_failed")
+    RECIPIENTS = ("sender", "receiver")
+
+    @classmethod
+    def _payloads(cls, event: str, payload: Dict) -> list[Optional[Dict]]:
+        """Payload of each outbox row queued for `event`"""
+        if event not in cls.BOTH_PARTIES:
+            return [payload or None]
+        return [{**payload, "recipient": recipient} for recipient in cls.RECIPIENTS]
+
+    @classmethod
+    def enqueue(cls, db: Session, transaction: Transaction, *events: str, **payload) -> list[NotificationOutbox]:
+        """
+        Queue notifications in the caller's DB transaction, they are sent by the outbox dispatcher after commit.
+        :param db: Database session holding the state change
+        :param transaction: Flushed transaction the notifications are about
+        :param events: notify_<event> methods of this service to call, e.g. "transaction_received"
+        :param payload: Extra keyword arguments for the notify methods (reason, error_message)
+        :return: the outbox entries added to the session
+        """
+        for event in events:
+            if not hasattr(cls, f"notify_{event}"):
+                raise ValueError(f"Unknown transaction notification: {event}")
+
+        entries = [NotificationOutbox(event=event, transaction_id=transaction.id, payload=row_payload)
+                   for event in events for row_payload in cls._payloads(event, payload)]
+        db.add_all(entries)
+        return entries
+
+    @classmethod
+    def enqueue_bulk(cls, db: Session, event: str, transaction_ids: List[int], **payload) -> int:
+        """
+        Queue the same notification for many transactions with one INSERT, for batch jobs.
+        :return: number of outbox rows written
+        """
+        if not hasattr(cls, f"notify_{event}"):
+            raise ValueError(f"Unknown transaction notification: {event}")
+        if not transaction_ids:
+            return 0
+
+        rows = [{"event": event, "transaction_id": transaction_id, "payload": row_payload}
+                for transaction_id in transaction_ids for row_payload in cls._payloads(event, payload)]
+        db.execute(insert(NotificationOutbox.__table__), rows)
+        return len(rows)
+
+    @classmethod
+    def deliver(cls, event: str, transaction: Transaction, payload: Optional[Dict] = None) -> bool:
+        """
+        Send one queued notification, used by the outbox dispatcher
+        :return: True if the mail provider accepted every message
+        """
+        return getattr(cls, f"notify_{event}")(transaction, **(payload or {}))
+
     @staticmethod
     def notify_sender_transaction_created(transaction: Transaction):
         """Notify sender that transaction was created and needs confirmation"""
@@ -185,118 +243,174 @@ class TransactionNotificationService:
             return False
 
     @staticmethod
-    def notify_transaction_declined(transaction: Transaction, reason: Optional[str] = None):
-        """Notify all parties about transaction decline"""
+    def notify_transaction_declined(transaction: Transaction, reason: Optional[str] = None,
+                                    recipient: Optional[str] = None):
+        """Notify all parties about transaction decline, or only `recipient` ("sender" or "receiver")"""
         try:
-            # Send email to sender about decline
-            sender_result = NotificationService.notify_from_template(
-                template=EmailTemplates.TRANSACTION_DECLINED,
-                user=transaction.sender,
-                amount=transaction.amount,
-                recipient_username=transaction.receiver.username,
-                description=transaction.description or 'No description',
-                transaction_id=transaction.id,
-                reason=reason or 'No reason provided'
-            )
-            
-            # Send email to receiver confirming their action
-            receiver_result = NotificationService.notify(
-                user=transaction.receiver,
-                title="Transaction Declined - Confirmation",
-                message=f"You have successfully declined the transaction of ${transaction.amount:.2f} from {transaction.sender.username}. Transaction ID: {transaction.id}"
-            )
-            
+            results = []
+            if recipient in (None, "sender"):
+                # Send email to sender about decline
+                results.append(NotificationService.notify_from_template(
+                    template=EmailTemplates.TRANSACTION_DECLINED,
+                    user=transaction.sender,
+                    amount=transaction.amount,
+                    recipient_username=transaction.receiver.username,
+                    description=transaction.description or 'No description',
+                    transaction_id=transaction.id,
+                    reason=reason or 'No reason provided'
+                ))
+                print(f"📧 EMAIL SENT to {transaction.sender.email}: Transaction Declined")
+
+            if recipient in (None, "receiver"):
+                # Send email to receiver confirming their action
+                results.append(NotificationService.notify(
+                    user=transaction.receiver,
+                    title="Transaction Declined - Confirmation",
+                    message=f"You have successfully declined the transaction of ${transaction.amount:.2f} from {transaction.sender.username}. Transaction ID: {transaction.id}"
+                ))
+                print(f"📧 EMAIL SENT to {transaction.receiver.email}: Transaction Declined - Confirmation")
+
             # Log the notifications
             logger.info(f"Transaction declined emails sent for transaction {transaction.id}")
-            
+
             # Also print to console for development/debugging
-            print(f"📧 EMAIL SENT to {transaction.sender.email}: Transaction Declined")
-            print(f"📧 EMAIL SENT to {transaction.receiver.email}: Transaction Declined - Confirmation")
             print(f"   ❌ ${transaction.amount:.2f} transaction declined")
             print(f"   🔗 Transaction ID: {transaction.id}")
-            
-            return sender_result.status_code == 200 and receiver_result.status_code == 200
-            
+
+            return all(result.status_code == 200 for result in results)
+
         except Exception as e:
             logger.error(f"Failed to send transaction declined emails for transaction {transaction.id}: {str(e)}")
             print(f"❌ Failed to send email notifications: {str(e)}")
             return False
 
     @staticmethod
-    def notify_transaction_cancelled(transaction: Transaction):
-        """Notify all parties about transaction cancellation"""
+    def notify_transaction_cancelled(transaction: Transaction, recipient: Optional[str] = None):
+        """Notify all parties about transaction cancellation, or only `recipient` ("sender" or "receiver")"""
         try:
-            # Send email to sender
-            sender_result = NotificationService.notify_from_template(
-                template=EmailTemplates.TRANSACTION_CANCELLED,
-                user=transaction.sender,
-                amount=transaction.amount,
-                recipient_username=transaction.receiver.username,
-                description=transaction.description or 'No description',
-                transaction_id=transaction.id
-            )
-            
-            # Send email to receiver
-            receiver_result = NotificationService.notify(
-                user=transaction.receiver,
-                title="Transaction Cancelled",
-                message=f"The transaction of ${transaction.amount:.2f} from {transaction.sender.username} has been cancelled. Transaction ID: {transaction.id}"
-            )
-            
+            results = []
+            if recipient in (None, "sender"):
+                # Send email to sender
+                results.append(NotificationService.notify_from_template(
+                    template=EmailTemplates.TRANSACTION_CANCELLED,
+                    user=transaction.sender,
+                    amount=transaction.amount,
+                    recipient_username=transaction.receiver.username,
+                    description=transaction.description or 'No description',
+                    transaction_id=transaction.id
+                ))
+                print(f"📧 EMAIL SENT to {transaction.sender.email}: Transaction Cancelled")
+
+            if recipient in (None, "receiver"):
+                # Send email to receiver
+                results.append(NotificationService.notify(
+                    user=transaction.receiver,
+                    title="Transaction Cancelled",
+                    message=f"The transaction of ${transaction.amount:.2f} from {transaction.sender.username} has been cancelled. Transaction ID: {transaction.id}"
+                ))
+                print(f"📧 EMAIL SENT to {transaction.receiver.email}: Transaction Cancelled - Notification")
+
             # Log the notifications
             logger.info(f"Transaction cancelled emails sent for transaction {transaction.id}")
-            
+
             # Also print to console for development/debugging
-            print(f"📧 EMAIL SENT to {transaction.sender.email}: Transaction Cancelled")
-            print(f"📧 EMAIL SENT to {transaction.receiver.email}: Transaction Cancelled - Notification")
             print(f"   🚫 ${transaction.amount:.2f} transaction cancelled")
             print(f"   🔗 Transaction ID: {transaction.id}")
-            
-            return sender_result.status_code == 200 and receiver_result.status_code == 200
-            
+
+            return all(result.status_code == 200 for result in results)
+
         except Exception as e:
             logger.error(f"Failed to send transaction cancelled emails for transaction {transaction.id}: {str(e)}")
             print(f"❌ Failed to send email notifications: {str(e)}")
             return False
 
     @staticmethod
-    def notify_transaction_failed(transaction: Transaction, error_message: str):
-        """Notify all parties about transaction failure"""
+    def notify_transaction_expired(transaction: Transaction, recipient: Optional[str] = None):
+        """Notify all parties that a transfer expired before it was accepted, or only `recipient`"""
         try:
-            # Send email to sender
-            sender_result = NotificationService.notify_from_template(
-                template=EmailTemplates.TRANSACTION_FAILED,
-                user=transaction.sender,
-                amount=transaction.amount,
-                recipient_username=transaction.receiver.username,
-                description=transaction.description or 'No description',
-                transaction_id=transaction.id,
-                error_message=error_message
-            )
-            
-            # Send email to receiver
-            receiver_result = NotificationService.notify(
-                user=transaction.receiver,
-                title="Transaction Failed",
-                message=f"The transaction of ${transaction.amount:.2f} from {transaction.sender.username} has failed due to: {error_message}. Transaction ID: {transaction.id}"
-            )
-            
+            results = []
+            if recipient in (None, "sender"):
+                results.append(NotificationService.notify(
+                    user=transaction.sender,
+                    title="Transaction Expired",
+                    message=f"Your transaction of ${transaction.amount:.2f} to {transaction.receiver.username} was not accepted in time and has been cancelled. The reserved funds are available again. Transaction ID: {transaction.id}"
+                ))
+            if recipient in (None, "receiver"):
+                results.append(NotificationService.notify(
+                    user=transaction.receiver,
+                    title="Transaction Expired",
+                    message=f"The transaction of ${transaction.amount:.2f} from {transaction.sender.username} expired before it was accepted and has been cancelled. Transaction ID: {transaction.id}"
+                ))
+
+            logger.info(f"Transaction expired emails sent for transaction {transaction.id}")
+
+            return all(result.status_code == 200 for result in results)
+
+        except Exception as e:
+            logger.error(f"Failed to send transaction expired emails for transaction {transaction.id}: {str(e)}")
+            return False
+
+    @staticmethod
+    def notify_transaction_failed(transaction: Transaction, error_message: str, recipient: Optional[str] = None):
+        """Notify all parties about transaction failure, or only `recipient` ("sender" or "receiver")"""
+        try:
+            results = []
+            if recipient in (None, "sender"):
+                # Send email to sender
+                results.append(NotificationService.notify_from_template(
+                    template=EmailTemplates.TRANSACTION_FAILED,
+                    user=transaction.sender,
+                    amount=transaction.amount,
+                    recipient_username=transaction.receiver.username,
+                    description=transaction.description or 'No description',
+                    transaction_id=transaction.id,
+                    error_message=error_message
+                ))
+                print(f"📧 EMAIL SENT to {transaction.sender.email}: Transaction Failed")
+
+            if recipient in (None, "receiver"):
+                # Send email to receiver
+                results.append(NotificationService.notify(
+                    user=transaction.receiver,
+                    title="Transaction Failed",
+                    message=f"The transaction of ${transaction.amount:.2f} from {transaction.sender.username} has failed due to: {error_message}. Transaction ID: {transaction.id}"
+                ))
+                print(f"📧 EMAIL SENT to {transaction.receiver.email}: Transaction Failed - Notification")
+
             # Log the notifications
             logger.error(f"Transaction failed emails sent for transaction {transaction.id}: {error_message}")
-            
+
             # Also print to console for development/debugging
-            print(f"📧 EMAIL SENT to {transaction.sender.email}: Transaction Failed")
-            print(f"📧 EMAIL SENT to {transaction.receiver.email}: Transaction Failed - Notification")
             print(f"   ❌ ${transaction.amount:.2f} transaction failed: {error_message}")
             print(f"   🔗 Transaction ID: {transaction.id}")
-            
-            return sender_result.status_code == 200 and receiver_result.status_code == 200
-            
+
+            return all(result.status_code == 200 for result in results)
+
         except Exception as e:
             logger.error(f"Failed to send transaction failed emails for transaction {transaction.id}: {str(e)}")
             print(f"❌ Failed to send email notifications: {str(e)}")
             return False
 
+    @staticmethod
+    def notify_recurring_transaction_failed(transaction: Transaction):
+        """Notify sender that a scheduled execution of a recurring transaction could not be made"""
+        try:
+            result = NotificationService.notify_from_template(
+                template=EmailTemplates.FAILED_RECURRING_TRANSACTION,
+                user=transaction.sender,
+                amount=transaction.amount,
+                currency=transaction.currency.code if transaction.currency else ""
+            )
+
+            logger.info(f"Failed recurring transaction email sent to {transaction.sender.email} "
+                        f"for transaction {transaction.id}")
+
+            return result.status_code == 200
+
+        except Exception as e:
+            logger.error(f"Failed to send failed recurring transaction email to {transaction.sender.email}: {str(e)}")
+            return False
+
     # Legacy method for backward compatibility
     @classmethod
     def notify_transaction_confirmed(cls, transaction: Transaction) -> bool:
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import (OUTBOX_BATCH_SIZE, OUTBOX_CONCURRENCY, OUTBOX_POLL_INTERVAL, OUTBOX_MAX_ATTEMPTS,
+                        OUTBOX_CLAIM_TIMEOUT)
+from app.infrestructure.database import SessionLocal
+from app.models.notification_outbox import NotificationOutbox, OutboxStatus
+from app.models.transaction import Transaction
+from .transaction_notifications import TransactionNotificationService
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+class TransactionOutboxDispatcher:
+    """
+    Drains the notification outbox in the background.
+    Batches of due rows are claimed with SKIP LOCKED so several API workers can dispatch side by side,
+    at most `concurrency` e-mails are in flight at once and failed sends are retried with exponential backoff
+    until `max_attempts` is reached. Rows stuck in SENDING longer than `claim_timeout` seconds
+    (a worker died mid-batch) are claimed again.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = 50, concurrency: int = 8,
+                 poll_interval: float = 1.0, max_attempts: int = 5, claim_timeout: int = 300):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(MAX_BACKOFF_SECONDS, self.poll_interval * 2 ** attempts))
+
+    def claim(self) -> list[NotificationOutbox]:
+        """
+        Mark a batch of due rows as SENDING and load what their templates need
+        :return: detached outbox rows with their transaction, sender and receiver loaded
+        """
+        now = datetime.now()
+        with self.session_factory() as db:
+            due = or_(and_(NotificationOutbox.status == OutboxStatus.PENDING,
+                           NotificationOutbox.available_at <= now),
+                      and_(NotificationOutbox.status == OutboxStatus.SENDING,
+                           NotificationOutbox.claimed_at < now - timedelta(seconds=self.claim_timeout)))
+            ids = db.execute(select(NotificationOutbox.id)
+                             .where(due)
+                             .order_by(NotificationOutbox.id)
+                             .limit(self.batch_size)
+                             .with_for_update(skip_locked=True)).scalars().all()
+            if not ids:
+                return []
+
+            db.execute(update(NotificationOutbox)
+                       .where(NotificationOutbox.id.in_(ids))
+                       .values(status=OutboxStatus.SENDING,
+                               claimed_at=now,
+                               attempts=NotificationOutbox.attempts + 1))
+            entries = db.execute(select(NotificationOutbox)
+                                 .where(NotificationOutbox.id.in_(ids))
+                                 .order_by(NotificationOutbox.id)
+                                 .options(joinedload(NotificationOutbox.transaction)
+                                          .joinedload(Transaction.sender),
+                                          joinedload(NotificationOutbox.transaction)
+                                          .joinedload(Transaction.receiver),
+                                          joinedload(NotificationOutbox.transaction)
+                                          .joinedload(Transaction.currency))).scalars().all()
+            # Detach before commit so the loaded state is not expired
+            db.expunge_all()
+            db.commit()
+            return list(entries)
+
+    def complete(self, results: Dict[int, Optional[str]], attempts: Dict[int, int]):
+        """
+        Store the outcome of a sent batch
+        :param results: outbox id -> None when sent, error message otherwise
+        :param attempts: outbox id -> attempts made so far
+        """
+        now = datetime.now()
+        sent, retried, failed = 0, 0, 0
+        with self.session_factory() as db:
+            for entry_id, error in results.items():
+                if error is None:
+                    values = dict(status=OutboxStatus.SENT, sent_at=now, last_error=None)
+                    sent += 1
+                elif attempts[entry_id] >= self.max_attempts:
+                    values = dict(status=OutboxStatus.FAILED, last_error=error)
+                    failed += 1
+                else:
+                    values = dict(status=OutboxStatus.PENDING, last_error=error,
+                                  available_at=now + self._backoff(attempts[entry_id]))
+                    retried += 1
+                db.execute(update(NotificationOutbox).where(NotificationOutbox.id == entry_id).values(**values))
+            db.commit()
+
+        with self._lock:
+            self.sent += sent
+            self.retried += retried
+            self.failed += failed
+            self.batches += 1
+
+    @staticmethod
+    def _send(entry: NotificationOutbox) -> Optional[str]:
+        try:
+            if TransactionNotificationService.deliver(entry.event, entry.transaction, entry.payload):
+                return None
+            return "Mail provider did not accept the message"
+        except Exception as e:
+            return str(e)
+
+    async def dispatch_once(self) -> int:
+        """
+        Claim, send and settle one batch
+        :return: number of outbox rows handled
+        """
+        entries = await asyncio.to_thread(self.claim)
+        if not entries:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(entry: NotificationOutbox):
+            async with semaphore:
+                return entry.id, await asyncio.to_thread(self._send, entry)
+
+        results = dict(await asyncio.gather(*(send(entry) for entry in entries)))
+        await asyncio.to_thread(self.complete, results, {entry.id: entry.attempts for entry in entries})
+
+        for entry_id, error in results.items():
+            if error is not None:
+                logger.warning(f"Outbox notification {entry_id} failed: {error}")
+        return len(entries)
+
+    async def run(self):
+        """Dispatch until stopped, back to back while there is a backlog, every `poll_interval` otherwise"""
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+        logger.info(f"Started notification outbox dispatcher (batch {self.batch_size}, "
+                    f"concurrency {self.concurrency})")
+        while not self._stopping.is_set():
+            try:
+                handled = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Notification outbox dispatch failed: {str(e)}")
+                handled = 0
+
+            if handled < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> asyncio.Task:
+        """Start the dispatcher on the running event loop"""
+        if self._task is None or self._task.done():
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Finish the batch in flight and stop"""
+        if self._task is None:
+            return
+        if self._stopping is not None:
+            self._stopping.set()
+        await self._task
+        self._task = None
+        self._stopping = None
+
+    def backlog(self, db: Session) -> Dict[str, int]:
+        """Outbox rows per status"""
+        counts = dict(db.execute(select(NotificationOutbox.status, func.count())
+                                 .group_by(NotificationOutbox.status)).all())
+        return {status.value: counts.get(status, 0) for status in OutboxStatus}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "running": self._task is not None and not self._task.done(),
+                "batch_size": self.batch_size,
+                "concurrency": self.concurrency,
+                "max_attempts": self.max_attempts,
+                "batches": self.batches,
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+
+outbox_dispatcher = TransactionOutboxDispatcher(batch_size=OUTBOX_BATCH_SIZE,
+                                                concurrency=OUTBOX_CONCURRENCY,
+                                                poll_interval=OUTBOX_POLL_INTERVAL,
+                                                max_attempts=OUTBOX_MAX_ATTEMPTS,
+                                                claim_timeout=OUTBOX_CLAIM_TIMEOUT)
+
+
+if __name__ == "__main__":
+    # Standalone dispatcher, for deployments that keep e-mail out of the API processes
+    asyncio.run(outbox_dispatcher.run())
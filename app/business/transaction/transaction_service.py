@@ -1,14 +1,19 @@
+from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import HTTPException
-from sqlalchemy import select, func
-from sqlalchemy.orm import Session
-
-from app.models import User, Transaction, RecurringTransaction
-from app.models.transaction import TransactionStatus, TransactionUpdateStatus
-from app.schemas.transaction import TransactionCreate, TransactionHistoryResponse, TransactionStatusUpdate
+from sqlalchemy import select, func, and_, or_, case, true, union_all, update
+from sqlalchemy.orm import Session, aliased, joinedload
+
+from app.models import User, Transaction, RecurringTransaction, Contact, TransactionSearch, UserDailyRollup
+from app.models.transaction import TransactionStatus, TransactionUpdateStatus, UserTransactionsQuery
+from app.schemas.transaction import (TransactionCreate, TransactionHistoryResponse, TransactionStatusUpdate,
+                                     DirectTransferCreate)
+from .transaction_cursor import TransactionCursor
+from .transaction_forecast import forecast_cache
 from .transaction_notifications import TransactionNotificationService
 from .transaction_validators import TransactionValidators
+from ..payment.ledger import LedgerService
 from ..user.user_validators import UserValidators
 from ...schemas.router import TransactionHistoryFilter
 
@@ -51,6 +56,11 @@ class TransactionService:
         )
 
         db.add(transaction)
+        db.flush()
+
+        # Queue notifications, they are committed together with the transaction
+        TransactionNotificationService.enqueue(db, transaction,
+                                               "sender_transaction_created", "transaction_received")
         db.commit()
         db.refresh(transaction)
 
@@ -59,9 +69,61 @@ class TransactionService:
 
         db.refresh(transaction)
 
-        # Send notifications
-        TransactionNotificationService.notify_sender_transaction_created(transaction)
-        TransactionNotificationService.notify_transaction_received(transaction)
+        return transaction
+
+    @classmethod
+    def create_direct_transaction(cls, db: Session, sender: User, transfer: DirectTransferCreate) -> Transaction:
+        """
+        Transfer to a trusted contact in one call: the receiver must be in the sender's contacts and accept
+        transfers from the sender automatically. The funds move and the transaction is created COMPLETED in one
+        commit, without the confirm and accept steps or their reservation.
+        :param db: Database session
+        :param sender: User sending the transaction
+        :param transfer: Transfer data
+        :return: Completed transaction object
+        """
+        validated_amount = TransactionValidators.validate_transaction_amount(transfer.amount)
+        identifier = transfer.identifier.strip()
+
+        # The receiver and both contact entries in one query
+        sender_contact, receiver_contact = aliased(Contact), aliased(Contact)
+        receiver = db.execute(select(User)
+                              .join(sender_contact, and_(sender_contact.user_id == sender.id,
+                                                         sender_contact.contact_id == User.id))
+                              .join(receiver_contact, and_(receiver_contact.user_id == User.id,
+                                                           receiver_contact.contact_id == sender.id,
+                                                           receiver_contact.auto_accept.is_(True)))
+                              .where(or_(User.username == identifier,
+                                         User.email == identifier,
+                                         User.phone_number == identifier))).scalars().first()
+        if receiver is None:
+            raise HTTPException(status_code=403,
+                                detail="Direct transfers are only possible to contacts who accept them automatically")
+
+        try:
+            sender.debit(validated_amount)
+            receiver.credit(validated_amount)
+        except ValueError as e:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+
+        transaction = Transaction(
+            sender_id=sender.id,
+            receiver_id=receiver.id,
+            amount=validated_amount,
+            description=transfer.description,
+            category_id=transfer.category_id,
+            currency_id=transfer.currency_id,
+            status=TransactionStatus.COMPLETED,
+            recurring=False
+        )
+        db.add(transaction)
+        db.flush()
+        LedgerService.record_transfer(db, transaction)
+        TransactionNotificationService.enqueue(db, transaction,
+                                               "sender_transaction_completed", "transaction_completed")
+        db.commit()
+        db.refresh(transaction)
 
         return transaction
 
@@ -104,17 +166,36 @@ class TransactionService:
                 # Log the error but continue with marking the transaction as failed
                 print(f"Error releasing funds: {str(fund_error)}")
 
+        # Notify about failure
+        TransactionNotificationService.enqueue(db, transaction, "transaction_failed", error_message=str(error))
+
         db.commit()
         db.refresh(transaction)
 
-        # Notify about failure
-        TransactionNotificationService.notify_transaction_failed(transaction, str(error))
-
         if isinstance(error, ValueError):
             print("line 113")
             raise HTTPException(status_code=400, detail=str(error))
         raise error
 
+    @classmethod
+    def _transition(cls, db: Session, transaction: Transaction, status: TransactionStatus,
+                    *expected: TransactionStatus, **values) -> None:
+        """
+        Move a transaction to `status` with an UPDATE that only matches while it is still in one of the `expected`
+        statuses, so two requests racing on the same transaction cannot both apply their balance changes. Other
+        columns in `values` are set by the same UPDATE
+        :raises HTTPException: 409 if another request changed the status first
+        """
+        previous_status = transaction.status
+        result = db.execute(update(Transaction)
+                            .where(Transaction.id == transaction.id, Transaction.status.in_(expected))
+                            .values(status=status, **values))
+        if result.rowcount == 0:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Transaction was modified by another request")
+        UserDailyRollup.record(db, [transaction], previous_status, status)
+        transaction.status = status
+
     @classmethod
     def confirm_transaction(cls, db: Session, user: User, transaction_id: int) -> Transaction:
         """
@@ -136,20 +217,21 @@ class TransactionService:
         db.refresh(user)  # Refresh user to get latest balance
         TransactionValidators.validate_sufficient_available_balance(user, transaction.amount)
 
+        # Change status to awaiting acceptance
+        cls._transition(db, transaction, TransactionStatus.AWAITING_ACCEPTANCE, TransactionStatus.PENDING,
+                        awaiting_since=datetime.now())
+
         try:
             # Reserve funds from sender's account
             transaction.sender.reserve_funds(transaction.amount)
 
-            # Change status to awaiting acceptance
-            transaction.status = TransactionStatus.AWAITING_ACCEPTANCE
+            # Queue notifications - transaction is now confirmed but awaiting receiver acceptance
+            TransactionNotificationService.enqueue(db, transaction,
+                                                   "sender_transaction_confirmed", "transaction_awaiting_acceptance")
 
             db.commit()
             db.refresh(transaction)
 
-            # Send notifications - transaction is now confirmed but awaiting receiver acceptance
-            TransactionNotificationService.notify_sender_transaction_confirmed(transaction)
-            TransactionNotificationService.notify_transaction_awaiting_acceptance(transaction)
-
             return transaction
 
         except (ValueError, Exception) as e:
@@ -175,23 +257,21 @@ class TransactionService:
         if transaction.recurring:
             return cls.accept_recurring_transaction(db, receiver, transaction)
 
-        try:
-            # Refresh both users to get latest balances
-            db.refresh(transaction.sender)
-            db.refresh(receiver)
+        cls._transition(db, transaction, TransactionStatus.COMPLETED, TransactionStatus.AWAITING_ACCEPTANCE)
 
+        try:
             # Transfer from reserved funds to actual transfer
             transaction.sender.transfer_from_reserved(transaction.amount)
-            receiver.balance += transaction.amount
-            transaction.status = TransactionStatus.COMPLETED
+            receiver.credit(transaction.amount)
+            LedgerService.record_transfer(db, transaction)
+
+            # Queue completion notifications
+            TransactionNotificationService.enqueue(db, transaction,
+                                                   "sender_transaction_completed", "transaction_completed")
 
             db.commit()
             db.refresh(transaction)
 
-            # Send completion notifications
-            TransactionNotificationService.notify_sender_transaction_completed(transaction)
-            TransactionNotificationService.notify_transaction_completed(transaction)
-
             return transaction
 
         except (ValueError, Exception) as e:
@@ -216,18 +296,19 @@ class TransactionService:
         if transaction.recurring:
             return cls.cancel_recurring_transaction(db, receiver, transaction)
 
+        # Mark transaction as denied
+        cls._transition(db, transaction, TransactionStatus.DENIED, TransactionStatus.AWAITING_ACCEPTANCE)
+
         try:
             # Release reserved funds back to sender
             transaction.sender.release_reserved_funds(transaction.amount)
 
-            # Mark transaction as denied
-            transaction.status = TransactionStatus.DENIED
+            # Queue notifications
+            TransactionNotificationService.enqueue(db, transaction, "transaction_declined", reason=reason)
+
             db.commit()
             db.refresh(transaction)
 
-            # Send notifications
-            TransactionNotificationService.notify_transaction_declined(transaction, reason)
-
             return transaction
 
         except (ValueError, Exception) as e:
@@ -264,16 +345,19 @@ class TransactionService:
                 detail=f"Cannot cancel transaction with status: {transaction.status.value}. Only pending and awaiting confirmation transactions can be cancelled."
             )
         print("Cancelling transaction")
+        previous_status = transaction.status
+        cls._transition(db, transaction, TransactionStatus.CANCELLED, previous_status)
         try:
-            transaction.status = TransactionStatus.CANCELLED
-            user.release_reserved_funds(transaction.amount)
+            # Funds are only reserved once the transaction was confirmed
+            if previous_status == TransactionStatus.AWAITING_ACCEPTANCE:
+                user.release_reserved_funds(transaction.amount)
+
+            # Queue notifications
+            TransactionNotificationService.enqueue(db, transaction, "transaction_cancelled")
 
             db.commit()
             db.refresh(transaction)
 
-            # Send notifications
-            TransactionNotificationService.notify_transaction_cancelled(transaction)
-
             return transaction
         except Exception as e:
             db.rollback()
@@ -292,73 +376,173 @@ class TransactionService:
         TransactionValidators.validate_transaction_ownership(transaction, user)
         return transaction
 
+    @classmethod
+    def _history_totals_columns(cls, user: User, entity=Transaction) -> list:
+        """
+        Aggregates over the whole filtered history
+        :param user: User the history belongs to
+        :param entity: Transaction or an alias of it
+        :return: labelled aggregate columns
+        """
+        completed = entity.status.in_([TransactionStatus.COMPLETED, TransactionStatus.AWAITING_ACCEPTANCE])
+        outgoing = and_(completed, entity.sender_id == user.id)
+        incoming = and_(completed, entity.receiver_id == user.id)
+
+        return [
+            func.count().label("total_count"),
+            func.sum(case((outgoing, entity.amount), else_=0)).label("outgoing_total"),
+            func.count(case((outgoing, entity.id))).label("outgoing_count"),
+            func.sum(case((incoming, entity.amount), else_=0)).label("incoming_total"),
+            func.count(case((incoming, entity.id))).label("incoming_count"),
+            func.count(case((completed, entity.id))).label("total_completed"),
+        ]
+
+    @classmethod
+    def _rollup_totals(cls, user: User, date_from: Optional[datetime], date_to: Optional[datetime],
+                       direction: Optional[str], status: Optional[str]):
+        """
+        Aggregates over the filtered history read from the daily rollups for whole days,
+        and from transactions only for the partial days at the edges of the range
+        :return: totals subquery with the labels of _history_totals_columns,
+                 None when the range does not cover a whole day
+        """
+        rollup = UserDailyRollup
+        criteria = [rollup.user_id == user.id]
+        edges = []
+        if date_from is not None:
+            first_day = date_from.replace(hour=0, minute=0, second=0, microsecond=0)
+            if first_day != date_from:
+                first_day += timedelta(days=1)
+                edges.append(and_(Transaction.date >= date_from, Transaction.date < first_day))
+            criteria.append(rollup.day >= first_day.date())
+        if date_to is not None:
+            last_day = date_to.replace(hour=0, minute=0, second=0, microsecond=0)
+            edges.append(and_(Transaction.date >= last_day, Transaction.date <= date_to))
+            criteria.append(rollup.day < last_day.date())
+            if date_from is not None and first_day >= last_day:
+                return None
+        if direction:
+            criteria.append(rollup.direction == direction)
+        if status:
+            criteria.append(rollup.status == status)
+
+        completed = rollup.status.in_([TransactionStatus.COMPLETED.value, TransactionStatus.AWAITING_ACCEPTANCE.value])
+        outgoing = and_(completed, rollup.direction == "out")
+        incoming = and_(completed, rollup.direction == "in")
+        parts = [select(func.sum(rollup.transaction_count).label("total_count"),
+                        func.sum(case((outgoing, rollup.amount), else_=0)).label("outgoing_total"),
+                        func.sum(case((outgoing, rollup.transaction_count), else_=0)).label("outgoing_count"),
+                        func.sum(case((incoming, rollup.amount), else_=0)).label("incoming_total"),
+                        func.sum(case((incoming, rollup.transaction_count), else_=0)).label("incoming_count"),
+                        func.sum(case((completed, rollup.transaction_count), else_=0)).label("total_completed"))
+                 .where(*criteria)]
+        if edges:
+            builder = UserTransactionsQuery(user.id, direction=direction).where(or_(*edges))
+            if status:
+                builder.where(Transaction.status == status)
+            edge = aliased(Transaction, builder.subquery(name="edge_days"))
+            parts.append(select(*cls._history_totals_columns(user, edge)))
+
+        combined = union_all(*parts).subquery("parts") if len(parts) > 1 else parts[0].subquery("parts")
+        return select(*(func.sum(column).label(column.name) for column in combined.c)).subquery("totals")
+
     @classmethod
     def get_user_transaction_history(cls, db: Session, user: User,
                                      history_filter: TransactionHistoryFilter) -> TransactionHistoryResponse:
-        # Get base Select object from user.get_transactions
-        query = user.get_transactions(db, order_by=history_filter.order_by, legacy_query=False)
-
+        """
+        Get a page of the user's transaction history with totals over the whole filtered history.
+        Rows come from UserTransactionsQuery, each branch is cut to the page size before the merge.
+        Totals come from the daily rollups unless the history is filtered by the other party or searched.
+        `q` is matched against the descriptions through the full-text index and can be ordered by relevance.
+        The page is outer joined to the totals, so page, totals, sender, receiver and category
+        are fetched in a single statement, even when the page is empty.
+        :param db: Database session
+        :param user: User requesting the history
+        :param history_filter: Filtering, sorting and pagination options
+        :return: TransactionHistoryResponse
+        """
         date_from = history_filter.date_from
         date_to = history_filter.date_to
         sender_id = history_filter.sender_id
         receiver_id = history_filter.receiver_id
         direction = history_filter.direction
         status = history_filter.status
-        # order_by = history_filter.order_by
+        order_by = history_filter.order_by
         limit = history_filter.limit
         offset = (history_filter.page - 1) * limit
+        cursor_mode = history_filter.pagination == "cursor" or history_filter.cursor is not None
+        search = TransactionSearch(history_filter.q or "", db.get_bind().dialect.name, user.id)
+
+        builder = UserTransactionsQuery(user.id, direction=direction if direction in ("in", "out") else None,
+                                        order_by=order_by, rank=search.rank if search else None)
+        # Relevance without a search is ordered by date
+        order_by = builder.order_by
+        if order_by == "relevance" and cursor_mode:
+            raise HTTPException(status_code=400, detail="Results ordered by relevance are paged by page number")
 
         # Apply additional filters
         if date_from:
-            query = query.filter(Transaction.date >= date_from)
+            builder.where(Transaction.date >= date_from)
         if date_to:
-            query = query.filter(Transaction.date <= date_to)
+            builder.where(Transaction.date <= date_to)
         if sender_id:
-            query = query.filter(Transaction.sender_id == sender_id)
+            builder.where(Transaction.sender_id == sender_id)
         if receiver_id:
-            query = query.filter(Transaction.receiver_id == receiver_id)
-        if direction == "in":
-            query = query.filter(Transaction.receiver_id == user.id)
-        elif direction == "out":
-            query = query.filter(Transaction.sender_id == user.id)
+            builder.where(Transaction.receiver_id == receiver_id)
         if status:
-            query = query.filter(Transaction.status == status)
-
-        # Calculate total_count before pagination
-        total_count_query = select(func.count()).select_from(Transaction).where(query.whereclause)
-        total_count = db.execute(total_count_query).scalar() or 0
-
-        # Calculate financial totals in a single query
-        completed_query = query.filter(
-            Transaction.status.in_([TransactionStatus.COMPLETED, TransactionStatus.AWAITING_ACCEPTANCE]))
-        totals_query = select(
-            func.sum(Transaction.amount).filter(Transaction.sender_id == user.id).label('outgoing_total'),
-            func.count(Transaction.id).filter(Transaction.sender_id == user.id).label('outgoing_count'),
-            func.sum(Transaction.amount).filter(Transaction.receiver_id == user.id).label('incoming_total'),
-            func.count(Transaction.id).filter(Transaction.receiver_id == user.id).label('incoming_count'),
-            func.count(Transaction.id).label('total_completed')
-        ).select_from(Transaction).where(completed_query.whereclause)
-
-        result = db.execute(totals_query).first()
-        outgoing_total = result.outgoing_total or 0
-        outgoing_count = result.outgoing_count or 0
-        incoming_total = result.incoming_total or 0
-        incoming_count = result.incoming_count or 0
-        total_completed = result.total_completed or 0
-
-        # Apply sorting (override get_transactions sorting)
-        # if order_by == "date_asc":
-        #     query = query.order_by(Transaction.date.asc())
-        # elif order_by == "amount_desc":
-        #     query = query.order_by(Transaction.amount.desc())
-        # elif order_by == "amount_asc":
-        #     query = query.order_by(Transaction.amount.asc())
-        # else:  # date_desc
-        #     query = query.order_by(Transaction.date.desc())
+            builder.where(Transaction.status == status)
+        if search:
+            builder.where(search.criterion())
+
+        # Totals cover the filtered history, not the page, so they are built before the cursor predicate
+        totals = None
+        if not (sender_id or receiver_id or search):
+            totals = cls._rollup_totals(user, date_from, date_to, direction, status)
+        if totals is None:
+            filtered = aliased(Transaction, builder.subquery(name="filtered"))
+            totals = select(*cls._history_totals_columns(user, filtered)).subquery("totals")
 
         # Apply pagination
-        query = query.offset(offset).limit(limit)
-        transactions = db.execute(query).scalars().all()
+        if cursor_mode:
+            # Keyset pagination, constant cost at any depth
+            if history_filter.cursor:
+                builder.where(TransactionCursor.predicate(order_by, history_filter.cursor))
+            offset, page_size = 0, limit + 1
+        else:
+            page_size = limit
+
+        page, _ = builder.statement(page_size, offset, name="page")
+        history = aliased(Transaction, page.subquery("history"), name="history")
+        page_query = (select(history,
+                             totals.c.total_count,
+                             totals.c.outgoing_total,
+                             totals.c.outgoing_count,
+                             totals.c.incoming_total,
+                             totals.c.incoming_count,
+                             totals.c.total_completed)
+                      .select_from(totals)
+                      .outerjoin(history, true())
+                      .options(joinedload(history.sender),
+                               joinedload(history.receiver),
+                               joinedload(history.category))
+                      .order_by(*builder.ordering(history)))
+
+        rows = db.execute(page_query).all()
+        transactions = [row[0] for row in rows if row[0] is not None]
+
+        next_cursor = None
+        if cursor_mode and len(transactions) > limit:
+            transactions = transactions[:limit]
+            next_cursor = TransactionCursor.encode(order_by, transactions[-1])
+
+        # A page past the end still carries the totals on its single all-null row
+        totals = rows[0] if rows else None
+        total_count = (totals.total_count if totals else 0) or 0
+        outgoing_total = (totals.outgoing_total if totals else 0) or 0
+        outgoing_count = (totals.outgoing_count if totals else 0) or 0
+        incoming_total = (totals.incoming_total if totals else 0) or 0
+        incoming_count = (totals.incoming_count if totals else 0) or 0
+        total_completed = (totals.total_completed if totals else 0) or 0
 
         # Return response
         return TransactionHistoryResponse(
@@ -370,7 +554,8 @@ class TransactionService:
             avg_outgoing_transaction=round(outgoing_total / outgoing_count, 2) if outgoing_count > 0 else 0,
             incoming_total=incoming_total,
             avg_incoming_transaction=round(incoming_total / incoming_count, 2) if incoming_count > 0 else 0,
-            net_total=round(outgoing_total - incoming_total, 2)
+            net_total=round(outgoing_total - incoming_total, 2),
+            next_cursor=next_cursor
         )
 
     @classmethod
@@ -432,9 +617,10 @@ class TransactionService:
                 detail=f"Cannot accept transaction with status: {transaction.status.value}. Only awaiting confirmation transactions can be accepted."
             )
         recurring = transaction.recurring_transaction
-        recurring.is_active = True
+        recurring.activate()
         transaction.status = TransactionStatus.ACCEPTED
         db.commit()
+        forecast_cache.invalidate(transaction.sender_id, transaction.receiver_id)
         db.refresh(transaction)
         return transaction
 
@@ -447,7 +633,8 @@ class TransactionService:
                 detail=f"Cannot cancel transaction with status: {transaction.status.value}. Only pending and awaiting confirmation transactions can be cancelled."
             )
         transaction.status = TransactionStatus.CANCELLED
-        transaction.recurring_transaction.is_active = False
+        transaction.recurring_transaction.deactivate()
         db.commit()
+        forecast_cache.invalidate(transaction.sender_id, transaction.receiver_id)
         db.refresh(transaction)
         return transaction
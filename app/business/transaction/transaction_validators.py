@@ -35,6 +35,9 @@ class TransactionValidators:
         :return: True if sufficient available balance
         :raises HTTPException: If insufficient available balance
         """
+        if sender.available_balance < amount:
+            # Credits still parked in balance shards count towards the available balance
+            sender.fold_credit_shards()
         if sender.available_balance < amount:
             raise HTTPException(
                 status_code=400,
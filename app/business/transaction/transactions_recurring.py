@@ -1,17 +1,29 @@
 import datetime
-from typing import List
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
 
-from sqlalchemy import and_
-from sqlalchemy.orm import Query, Session
+from sqlalchemy import and_, bindparam, create_engine, func, insert, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import Select
 
-from app.business import NotificationService
+from app.business.payment.ledger import LedgerService
 from app.business.user.user_auth import UserAuthService
-from app.business.utils.notification_service import EmailTemplates
+from app.config import (DB_URL, RECURRING_CHUNK_SIZE, RECURRING_CATCH_UP, RECURRING_CATCH_UP_MAX_BATCHES,
+                        RECURRING_WORKERS, RECURRING_POOL, RECURRING_WINDOW_SECONDS, RECURRING_RATE)
 from app.infrestructure import SessionLocal
-from app.infrestructure.scheduler import schedule_daily_job
-from app.models import Transaction, RecurringTransactionHistory, User
-from app.models.recurring_transation import RecurringInterval, RecurringTransaction
+from app.infrestructure.scheduler import schedule_daily_job, schedule_once, scheduler_leader
+from app.models import Transaction, RecurringRun, RecurringTransactionHistory, User
+from app.models.recurring_transation import INTERVAL_DAYS, RecurringInterval, RecurringTransaction
 from app.models.transaction import TransactionStatus
+from .transaction_forecast import forecast_cache
+from .transaction_notifications import TransactionNotificationService
+
+logger = logging.getLogger(__name__)
 
 
 class RecurringService:
@@ -22,97 +34,347 @@ class RecurringService:
     ]
 
     @classmethod
-    def gen_recurring_transaction_map(cls, t: Transaction, db: Session, rid: int, interval: RecurringInterval):
-        """Generate a map of recurring transaction data"""
-        last_execution = (db.query(RecurringTransactionHistory)
-                          .filter(RecurringTransactionHistory.recurring_transaction_id == t.id)
-                          .order_by(RecurringTransactionHistory.execution_date.desc())
-                          .first())
-
-        if last_execution:
-            last_execution_date = last_execution.execution_date.date()
-            days_since = (datetime.date.today() - last_execution_date).days
-            if last_execution_date == datetime.date.today():
-                add = False
+    def due_schedules_query(cls, now: datetime.datetime, limit: int = None,
+                            partition: Optional[tuple[int, int]] = None, lock: bool = False,
+                            current: bool = False) -> Select:
+        """
+        Active schedules whose next run is due at `now`, oldest run first, read from the next_run_at index
+        :param now: moment of the run
+        :param limit: batch size
+        :param partition: (index, count), only schedules with sender_id % count == index
+        :param lock: lock the schedule rows until the batch commits, skipping those another run has locked
+        :param current: only schedules whose next run is their latest due one, not a missed run to replay
+        :return: Select of (id, interval, next_run_at, transaction_id, sender_id, receiver_id, amount)
+        """
+        query = (select(RecurringTransaction.id,
+                        RecurringTransaction.interval,
+                        RecurringTransaction.next_run_at,
+                        Transaction.id.label("transaction_id"),
+                        Transaction.sender_id,
+                        Transaction.receiver_id,
+                        Transaction.amount)
+                 .join(Transaction, RecurringTransaction.transaction_id == Transaction.id)
+                 .where(RecurringTransaction.next_run_at <= now,
+                        RecurringTransaction.is_active == True,
+                        Transaction.recurring == True,
+                        Transaction.status == TransactionStatus.ACCEPTED)
+                 .order_by(RecurringTransaction.next_run_at, RecurringTransaction.id)
+                 .limit(limit))
+        if partition is not None:
+            index, count = partition
+            query = query.where(Transaction.sender_id % count == index)
+        if current:
+            query = query.where(or_(*(and_(RecurringTransaction.interval == interval,
+                                           RecurringTransaction.next_run_at > now - datetime.timedelta(days=days))
+                                      for interval, days in INTERVAL_DAYS.items())))
+        if lock:
+            # Overlapping runs (a demoted leader, a resumed spread run, the catch-up CLI) leave the schedules another
+            # run is executing to it, and no longer see them as due once it has committed their next run
+            query = query.with_for_update(skip_locked=True, of=RecurringTransaction)
+        return query
+
+    @classmethod
+    def execute_chunk(cls, db: Session, schedules: List[Row], now: datetime.datetime,
+                      catch_up: bool = False, commit: bool = True) -> tuple[int, int, int]:
+        """
+        Execute a chunk of due schedules in one DB transaction.
+        Balances of every involved user are locked and read once, moves are applied as one relative
+        UPDATE per user, the history rows and the ledger entries are inserted with one INSERT each.
+        Every schedule moves to its following run, or past `now` when missed runs are not caught up,
+        and its execution counters are incremented in the same UPDATE.
+        :param commit: False leaves the transaction open for the caller to add to it and commit
+        :return: (completed, failed, missed runs skipped)
+        """
+        user_ids = {s.sender_id for s in schedules} | {s.receiver_id for s in schedules}
+        users = {u.id: u for u in db.execute(select(User.id, User.balance, User.reserved_balance,
+                                                    User.status, User.admin)
+                                             .where(User.id.in_(user_ids))
+                                             .order_by(User.id)
+                                             .with_for_update()).all()}
+        available = {user_id: u.balance - u.reserved_balance for user_id, u in users.items()}
+        deltas = defaultdict(float)
+        history, insufficient, next_runs, entries = [], [], [], []
+        skipped = 0
+
+        for schedule in schedules:
+            sender, receiver = users.get(schedule.sender_id), users.get(schedule.receiver_id)
+            if sender is None:
+                # Nobody to notify, and the schedule fails on every run until it is deactivated
+                reason = "Sender account not found"
+            elif available[sender.id] < schedule.amount:
+                reason = "Insufficient balance"
+                insufficient.append(schedule.transaction_id)
+            elif (receiver is None or not UserAuthService.verify_user_can_transact(sender)
+                  or not UserAuthService.verify_user_can_transact(receiver)):
+                reason = "Account has suspended rights to transact"
             else:
-                match interval:
-                    case RecurringInterval.DAILY:
-                        add = last_execution_date != datetime.date.today()
+                reason = ""
+                available[sender.id] -= schedule.amount
+                available[receiver.id] += schedule.amount
+                deltas[sender.id] -= schedule.amount
+                deltas[receiver.id] += schedule.amount
+                entries += LedgerService.journal("recurring", schedule.transaction_id, schedule.amount,
+                                                 sender.id, receiver.id, now=now)
 
-                    case RecurringInterval.WEEKLY:
-                        add = days_since % 7 == 0
+            history.append({"recurring_transaction_id": schedule.id,
+                            "execution_date": now,
+                            "status": TransactionStatus.FAILED if reason else TransactionStatus.COMPLETED,
+                            "reason": reason})
 
-                    case RecurringInterval.MONTHLY:
-                        add = days_since % 30 == 0
+            next_run_at = RecurringTransaction.following_run(schedule.next_run_at, schedule.interval,
+                                                             after=None if catch_up else now)
+            skipped += (next_run_at - schedule.next_run_at).days // INTERVAL_DAYS[schedule.interval] - 1
+            next_runs.append({"recurring_id": schedule.id, "next_run_at": next_run_at,
+                              "completed": 0 if reason else 1, "failed": 1 if reason else 0,
+                              "transferred": 0.0 if reason else schedule.amount})
 
-                    case _:
-                        add = False
-        else:
-            add = True
+        users_table = User.__table__
+        moves = [{"user_id": user_id, "delta": delta} for user_id, delta in deltas.items() if delta]
+        if moves:
+            db.execute(update(users_table)
+                       .where(users_table.c.id == bindparam("user_id"))
+                       .values(balance=users_table.c.balance + bindparam("delta"),
+                               data_version=users_table.c.data_version + 1),
+                       moves)
+        recurring_table = RecurringTransaction.__table__
+        db.execute(update(recurring_table)
+                   .where(recurring_table.c.id == bindparam("recurring_id"))
+                   .values(next_run_at=bindparam("next_run_at"),
+                           execution_count=recurring_table.c.execution_count + bindparam("completed"),
+                           failure_count=recurring_table.c.failure_count + bindparam("failed"),
+                           total_transferred=recurring_table.c.total_transferred + bindparam("transferred"),
+                           last_executed_at=now),
+                   next_runs)
+        db.execute(insert(RecurringTransactionHistory.__table__), history)
+        LedgerService.record(db, entries)
+        TransactionNotificationService.enqueue_bulk(db, "recurring_transaction_failed", insufficient)
+        if commit:
+            db.commit()
+        # Executed schedules moved to their next run
+        forecast_cache.invalidate(*user_ids)
 
-        if not add:
-            return None
+        failed = sum(1 for h in history if h["reason"])
+        return len(history) - failed, failed, skipped
 
-        return {"rid": rid,
-                "amount": t.amount,
-                "date": t.date,
-                "sender": t.sender,
-                "receiver": t.receiver,
-                "currency": t.currency}
+    @classmethod
+    def execute_due(cls, db: Session, now: datetime.datetime = None, chunk_size: int = RECURRING_CHUNK_SIZE,
+                    catch_up: bool = False, max_batches: int = None,
+                    partition: Optional[tuple[int, int]] = None) -> dict:
+        """
+        Execute the schedules due at `now` in batches of `chunk_size`, one DB transaction per batch.
+        Without catch-up a schedule runs once and runs missed during downtime are skipped (and counted).
+        With catch-up every missed run is replayed, oldest first. After `max_batches` batches only the runs due
+        at `now` are executed, the missed runs left stay due for the next call.
+        :param partition: (index, count), restrict the run to one sender partition
+        :return: run summary with counts and throughput
+        """
+        now = now or datetime.datetime.now()
+        started = time.perf_counter()
+        completed, failed, skipped, errors, batches = 0, 0, 0, 0, 0
+
+        while True:
+            # The cap bounds the replays only, the schedules due at `now` are always drained
+            current = max_batches is not None and batches >= max_batches
+            batch = db.execute(cls.due_schedules_query(now, chunk_size, partition, lock=True, current=current)).all()
+            if not batch:
+                break
+            try:
+                batch_completed, batch_failed, batch_skipped = cls.execute_chunk(db, batch, now, catch_up)
+            except Exception as e:
+                # The batch stays due and is retried by the next run
+                db.rollback()
+                logger.error(f"Recurring transaction batch {batches + 1} failed: {str(e)}")
+                errors += len(batch)
+                break
+            batches += 1
+            completed += batch_completed
+            failed += batch_failed
+            skipped += batch_skipped
+
+        remaining = db.execute(select(func.count())
+                               .select_from(cls.due_schedules_query(now, partition=partition).subquery())).scalar()
+        elapsed = time.perf_counter() - started
+        executed = completed + failed
+        if skipped:
+            logger.warning(f"Skipped {skipped} missed recurring transaction runs, run with catch-up to replay them")
+        return {"due": executed,
+                "completed": completed,
+                "failed": failed,
+                "skipped": skipped,
+                "errors": errors,
+                "batches": batches,
+                "remaining": remaining,
+                "seconds": round(elapsed, 3),
+                "per_second": round(executed / elapsed, 1) if elapsed else 0.0}
 
     @classmethod
-    def transfer_balance(cls, db: Session, sender: User, receiver: User, amount: float):
-        try:
-            sender.balance -= amount
-            receiver.balance += amount
-            db.commit()
-            return True
-        except Exception as e:
-            return False
+    def execute_partition(cls, session_factory, index: int, partitions: int, now: datetime.datetime,
+                          **options) -> dict:
+        """
+        Execute one sender partition on its own session
+        :return: execute_due summary of the partition
+        """
+        with session_factory() as db:
+            results = cls.execute_due(db, now, partition=(index, partitions), **options)
+        return {"partition": index, **results}
+
+    @classmethod
+    def execute_partitioned(cls, workers: int = RECURRING_WORKERS, now: datetime.datetime = None,
+                            pool: str = RECURRING_POOL, session_factory=SessionLocal, db_url: str = DB_URL,
+                            **options) -> dict:
+        """
+        Execute the due schedules on `workers` threads or processes, partitioned by sender_id % workers.
+        Every payer belongs to exactly one partition, so only one worker ever debits a given balance.
+        Credits to receivers are relative updates taken under the same id-ordered row locks,
+        so workers crediting a shared receiver wait for each other instead of deadlocking.
+        A payer that can only cover today's schedules with money received in the same run may see that
+        credit before or after its own debit, unlike the sequential run's strict (next_run_at, id) order.
+        :param pool: "thread" (sessions from `session_factory`) or "process" (engine per process on `db_url`)
+        :param options: chunk_size, catch_up and max_batches of execute_due
+        :return: totals of the run with a per-partition breakdown
+        """
+        now = now or datetime.datetime.now()
+        started = time.perf_counter()
+
+        if pool == "process":
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_execute_partition_process, db_url, index, workers, now, options)
+                           for index in range(workers)]
+                partitions = [future.result() for future in futures]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recurring") as executor:
+                futures = [executor.submit(cls.execute_partition, session_factory, index, workers, now, **options)
+                           for index in range(workers)]
+                partitions = [future.result() for future in futures]
+
+        elapsed = time.perf_counter() - started
+        totals = {key: sum(p[key] for p in partitions)
+                  for key in ("due", "completed", "failed", "skipped", "errors", "batches", "remaining")}
+        return {"workers": workers,
+                "pool": pool,
+                **totals,
+                "seconds": round(elapsed, 3),
+                "per_second": round(totals["due"] / elapsed, 1) if elapsed else 0.0,
+                "partitions": partitions}
+
+    @classmethod
+    def start_spread_run(cls, db: Session, now: datetime.datetime, window: int, rate: float,
+                         resume: bool = False) -> Optional[RecurringRun]:
+        """
+        Checkpoint of the spread run to execute.
+        A resumed run keeps its cut-off and window; its rate is raised if needed to still end within the window.
+        A new run supersedes an unfinished one, whose schedules are still due at the later cut-off.
+        :param resume: only resume the unfinished run, None if there is none
+        """
+        unfinished = db.execute(select(RecurringRun)
+                                .where(RecurringRun.finished_at.is_(None))
+                                .order_by(RecurringRun.scheduled_for.desc())).scalars().all()
+        if resume:
+            if not unfinished:
+                return None
+            run, *superseded = unfinished
+            due = cls.count_due(db, run.scheduled_for)
+            left = (run.window_ends_at - now).total_seconds()
+            if left > 0:
+                run.rate = max(run.rate, due / left)
+            logger.info(f"Resuming recurring run of {run.scheduled_for} with {due} schedules left at {run.rate}/s")
+        else:
+            superseded = unfinished
+            due = cls.count_due(db, now)
+            run = RecurringRun(scheduled_for=now, window_ends_at=now + datetime.timedelta(seconds=window),
+                               rate=rate or max(due / window, 1.0), due=0, completed=0, failed=0, skipped=0,
+                               started_at=now)
+            db.add(run)
+            if due / run.rate > window:
+                logger.warning(f"{due} recurring transactions at {run.rate}/s overrun the {window}s window")
+        for old in superseded:
+            old.finished_at = now
+        db.commit()
+        return run
 
     @classmethod
-    def attempt_execute_recurring(cls, db: Session, map: List[dict]):
-        return_map_list = []
-        for rt in map:
-            can_execute = rt["sender"].available_balance >= rt["amount"]
-            if not can_execute:
-                return_map_list.append({"failed": True, "reason": "Insufficient balance", "map": rt})
-                NotificationService.notify_from_template(EmailTemplates.FAILED_RECURRING_TRANSACTION,
-                                                         rt["sender"],
-                                                         amount=rt["amount"],
-                                                         currency=rt["currency"])
-                continue
-
-            can_send = UserAuthService.verify_user_can_transact(rt["sender"])
-            can_receive = UserAuthService.verify_user_can_transact(rt["receiver"])
-            if not can_send or not can_receive:
-                return_map_list.append(
-                    {"failed": True, "reason": "Account has suspended rights to transact", "map": rt})
-                continue
-
-            if cls.transfer_balance(db, rt["sender"], rt["receiver"], rt["amount"]):
-                return_map_list.append({"failed": False, "reason": "", "map": rt})
-                continue
-
-        return return_map_list
+    def count_due(cls, db: Session, now: datetime.datetime) -> int:
+        return db.execute(select(func.count()).select_from(cls.due_schedules_query(now).subquery())).scalar()
 
     @classmethod
-    def log_recurring_attempts(cls, *attempts, db: Session):
-        failed = 0
-        completed = 0
-        for attempt_map in attempts:
-            for attempt in attempt_map:
-                log = RecurringTransactionHistory(recurring_transaction_id=attempt["map"]["rid"],
-                                                  execution_date=attempt["map"]["date"],
-                                                  status=TransactionStatus.FAILED if \
-                                                      attempt["failed"] else TransactionStatus.COMPLETED,
-                                                  reason=attempt["reason"])
-                db.add(log)
+    def execute_spread(cls, db: Session, now: datetime.datetime = None, window: int = RECURRING_WINDOW_SECONDS,
+                       rate: float = RECURRING_RATE, chunk_size: int = RECURRING_CHUNK_SIZE, catch_up: bool = False,
+                       proceed: Callable[[], bool] = lambda: True, resume: bool = False,
+                       clock=datetime.datetime.now, sleep=time.sleep) -> Optional[dict]:
+        """
+        Execute the schedules due at `now` at a steady `rate` instead of all at once, spreading the balance
+        updates and failure e-mails over `window` seconds. Batches hold about one second of transfers
+        (at most `chunk_size`) and start on a fixed pace; once the window is over the rest runs unpaced.
+        Every batch commits together with the RecurringRun checkpoint, and executed schedules are no longer due,
+        so a run interrupted by a restart (or stopped by `proceed` returning False) resumes where it stopped.
+        :param rate: transfers per second, 0 to fit the due schedules into the window
+        :param resume: continue the unfinished run instead of starting one at `now`
+        :return: run summary with counts and throughput, cumulative over resumed attempts
+        """
+        run = cls.start_spread_run(db, now or clock(), window, rate, resume)
+        if run is None:
+            return None
+        batch_size = max(1, min(chunk_size, int(run.rate)))
+        started = time.perf_counter()
+        executed, errors, batches, stopped = 0, 0, 0, False
+        next_batch_at = clock()
+
+        while True:
+            if not proceed():
+                stopped = True
+                break
+            wait = (next_batch_at - clock()).total_seconds()
+            if wait > 0 and next_batch_at < run.window_ends_at:
+                sleep(wait)
+            batch = db.execute(cls.due_schedules_query(run.scheduled_for, batch_size, lock=True)).all()
+            if not batch:
+                break
+            try:
+                completed, failed, skipped = cls.execute_chunk(db, batch, run.scheduled_for, catch_up, commit=False)
+                run.due += len(batch)
+                run.completed += completed
+                run.failed += failed
+                run.skipped += skipped
+                run.checkpoint_at = clock()
                 db.commit()
-                failed += 1 if attempt["failed"] else 0
-                completed += 1 if not attempt["failed"] else 0
+            except Exception as e:
+                # The batch stays due and is picked up when the run is resumed
+                db.rollback()
+                logger.error(f"Recurring run of {run.scheduled_for} failed at batch {batches + 1}: {str(e)}")
+                errors += len(batch)
+                stopped = True
+                break
+            batches += 1
+            executed += len(batch)
+            next_batch_at += datetime.timedelta(seconds=len(batch) / run.rate)
 
-        return completed, failed
+        if not stopped:
+            run.finished_at = clock()
+            db.commit()
+        elapsed = time.perf_counter() - started
+        return {"due": run.due,
+                "completed": run.completed,
+                "failed": run.failed,
+                "skipped": run.skipped,
+                "errors": errors,
+                "batches": batches,
+                "remaining": cls.count_due(db, run.scheduled_for),
+                "scheduled_for": run.scheduled_for,
+                "window_ends_at": run.window_ends_at,
+                "rate": run.rate,
+                "finished": run.finished_at is not None,
+                "seconds": round(elapsed, 3),
+                "per_second": round(executed / elapsed, 1) if elapsed else 0.0}
+
+    @classmethod
+    def resume_spread_run(cls):
+        """Resume a spread run interrupted by a restart, if there is one"""
+        with SessionLocal() as db:
+            results = cls.execute_spread(db, catch_up=RECURRING_CATCH_UP, resume=True,
+                                         proceed=lambda: scheduler_leader.is_leader)
+            if results:
+                logger.info(f"Recurring transactions run: {results}")
+            return results
 
     @classmethod
     def execute_recurring_transactions(cls):
@@ -123,23 +385,21 @@ class RecurringService:
                 print("Database connection error, unable to execute recurring transactions.")
                 return
             else:
-                map_lists = []
-                transactions: Query = (db.query(Transaction, RecurringTransaction.id.label("rt_id"))
-                                       .join(RecurringTransaction)
-                                       .filter(and_(Transaction.recurring == True,
-                                                    Transaction.status == TransactionStatus.ACCEPTED,
-                                                    RecurringTransaction.is_active == True)))
-                for interval in cls.INTERVALS:
-                    query = transactions.filter(RecurringTransaction.interval == interval)
-                    map_list = [
-                        transaction_map
-                        for transaction, rid in query
-                        if (transaction_map := cls.gen_recurring_transaction_map(transaction, db, rid, interval))
-                    ]
-                    map_lists.append(map_list)
-
+                options = dict(catch_up=RECURRING_CATCH_UP,
+                               max_batches=RECURRING_CATCH_UP_MAX_BATCHES if RECURRING_CATCH_UP else None)
+                if RECURRING_WINDOW_SECONDS:
+                    # A demoted leader stops between batches and the new leader resumes the run
+                    results = cls.execute_spread(db, catch_up=RECURRING_CATCH_UP,
+                                                 proceed=lambda: scheduler_leader.is_leader)
+                elif RECURRING_WORKERS > 1:
+                    results = cls.execute_partitioned(**options)
+                else:
+                    results = cls.execute_due(db, **options)
+                logger.info(f"Recurring transactions run: {results}")
                 print(
-                    f"Recurring transactions executed successfully. Total completed: {results[0]}, failed: {results[1]}")
+                    f"Recurring transactions executed successfully. Total completed: {results['completed']}, "
+                    f"failed: {results['failed']}")
+                return results
 
     @classmethod
     def register_recurring_transactions(cls):
@@ -148,3 +408,21 @@ class RecurringService:
                            hour=8,
                            minute=0,
                            job_id="execute_recurring_transactions")
+        if RECURRING_WINDOW_SECONDS:
+            schedule_once(func=cls.resume_spread_run, job_id="resume_recurring_run")
+
+
+def _execute_partition_process(db_url: str, index: int, partitions: int, now: datetime.datetime,
+                               options: dict) -> dict:
+    # Process pool entry point, engines and sessions cannot cross the process boundary
+    engine = create_engine(db_url, poolclass=NullPool)
+    try:
+        return RecurringService.execute_partition(sessionmaker(bind=engine), index, partitions, now, **options)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    # Replay every run missed during downtime, for operators after an outage
+    with SessionLocal() as session:
+        print(RecurringService.execute_due(session, catch_up=True))
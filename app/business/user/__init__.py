@@ -1,3 +1,4 @@
 from .user_auth import UserAuthService as UAuth
 from .user_validators import UserValidators as UVal
 from .user_admin import AdminService
+from .balance_shards import BalanceShardService
@@ -0,0 +1,99 @@
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import BALANCE_SHARDS_COMPACT_INTERVAL, BALANCE_SHARDS_MAX
+from app.infrestructure import SessionLocal
+from app.infrestructure.scheduler import schedule_interval_job
+from app.models import BalanceShard, User
+from app.business.user.user_validators import UserValidators
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceShardService:
+    """Opt-in sharded credits for accounts receiving many concurrent transfers"""
+
+    @classmethod
+    def set_credit_shards(cls, db: Session, user_id: int, shards: int) -> dict:
+        """
+        Spread the incoming credits of a user over `shards` rows, or credit the balance directly again with 0.
+        Credits already in the shards are folded into the balance, and shard rows beyond the new count are removed
+        once they are empty.
+        :param db: Database session
+        :param user_id: User to change
+        :param shards: Number of shard rows, at most BALANCE_SHARDS_MAX
+        :return: shard status of the user
+        """
+        if not 0 <= shards <= BALANCE_SHARDS_MAX:
+            raise HTTPException(status_code=400, detail=f"Shard count must be between 0 and {BALANCE_SHARDS_MAX}")
+        user = UserValidators.search_user_by_identifier(db, user_id)
+
+        existing = set(db.execute(select(BalanceShard.shard).where(BalanceShard.user_id == user.id)).scalars())
+        missing = [{"user_id": user.id, "shard": shard, "amount": 0.0}
+                   for shard in range(shards) if shard not in existing]
+        if missing:
+            db.execute(insert(BalanceShard), missing)
+        db.execute(update(User).where(User.id == user.id).values(credit_shards=shards)
+                   .execution_options(synchronize_session=False))
+        db.commit()
+
+        BalanceShard.fold(db, [user.id])
+        db.execute(delete(BalanceShard).where(BalanceShard.user_id == user.id,
+                                              BalanceShard.shard >= shards,
+                                              BalanceShard.amount == 0))
+        db.commit()
+        db.refresh(user)
+        return cls.status(db, user)
+
+    @classmethod
+    def status(cls, db: Session, user: User) -> dict:
+        """Shard count of the user and the credits waiting to be folded into the balance"""
+        pending = db.execute(select(func.coalesce(func.sum(BalanceShard.amount), 0))
+                             .where(BalanceShard.user_id == user.id)).scalar()
+        return {"user_id": user.id,
+                "credit_shards": user.credit_shards,
+                "balance": user.balance,
+                "pending_credits": pending}
+
+    @classmethod
+    def compact(cls, db: Session, batch_size: int = 1000) -> dict:
+        """
+        Fold the shards of every user with pending credits into their balances, `batch_size` users per commit
+        :return: number of users and amount folded
+        """
+        folded_users, folded = 0, 0.0
+        last_id = 0
+        while True:
+            user_ids = db.execute(select(BalanceShard.user_id)
+                                  .where(BalanceShard.amount != 0, BalanceShard.user_id > last_id)
+                                  .group_by(BalanceShard.user_id)
+                                  .order_by(BalanceShard.user_id)
+                                  .limit(batch_size)).scalars().all()
+            if not user_ids:
+                break
+
+            totals = BalanceShard.fold(db, user_ids)
+            db.commit()
+            folded_users += len(totals)
+            folded += sum(totals.values())
+            last_id = user_ids[-1]
+
+        return {"users": folded_users, "folded": round(folded, 2)}
+
+    @classmethod
+    def compact_balance_shards(cls):
+        """Scheduled compactor job"""
+        with SessionLocal() as db:
+            result = cls.compact(db)
+        if result["users"]:
+            logger.info("Folded %.2f of sharded credits into %d balances", result["folded"], result["users"])
+
+    @classmethod
+    def register_compactor(cls):
+        """ Fold sharded credits into the balances every BALANCE_SHARDS_COMPACT_INTERVAL seconds"""
+        schedule_interval_job(func=cls.compact_balance_shards,
+                              seconds=BALANCE_SHARDS_COMPACT_INTERVAL,
+                              job_id="compact_balance_shards")
@@ -5,16 +5,16 @@ from datetime import datetime
 from typing import Dict
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.business.user import UVal
 from app.business.user.user_auth import UserAuthService
 from app.business.user.user_validators import UserValidators
 from app.business.utils import NotificationService
 from app.business.utils.notification_service import EmailTemplates
-from app.infrestructure import auth, DataValidators
+from app.infrestructure import auth, DataValidators, principal_cache
 from app.models import User, UStatus, Transaction
-from app.models.transaction import TransactionStatus
+from app.models.transaction import TransactionStatus, UserTransactionsQuery
 from app.schemas.admin import UpdateUserStatus, AdminUserResponse, AdminTransactionResponse
 from app.schemas.router import AdminUserFilter
 
@@ -65,6 +65,7 @@ class AdminService:
 
                 db.commit()
                 db.refresh(user)
+                principal_cache.invalidate(user)
                 return {"user": user, "message": "User approved successfully"}
 
             case UStatus.BLOCKED.value:
@@ -76,6 +77,7 @@ class AdminService:
 
                     db.commit()
                     db.refresh(user)
+                    principal_cache.invalidate(user)
                     return {"user": user, "message": "User blocked successfully"}
 
             case UStatus.DEACTIVATED.value:
@@ -87,6 +89,7 @@ class AdminService:
 
                     db.commit()
                     db.refresh(user)
+                    principal_cache.invalidate(user)
                     return {"user": user, "message": "User deactivated successfully"}
 
             case _:
@@ -191,14 +194,11 @@ class AdminService:
         # Search by setup
         search_by = search_data.get("search_by")
 
-        query_transactions = user.get_transactions(db, order_by=sort_by, offset=offset, limit=limit)
+        # Filters and direction are pushed into the sent/received branches of the UNION ALL
+        builder = UserTransactionsQuery(user.id, order_by=sort_by)
 
-        if not search_by:
-            transactions = query_transactions.all()
-
-        else:
+        if search_by:
             query = search_data.get("search_query", "")
-            transactions = []
 
             match search_by:
                 case "period":
@@ -213,31 +213,28 @@ class AdminService:
                     except ValueError:
                         raise HTTPException(status_code=400, detail="Invalid date format provided")
 
-                    transactions = user.get_transactions(db, date_from, date_to, sort_by, offset, limit).all()
+                    builder.where(Transaction.date.between(date_from, date_to))
 
                 case "sender":
-                    transactions = (query_transactions.filter(Transaction.sender_id == user.id)
-                                    .offset(offset).limit(limit).all())
+                    builder.direction = "out"
 
                 case "receiver":
-                    transactions = (query_transactions.filter(Transaction.receiver_id == user.id)
-                                    .offset(offset).limit(limit).all())
+                    builder.direction = "in"
 
                 case "direction":
                     if query not in ("incoming", "outgoing"):
                         raise HTTPException(status_code=400,
                                             detail="Invalid direction provided, options are outgoing and incoming")
 
-                    if query == "incoming":
-                        transactions = (query_transactions.filter(Transaction.receiver_id == user.id)
-                                        .offset(offset).limit(limit).all())
-                    else:
-                        transactions = (query_transactions.filter(Transaction.sender_id == user.id)
-                                        .offset(offset).limit(limit).all())
+                    builder.direction = "in" if query == "incoming" else "out"
 
                 case _:
                     raise HTTPException(status_code=400, detail=f"Invalid search_query parameter provided: {search_by}")
 
+        query_transactions, history = builder.statement(limit, offset)
+        transactions = db.execute(query_transactions.options(joinedload(history.sender),
+                                                             joinedload(history.receiver))).scalars().unique().all()
+
         response = {
             "transactions": [AdminTransactionResponse.model_validate(t) for t in transactions],
             "results_per_page": limit
@@ -297,4 +294,5 @@ class AdminService:
         user.admin = True
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user)
         return user
\ No newline at end of file
@@ -1,4 +1,5 @@
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from starlette import status
@@ -9,8 +10,8 @@ from app.business.utils import NotificationService
 from app.business.user.user_validators import UserValidators as UVal
 from app.business.utils.notification_service import EmailTemplates
 from app.dependencies import get_db
-from app.infrestructure import generate_token, data_validators, auth, DataValidators, hash_email, hash_password, \
-    check_hashed_password
+from app.infrestructure import generate_token, data_validators, auth, DataValidators, generate_email_key, \
+    hash_password_async, check_hashed_password_async, principal_cache
 from app.models import User, UStatus
 from app.models.user import UserStatus
 from app.schemas.user import UserCreate, UserUpdate
@@ -21,29 +22,36 @@ class UserAuthService:
     """Business logic for user authentication and authorization"""
 
     @classmethod
-    def register(cls, user_data: UserCreate, db: Session) -> User:
+    async def register(cls, user_data: UserCreate, db: Session) -> User:
         """
         Create a new user account in the database.
+        The password is hashed on the hashing pool without holding a request thread, the database work runs in the
+        threadpool.
         :param user_data: user input data
         :param db: database session
         :return user: User object if account is successfully created
         """
-        user = UVal.validate_unique_user_data(dict(user_data), db)
+        user = await run_in_threadpool(UVal.validate_unique_user_data, dict(user_data), db)
         if user:
             raise HTTPException(status_code=400, detail="Username, email or phone number is already in use")
 
         user = User(username=user_data.username,
-                    hashed_password=hash_password(user_data.password),
+                    hashed_password=await hash_password_async(user_data.password),
                     email=user_data.email,
                     phone_number=user_data.phone_number,
-                    email_key=hash_email(user_data.email).replace("/", "").replace(".", ""))
+                    email_key=generate_email_key())
 
+        return await run_in_threadpool(cls._create_account, db, user, user_data.email_verification_link)
+
+    @classmethod
+    def _create_account(cls, db: Session, user: User, verification_link: str) -> User:
+        """Store a registered user and send the e-mail verification link"""
         db.add(user)
         db.commit()
         db.refresh(user)
 
         print(NotificationService.notify_from_template(EmailTemplates.EMAIL_VERIFICATION, user,
-                                                       verification_link=user_data.email_verification_link, key=user.email_key))
+                                                       verification_link=verification_link, key=user.email_key))
 
         return user
 
@@ -68,29 +76,37 @@ class UserAuthService:
         key_check.status = UStatus.PENDING
         key_check.email_key = None
         db.commit()
+        principal_cache.invalidate(key_check)
 
         return {"detail": "Email successfully verified"}
 
     @classmethod
-    def login(cls,
-              db: Session = Depends(get_db),
-              user_data: OAuth2PasswordRequestForm = Depends()) -> JSONResponse:
+    async def login(cls,
+                    db: Session = Depends(get_db),
+                    user_data: OAuth2PasswordRequestForm = Depends()) -> JSONResponse:
         """
         Authenticate a user and generates an authorization token if successful.
+        The password is checked on the hashing pool without holding a request thread, the database work runs in the
+        threadpool.
         :param db: database session
         :param user_data: OAuth2 login credentials
         :return dict: access token, token type and username if successful
         """
 
         exc = HTTPException(status_code=400, detail="Incorrect username or password")
-        user = UVal.find_user_with_or_raise_exception("username", user_data.username, db, exc)
+        user = await run_in_threadpool(UVal.find_user_with_or_raise_exception, "username", user_data.username, db, exc)
 
         if not user:
             raise exc
 
-        if not check_hashed_password(user_data.password, user.hashed_password):
+        if not await check_hashed_password_async(user_data.password, user.hashed_password):
             raise exc
 
+        return await run_in_threadpool(cls._start_session, db, user)
+
+    @classmethod
+    def _start_session(cls, db: Session, user: User) -> JSONResponse:
+        """Apply the status rules of an authenticated user and issue their token"""
         if user.status == UserStatus.EMAIL:
             raise HTTPException(status_code=412, detail="Your email address is not verified, please check your inbox")
 
@@ -101,6 +117,7 @@ class UserAuthService:
             user.status = UStatus.REACTIVATION
             db.commit()
             db.refresh(user)
+            principal_cache.invalidate(user)
 
             raise HTTPException(status_code=400, detail="Your account is deactivated. Log in again to reactivate.")
 
@@ -108,6 +125,7 @@ class UserAuthService:
             user.status = UStatus.ACTIVE
             db.commit()
             db.refresh(user)
+            principal_cache.invalidate(user)
 
         # Create response and set cookie
         token = generate_token(user.username)
@@ -136,6 +154,7 @@ class UserAuthService:
         user.status = status
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user)
         return user
 
     @classmethod
@@ -220,6 +239,7 @@ class UserAuthService:
         user.hashed_password = auth.hash_password(password)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user)
         return user
 
     @classmethod
@@ -267,5 +287,6 @@ class UserAuthService:
         # Hash the password before storing
         user.hashed_password = auth.hash_password(validated_password)
         db.commit()
+        principal_cache.invalidate(user)
         
         return {"detail": "Password has been reset successfully."}
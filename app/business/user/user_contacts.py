@@ -30,6 +30,17 @@ class UserContacts:
             raise HTTPException(status_code=400, detail="Contact already exists")
         return cls.insert_contact(db, user, contact)
 
+    @classmethod
+    def set_auto_accept(cls, db: Session, user: User, contact_id: int, auto_accept: bool) -> Contact:
+        """Let transfers from a contact complete without being accepted, or require acceptance again"""
+        contact = user.contacts.filter(Contact.id == contact_id).first()
+        if not contact:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        contact.auto_accept = auto_accept
+        db.commit()
+        db.refresh(contact)
+        return contact
+
     @classmethod
     def remove_contact(cls, db: Session, user: User, contact_id: int):
         contact = user.contacts.filter(Contact.id == contact_id).first()
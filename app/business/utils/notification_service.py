@@ -1,11 +1,9 @@
-import os
 from enum import Enum
 from typing import Dict
 
-import requests
-from requests import Response
+from httpx import Response
 
-from app.config import MAILGUN_API_KEY
+from app.infrestructure.mail_transport import mail_transport
 from app.models import User
 
 
@@ -308,10 +306,7 @@ class NotificationService:
 
     @classmethod
     def send_email(cls, to: User, subject: str, body: str) -> Response:
-        sent = requests.post(url="https://api.mailgun.net/v3/vwallet.ninja/messages",
-                             auth=("api", os.getenv(MAILGUN_API_KEY, "Key_not_defined")),
-                             data=cls.email_factory(to, subject, body))
-        return sent
+        return mail_transport.send_sync(cls.email_factory(to, subject, body))
 
     @classmethod
     def notify_from_template(cls, template: EmailTemplates, user: User, **kwargs) -> Response:
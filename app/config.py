@@ -30,6 +30,69 @@ SECRET_KEY = get_env_var("SECRET_KEY")
 ALGORITHM = get_env_var("ALGORITHM", required=False) or "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(get_env_var("ACCESS_TOKEN_EXPIRE_MINUTES", required=False) or "3600")
 
+# Authenticated principal cache (per process)
+PRINCIPAL_CACHE_SIZE = int(get_env_var("PRINCIPAL_CACHE_SIZE", required=False) or "4096")
+PRINCIPAL_CACHE_TTL = float(get_env_var("PRINCIPAL_CACHE_TTL", required=False) or "60")
+
+# Password hashing process pool (0 workers hashes inline)
+HASH_POOL_WORKERS = int(get_env_var("HASH_POOL_WORKERS", required=False) or str(min(4, os.cpu_count() or 1)))
+# Hashes allowed to wait for a worker before logins and sign-ups are shed with 503 Retry-After. Waiting logins hold
+# no thread, so this only bounds the queueing delay: about max_pending / workers bcrypt rounds (~0.25 s each)
+HASH_POOL_MAX_PENDING = int(get_env_var("HASH_POOL_MAX_PENDING", required=False) or "64")
+
+# Transaction notification outbox dispatcher
+OUTBOX_DISPATCHER_ENABLED = (get_env_var("OUTBOX_DISPATCHER_ENABLED", required=False) or "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(get_env_var("OUTBOX_BATCH_SIZE", required=False) or "50")
+OUTBOX_CONCURRENCY = int(get_env_var("OUTBOX_CONCURRENCY", required=False) or "8")
+OUTBOX_POLL_INTERVAL = float(get_env_var("OUTBOX_POLL_INTERVAL", required=False) or "1.0")
+OUTBOX_MAX_ATTEMPTS = int(get_env_var("OUTBOX_MAX_ATTEMPTS", required=False) or "5")
+OUTBOX_CLAIM_TIMEOUT = int(get_env_var("OUTBOX_CLAIM_TIMEOUT", required=False) or "300")
+
+# Recurring transaction executor
+RECURRING_CHUNK_SIZE = int(get_env_var("RECURRING_CHUNK_SIZE", required=False) or "1000")
+# Replay runs missed during downtime, at most RECURRING_CATCH_UP_MAX_BATCHES chunks of replays per job run
+RECURRING_CATCH_UP = (get_env_var("RECURRING_CATCH_UP", required=False) or "true").lower() == "true"
+RECURRING_CATCH_UP_MAX_BATCHES = int(get_env_var("RECURRING_CATCH_UP_MAX_BATCHES", required=False) or "50")
+# Sender partitions executed in parallel, on a "thread" or "process" pool
+RECURRING_WORKERS = int(get_env_var("RECURRING_WORKERS", required=False) or "1")
+RECURRING_POOL = get_env_var("RECURRING_POOL", required=False) or "thread"
+# Spread the daily run over a window of seconds (0 runs everything at once), at RECURRING_RATE transfers/s
+# or, with 0, at the rate that finishes the due schedules by the end of the window
+RECURRING_WINDOW_SECONDS = int(get_env_var("RECURRING_WINDOW_SECONDS", required=False) or "0")
+RECURRING_RATE = float(get_env_var("RECURRING_RATE", required=False) or "0")
+
+# Bulk transfers, rows accepted per request
+BULK_TRANSFER_MAX_ROWS = int(get_env_var("BULK_TRANSFER_MAX_ROWS", required=False) or "5000")
+
+# Batch status updates, items accepted per request
+TRANSACTION_BATCH_MAX_ITEMS = int(get_env_var("TRANSACTION_BATCH_MAX_ITEMS", required=False) or "500")
+
+# Transfers left in AWAITING_ACCEPTANCE for TRANSACTION_ACCEPT_TTL seconds (0 never expires) are cancelled and their
+# reservation released by a sweep every TRANSACTION_EXPIRY_INTERVAL seconds, TRANSACTION_EXPIRY_BATCH per commit
+TRANSACTION_ACCEPT_TTL = int(get_env_var("TRANSACTION_ACCEPT_TTL", required=False) or "604800")
+TRANSACTION_EXPIRY_INTERVAL = int(get_env_var("TRANSACTION_EXPIRY_INTERVAL", required=False) or "300")
+TRANSACTION_EXPIRY_BATCH = int(get_env_var("TRANSACTION_EXPIRY_BATCH", required=False) or "1000")
+
+# Balance forecast, per process cache of the projected recurring flows of a user
+FORECAST_MAX_MONTHS = int(get_env_var("FORECAST_MAX_MONTHS", required=False) or "24")
+FORECAST_HISTORY_DAYS = int(get_env_var("FORECAST_HISTORY_DAYS", required=False) or "90")
+FORECAST_CACHE_SIZE = int(get_env_var("FORECAST_CACHE_SIZE", required=False) or "1024")
+FORECAST_CACHE_TTL = float(get_env_var("FORECAST_CACHE_TTL", required=False) or "300")
+
+# Scheduler leader election, only the holder of the lease runs scheduled jobs
+SCHEDULER_LEASE_TTL = float(get_env_var("SCHEDULER_LEASE_TTL", required=False) or "30")
+SCHEDULER_LEASE_RENEW_INTERVAL = float(get_env_var("SCHEDULER_LEASE_RENEW_INTERVAL", required=False) or "10")
+
+# Sharded credits for hot receiving accounts, folded into the balance every BALANCE_SHARDS_COMPACT_INTERVAL seconds
+BALANCE_SHARDS_COMPACT_INTERVAL = int(get_env_var("BALANCE_SHARDS_COMPACT_INTERVAL", required=False) or "60")
+BALANCE_SHARDS_MAX = int(get_env_var("BALANCE_SHARDS_MAX", required=False) or "64")
+
+# Ledger snapshots, taken every LEDGER_SNAPSHOT_INTERVAL seconds for users with at least LEDGER_SNAPSHOT_MIN_ENTRIES
+# new entries older than LEDGER_SNAPSHOT_SETTLE_SECONDS, so entries of transactions still open are not skipped
+LEDGER_SNAPSHOT_INTERVAL = int(get_env_var("LEDGER_SNAPSHOT_INTERVAL", required=False) or "3600")
+LEDGER_SNAPSHOT_MIN_ENTRIES = int(get_env_var("LEDGER_SNAPSHOT_MIN_ENTRIES", required=False) or "100")
+LEDGER_SNAPSHOT_SETTLE_SECONDS = int(get_env_var("LEDGER_SNAPSHOT_SETTLE_SECONDS", required=False) or "300")
+
 # Stripe Configuration
 STRIPE_PUBLISHABLE_KEY = get_env_var("STRIPE_PUBLISHABLE_KEY", required=False)
 STRIPE_SECRET_KEY = get_env_var("STRIPE_SECRET_KEY", required=False)
@@ -40,5 +103,10 @@ MAILGUN_API_KEY = get_env_var("MAILGUN_API_KEY", required=False)
 MAILGUN_SANDBOX_DOMAIN = get_env_var("MAILGUN_SANDBOX_DOMAIN", required=False)
 MAILGUN_URL = get_env_var("MAILGUN_URL", required=False)
 
+# Pooled mail transport (per process)
+MAIL_MAX_CONNECTIONS = int(get_env_var("MAIL_MAX_CONNECTIONS", required=False) or "20")
+MAIL_CONCURRENCY = int(get_env_var("MAIL_CONCURRENCY", required=False) or "10")
+MAIL_TIMEOUT = float(get_env_var("MAIL_TIMEOUT", required=False) or "10")
+
 # Cloudinary configuration (now only using CLOUDINARY_URL)
 CLOUDINARY_URL = get_env_var("CLOUDINARY_URL")
\ No newline at end of file
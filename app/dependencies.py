@@ -1,9 +1,12 @@
-from fastapi import Depends
+import hashlib
+from typing import Optional
+
+from fastapi import Depends, Request, Response
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.infrestructure import invalid_credentials, verify_token, SessionLocal, forbidden_access, pending_user, \
-    deactivated_user, blocked_user, forced_password_reset, email_verification_user
+    deactivated_user, blocked_user, forced_password_reset, email_verification_user, principal_cache
 from app.infrestructure.database import get_connection
 from app.models import User
 
@@ -13,14 +16,35 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/token")
 get_db = get_connection
 
 
+def attach_cached_user(db: Session, principal) -> User:
+    """
+        Builds a persistent User from a cached principal without querying the users table.
+        Attributes outside the principal are loaded by primary key on first access.
+    """
+    user = User()
+    user.id = principal.id
+    user.__dict__.update(username=principal.username,
+                         status=principal.status,
+                         admin=principal.admin,
+                         forced_password_reset=principal.forced_password_reset)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
 def getValidUser(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     """
         Returns an instance of User if the token is valid and the account is not deactivated.
     """
     username = verify_token(token)
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise invalid_credentials
+    principal = principal_cache.get(username)
+    if principal:
+        user = attach_cached_user(db, principal)
+    else:
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            raise invalid_credentials
+        principal_cache.put(user)
+
     if user.status == "email_verification":
         raise email_verification_user
     if user.status == "deactivated":
@@ -79,3 +103,22 @@ def get_current_admin(admin: User = Depends(get_active_user_except_blocked)):
         raise forced_password_reset
 
     return admin
+
+
+def conditional_get(request: Request, response: Response, user: User, *scope) -> Optional[Response]:
+    """
+        Tags the response of a read endpoint with a weak ETag derived from the data version of the user, the path,
+        the query string and `scope` (values the response depends on besides the user's data, like the day).
+        Returns a 304 Not Modified response when If-None-Match holds that ETag, so the caller can skip its queries.
+        The version is read before the response is built: a write committed in between only causes one more 200.
+    """
+    key = f"{user.id}:{user.data_version}:{request.url.path}?{request.url.query}:{':'.join(map(str, scope))}"
+    etag = f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # Weak comparison, as required for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if "*" in candidates or etag.removeprefix("W/") in candidates:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
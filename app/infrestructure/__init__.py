@@ -1,5 +1,8 @@
 from .auth import *
 from .database import Base, SessionLocal
+from .hashing import hashing_pool
+from .mail_transport import mail_transport
+from .principal_cache import principal_cache
 from .validators import *
 
 data_validators = DataValidators()
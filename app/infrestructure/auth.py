@@ -1,3 +1,4 @@
+import secrets
 from datetime import datetime, timedelta
 
 import jwt
@@ -6,6 +7,7 @@ from passlib.context import CryptContext
 from starlette import status
 
 from app.config import ALGORITHM, SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES
+from .hashing import hashing_pool, bcrypt_context, bcrypt_hash, bcrypt_verify
 
 hash_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -63,20 +65,27 @@ forced_password_reset = HTTPException(
 )
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = bcrypt_context
 
 def hash_password(password: str) -> str:
     """
-        Hashes a password using bcrypt.
+        Hashes a password using bcrypt on the hashing process pool.
     """
-    return pwd_context.hash(password)
+    return hashing_pool.call(bcrypt_hash, password)
 
 
-def hash_email(email: str) -> str:
+async def hash_password_async(password: str) -> str:
     """
-        Hashes a password using bcrypt.
+        Hashes a password using bcrypt on the hashing process pool without blocking the event loop.
     """
-    return pwd_context.hash(email)
+    return await hashing_pool.run(bcrypt_hash, password)
+
+
+def generate_email_key() -> str:
+    """
+        Generates a random URL-safe key for email verification links.
+    """
+    return secrets.token_urlsafe(32)
 
 
 def check_hashed_password(plain_password: str, hashed_password: str) -> bool:
@@ -84,7 +93,21 @@ def check_hashed_password(plain_password: str, hashed_password: str) -> bool:
         Checks if a plain password matches a hashed password.
     """
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return hashing_pool.call(bcrypt_verify, plain_password, hashed_password)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid credentials")
+
+
+async def check_hashed_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+        Checks if a plain password matches a hashed password without blocking the event loop.
+    """
+    try:
+        return await hashing_pool.run(bcrypt_verify, plain_password, hashed_password)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid credentials")
 
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+
+from app.config import HASH_POOL_WORKERS, HASH_POOL_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+hashing_overloaded = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many authentication requests, please try again shortly",
+    headers={"Retry-After": "1"}
+)
+
+
+# Worker functions must live at module level so the process pool can pickle them
+
+def bcrypt_hash(password: str) -> str:
+    return bcrypt_context.hash(password)
+
+
+def bcrypt_verify(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt_context.verify(plain_password, hashed_password)
+
+
+class HashingPool:
+    """
+    Bounded process pool for bcrypt work.
+    Hashing runs outside the API process and at most `max_pending` calls may wait for a worker,
+    further calls are rejected with 503. Awaited calls (`run`) wait without holding a request thread, so the limit
+    only bounds how long a login may queue, about max_pending / workers bcrypt rounds.
+    A pool with 0 workers hashes inline, which is what tests and one-off scripts use.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.pending = 0
+        self.max_pending_seen = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    logger.info(f"Started hashing pool with {self.workers} workers")
+        return self._executor
+
+    def _on_done(self, future: Future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args) -> Future:
+        """
+            Queues a hashing call and returns its future, raises 503 when the queue is full.
+        """
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            with self._lock:
+                self.submitted += 1
+                self.completed += 1
+            return future
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise hashing_overloaded
+            self.pending += 1
+            self.submitted += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+        future.add_done_callback(self._on_done)
+        return future
+
+    def call(self, fn, *args):
+        """
+            Runs a hashing call on the pool and blocks until it completes, for sync callers off the login path.
+        """
+        return self.submit(fn, *args).result()
+
+    async def run(self, fn, *args):
+        """
+            Runs a hashing call on the pool without blocking the event loop or a threadpool slot.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers,
+                    "max_pending": self.max_pending,
+                    "queue_depth": self.pending,
+                    "max_queue_depth": self.max_pending_seen,
+                    "submitted": self.submitted,
+                    "completed": self.completed,
+                    "rejected": self.rejected}
+
+
+hashing_pool = HashingPool(workers=HASH_POOL_WORKERS, max_pending=HASH_POOL_MAX_PENDING)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Iterable
+
+import httpx
+
+from app.config import MAILGUN_API_KEY, MAILGUN_URL, MAIL_MAX_CONNECTIONS, MAIL_CONCURRENCY, MAIL_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+MAIL_DOMAIN = "vwallet.ninja"
+
+
+class MailTransport:
+    """
+    Pooled HTTP client for the Mailgun messages API.
+    One keep-alive connection pool is shared by the whole process and owned by a private event loop thread,
+    so async callers on any loop and plain threads (send_sync) reuse the same connections.
+    At most `concurrency` requests are in flight, further messages wait for a free slot.
+    """
+
+    def __init__(self, base_url: str = "https://api.mailgun.net/", api_key: str = None,
+                 domain: str = MAIL_DOMAIN, max_connections: int = 20, concurrency: int = 10,
+                 timeout: float = 10.0, transport: httpx.AsyncBaseTransport = None):
+        self.base_url = base_url
+        self.api_key = api_key or "Key_not_defined"
+        self.domain = domain
+        self.max_connections = max_connections
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.transport = transport
+        self.sent = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name="mail-transport", daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+                    logger.info(f"Started mail transport ({self.max_connections} connections, "
+                                f"{self.concurrency} concurrent requests)")
+        return self._loop
+
+    def _session(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        # Only called on the transport loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url,
+                                             auth=("api", self.api_key),
+                                             timeout=httpx.Timeout(self.timeout),
+                                             limits=httpx.Limits(max_connections=self.max_connections,
+                                                                 max_keepalive_connections=self.max_connections),
+                                             transport=self.transport)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client, self._semaphore
+
+    async def _post(self, data: Dict) -> httpx.Response:
+        client, semaphore = self._session()
+        async with semaphore:
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                response = await client.post(f"v3/{self.domain}/messages", data=data)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        with self._lock:
+            if response.is_success:
+                self.sent += 1
+            else:
+                self.errors += 1
+        return response
+
+    def submit(self, data: Dict) -> Future:
+        """
+            Queues a message on the transport loop and returns its future.
+        """
+        return asyncio.run_coroutine_threadsafe(self._post(data), self.loop)
+
+    async def send(self, data: Dict) -> httpx.Response:
+        """
+            Sends a message without blocking the calling event loop.
+        """
+        return await asyncio.wrap_future(self.submit(data))
+
+    async def send_many(self, messages: Iterable[Dict]) -> list[httpx.Response]:
+        """
+            Sends messages concurrently, bounded by `concurrency`, and returns the responses in order.
+        """
+        return await asyncio.gather(*(self.send(data) for data in messages))
+
+    def send_sync(self, data: Dict) -> httpx.Response:
+        """
+            Sends a message and blocks until the mail provider answers, for synchronous callers.
+        """
+        return self.submit(data).result()
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+        if loop is None:
+            return
+
+        async def shutdown():
+            if self._client is not None:
+                await self._client.aclose()
+            self._client, self._semaphore = None, None
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"max_connections": self.max_connections,
+                    "concurrency": self.concurrency,
+                    "in_flight": self.in_flight,
+                    "max_in_flight": self.max_in_flight,
+                    "sent": self.sent,
+                    "errors": self.errors}
+
+
+mail_transport = MailTransport(base_url=MAILGUN_URL or "https://api.mailgun.net/",
+                               api_key=MAILGUN_API_KEY,
+                               max_connections=MAIL_MAX_CONNECTIONS,
+                               concurrency=MAIL_CONCURRENCY,
+                               timeout=MAIL_TIMEOUT)
@@ -0,0 +1,43 @@
+import logging
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.config import ROOT_DIR
+
+logger = logging.getLogger(__name__)
+
+# Schema that Base.metadata.create_all used to build before the migration chain existed
+BASELINE_REVISION = "18ff05f451e9"
+
+# Tables no model declares: the APScheduler job store, and on SQLite the FTS5 search table with its shadow tables
+IGNORED_TABLES = {"apscheduler_jobs"}
+IGNORED_TABLE_PREFIXES = ("transactions_fts",)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and (name in IGNORED_TABLES or name.startswith(IGNORED_TABLE_PREFIXES)))
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(ROOT_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT_DIR / "alembic"))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def run_migrations(engine: Engine, revision: str = "head"):
+    """
+        Upgrades the database to the given revision.
+        Databases created by create_all have no alembic_version table, they are stamped at the baseline first.
+    """
+    with engine.begin() as connection:
+        config = alembic_config(connection)
+        inspector = inspect(connection)
+        if not inspector.has_table("alembic_version") and inspector.has_table("users"):
+            logger.info(f"Stamping unversioned database at baseline revision {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+
+
+class Principal:
+    """Authorization snapshot of a user, enough to run the dependency chain without a users query"""
+    __slots__ = ("id", "username", "status", "admin", "forced_password_reset", "expires_at")
+
+    def __init__(self, id: int, username: str, status, admin: bool, forced_password_reset: bool, expires_at: float):
+        self.id = id
+        self.username = username
+        self.status = status
+        self.admin = admin
+        self.forced_password_reset = forced_password_reset
+        self.expires_at = expires_at
+
+    def as_dict(self) -> dict:
+        return {"id": self.id,
+                "username": self.username,
+                "status": self.status,
+                "admin": self.admin,
+                "forced_password_reset": self.forced_password_reset}
+
+
+class PrincipalCache:
+    """
+    Bounded TTL/LRU cache of authenticated principals keyed by username.
+    The cache is per process, entries expire after `ttl` seconds so workers that miss an
+    explicit invalidation converge on their own.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, Principal] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[Principal]:
+        """
+            Returns the cached principal for a username or None if missing or expired.
+        """
+        with self._lock:
+            principal = self._entries.get(username)
+            if principal is None:
+                self.misses += 1
+                return None
+
+            if principal.expires_at <= time.monotonic():
+                del self._entries[username]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return principal
+
+    def put(self, user) -> Principal:
+        """
+            Caches the authorization fields of a User object.
+        """
+        principal = Principal(id=user.id,
+                              username=user.username,
+                              status=user.status,
+                              admin=user.admin,
+                              forced_password_reset=user.forced_password_reset,
+                              expires_at=time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[user.username] = principal
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return principal
+
+    def invalidate(self, user) -> None:
+        """
+            Drops a user from the cache, accepts a User object or a username.
+        """
+        username = user if isinstance(user, str) else getattr(user, "username", None)
+        if not username:
+            return
+
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries),
+                    "max_size": self.max_size,
+                    "ttl": self.ttl,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+principal_cache = PrincipalCache(max_size=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
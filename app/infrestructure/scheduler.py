@@ -1,7 +1,22 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from app.config import DB_URL
+from sqlalchemy import case, insert, or_, select, update
+
+from app.config import DB_URL, SCHEDULER_LEASE_TTL, SCHEDULER_LEASE_RENEW_INTERVAL
+from app.infrestructure.database import SessionLocal
+from app.models.scheduler_lease import SchedulerLease
+
+logger = logging.getLogger(__name__)
 
 
 # Create a singleton scheduler instance
@@ -21,11 +36,165 @@ class SchedulerManager:
         return cls._instance
 
 
-# Function to initialize and start the scheduler
+class SchedulerLeader:
+    """
+    Leader election over a lease row, so that one process of a multi-worker deployment runs the scheduled jobs.
+
+    Every process heartbeats every `renew_interval` seconds with a single conditional UPDATE that takes the lease
+    when it is free, expired or already ours, and pushes its expiry `ttl` seconds ahead. A process that wins the
+    lease runs the `on_elected` callbacks and resumes its scheduler; one that fails to renew (lost the row to
+    another process or could not reach the database) pauses it. When the leader dies the lease lapses and
+    the next heartbeat of a follower takes over, within `ttl + renew_interval` seconds.
+    """
+
+    def __init__(self, session_factory=SessionLocal, name: str = "scheduler", ttl: float = SCHEDULER_LEASE_TTL,
+                 renew_interval: float = SCHEDULER_LEASE_RENEW_INTERVAL, holder: str = None,
+                 scheduler: Callable[[], BackgroundScheduler] = None):
+        self.session_factory = session_factory
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self._scheduler = scheduler or SchedulerManager.get_scheduler
+        self._on_elected: List[Callable] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.is_leader = False
+        self.elections = 0
+        self.heartbeats = 0
+        self.errors = 0
+
+    def on_elected(self, func: Callable) -> Callable:
+        """Register a callback run every time this process becomes the leader, before its scheduler resumes."""
+        self._on_elected.append(func)
+        return func
+
+    def heartbeat(self, now: datetime = None) -> bool:
+        """
+        Take or renew the lease and start or pause the scheduler on a change of leadership.
+        :return: whether this process holds the lease
+        """
+        now = now or datetime.now()
+        try:
+            with self.session_factory() as db:
+                leader = self._acquire(db, now)
+        except Exception as e:
+            # Without a renewed lease another process may take over at any time
+            logger.error(f"Scheduler lease heartbeat failed: {str(e)}")
+            self.errors += 1
+            leader = False
+
+        with self._lock:
+            self.heartbeats += 1
+            if leader and not self.is_leader:
+                self._elected()
+            elif not leader and self.is_leader:
+                self._demoted()
+        return leader
+
+    def _acquire(self, db, now: datetime) -> bool:
+        leases = SchedulerLease.__table__
+        c = leases.c
+        result = db.execute(update(leases)
+                            .where(c.name == self.name,
+                                   or_(c.holder.is_(None), c.holder == self.holder, c.expires_at < now))
+                            .values(holder=self.holder,
+                                    acquired_at=case((c.holder == self.holder, c.acquired_at), else_=now),
+                                    renewed_at=now,
+                                    expires_at=now + timedelta(seconds=self.ttl)))
+        if result.rowcount == 0 and db.get(SchedulerLease, self.name) is None:
+            # The migration seeds the default lease, other names are created by their first heartbeat
+            db.execute(insert(leases).values(name=self.name, holder=self.holder, acquired_at=now,
+                                             renewed_at=now, expires_at=now + timedelta(seconds=self.ttl)))
+            db.commit()
+            return True
+        db.commit()
+        return result.rowcount == 1
+
+    def _elected(self):
+        logger.info(f"{self.holder} acquired the {self.name} lease")
+        self.is_leader = True
+        self.elections += 1
+        scheduler = self._scheduler()
+        for callback in self._on_elected:
+            callback()
+        if not scheduler.running:
+            scheduler.start()
+        else:
+            scheduler.resume()
+
+    def _demoted(self):
+        logger.warning(f"{self.holder} lost the {self.name} lease")
+        self.is_leader = False
+        scheduler = self._scheduler()
+        if scheduler.running:
+            scheduler.pause()
+
+    def release(self):
+        """Give the lease up so a follower takes over on its next heartbeat instead of waiting for the expiry."""
+        with self._lock:
+            if self.is_leader:
+                self._demoted()
+        leases = SchedulerLease.__table__
+        try:
+            with self.session_factory() as db:
+                db.execute(update(leases)
+                           .where(leases.c.name == self.name, leases.c.holder == self.holder)
+                           .values(holder=None, expires_at=datetime.now()))
+                db.commit()
+        except Exception as e:
+            logger.error(f"Releasing the scheduler lease failed: {str(e)}")
+
+    def run(self):
+        while not self._stopping.is_set():
+            self.heartbeat()
+            self._stopping.wait(self.renew_interval)
+
+    def start(self):
+        """Heartbeat on a daemon thread until stop() is called."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self.run, name="scheduler-leader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.release()
+
+    def status(self, db) -> Dict:
+        """
+        Returns the current lease holder as stored in the database together with the view of this process.
+        """
+        lease = db.execute(select(SchedulerLease).where(SchedulerLease.name == self.name)).scalar_one_or_none()
+        now = datetime.now()
+        held = lease is not None and lease.holder is not None and lease.expires_at is not None \
+            and lease.expires_at >= now
+        return {"lease": self.name,
+                "holder": lease.holder if held else None,
+                "acquired_at": lease.acquired_at if held else None,
+                "renewed_at": lease.renewed_at if lease else None,
+                "expires_at": lease.expires_at if lease else None,
+                "worker": self.holder,
+                "is_leader": self.is_leader,
+                "ttl": self.ttl,
+                "renew_interval": self.renew_interval,
+                "elections": self.elections,
+                "heartbeats": self.heartbeats,
+                "errors": self.errors}
+
+
+scheduler_leader = SchedulerLeader()
+
+
+# Function to initialize the scheduler, it only runs jobs while this process holds the leader lease
 def init_scheduler() -> BackgroundScheduler:
     scheduler = SchedulerManager.get_scheduler()
-    if not scheduler.running:
-        scheduler.start()
+    scheduler_leader.start()
 
     return scheduler
 
@@ -56,4 +225,50 @@ def schedule_daily_job(func, hour, minute, job_id=None, **kwargs):
         kwargs=kwargs
     )
 
-    return job_id
\ No newline at end of file
+    return job_id
+
+# Function to add a job that runs once, as soon as the scheduler is running
+def schedule_once(func, job_id=None, **kwargs):
+    """
+    Schedule a function to run once, right away
+
+    Args:
+        func: The function to execute
+        job_id: Optional unique identifier for the job
+        **kwargs: Additional arguments to pass to the function
+    """
+    scheduler = SchedulerManager.get_scheduler()
+    scheduler.add_job(
+        func=func,
+        trigger=DateTrigger(),
+        id=job_id,
+        replace_existing=True,
+        kwargs=kwargs
+    )
+
+    return job_id
+
+
+# Function to add a job that runs every `seconds` seconds
+def schedule_interval_job(func, seconds, job_id=None, **kwargs):
+    """
+    Schedule a function to run at a fixed interval
+
+    Args:
+        func: The function to execute
+        seconds: Seconds between two runs
+        job_id: Optional unique identifier for the job
+        **kwargs: Additional arguments to pass to the function
+    """
+    scheduler = SchedulerManager.get_scheduler()
+    scheduler.add_job(
+        func=func,
+        trigger=IntervalTrigger(seconds=seconds),
+        id=job_id,
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+        kwargs=kwargs
+    )
+
+    return job_id
@@ -1,14 +1,21 @@
 # Import all models, so that Base has them before being
 
+from .balance_shard import BalanceShard
 from .card import Card
 from .category import Category
 from .contact import Contact
 from .currency import Currency
 from .deposit import Deposit
+from .ledger import LedgerEntry, LedgerSnapshot
+from .notification_outbox import NotificationOutbox
+from .recurring_run import RecurringRun
 from .recurring_transaction_history import RecurringTransactionHistory
 from .recurring_transation import RecurringTransaction
+from .scheduler_lease import SchedulerLease
 from .transaction import Transaction
+from .transaction_search import TransactionSearch
 from .user import User
+from .user_daily_rollup import UserDailyRollup
 from .user import UserStatus as UStatus
 from .withdrawal import Withdrawal
 from .withdrawal import WithdrawalMethod as WMethod
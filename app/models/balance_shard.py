@@ -0,0 +1,60 @@
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from sqlalchemy import Column, Integer, Float, ForeignKey, bindparam, column, table
+from sqlalchemy.orm import Session
+
+from app.infrestructure import Base
+
+# Only the columns the fold writes, the users model imports this module
+users = table("users", column("id"), column("balance"), column("data_version"))
+
+
+class BalanceShard(Base):
+    """
+    One of the credit rows of a user with sharded credits.
+    Incoming transfers add to a random shard instead of the users row, so concurrent credits to the same
+    account do not queue on a single row lock. The amounts are folded into User.balance on read and by the compactor.
+    """
+    __tablename__ = "balance_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    amount = Column(Float, default=0.0, server_default="0", nullable=False)
+
+    @classmethod
+    def fold(cls, db: Session, user_ids: Iterable[int]) -> Dict[int, float]:
+        """
+        Move the credits collected in the shards of the users into their balances, with three statements.
+        The amounts are claimed with an UPDATE that negates them and returns the result, so the shard rows stay locked
+        until the commit: a concurrent fold of the same user waits, then finds nothing left to fold, and credits
+        landing meanwhile wait for the commit and stay in the shard for the next fold. Shards beyond the current
+        shard count of a user are folded too.
+        :return: amount added to the balance per user
+        """
+        shard_table = cls.__table__
+        claimed = db.execute(shard_table.update()
+                             .where(shard_table.c.user_id.in_(sorted(set(user_ids))), shard_table.c.amount != 0)
+                             .values(amount=-shard_table.c.amount)
+                             .returning(shard_table.c.user_id, shard_table.c.shard, shard_table.c.amount)
+                             .execution_options(synchronize_session=False)).all()
+        if not claimed:
+            return {}
+
+        shards = [(user_id, shard, -amount) for user_id, shard, amount in claimed]
+        db.execute(shard_table.update()
+                   .where(shard_table.c.user_id == bindparam("folded_user"),
+                          shard_table.c.shard == bindparam("folded_shard"))
+                   .values(amount=shard_table.c.amount + bindparam("folded_amount")),
+                   [{"folded_user": user_id, "folded_shard": shard, "folded_amount": amount}
+                    for user_id, shard, amount in shards])
+
+        totals = defaultdict(float)
+        for user_id, _, amount in shards:
+            totals[user_id] += amount
+        db.execute(users.update()
+                   .where(users.c.id == bindparam("folded_user"))
+                   .values(balance=users.c.balance + bindparam("folded_total"),
+                           data_version=users.c.data_version + 1),
+                   [{"folded_user": user_id, "folded_total": total} for user_id, total in totals.items()])
+        return dict(totals)
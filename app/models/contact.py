@@ -1,10 +1,10 @@
 from fastapi import HTTPException
-from sqlalchemy import Column, Integer, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, ForeignKey, false, or_
+from sqlalchemy.orm import relationship, object_session
 from sqlalchemy.orm import validates
 
 from app.infrestructure import Base
-from app.models.transaction import Transaction
+from app.models.transaction import Transaction, UserTransactionsQuery
 
 
 class Contact(Base):
@@ -13,6 +13,8 @@ class Contact(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     contact_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Transfers from contact_id to user_id complete without being accepted
+    auto_accept = Column(Boolean, nullable=False, default=False, server_default=false())
 
     user = relationship("User", foreign_keys=[user_id], back_populates="contacts")
     contact_user = relationship("User", foreign_keys=[contact_id])
@@ -33,5 +35,7 @@ class Contact(Base):
 
     @property
     def transactions(self):
-        return (self.user.transactions_query
-                .filter(Transaction.sender_id == self.contact_id or Transaction.receiver_id == self.contact_id).all())
+        query, _ = (UserTransactionsQuery(self.user_id)
+                    .where(or_(Transaction.sender_id == self.contact_id, Transaction.receiver_id == self.contact_id))
+                    .statement())
+        return object_session(self).execute(query).scalars().all()
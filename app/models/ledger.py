@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+
+from app.infrestructure import Base
+
+
+class LedgerEntry(Base):
+    """
+    One side of a balance movement. Every movement is written as two entries of opposite sign with the same
+    kind and reference, so the entries of a movement sum to zero. The other side of deposits and withdrawals is an
+    external account without a user.
+    Rows are only ever inserted: the wallet entries of a user sum to its balance plus pending sharded credits.
+    """
+    __tablename__ = "ledger_entries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # "wallet" for user balances, otherwise the external counterparty ("card", "payout", "equity")
+    account = Column(String(32), nullable=False)
+    # "transfer", "recurring", "deposit", "withdrawal", "withdrawal_refund", "refund" or "opening"
+    kind = Column(String(32), nullable=False)
+    # Id of the transaction, deposit or withdrawal behind the movement
+    reference_id = Column(Integer, nullable=True)
+    amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    # Historical balances read the entries of a user after its last snapshot from this index only
+    __table_args__ = (
+        Index("ix_ledger_entries_user_id_id", "user_id", "id"),
+    )
+
+
+class LedgerSnapshot(Base):
+    """
+    Wallet balance of a user after a ledger entry, so a historical balance only sums the entries since.
+    """
+    __tablename__ = "ledger_snapshots"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Last entry included in the balance
+    entry_id = Column(Integer, nullable=False)
+    balance = Column(Float, nullable=False)
+    # created_at of that entry
+    taken_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_ledger_snapshots_user_id_entry_id", "user_id", "entry_id", unique=True),
+    )
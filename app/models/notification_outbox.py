@@ -0,0 +1,51 @@
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, JSON, Index, text
+from sqlalchemy import Enum as CEnum
+from sqlalchemy.orm import relationship
+
+from app.infrestructure import Base
+
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class NotificationOutbox(Base):
+    """
+    Transaction e-mail waiting to be sent.
+    Rows are written in the same DB transaction as the state change they announce
+    and drained by TransactionOutboxDispatcher.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event = Column(String(64), nullable=False)
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=False)
+    payload = Column(JSON, nullable=True)
+
+    status = Column(CEnum(OutboxStatus, name="outbox_status",
+                          values_callable=lambda obj: [e.value for e in obj]),
+                    default=OutboxStatus.PENDING,
+                    nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    available_at = Column(DateTime, default=datetime.now, nullable=False)
+    claimed_at = Column(DateTime, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+
+    transaction = relationship("Transaction")
+
+    # The dispatcher only ever reads the unsent rows
+    __table_args__ = (
+        Index("ix_notification_outbox_pending", "available_at",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        Index("ix_notification_outbox_sending", "claimed_at",
+              postgresql_where=text("status = 'sending'"), sqlite_where=text("status = 'sending'")),
+    )
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, Float
+
+from app.infrestructure import Base
+
+
+class RecurringRun(Base):
+    """
+    Checkpoint of a recurring transaction run spread over a time window.
+    Counters are updated in the same DB transaction as every executed chunk, so a run interrupted by a restart
+    is resumed with its original cut-off and window instead of starting over.
+    """
+    __tablename__ = "recurring_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Schedules due at this moment belong to the run
+    scheduled_for = Column(DateTime, nullable=False, unique=True)
+    window_ends_at = Column(DateTime, nullable=False)
+    # Target transfers per second
+    rate = Column(Float, nullable=False)
+
+    due = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    skipped = Column(Integer, default=0, nullable=False)
+
+    started_at = Column(DateTime, default=datetime.now, nullable=False)
+    checkpoint_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Enum as CEnum
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index, Enum as CEnum
 from sqlalchemy.orm import relationship
 from app.infrestructure import Base
 from app.models.transaction import TransactionStatus
@@ -17,4 +17,9 @@ class RecurringTransactionHistory(Base):
 
     recurring_transaction_id = Column(Integer, ForeignKey("recurring_transactions.id"), nullable=False)
 
-    recurring_transaction = relationship("RecurringTransaction", back_populates="history")
\ No newline at end of file
+    recurring_transaction = relationship("RecurringTransaction", back_populates="history")
+
+    # Last execution per schedule is read from the index
+    __table_args__ = (
+        Index("ix_recurring_transaction_history_rid_date", "recurring_transaction_id", "execution_date"),
+    )
@@ -1,7 +1,8 @@
+from datetime import datetime, time, timedelta
 from enum import Enum
 
 from fastapi import HTTPException
-from sqlalchemy import Column, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, DateTime, Float, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import validates
 from sqlalchemy.types import Enum as CEnum
@@ -15,6 +16,13 @@ class RecurringInterval(str, Enum):
     MONTHLY = "month"
 
 
+INTERVAL_DAYS = {
+    RecurringInterval.DAILY: 1,
+    RecurringInterval.WEEKLY: 7,
+    RecurringInterval.MONTHLY: 30,
+}
+
+
 class RecurringTransaction(Base):
     __tablename__ = "recurring_transactions"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -23,17 +31,49 @@ class RecurringTransaction(Base):
                             values_callable=lambda obj: [e.value for e in obj]),
                       default=RecurringInterval.DAILY, nullable=False)
     is_active = Column(Boolean, nullable=False, default=False)
+    # Start of the day of the next scheduled execution, NULL while the schedule is inactive
+    next_run_at = Column(DateTime, nullable=True)
+    # Maintained by the executor with every run, RecurringCountersService rebuilds them from the history
+    execution_count = Column(Integer, default=0, server_default="0", nullable=False)
+    failure_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_executed_at = Column(DateTime, nullable=True)
+    total_transferred = Column(Float, default=0.0, server_default="0", nullable=False)
 
     transaction = relationship("Transaction", back_populates="recurring_transaction")
     history = relationship("RecurringTransactionHistory", back_populates="recurring_transaction", lazy='dynamic')
 
-    @property
-    def executions(self) -> int:
-        return self.history.count()
+    # The daily job reads the due rows from this index only
+    __table_args__ = (
+        Index("ix_recurring_transactions_next_run_at", "next_run_at",
+              postgresql_where=text("next_run_at IS NOT NULL"), sqlite_where=text("next_run_at IS NOT NULL")),
+    )
+
+    @staticmethod
+    def following_run(run_at: datetime, interval: RecurringInterval, after: datetime = None) -> datetime:
+        """
+        Next scheduled run after `run_at`
+        :param run_at: scheduled run that was just executed
+        :param interval: schedule interval
+        :param after: skip every run up to this moment, instead of advancing by a single interval
+        :return: start of the day of the next run
+        """
+        step = timedelta(days=INTERVAL_DAYS[interval])
+        if after is None or after < run_at:
+            return run_at + step
+        return run_at + step * ((after - run_at) // step + 1)
+
+    def activate(self, now: datetime = None):
+        """Start the schedule, its first run is picked up by the next daily job"""
+        self.is_active = True
+        self.next_run_at = datetime.combine((now or datetime.now()).date(), time.min)
+
+    def deactivate(self):
+        self.is_active = False
+        self.next_run_at = None
 
     @property
-    def total_transferred(self):
-        return self.executions * self.transaction.amount
+    def executions(self) -> int:
+        return self.execution_count
 
     @property
     def is_executable(self) -> bool:
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime
+
+from app.infrestructure import Base
+
+
+class SchedulerLease(Base):
+    """
+    Named lease held by at most one process at a time.
+    The holder renews expires_at on every heartbeat; once it lapses any other process may take the lease over.
+    """
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(255), nullable=True)
+    acquired_at = Column(DateTime, nullable=True)
+    renewed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
@@ -2,10 +2,11 @@ from datetime import datetime
 from enum import Enum
 
 from fastapi import HTTPException
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String, Boolean
-from sqlalchemy import Enum as CEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String, Boolean, Index, text
+from sqlalchemy import Enum as CEnum, select, union_all
+from sqlalchemy.orm import relationship, aliased, column_property
 from sqlalchemy.orm import validates
+from sqlalchemy.sql import Select
 
 from app.infrestructure import Base
 from app.schemas.user import ShortUserResponse
@@ -38,22 +39,47 @@ class Transaction(Base):
     description = Column(String, nullable=True)
     date = Column(DateTime, default=datetime.now, nullable=False)
 
-    status = Column(CEnum(TransactionStatus, name="transaction_status",
-                          values_callable=lambda obj: [e.value for e in obj]),
-                    default=TransactionStatus.PENDING,
-                    nullable=False)
+    # The previous status is loaded before it is replaced, so the daily rollups know what to move the row out of
+    status = column_property(Column(CEnum(TransactionStatus, name="transaction_status",
+                                          values_callable=lambda obj: [e.value for e in obj]),
+                                    default=TransactionStatus.PENDING,
+                                    nullable=False),
+                             active_history=True)
     recurring = Column(Boolean, default=False, nullable=False)
+    # Set when the sender confirms, the acceptance TTL counts from here rather than from the creation date
+    awaiting_since = Column(DateTime, nullable=True)
 
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     currency_id = Column(Integer, ForeignKey("currencies.id"), nullable=False)
 
     category = relationship("Category", back_populates="transactions")
-    recurring_transaction = relationship("RecurringTransaction", back_populates="transaction", lazy='dynamic')
+    recurring_transaction = relationship("RecurringTransaction", back_populates="transaction", uselist=False)
     currency = relationship("Currency", back_populates="transactions")
 
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_transactions")
     receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_transactions")
 
+    # History is read per participant newest first, the partial indexes cover the short lived
+    # PENDING and AWAITING_ACCEPTANCE rows behind the pending lists. Keep in sync with alembic/versions.
+    __table_args__ = (
+        Index("ix_transactions_sender_id_date", "sender_id", "date"),
+        Index("ix_transactions_receiver_id_date", "receiver_id", "date"),
+        Index("ix_transactions_pending_sender_id", "sender_id",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        Index("ix_transactions_pending_receiver_id", "receiver_id",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        Index("ix_transactions_awaiting_sender_id", "sender_id",
+              postgresql_where=text("status = 'awaiting_acceptance'"),
+              sqlite_where=text("status = 'awaiting_acceptance'")),
+        Index("ix_transactions_awaiting_receiver_id_date", "receiver_id", "date",
+              postgresql_where=text("status = 'awaiting_acceptance'"),
+              sqlite_where=text("status = 'awaiting_acceptance'")),
+        # Oldest first for the expiry sweeper
+        Index("ix_transactions_awaiting_since", "awaiting_since",
+              postgresql_where=text("status = 'awaiting_acceptance'"),
+              sqlite_where=text("status = 'awaiting_acceptance'")),
+    )
+
     @validates("amount")
     def validate_amount(self, key, v: float):
         if v < 0:
@@ -99,4 +125,100 @@ class Transaction(Base):
 
     @property
     def recurring_query(self):
-        return
\ No newline at end of file
+        return
+
+
+class UserTransactionsQuery:
+    """
+    Builds "transactions of a user" as UNION ALL of the sent and received branches instead of
+    sender_id = :id OR receiver_id = :id, so each branch is served by its (participant, date) index.
+    Filters, keyset predicates and ORDER BY/LIMIT are pushed down into every branch,
+    the outer query only merges at most (offset + limit) rows per branch.
+    """
+
+    SORT_COLUMNS = {
+        "date_desc": ("date", True),
+        "date_asc": ("date", False),
+        "amount_desc": ("amount", True),
+        "amount_asc": ("amount", False),
+    }
+
+    def __init__(self, user_id: int, direction: str = None, order_by: str = "date_desc", rank=None):
+        """
+        :param user_id: participant whose transactions are selected
+        :param direction: "in" for received only, "out" for sent only, None for both
+        :param order_by: one of SORT_COLUMNS, or "relevance" when rank is given
+        :param rank: builds the relevance of Transaction or an alias of it, e.g. TransactionSearch.rank
+        """
+        self.user_id = user_id
+        self.direction = direction
+        self.rank = rank
+        if order_by == "relevance" and rank is not None:
+            self.order_by = order_by
+        else:
+            self.order_by = order_by if order_by in self.SORT_COLUMNS else "date_desc"
+        self.criteria = []
+
+    def where(self, *criteria) -> "UserTransactionsQuery":
+        """
+        Add filters on Transaction columns, they are applied inside every branch
+        :return: self, for chaining
+        """
+        self.criteria.extend(criteria)
+        return self
+
+    def sort_column(self, entity=None):
+        entity = entity if entity is not None else Transaction
+        if self.order_by == "relevance":
+            return self.rank(entity), True
+        name, descending = self.SORT_COLUMNS[self.order_by]
+        return getattr(entity, name), descending
+
+    def ordering(self, entity=None) -> list:
+        """
+        ORDER BY clauses (sort column, id) for Transaction or an alias of it
+        """
+        entity = entity if entity is not None else Transaction
+        column, descending = self.sort_column(entity)
+        if descending:
+            return [column.desc(), entity.id.desc()]
+        return [column.asc(), entity.id.asc()]
+
+    def branches(self) -> list[Select]:
+        branches = []
+        if self.direction in (None, "out"):
+            branches.append(select(Transaction).where(Transaction.sender_id == self.user_id, *self.criteria))
+        if self.direction in (None, "in"):
+            received = select(Transaction).where(Transaction.receiver_id == self.user_id, *self.criteria)
+            if self.direction is None:
+                # A transfer to oneself is already part of the sent branch
+                received = received.where(Transaction.sender_id != self.user_id)
+            branches.append(received)
+        return branches
+
+    def subquery(self, limit: int = None, offset: int = 0, name: str = "user_transactions"):
+        """
+        UNION ALL of the branches as a subquery
+        :param limit: when set, each branch is sorted and cut to offset + limit rows
+        :param offset: rows the outer query will skip
+        :param name: subquery alias
+        """
+        branches = self.branches()
+        if limit is not None:
+            # Wrapped in a subquery so an ordered and limited branch is valid as a UNION member on every dialect
+            branches = [select(branch.order_by(*self.ordering()).limit(offset + limit).subquery())
+                        for branch in branches]
+        if len(branches) == 1:
+            return branches[0].subquery(name)
+        return union_all(*branches).subquery(name)
+
+    def statement(self, limit: int = None, offset: int = 0, name: str = "user_transactions"):
+        """
+        Ordered page of the user's transactions
+        :return: (Select, entity) where entity is the Transaction alias to filter, order or load options on
+        """
+        entity = aliased(Transaction, self.subquery(limit, offset, name), name=name)
+        query = select(entity).order_by(*self.ordering(entity))
+        if limit is not None:
+            query = query.offset(offset).limit(limit)
+        return query, entity
@@ -0,0 +1,98 @@
+import re
+from typing import List
+
+from sqlalchemy import DDL, Index, and_, event, func, literal_column, select
+from sqlalchemy.sql import column, table
+
+from app.models.transaction import Transaction
+
+# Language-neutral parsing, descriptions are short and written in any language
+SEARCH_CONFIG = literal_column("'simple'")
+
+# External content FTS5 table over the descriptions, kept in sync by triggers. The participants are indexed too,
+# so a search is scoped to one user inside the index instead of intersecting with every match of a common word.
+# Status updates do not touch it. Keep in sync with alembic/versions.
+FTS_TABLE = "transactions_fts"
+FTS_COLUMNS = "description, sender_id, receiver_id"
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({FTS_COLUMNS}, content='transactions', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON transactions WHEN new.description IS NOT NULL BEGIN "
+    f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) "
+    f"VALUES (new.id, new.description, new.sender_id, new.receiver_id); END",
+    f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON transactions WHEN old.description IS NOT NULL BEGIN "
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.description, old.sender_id, old.receiver_id); END",
+    f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF {FTS_COLUMNS} ON transactions BEGIN "
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {FTS_COLUMNS}) "
+    f"SELECT 'delete', old.id, old.description, old.sender_id, old.receiver_id WHERE old.description IS NOT NULL; "
+    f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) "
+    f"SELECT new.id, new.description, new.sender_id, new.receiver_id WHERE new.description IS NOT NULL; END",
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Transaction.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+fts = table(FTS_TABLE, column("rowid"))
+
+
+def search_document(entity=Transaction):
+    """tsvector of the description, the expression of the GIN index on PostgreSQL"""
+    return func.to_tsvector(SEARCH_CONFIG, func.coalesce(entity.description, literal_column("''")))
+
+
+Index("ix_transactions_description_search", search_document(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+
+class TransactionSearch:
+    """
+    Full-text search over transaction descriptions: every word of the query must appear, in any order.
+    Uses the GIN index on PostgreSQL and the FTS5 table on SQLite, other databases fall back to LIKE.
+    Relevance is ts_rank on PostgreSQL and the frequency of the words in the description elsewhere.
+    """
+
+    def __init__(self, query: str, dialect: str, user_id: int = None):
+        """
+        :param query: text typed by the user, punctuation and operators are ignored
+        :param dialect: name of the dialect of the session the search runs on
+        :param user_id: participant the searched history belongs to, narrows the FTS5 query on SQLite
+        """
+        self.words: List[str] = re.findall(r"\w+", query.lower())
+        self.dialect = dialect
+        self.user_id = user_id
+
+    def __bool__(self) -> bool:
+        return bool(self.words)
+
+    def _fts_match(self):
+        # Every word quoted, so user input can never form an FTS5 query with operators or syntax errors
+        expression = "description : (" + " ".join(f'"{word}"' for word in self.words) + ")"
+        if self.user_id is not None:
+            expression += f' AND (sender_id : "{int(self.user_id)}" OR receiver_id : "{int(self.user_id)}")'
+        return literal_column(FTS_TABLE).op("MATCH")(expression)
+
+    def _tsquery(self):
+        return func.plainto_tsquery(SEARCH_CONFIG, " ".join(self.words))
+
+    def criterion(self, entity=Transaction):
+        """
+        Filter on Transaction or an alias of it selecting the matching transactions
+        """
+        if self.dialect == "postgresql":
+            return search_document(entity).op("@@")(self._tsquery())
+        if self.dialect == "sqlite":
+            return entity.id.in_(select(fts.c.rowid).where(self._fts_match()))
+        return and_(*(entity.description.icontains(word, autoescape=True) for word in self.words))
+
+    def rank(self, entity=Transaction):
+        """
+        Relevance of Transaction or an alias of it, higher is better
+        """
+        if self.dialect == "postgresql":
+            return func.ts_rank(search_document(entity), self._tsquery())
+        # Occurrences of the words per character of the description. bm25() of FTS5 would have to score every
+        # match of the words in the whole table, this only reads the rows of the user that matched.
+        description = func.lower(entity.description)
+        occurrences = [(func.length(description) - func.length(func.replace(description, word, ""))) / len(word)
+                       for word in self.words]
+        return sum(occurrences[1:], occurrences[0]) * 1.0 / func.length(description)
@@ -1,17 +1,20 @@
+import random
 from datetime import date, datetime, timedelta
 from enum import Enum
-from typing import List
+from typing import Iterable, List
 
-from sqlalchemy import Integer, Column, String, Boolean, Float, DateTime, select, union, or_, func
+from sqlalchemy import Integer, Column, String, Boolean, Float, DateTime, select, union, or_, func, and_, true, update, \
+    event, inspect
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import validates, relationship, Session, Query
+from sqlalchemy.orm import validates, relationship, Session, Query, object_session
 from sqlalchemy.sql import Select
 from sqlalchemy.types import Enum as CEnum
 
 from app.infrestructure import Base, data_validators
-from app.models import Deposit, Card, Transaction
+from app.models import Deposit, Card, Category, Transaction
+from app.models.balance_shard import BalanceShard
 from app.models.deposit import DepositStatus
-from app.models.transaction import TransactionStatus
+from app.models.transaction import TransactionStatus, UserTransactionsQuery
 from app.models.withdrawal import Withdrawal, WithdrawalType, WithdrawalStatus
 
 
@@ -34,6 +37,11 @@ class User(Base):
     created_at = Column(DateTime, nullable=False, default=datetime.now)
     balance = Column(Float, nullable=False, default=0)
     reserved_balance = Column(Float, nullable=False, default=0)  # For pending transactions
+    # Incoming credits are spread over this many balance_shards rows, 0 credits the balance directly
+    credit_shards = Column(Integer, nullable=False, default=0, server_default="0")
+    # Advanced in the DB transaction of every write to the user's balances, transactions, deposits, withdrawals or
+    # profile. The ETags of the polled read endpoints are derived from it, see app.dependencies.conditional_get
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     admin = Column(Boolean, nullable=False, default=False)
     avatar = Column(String, nullable=True)
 
@@ -41,7 +49,7 @@ class User(Base):
                           values_callable=lambda obj: [e.value for e in obj]),
                     nullable=False,
                     default=UserStatus.EMAIL)
-    email_key = Column(String, nullable=True)
+    email_key = Column(String, nullable=True, index=True, unique=True)
 
     forced_password_reset = Column(Boolean, nullable=False, default=False)
 
@@ -63,17 +71,14 @@ class User(Base):
     @hybrid_property
     def transactions(self):
         # For instance-level access, return list of transactions
-        query = select(Transaction).where(
-            or_(Transaction.sender_id == self.id, Transaction.receiver_id == self.id)
-        ).order_by(Transaction.date.desc())
+        query, _ = UserTransactionsQuery(self.id).statement()
         return self._session.execute(query).scalars().all()
 
     @hybrid_property
     def transactions_query(self):
-        # Return a Select object for 2.0 compatibility
-        return select(Transaction).where(
-            or_(Transaction.sender_id == self.id, Transaction.receiver_id == self.id)
-        )
+        # Return a Select object for 2.0 compatibility, rows are the Transaction alias over the UNION ALL
+        query, _ = UserTransactionsQuery(self.id).statement()
+        return query
 
     @property
     def pending_received_transactions(self):
@@ -110,6 +115,7 @@ class User(Base):
                          legacy_query: bool = True) -> Select | Query:
         """
         Get transactions query with filtering, sorting, and pagination.
+        Built with UserTransactionsQuery, filters apply to the Transaction alias the rows are read from.
         :param db: SQLAlchemy 2.0 Session
         :param date_from: Start date filter
         :param date_to: End date filter
@@ -119,26 +125,22 @@ class User(Base):
         :param legacy_query: Return 1.x Query object for backward compatibility
         :return: SQLAlchemy 2.0 Select or 1.x Query object
         """
-        query = self.transactions_query
+        builder = UserTransactionsQuery(self.id, order_by=order_by)
 
         if date_from and date_to:
-            query = query.filter(Transaction.date.between(date_from, date_to))
-
-        if order_by == "date_asc":
-            query = query.order_by(Transaction.date.asc())
-        elif order_by == "date_desc":
-            query = query.order_by(Transaction.date.desc())
-        elif order_by == "amount_asc":
-            query = query.order_by(Transaction.amount.asc())
-        else:  # amount_desc
-            query = query.order_by(Transaction.amount.desc())
+            builder.where(Transaction.date.between(date_from, date_to))
 
         if offset is not None and limit is not None:
-            query = query.offset(offset).limit(limit)
+            query, entity = builder.statement(limit, offset)
+        else:
+            query, entity = builder.statement()
 
         if legacy_query:
             # Convert to 1.x Query for backward compatibility
-            return db.query(Transaction).select_from(query.subquery())
+            legacy = db.query(entity).order_by(*builder.ordering(entity))
+            if offset is not None and limit is not None:
+                legacy = legacy.offset(offset).limit(limit)
+            return legacy
 
         return query
 
@@ -324,6 +326,22 @@ class User(Base):
         """Get available balance (total balance minus reserved balance)"""
         return self.balance - self.reserved_balance
 
+    def _update_balances(self, condition, **values) -> bool:
+        """
+        Apply `values` to this user's row with one UPDATE guarded by `condition`, evaluated by the database
+        against the committed balances rather than the copy loaded in this session, so concurrent
+        requests on the same account never overwrite each other.
+        The balances are expired and reloaded on next access.
+        :return: True if the row matched the condition and was updated
+        """
+        db = object_session(self)
+        result = db.execute(update(User)
+                            .where(User.id == self.id, condition)
+                            .values(data_version=User.data_version + 1, **values)
+                            .execution_options(synchronize_session=False))
+        db.expire(self, ["balance", "reserved_balance", "data_version"])
+        return result.rowcount == 1
+
     def reserve_funds(self, amount: float) -> bool:
         """
         Reserve funds for a pending transaction
@@ -331,11 +349,14 @@ class User(Base):
         :return: True if successful
         :raises: ValueError if insufficient available balance
         """
-        if self.available_balance < amount:
+        condition = User.balance - User.reserved_balance >= amount
+        reserved = self._update_balances(condition, reserved_balance=User.reserved_balance + amount)
+        if not reserved and self.fold_credit_shards():
+            # Credits still parked in balance shards count towards the available balance
+            reserved = self._update_balances(condition, reserved_balance=User.reserved_balance + amount)
+        if not reserved:
             raise ValueError(
                 f"Insufficient available balance. Available: ${self.available_balance:.2f}, Required: ${amount:.2f}")
-
-        self.reserved_balance += amount
         return True
 
     def release_reserved_funds(self, amount: float) -> bool:
@@ -344,11 +365,10 @@ class User(Base):
         :param amount: Amount to release
         :return: True if successful
         """
-        if self.reserved_balance < amount:
+        if not self._update_balances(User.reserved_balance >= amount,
+                                     reserved_balance=User.reserved_balance - amount):
             raise ValueError(
                 f"Cannot release more than reserved. Reserved: ${self.reserved_balance:.2f}, Requested: ${amount:.2f}")
-
-        self.reserved_balance -= amount
         return True
 
     def transfer_from_reserved(self, amount: float) -> bool:
@@ -357,17 +377,110 @@ class User(Base):
         :param amount: Amount to transfer
         :return: True if successful
         """
-        if self.reserved_balance < amount:
-            raise ValueError(
-                f"Cannot transfer more than reserved. Reserved: ${self.reserved_balance:.2f}, Requested: ${amount:.2f}")
-
-        if self.balance < amount:
+        # Remove from both reserved and total balance
+        if not self._update_balances(and_(User.reserved_balance >= amount, User.balance >= amount),
+                                     reserved_balance=User.reserved_balance - amount,
+                                     balance=User.balance - amount):
+            if self.reserved_balance < amount:
+                raise ValueError(f"Cannot transfer more than reserved. Reserved: ${self.reserved_balance:.2f}, "
+                                 f"Requested: ${amount:.2f}")
             raise ValueError(f"Insufficient total balance. Balance: ${self.balance:.2f}, Required: ${amount:.2f}")
+        return True
 
-        # Remove from both reserved and total balance
-        self.reserved_balance -= amount
-        self.balance -= amount
+    def debit(self, amount: float) -> bool:
+        """
+        Take funds straight from the available balance, for transfers that complete without a reservation
+        :param amount: Amount to take
+        :return: True if successful
+        :raises: ValueError if insufficient available balance
+        """
+        condition = User.balance - User.reserved_balance >= amount
+        debited = self._update_balances(condition, balance=User.balance - amount)
+        if not debited and self.fold_credit_shards():
+            debited = self._update_balances(condition, balance=User.balance - amount)
+        if not debited:
+            raise ValueError(
+                f"Insufficient available balance. Available: ${self.available_balance:.2f}, Required: ${amount:.2f}")
         return True
 
+    def credit(self, amount: float) -> bool:
+        """
+        Add received funds to the balance, or to a random balance shard if the user has sharded credits
+        :param amount: Amount received
+        :return: True if successful
+        """
+        if self.credit_shards:
+            db = object_session(self)
+            result = db.execute(update(BalanceShard)
+                                .where(BalanceShard.user_id == self.id,
+                                       BalanceShard.shard == random.randrange(self.credit_shards))
+                                .values(amount=BalanceShard.amount + amount)
+                                .execution_options(synchronize_session=False))
+            if result.rowcount == 1:
+                return True
+            # The shard rows are being changed by BalanceShardService.set_credit_shards, credit the balance instead
+        return self._update_balances(true(), balance=User.balance + amount)
+
+    def fold_credit_shards(self) -> float:
+        """
+        Move the credits collected in the balance shards of the user into the balance
+        :return: Amount added to the balance
+        """
+        if not self.credit_shards:
+            return 0.0
+
+        db = object_session(self)
+        total = BalanceShard.fold(db, [self.id]).get(self.id, 0.0)
+        if total:
+            db.expire(self, ["balance", "data_version"])
+        return total
+
+    @classmethod
+    def bump_data_versions(cls, connection, user_ids: Iterable[int]) -> None:
+        """
+        Advance the data version of the users with one UPDATE, in the caller's transaction.
+        Rows are locked in id order, like the other multi-user balance updates.
+        """
+        user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+        if user_ids:
+            connection.execute(update(cls.__table__)
+                               .where(cls.__table__.c.id.in_(user_ids))
+                               .values(data_version=cls.__table__.c.data_version + 1))
+
     def __repr__(self):
         return f"User(#{self.id}, {self.username}, {self.email})"
+
+
+@event.listens_for(Session, "before_flush")
+def bump_modified_users(session: Session, flush_context, instances) -> None:
+    """Advance the data version of users whose row is updated by this flush, in the same UPDATE"""
+    for instance in session.dirty:
+        if isinstance(instance, User) and session.is_modified(instance, include_collections=False):
+            instance.data_version = User.data_version + 1
+
+
+@event.listens_for(Session, "after_flush")
+def bump_flushed_owners(session: Session, flush_context) -> None:
+    """
+    Advance the data version of the users whose deposits, withdrawals, transaction details or category names were
+    written by this flush. Inserted transactions and status changes are covered by UserDailyRollup.apply.
+    """
+    user_ids, renamed = set(), []
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, (Deposit, Withdrawal)):
+            user_ids.add(instance.user_id)
+        elif isinstance(instance, Transaction) and instance in session.dirty:
+            status = inspect(instance).attrs.status.history
+            if not (status.added and status.deleted) and session.is_modified(instance, include_collections=False):
+                user_ids.update((instance.sender_id, instance.receiver_id))
+        elif isinstance(instance, Category) and instance not in session.new:
+            if instance in session.deleted or inspect(instance).attrs.name.history.has_changes():
+                user_ids.add(instance.user_id)
+                renamed.append(instance.id)
+
+    if renamed:
+        # The category name is shown in the history of both parties of its transactions
+        user_ids.update(*session.connection().execute(select(Transaction.sender_id, Transaction.receiver_id)
+                                                      .where(Transaction.category_id.in_(renamed))))
+    if user_ids:
+        User.bump_data_versions(session.connection(), user_ids)
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, String, event, inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.infrestructure import Base
+from app.models.transaction import Transaction, TransactionStatus
+from app.models.user import User
+
+RollupKey = Tuple[int, date, str, str]
+
+
+class UserDailyRollup(Base):
+    """
+    Number and sum of the transactions of a user per day, direction ("in" or "out") and status.
+    Kept in the DB transaction of every insert and status change: ORM flushes of Transaction rows are rolled up by
+    the after_flush hook below, statements that bypass the unit of work call UserDailyRollup.record themselves.
+    Applying the changes also advances User.data_version of the users involved.
+    History totals over date ranges read whole days from here and only the partial edge days from transactions.
+    """
+    __tablename__ = "user_daily_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    direction = Column(String(3), primary_key=True)
+    status = Column(String(32), primary_key=True)
+    transaction_count = Column(Integer, nullable=False, default=0, server_default="0")
+    amount = Column(Float, nullable=False, default=0.0, server_default="0")
+
+    @classmethod
+    def collect(cls, deltas: Dict[RollupKey, list], transactions: Iterable,
+                old_status: Optional[TransactionStatus], new_status: Optional[TransactionStatus]) -> Dict:
+        """
+        Add the rollup changes of moving `transactions` from `old_status` to `new_status` to `deltas`
+        :param transactions: objects or rows with sender_id, receiver_id, date and amount
+        :param old_status: None for new transactions
+        :param new_status: None for deleted transactions
+        """
+        for transaction in transactions:
+            day = transaction.date.date()
+            sides = [(transaction.sender_id, "out")]
+            if transaction.receiver_id != transaction.sender_id:
+                sides.append((transaction.receiver_id, "in"))
+            for user_id, direction in sides:
+                for status, sign in ((old_status, -1), (new_status, 1)):
+                    if status is not None:
+                        delta = deltas[(user_id, day, direction, TransactionStatus(status).value)]
+                        delta[0] += sign
+                        delta[1] += sign * transaction.amount
+        return deltas
+
+    @classmethod
+    def apply(cls, connection, deltas: Dict[RollupKey, list]) -> None:
+        """Add `deltas` to the rollup rows with one upsert, and advance the data version of their users"""
+        rows = [{"user_id": user_id, "day": day, "direction": direction, "status": status,
+                 "transaction_count": count, "amount": round(amount, 2)}
+                for (user_id, day, direction, status), (count, amount) in deltas.items() if count or amount]
+        if not rows:
+            return
+
+        table = cls.__table__
+        dialect = connection.dialect.name
+        if dialect == "mysql":
+            statement = mysql.insert(table)
+            statement = statement.on_duplicate_key_update(
+                transaction_count=table.c.transaction_count + statement.inserted.transaction_count,
+                amount=table.c.amount + statement.inserted.amount)
+        else:
+            statement = (postgresql if dialect == "postgresql" else sqlite).insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.day, table.c.direction, table.c.status],
+                set_={"transaction_count": table.c.transaction_count + statement.excluded.transaction_count,
+                      "amount": table.c.amount + statement.excluded.amount})
+        connection.execute(statement, rows)
+        User.bump_data_versions(connection, {row["user_id"] for row in rows})
+
+    @classmethod
+    def record(cls, db: Session, transactions: Iterable,
+               old_status: Optional[TransactionStatus], new_status: Optional[TransactionStatus]) -> None:
+        """Roll up a status change made with a statement that bypasses the unit of work, in the caller's transaction"""
+        cls.apply(db.connection(), cls.collect(defaultdict(lambda: [0, 0.0]), transactions, old_status, new_status))
+
+
+@event.listens_for(Session, "after_flush")
+def roll_up_flushed_transactions(session: Session, flush_context) -> None:
+    """Roll up the Transaction rows inserted, deleted or moved to another status by this flush"""
+    deltas = defaultdict(lambda: [0, 0.0])
+    for instance in session.new:
+        if isinstance(instance, Transaction):
+            UserDailyRollup.collect(deltas, [instance], None, instance.status)
+    for instance in session.deleted:
+        if isinstance(instance, Transaction):
+            UserDailyRollup.collect(deltas, [instance], instance.status, None)
+    for instance in session.dirty:
+        if isinstance(instance, Transaction):
+            history = inspect(instance).attrs.status.history
+            if history.added and history.deleted:
+                UserDailyRollup.collect(deltas, [instance], history.deleted[0], history.added[0])
+    if deltas:
+        UserDailyRollup.apply(session.connection(), deltas)
@@ -48,6 +48,10 @@ class UpdateUserStatus(BaseModel):
     reason: Optional[str] = None
 
 
+class UpdateCreditShards(BaseModel):
+    shards: int
+
+
 class UpdateUserStatusResponse(BaseModel):
     user: UserResponse
     message: str
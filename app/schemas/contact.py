@@ -17,6 +17,10 @@ class ContactUpdate(ContactBase):
     contact_id: Optional[int] = None
 
 
+class ContactAutoAccept(BaseModel):
+    auto_accept: bool
+
+
 class ContactResponse(BaseModel):
     id: int
     user_id: int
@@ -28,6 +32,7 @@ class ContactResponse(BaseModel):
 class ContactPublicResponse(BaseModel):
     id: int
     contact_user: "UserPublicResponse"
+    auto_accept: bool = False
 
     class Config:
         from_attributes = True
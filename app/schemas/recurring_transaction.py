@@ -1,4 +1,5 @@
-from typing import Literal
+from datetime import datetime
+from typing import Literal, Optional
 
 from pydantic import BaseModel
 
@@ -14,6 +15,9 @@ class RecurringTransactionBase(BaseModel):
 class RecurringTransactionResponse(RecurringTransactionBase):
     id: int
     repeated: int = 0
+    execution_count: int = 0
+    failure_count: int = 0
+    last_executed_at: Optional[datetime] = None
     total_transferred: float = 0.0
 
     class Config:
@@ -37,10 +37,16 @@ class TransactionHistoryFilter(BaseModel):
     # Pagination
     limit: Optional[int] = Field(30, ge=10, le=100, description="Limit number of results per page")
     page: Optional[int] = Field(1, ge=1, description="The current page")
+    pagination: Literal["offset", "cursor"] = \
+        Field("offset", description="Page by page number (offset) or by the next_cursor of the previous page (cursor)")
+    cursor: Optional[str] = Field(None, description="Opaque cursor from the previous page, implies cursor pagination")
 
     # Sorting
-    order_by: Literal["date_desc", "date_asc", "amount_desc", "amount_asc"] =\
-        Field("date_desc", description="Sort order")
+    order_by: Literal["date_desc", "date_asc", "amount_desc", "amount_asc", "relevance"] =\
+        Field("date_desc", description="Sort order, relevance applies to searches with q and offset pagination")
+
+    # Full-text search
+    q: Optional[str] = Field(None, max_length=200, description="Words that must all appear in the description")
 
     # Date filtering
     date_from: Optional[datetime] = Field(None, description="Filter transactions from this date (ISO format)")
@@ -57,3 +63,8 @@ class TransactionHistoryFilter(BaseModel):
     status: Optional[Literal["pending", "awaiting_acceptance", "completed", "denied", "cancelled", "failed"]] = \
         Field(None,
               description="Filter by transaction status")
+
+
+class TransactionForecastFilter(BaseModel):
+    months: int = Field(3, ge=1, le=24, description="Number of months to project ahead")
+    granularity: Literal["day", "week", "month"] = Field("day", description="One point per day, week or month")
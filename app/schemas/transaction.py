@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import Optional, List, Literal
 
@@ -105,6 +105,97 @@ class TransactionHistoryResponse(BaseModel):
     avg_outgoing_transaction: float = 0.0
     avg_incoming_transaction: float = 0.0
     net_total: float = 0.0
+    next_cursor: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ForecastPoint(BaseModel):
+    date: date
+    balance: float
+    recurring_in: float = 0.0
+    recurring_out: float = 0.0
+
+
+class TransactionForecastResponse(BaseModel):
+    available_balance: float
+    start: date
+    end: date
+    granularity: str
+    recurring_in: float = 0.0
+    recurring_out: float = 0.0
+    average_daily_net: float = 0.0
+    lowest_balance: float
+    lowest_balance_on: date
+    first_negative_on: Optional[date] = None
+    points: List[ForecastPoint] = []
+
+
+class BulkTransferItem(BaseModel):
+    identifier: str
+    amount: float
+    description: Optional[str] = None
+    category_id: Optional[int] = None
+
+    @field_validator('category_id')
+    def category_id_must_be_positive(cls, v):
+        if isinstance(v, int) and v < 1:
+            return None
+        return v
+
+
+class BulkTransferCreate(BaseModel):
+    transfers: List[BulkTransferItem]
+    currency_id: int = 1
+
+
+class BulkTransferResult(BaseModel):
+    row: int
+    identifier: str
+    amount: Optional[float] = None
+    status: Literal["created", "rejected"]
+    transaction_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkTransferResponse(BaseModel):
+    rows: int
+    created: int
+    rejected: int
+    total_amount: float
+    results: List[BulkTransferResult] = []
+
+
+class DirectTransferCreate(BulkTransferItem):
+    """Transfer to a contact who accepts transfers from the sender automatically"""
+    currency_id: int = 1
+
+    @field_validator("currency_id")
+    def currency_id_null(cls, v):
+        if isinstance(v, int) and v == 0:
+            return 1
+        return v
+
+
+class TransactionBatchItem(BaseModel):
+    transaction_id: int
+    action: TransactionUpdateStatus
+
+
+class TransactionBatchUpdate(BaseModel):
+    items: List[TransactionBatchItem]
+
+
+class TransactionBatchResult(BaseModel):
+    transaction_id: int
+    action: TransactionUpdateStatus
+    outcome: Literal["applied", "rejected"]
+    status: Optional[TransactionStatus] = None
+    error: Optional[str] = None
+
+
+class TransactionBatchResponse(BaseModel):
+    applied: int
+    rejected: int
+    results: List[TransactionBatchResult] = []
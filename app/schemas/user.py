@@ -1,3 +1,4 @@
+from datetime import datetime
 from enum import Enum
 from typing import Optional, ForwardRef
 
@@ -108,6 +109,14 @@ class ShortUserResponse(BaseModel):
         from_attributes = True
 
 
+class BalanceAtResponse(BaseModel):
+    """
+    Wallet balance of the user at a point in time, from the ledger.
+    """
+    at: datetime
+    balance: float
+
+
 class PasswordResetRequest(BaseModel):
     """
     Request schema for initiating a password reset.
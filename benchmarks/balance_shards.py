@@ -0,0 +1,84 @@
+"""
+Credit throughput into one hot receiving account from concurrent threads, single users row vs. sharded credits.
+
+Every thread credits the same user and commits after each credit, like accept_transaction does for the receiver.
+With `--shards 0` every credit updates the users row; otherwise the credits land in a random balance shard and
+BalanceShardService.compact folds them into the balance at the end. The final balance must equal the credits.
+SQLite locks the whole database for every write, so the file database shows the overhead of sharding rather than
+the contention it removes; point `--db-url` at an empty PostgreSQL database to measure row-lock contention.
+
+    python -m benchmarks.balance_shards --threads 8 --credits 300 --shards 0 4 16
+    python -m benchmarks.balance_shards --db-url postgresql://localhost/wallet_bench --threads 32
+"""
+import argparse
+import os
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.business.user.balance_shards import BalanceShardService
+from app.models import User
+from benchmarks.balance_updates import START_BALANCE, engine_for, seed
+
+
+def run(db_url: str, shards: int, threads: int, credits: int):
+    engine = engine_for(db_url, "conditional")
+    receiver_id, = seed(engine, 1)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with factory() as db:
+        BalanceShardService.set_credit_shards(db, receiver_id, shards)
+    errors, lock = [0], threading.Lock()
+
+    def worker():
+        with factory() as db:
+            receiver = db.get(User, receiver_id)
+            db.commit()
+            for _ in range(credits):
+                try:
+                    receiver.credit(1.0)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        errors[0] += 1
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    with factory() as db:
+        started_compact = time.perf_counter()
+        BalanceShardService.compact(db)
+        compact_ms = (time.perf_counter() - started_compact) * 1000
+        balance = db.get(User, receiver_id).balance
+    engine.dispose()
+
+    completed = threads * credits - errors[0]
+    print(f"{shards:>7} {threads:>8} {completed:>9,} {errors[0]:>7} {seconds:>9.2f} {completed / seconds:>10,.0f} "
+          f"{compact_ms:>11.1f} {'yes' if balance == START_BALANCE + completed else 'NO':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--credits", type=int, default=300, help="credits per thread")
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 4, 16])
+    parser.add_argument("--db", default="/tmp/wallet_shards_bench.db")
+    parser.add_argument("--db-url", help="database to run against instead of a SQLite file")
+    args = parser.parse_args()
+
+    print(f"\n{'shards':>7} {'threads':>8} {'credits':>9} {'errors':>7} {'seconds':>9} {'credits/s':>10} "
+          f"{'compact ms':>11} {'balanced':>9}")
+    for shards in args.shards:
+        run(args.db_url or f"sqlite:///{args.db}", shards, args.threads, args.credits)
+    if not args.db_url and os.path.exists(args.db):
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
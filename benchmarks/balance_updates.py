@@ -0,0 +1,149 @@
+"""
+Transfer throughput between a few hot accounts from concurrent threads, row-lock read-modify-write vs. the
+conditional UPDATEs of User.reserve_funds / transfer_from_reserved / credit.
+
+Every transfer reserves the amount and then moves it to the receiver, in two commits like confirm and accept.
+`lock` reads both users FOR UPDATE and writes the new balances from Python; SQLite has no row locks, so there
+every lock transaction starts with BEGIN IMMEDIATE instead. `conditional` lets the database check and apply the
+change in one statement per balance. After the run, the balances are compared with the transfers that reported
+success: any difference is a lost update.
+
+    python -m benchmarks.balance_updates --threads 8 --transfers 200
+    python -m benchmarks.balance_updates --db-url postgresql://localhost/wallet_bench --mode conditional
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.infrestructure import Base
+from app.models import User
+from app.models.user import UserStatus
+
+START_BALANCE = 1_000_000.0
+
+
+def engine_for(db_url: str, mode: str):
+    if not db_url.startswith("sqlite"):
+        return create_engine(db_url, pool_size=32)
+
+    engine = create_engine(db_url, connect_args={"timeout": 60, "isolation_level": None})
+
+    @event.listens_for(engine, "begin")
+    def begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if mode == "lock" else "BEGIN")
+
+    return engine
+
+
+def seed(engine, accounts: int) -> list[int]:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        users = [User(username=f"hot{i}", email=f"hot{i}@example.com", phone_number=f"{i:010d}",
+                      hashed_password="hashed", balance=START_BALANCE, status=UserStatus.ACTIVE)
+                 for i in range(accounts)]
+        db.add_all(users)
+        db.commit()
+        return [user.id for user in users]
+
+
+def transfer_locked(db, sender: User, receiver: User, amount: float):
+    sender_id, receiver_id = sender.id, receiver.id
+    sender = db.execute(select(User).where(User.id == sender_id)
+                        .with_for_update().execution_options(populate_existing=True)).scalar_one()
+    if sender.balance - sender.reserved_balance < amount:
+        raise ValueError("Insufficient available balance")
+    sender.reserved_balance += amount
+    db.commit()
+
+    # lock both rows in id order so opposite transfers cannot deadlock
+    users = {user.id: user for user in db.execute(select(User).where(User.id.in_([sender_id, receiver_id]))
+                                                  .order_by(User.id).with_for_update()
+                                                  .execution_options(populate_existing=True)).scalars()}
+    sender, receiver = users[sender_id], users[receiver_id]
+    sender.reserved_balance -= amount
+    sender.balance -= amount
+    receiver.balance += amount
+    db.commit()
+
+
+def transfer_conditional(db, sender: User, receiver: User, amount: float):
+    sender.reserve_funds(amount)
+    db.commit()
+
+    sender.transfer_from_reserved(amount)
+    receiver.credit(amount)
+    db.commit()
+
+
+def run(db_url: str, mode: str, threads: int, transfers: int, accounts: int):
+    engine = engine_for(db_url, mode)
+    ids = seed(engine, accounts)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    transfer = transfer_locked if mode == "lock" else transfer_conditional
+    expected = {user_id: START_BALANCE for user_id in ids}
+    errors, lock = [0], threading.Lock()
+
+    def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        with factory() as db:
+            users = {user_id: db.get(User, user_id) for user_id in ids}
+            db.commit()
+            for _ in range(transfers):
+                sender_id, receiver_id = rng.sample(ids, 2)
+                amount = float(rng.randint(1, 100))
+                try:
+                    transfer(db, users[sender_id], users[receiver_id], amount)
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    expected[sender_id] -= amount
+                    expected[receiver_id] += amount
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    with factory() as db:
+        balances = dict(db.execute(select(User.id, User.balance)).all())
+        reserved = db.execute(select(func.sum(User.reserved_balance))).scalar()
+    engine.dispose()
+
+    completed = threads * transfers - errors[0]
+    lost = sum(abs(balances[user_id] - expected[user_id]) > 0.001 for user_id in ids)
+    print(f"{mode:>12} {threads:>8} {completed:>10,} {errors[0]:>7} {seconds:>9.2f} {completed / seconds:>12,.0f} "
+          f"{lost:>14} {reserved:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--transfers", type=int, default=200, help="transfers per thread")
+    parser.add_argument("--accounts", type=int, default=4)
+    parser.add_argument("--mode", choices=["lock", "conditional"], nargs="+", default=["lock", "conditional"])
+    parser.add_argument("--db", default="/tmp/wallet_balance_bench.db")
+    parser.add_argument("--db-url", help="database to run against instead of a SQLite file")
+    args = parser.parse_args()
+
+    print(f"\n{'mode':>12} {'threads':>8} {'transfers':>10} {'errors':>7} {'seconds':>9} {'transfers/s':>12} "
+          f"{'lost accounts':>14} {'reserved':>9}")
+    for mode in args.mode:
+        run(args.db_url or f"sqlite:///{args.db}", mode, args.threads, args.transfers, args.accounts)
+    if not args.db_url and os.path.exists(args.db):
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
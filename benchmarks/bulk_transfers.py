@@ -0,0 +1,90 @@
+"""
+Payroll batch cost: one transfer at a time through TransactionService vs. one TransactionBulkService batch.
+
+Seeds a SQLite file with one payer and `--recipients` recipients, then pays `--rows` transfers to them twice: with
+create_pending_transaction + confirm_transaction per row, the way a client loops over the single-transfer API, and
+with one create_bulk call. Reports wall time, rows/s and SQL statements for each.
+
+    python -m benchmarks.bulk_transfers --rows 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.business.transaction import TransactionBulkService, TransactionService
+from app.infrestructure import Base
+from app.models import Currency, User
+from app.models.user import UserStatus
+from app.schemas.transaction import BulkTransferItem, TransactionCreate
+
+
+def seed(db, recipients: int) -> User:
+    db.add(Currency(id=1, code="EUR"))
+    db.add_all([User(username=f"user{i}", hashed_password="x", email=f"user{i}@example.com",
+                     phone_number=f"{i:010d}", balance=0, status=UserStatus.ACTIVE)
+                for i in range(recipients)])
+    payer = User(username="payer", hashed_password="x", email="payer@example.com",
+                 phone_number=f"{recipients:010d}", balance=1_000_000_000, status=UserStatus.ACTIVE)
+    db.add(payer)
+    db.commit()
+    return payer
+
+
+def one_by_one(db, payer: User, items: list):
+    for item in items:
+        transaction = TransactionService.create_pending_transaction(
+            db, payer, TransactionCreate(identifier=item.identifier, amount=item.amount))
+        TransactionService.confirm_transaction(db, payer, transaction.id)
+
+
+def bulk(db, payer: User, items: list):
+    TransactionBulkService.create_bulk(db, payer, items)
+
+
+def measure(name: str, engine, run, *args):
+    statements = []
+    listener = lambda *_: statements.append(None)
+    event.listen(engine, "before_cursor_execute", listener)
+    started = time.perf_counter()
+    # the identifier lookup used by the single-transfer path prints every match
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(*args)
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "before_cursor_execute", listener)
+    rows = len(args[-1])
+    print(f"{name:>12} {elapsed:>9.2f} {rows / elapsed:>10.0f} {len(statements):>11,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--recipients", type=int, default=500)
+    parser.add_argument("--db", default="/tmp/wallet_bulk_bench.db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        payer = seed(db, args.recipients)
+        items = [BulkTransferItem(identifier=f"user{i % args.recipients}", amount=float(i % 90 + 10))
+                 for i in range(args.rows)]
+        print(f"\n{args.rows:,} transfers to {args.recipients:,} recipients")
+        print(f"{'':>12} {'seconds':>9} {'rows/s':>10} {'statements':>11}")
+        measure("one by one", engine, one_by_one, db, payer, items)
+        measure("bulk", engine, bulk, db, payer, items)
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
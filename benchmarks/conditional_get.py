@@ -0,0 +1,153 @@
+"""
+Polling cost of the read endpoints, full response vs. 304 Not Modified from the data version ETag.
+
+Seeds a SQLite database built from the Alembic chain with one user taking part in `--rows` transactions, then
+replays the polls of a mobile client against the handlers of `/transactions` (first page with totals) and
+`/users/me`: each poll starts a new session with the user attached from a cached principal, as getValidUser does,
+and sends back the ETag of its previous response. One write lands every `--write-every` polls, so the next poll
+of each endpoint gets a full response again.
+The seeded file is reused on later runs when it already holds the requested row count.
+
+    python -m benchmarks.conditional_get --rows 200000
+    python -m benchmarks.conditional_get --rows 1000000 --write-every 10
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.business.transaction.transaction_service import TransactionService
+from app.dependencies import attach_cached_user, conditional_get
+from app.infrestructure.migrations import run_migrations
+from app.models import Transaction, User, UserDailyRollup
+from app.schemas.router import TransactionHistoryFilter
+from app.schemas.transaction import TransactionHistoryResponse
+from app.schemas.user import UserResponse
+
+HOT_USER = 1
+CHUNK = 100_000
+NOW = datetime(2025, 1, 1)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def seed(engine, rows: int, users: int):
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT count(*) FROM transactions")).scalar() == rows:
+            print(f"Reusing seeded database with {rows:,} transactions")
+            return
+        for table in ("user_daily_rollup", "transactions", "users", "currencies"):
+            connection.execute(text(f"DELETE FROM {table}"))
+        connection.commit()
+
+    started = time.perf_counter()
+    rng = random.Random(42)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("INSERT INTO currencies (id, code) VALUES (1, 'EUR')")
+        cursor.executemany(
+            "INSERT INTO users (id, username, hashed_password, email, phone_number, created_at, balance, "
+            "reserved_balance, admin, status, forced_password_reset) "
+            "VALUES (?, ?, 'x', ?, ?, ?, 1000000, 0, 0, 'active', 0)",
+            [(i, f"user{i}", f"user{i}@example.com", f"{i:010d}", NOW) for i in range(1, users + 1)])
+        raw.commit()
+    finally:
+        raw.close()
+
+    with engine.connect() as connection:
+        for start in range(0, rows, CHUNK):
+            batch = []
+            for i in range(start, min(rows, start + CHUNK)):
+                other = rng.randint(2, users)
+                sender, receiver = (HOT_USER, other) if rng.random() < 0.5 else (other, HOT_USER)
+                batch.append({"sender_id": sender, "receiver_id": receiver, "amount": round(rng.uniform(1, 500), 2),
+                              "date": NOW - timedelta(minutes=rows - i), "status": "completed", "recurring": False,
+                              "currency_id": 1})
+            connection.execute(Transaction.__table__.insert(), batch)
+            # Rows inserted with Core bypass the flush hook, so their rollups are collected here
+            deltas = defaultdict(lambda: [0, 0.0])
+            UserDailyRollup.collect(deltas, [SimpleNamespace(**row) for row in batch], None, "completed")
+            UserDailyRollup.apply(connection, deltas)
+            connection.commit()
+            print(f"  seeded {min(rows, start + CHUNK):,} rows", end="\r")
+        connection.execute(text("ANALYZE"))
+        connection.commit()
+    print(f"Seeded {rows:,} transactions in {time.perf_counter() - started:.1f}s")
+
+
+def history(db, user):
+    result = TransactionService.get_user_transaction_history(db, user, TransactionHistoryFilter())
+    return TransactionHistoryResponse.model_validate(result).model_dump_json()
+
+
+def me(db, user):
+    return UserResponse.model_validate(user).model_dump_json()
+
+
+def poll(engine, principal, handler, path: str, etag, conditional: bool):
+    headers = [(b"if-none-match", etag.encode())] if conditional and etag else []
+    request = Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers})
+    response = Response()
+    start = time.perf_counter()
+    with Session(engine) as db:
+        user = attach_cached_user(db, principal)
+        # Like the endpoint, /users/me folds the credit shards before its ETag is computed
+        if path == "/users/me" and user.fold_credit_shards():
+            db.commit()
+        if not (conditional and conditional_get(request, response, user)):
+            handler(db, user)
+    return (time.perf_counter() - start) * 1000, response.headers.get("etag", etag)
+
+
+def write(engine):
+    with Session(engine) as db:
+        db.add(Transaction(sender_id=2, receiver_id=HOT_USER, amount=1.0, date=datetime.now(), status="completed",
+                           recurring=False, currency_id=1))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--write-every", type=int, default=20, help="polls between two writes, 0 for none")
+    parser.add_argument("--db", default="/tmp/wallet_conditional_bench.db")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    run_migrations(engine)
+    seed(engine, args.rows, args.users)
+    with Session(engine) as db:
+        user = db.get(User, HOT_USER)
+        principal = SimpleNamespace(id=user.id, username=user.username, status=user.status, admin=user.admin,
+                                    forced_password_reset=user.forced_password_reset)
+
+    print(f"\n{'endpoint':<16} {'mode':<12} {'p50 ms':>9} {'p99 ms':>9} {'304s':>6}")
+    for path, handler in (("/transactions/", history), ("/users/me", me)):
+        for conditional in (False, True):
+            latencies, not_modified, etag = [], 0, None
+            for i in range(args.polls):
+                if args.write_every and i and i % args.write_every == 0:
+                    write(engine)
+                previous = etag
+                latency, etag = poll(engine, principal, handler, path, etag, conditional)
+                latencies.append(latency)
+                not_modified += conditional and etag == previous
+            print(f"{path:<16} {'conditional' if conditional else 'full':<12} {statistics.median(latencies):>9.2f} "
+                  f"{percentile(latencies, 99):>9.2f} {not_modified:>6}")
+
+
+if __name__ == "__main__":
+    main()
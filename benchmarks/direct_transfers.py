@@ -0,0 +1,104 @@
+"""
+Cost of one transfer between trusted contacts: create + confirm + accept vs. one direct transfer.
+
+Seeds a SQLite file with `--users` users who are all mutual contacts with auto-accept enabled, then sends
+`--transfers` transfers between random pairs, first through the three TransactionService steps a client calls
+one request at a time, then with create_direct_transaction. Reports the latency percentiles, SQL statements and
+commits per transfer.
+
+    python -m benchmarks.direct_transfers --transfers 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.business.transaction import TransactionService
+from app.infrestructure import Base
+from app.models import Contact, Currency, User
+from app.models.user import UserStatus
+from app.schemas.transaction import DirectTransferCreate, TransactionCreate
+
+
+def seed(db, users: int) -> list:
+    db.add(Currency(id=1, code="EUR"))
+    accounts = [User(username=f"user{i}", hashed_password="x", email=f"user{i}@example.com",
+                     phone_number=f"{i:010d}", balance=1_000_000, status=UserStatus.ACTIVE)
+                for i in range(users)]
+    db.add_all(accounts)
+    db.flush()
+    db.add_all([Contact(user_id=user.id, contact_id=contact.id, auto_accept=True)
+                for user in accounts for contact in accounts if user is not contact])
+    db.commit()
+    return accounts
+
+
+def three_steps(db, sender: User, receiver: User, amount: float):
+    transaction = TransactionService.create_pending_transaction(
+        db, sender, TransactionCreate(identifier=receiver.username, amount=amount))
+    TransactionService.confirm_transaction(db, sender, transaction.id)
+    TransactionService.accept_transaction(db, receiver, transaction.id)
+
+
+def direct(db, sender: User, receiver: User, amount: float):
+    TransactionService.create_direct_transaction(
+        db, sender, DirectTransferCreate(identifier=receiver.username, amount=amount))
+
+
+def measure(name: str, engine, db, accounts: list, transfers: int, send):
+    rng = random.Random(7)
+    counts = {"statements": 0, "commits": 0}
+    on_statement = lambda *_: counts.__setitem__("statements", counts["statements"] + 1)
+    on_commit = lambda *_: counts.__setitem__("commits", counts["commits"] + 1)
+    event.listen(engine, "before_cursor_execute", on_statement)
+    event.listen(engine, "commit", on_commit)
+
+    latencies = []
+    # the identifier lookup used by create_pending_transaction prints every match
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(transfers):
+            sender, receiver = rng.sample(accounts, 2)
+            started = time.perf_counter()
+            send(db, sender, receiver, float(rng.randint(1, 100)))
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    event.remove(engine, "before_cursor_execute", on_statement)
+    event.remove(engine, "commit", on_commit)
+    latencies.sort()
+    print(f"{name:>12} {statistics.mean(latencies):>9.2f} {latencies[len(latencies) // 2]:>9.2f} "
+          f"{latencies[int(len(latencies) * 0.99)]:>9.2f} {counts['statements'] / transfers:>11.1f} "
+          f"{counts['commits'] / transfers:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transfers", type=int, default=2000)
+    parser.add_argument("--db", default="/tmp/wallet_direct_bench.db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        accounts = seed(db, args.users)
+        print(f"\nper transfer over {args.transfers:,} transfers (latency in ms)")
+        print(f"{'':>12} {'mean':>9} {'p50':>9} {'p99':>9} {'statements':>11} {'commits':>8}")
+        measure("three steps", engine, db, accounts, args.transfers, three_steps)
+        measure("direct", engine, db, accounts, args.transfers, direct)
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
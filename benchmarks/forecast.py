@@ -0,0 +1,103 @@
+"""
+Balance forecast latency, per-day per-schedule Python loop vs. the grouped projection and its cache.
+
+Seeds an in-memory database with one user holding `--schedules` active schedules (a mix of daily, weekly and
+monthly, sent and received) and projects its balance `--months` months ahead with each strategy:
+
+    python -m benchmarks.forecast --schedules 2000 --months 24
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.business.transaction.transaction_forecast import ForecastService, add_months, forecast_cache
+from app.infrestructure import Base
+from app.models import Currency, RecurringTransaction, Transaction, User
+from app.models.recurring_transation import INTERVAL_DAYS, RecurringInterval
+from app.models.transaction import TransactionStatus
+
+TODAY = date(2025, 3, 10)
+
+
+def seed(db, schedules: int) -> User:
+    rng = random.Random(42)
+    db.add(Currency(id=1, code="EUR"))
+    users = [User(id=i, username=f"user{i}", hashed_password="x", email=f"user{i}@example.com",
+                  phone_number=f"{i:010d}", balance=10_000) for i in range(1, 51)]
+    db.add_all(users)
+    db.flush()
+    intervals = list(RecurringInterval)
+    for i in range(1, schedules + 1):
+        other = rng.randint(2, 50)
+        sender, receiver = (1, other) if rng.random() < 0.6 else (other, 1)
+        db.add(Transaction(id=i, sender_id=sender, receiver_id=receiver, amount=round(rng.uniform(1, 50), 2),
+                           date=datetime(2025, 1, 1), status=TransactionStatus.ACCEPTED, recurring=True,
+                           currency_id=1))
+        db.add(RecurringTransaction(id=i, transaction_id=i, interval=rng.choice(intervals), is_active=True,
+                                    next_run_at=datetime.combine(TODAY, datetime.min.time())
+                                    + timedelta(days=rng.randint(0, 29))))
+    db.commit()
+    return users[0]
+
+
+def naive_forecast(db, user: User, months: int) -> list:
+    """Walk every day and test every schedule against it"""
+    rows = db.execute(select(RecurringTransaction.interval, RecurringTransaction.next_run_at,
+                             Transaction.sender_id, Transaction.amount)
+                      .join(Transaction)
+                      .where(RecurringTransaction.is_active == True)
+                      .where((Transaction.sender_id == user.id) | (Transaction.receiver_id == user.id))).all()
+    balance, balances = user.balance, []
+    day, end = TODAY, add_months(TODAY, months)
+    while day <= end:
+        for interval, next_run_at, sender_id, amount in rows:
+            offset = (day - next_run_at.date()).days
+            if offset >= 0 and offset % INTERVAL_DAYS[interval] == 0:
+                balance += -amount if sender_id == user.id else amount
+        balances.append(balance)
+        day += timedelta(days=1)
+    return balances
+
+
+def timed(label: str, repeat: int, run):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<34} {elapsed * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, default=2000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        user = seed(db, args.schedules)
+
+        print(f"{args.schedules:,} schedules, {args.months} months\n")
+        print(f"{'strategy':<34} {'ms/request':>10}")
+        timed("Per-day per-schedule loop", args.repeat, lambda: naive_forecast(db, user, args.months))
+
+        def uncached():
+            forecast_cache.clear()
+            ForecastService.forecast(db, user, args.months, today=TODAY)
+
+        timed("Grouped projection, cold cache", args.repeat, uncached)
+        ForecastService.forecast(db, user, args.months, today=TODAY)
+        timed("Grouped projection, cached", args.repeat,
+              lambda: ForecastService.forecast(db, user, args.months, today=TODAY))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+History totals latency on multi-year histories, aggregate over the transactions vs. the daily rollups.
+
+Seeds a SQLite database built from the Alembic chain with `--rows` transactions spread over `--years` years,
+one user taking part in `--hot-share` of them, and their UserDailyRollup rows. Then computes the totals of
+the history endpoint for the hot user over several ranges, with the aggregate over the filtered transactions
+(TransactionService._history_totals_columns) and with TransactionService._rollup_totals, checking both agree.
+The seeded file is reused on later runs when it already holds the requested row count.
+
+    python -m benchmarks.history_rollups --rows 1000000 --years 5
+    python -m benchmarks.history_rollups --rows 5000000 --years 10 --db /tmp/rollups_5m.db
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session, aliased
+
+from app.business.transaction.transaction_service import TransactionService
+from app.infrestructure.migrations import run_migrations
+from app.models import UserDailyRollup
+from app.models.transaction import Transaction, UserTransactionsQuery
+
+HOT_USER = 1
+CHUNK = 100_000
+NOW = datetime(2025, 1, 1)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def seed(engine, rows: int, users: int, years: int, hot_share: float):
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT count(*) FROM transactions")).scalar() == rows:
+            print(f"Reusing seeded database with {rows:,} transactions")
+            return
+        for table in ("user_daily_rollup", "transactions", "users", "currencies"):
+            connection.execute(text(f"DELETE FROM {table}"))
+        connection.commit()
+
+    started = time.perf_counter()
+    rng = random.Random(42)
+    span = years * 365 * 86400
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("INSERT INTO currencies (id, code) VALUES (1, 'EUR')")
+        cursor.executemany(
+            "INSERT INTO users (id, username, hashed_password, email, phone_number, created_at, balance, "
+            "reserved_balance, admin, status, forced_password_reset) "
+            "VALUES (?, ?, 'x', ?, ?, ?, 0, 0, 0, 'active', 0)",
+            [(i, f"user{i}", f"user{i}@example.com", f"{i:010d}", NOW) for i in range(1, users + 1)])
+        raw.commit()
+    finally:
+        raw.close()
+
+    statuses = ["completed"] * 14 + ["pending", "awaiting_acceptance", "denied", "cancelled", "failed"]
+    with engine.connect() as connection:
+        for start in range(0, rows, CHUNK):
+            batch = []
+            for i in range(start, min(rows, start + CHUNK)):
+                sender, receiver = rng.randint(2, users), rng.randint(2, users - 1)
+                receiver += receiver >= sender
+                if rng.random() < hot_share:
+                    sender, receiver = (HOT_USER, receiver) if rng.random() < 0.5 else (sender, HOT_USER)
+                batch.append({"sender_id": sender, "receiver_id": receiver, "amount": round(rng.uniform(1, 500), 2),
+                              "date": NOW - timedelta(seconds=span * (rows - i) // rows),
+                              "status": rng.choice(statuses), "recurring": False, "currency_id": 1})
+            connection.execute(Transaction.__table__.insert(), batch)
+            # Rows inserted with Core bypass the flush hook, so their rollups are collected here
+            deltas = defaultdict(lambda: [0, 0.0])
+            for row in batch:
+                UserDailyRollup.collect(deltas, [SimpleNamespace(**row)], None, row["status"])
+            UserDailyRollup.apply(connection, deltas)
+            connection.commit()
+            print(f"  seeded {min(rows, start + CHUNK):,} rows", end="\r")
+        connection.execute(text("ANALYZE"))
+        connection.commit()
+    print(f"Seeded {rows:,} transactions over {years} years for {users:,} users "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+def aggregate_totals(user, date_from, date_to):
+    builder = UserTransactionsQuery(user.id)
+    if date_from:
+        builder.where(Transaction.date >= date_from)
+    if date_to:
+        builder.where(Transaction.date <= date_to)
+    filtered = aliased(Transaction, builder.subquery(name="filtered"))
+    return select(*TransactionService._history_totals_columns(user, filtered))
+
+
+def rollup_totals(user, date_from, date_to):
+    totals = TransactionService._rollup_totals(user, date_from, date_to, None, None)
+    # Ranges within a single day fall back to the aggregate, as in get_user_transaction_history
+    return select(totals) if totals is not None else aggregate_totals(user, date_from, date_to)
+
+
+def measure(db, build, user, date_from, date_to, repeat: int):
+    latencies, totals = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        totals = db.execute(build(user, date_from, date_to)).one()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--hot-share", type=float, default=0.2, help="share of rows involving the hot user")
+    parser.add_argument("--db", default="/tmp/wallet_rollups_bench.db")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    run_migrations(engine)
+    seed(engine, args.rows, args.users, args.years, args.hot_share)
+
+    user = SimpleNamespace(id=HOT_USER)
+    scenarios = [("whole history", None, None),
+                 ("last year, partial edge days", NOW - timedelta(days=365, hours=-9), NOW - timedelta(hours=5)),
+                 ("last 90 days, from midnight", NOW - timedelta(days=90), None),
+                 ("one month, partial edge days",
+                  NOW - timedelta(days=400, hours=3), NOW - timedelta(days=370, hours=14)),
+                 ("within one day", NOW - timedelta(days=3, hours=20), NOW - timedelta(days=3, hours=2))]
+
+    print(f"\n{'scenario':<30} {'query':<10} {'p50 ms':>9} {'p99 ms':>9} {'rows':>9}")
+    with Session(engine) as db:
+        for name, date_from, date_to in scenarios:
+            results = []
+            for label, build in (("aggregate", aggregate_totals), ("rollups", rollup_totals)):
+                latencies, totals = measure(db, build, user, date_from, date_to, args.repeat)
+                results.append(totals)
+                print(f"{name:<30} {label:<10} {statistics.median(latencies):>9.2f} "
+                      f"{percentile(latencies, 99):>9.2f} {totals.total_count or 0:>9,}")
+            aggregate, rollups = results
+            assert aggregate.total_count == rollups.total_count, (aggregate, rollups)
+            assert abs((aggregate.outgoing_total or 0) - (rollups.outgoing_total or 0)) < 0.01, (aggregate, rollups)
+
+
+if __name__ == "__main__":
+    main()
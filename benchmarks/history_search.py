@@ -0,0 +1,154 @@
+"""
+History search latency, LIKE '%word%' over the user's transactions vs. the full-text index (q=).
+
+Seeds a SQLite database built from the Alembic chain (so it carries the FTS5 table and its triggers) with
+`--rows` transactions whose descriptions are 2-4 words drawn from a skewed `--vocabulary`. One user takes part
+in `--hot-share` of them, the rest are spread evenly. Searches for a rare, a medium and a common word, and two
+words together, and reads the first page of 30 (newest first and by relevance) plus the number of matches, as the
+history endpoint does, once with a case-insensitive LIKE per word and once with TransactionSearch.
+The seeded file is reused on later runs when it already holds the requested row count.
+
+Targets at 10M rows: p99 under 25 ms for a typical user, and under 350 ms for a user in 2% of all transfers
+(200k rows) when the words match less than 1% of their history. Words found in a large share of a long history
+cost about as much as LIKE, counting the matches for the totals dominates.
+
+    python -m benchmarks.history_search --rows 10000000
+    python -m benchmarks.history_search --rows 1000000 --db /tmp/search_1m.db
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, create_engine, func, select, text
+from sqlalchemy.orm import Session
+
+from app.infrestructure.migrations import run_migrations
+from app.models import Transaction, TransactionSearch
+from app.models.transaction import UserTransactionsQuery
+
+HOT_USER = 1
+CHUNK = 100_000
+PAGE = 30
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def word(i: int) -> str:
+    return f"w{i:04d}"
+
+
+def seed(engine, rows: int, users: int, vocabulary: int, hot_share: float):
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT count(*) FROM transactions")).scalar() == rows:
+            print(f"Reusing seeded database with {rows:,} transactions")
+            return
+        for table in ("transactions", "users", "currencies"):
+            connection.execute(text(f"DELETE FROM {table}"))
+        connection.commit()
+
+    started = time.perf_counter()
+    rng = random.Random(42)
+    # Word i is drawn with weight 1 / (i + 1), so w0000 is common and the tail is rare
+    weights = [1 / (i + 1) for i in range(vocabulary)]
+    now = datetime(2025, 1, 1)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("INSERT INTO currencies (id, code) VALUES (1, 'EUR')")
+        cursor.executemany(
+            "INSERT INTO users (id, username, hashed_password, email, phone_number, created_at, balance, "
+            "reserved_balance, admin, status, forced_password_reset) "
+            "VALUES (?, ?, 'x', ?, ?, ?, 0, 0, 0, 'active', 0)",
+            [(i, f"user{i}", f"user{i}@example.com", f"{i:010d}", now) for i in range(1, users + 1)])
+
+        for start in range(0, rows, CHUNK):
+            batch = []
+            count = min(rows, start + CHUNK) - start
+            words = rng.choices(range(vocabulary), weights, k=4 * count)
+            for i in range(count):
+                sender, receiver = rng.randint(2, users), rng.randint(2, users)
+                if rng.random() < hot_share:
+                    if rng.random() < 0.5:
+                        sender = HOT_USER
+                    else:
+                        receiver = HOT_USER
+                description = " ".join(word(w) for w in words[4 * i:4 * i + rng.randint(2, 4)])
+                batch.append((sender, receiver, round(rng.uniform(1, 500), 2),
+                              now - timedelta(seconds=rows - start - i), description))
+            cursor.executemany(
+                "INSERT INTO transactions (sender_id, receiver_id, amount, date, status, recurring, currency_id, "
+                "description) VALUES (?, ?, ?, ?, 'completed', 0, 1, ?)", batch)
+            raw.commit()
+            print(f"  seeded {min(rows, start + CHUNK):,} rows", end="\r")
+        cursor.execute("ANALYZE")
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"Seeded {rows:,} transactions for {users:,} users in {time.perf_counter() - started:.1f}s")
+
+
+def like_builder(user_id: int, query: str, order_by: str) -> UserTransactionsQuery:
+    # No relevance without an index, LIKE results are always newest first
+    words = TransactionSearch(query, "sqlite", user_id).words
+    return UserTransactionsQuery(user_id).where(and_(*(Transaction.description.icontains(w) for w in words)))
+
+
+def fts_builder(user_id: int, query: str, order_by: str) -> UserTransactionsQuery:
+    search = TransactionSearch(query, "sqlite", user_id)
+    return UserTransactionsQuery(user_id, order_by=order_by, rank=search.rank).where(search.criterion())
+
+
+def measure(engine, build, user_ids, query: str, order_by: str, repeat: int):
+    latencies, found = [], 0
+    with Session(engine) as db:
+        for _ in range(repeat):
+            for user_id in user_ids:
+                start = time.perf_counter()
+                builder = build(user_id, query, order_by)
+                page, _ = builder.statement(PAGE)
+                db.execute(page).scalars().all()
+                matches = db.execute(select(func.count()).select_from(builder.subquery())).scalar()
+                latencies.append((time.perf_counter() - start) * 1000)
+                found = max(found, matches)
+                db.expunge_all()
+    return latencies, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=5_000)
+    parser.add_argument("--hot-share", type=float, default=0.02, help="share of rows involving the hot user")
+    parser.add_argument("--db", default="/tmp/wallet_search_bench.db")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    run_migrations(engine)
+    seed(engine, args.rows, args.users, args.vocabulary, args.hot_share)
+
+    typical = random.Random(7).sample(range(2, args.users + 1), 20)
+    queries = [("rare word", word(args.vocabulary - 1)), ("medium word", word(50)), ("common word", word(0)),
+               ("two words", f"{word(0)} {word(50)}")]
+    scenarios = [("hot user", [HOT_USER], args.repeat), ("20 typical users", typical, max(1, args.repeat // 4))]
+
+    print(f"\n{'scenario':<18} {'query':<12} {'order':<10} {'search':<6} {'p50 ms':>9} {'p99 ms':>9} {'matches':>9}")
+    for name, user_ids, repeat in scenarios:
+        for label, query in queries:
+            for order_by in ("date_desc", "relevance"):
+                for kind, build in (("LIKE", like_builder), ("FTS", fts_builder)):
+                    if kind == "LIKE" and order_by == "relevance":
+                        continue
+                    latencies, found = measure(engine, build, user_ids, query, order_by, repeat)
+                    print(f"{name:<18} {label:<12} {order_by:<10} {kind:<6} {statistics.median(latencies):>9.2f} "
+                          f"{percentile(latencies, 99):>9.2f} {found:>9,}")
+
+
+if __name__ == "__main__":
+    main()
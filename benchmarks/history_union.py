@@ -0,0 +1,133 @@
+"""
+"My transactions" page latency, OR predicate vs. the UNION ALL builder (UserTransactionsQuery).
+
+Seeds a SQLite database built from the Alembic chain (so it carries the production indexes) with
+`--rows` transactions. One user takes part in `--hot-share` of them, the rest are spread evenly.
+The seeded file is reused on later runs when it already holds the requested row count.
+
+    python -m benchmarks.history_union --rows 10000000
+    python -m benchmarks.history_union --rows 1000000 --db /tmp/history_1m.db
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.infrestructure.migrations import run_migrations
+from app.models.transaction import Transaction, UserTransactionsQuery
+
+HOT_USER = 1
+CHUNK = 100_000
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def seed(engine, rows: int, users: int, hot_share: float):
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT count(*) FROM transactions")).scalar() == rows:
+            print(f"Reusing seeded database with {rows:,} transactions")
+            return
+        connection.execute(text("DELETE FROM transactions"))
+        connection.execute(text("DELETE FROM users"))
+        connection.execute(text("DELETE FROM currencies"))
+        connection.commit()
+
+    started = time.perf_counter()
+    rng = random.Random(42)
+    now = datetime(2025, 1, 1)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("INSERT INTO currencies (id, code) VALUES (1, 'EUR')")
+        cursor.executemany(
+            "INSERT INTO users (id, username, hashed_password, email, phone_number, created_at, balance, "
+            "reserved_balance, admin, status, forced_password_reset) "
+            "VALUES (?, ?, 'x', ?, ?, ?, 0, 0, 0, 'active', 0)",
+            [(i, f"user{i}", f"user{i}@example.com", f"{i:010d}", now) for i in range(1, users + 1)])
+
+        statuses = ["completed"] * 17 + ["pending", "awaiting_acceptance", "denied"]
+        for start in range(0, rows, CHUNK):
+            batch = []
+            for i in range(start, min(rows, start + CHUNK)):
+                sender, receiver = rng.randint(2, users), rng.randint(2, users)
+                if rng.random() < hot_share:
+                    if rng.random() < 0.5:
+                        sender = HOT_USER
+                    else:
+                        receiver = HOT_USER
+                batch.append((sender, receiver, round(rng.uniform(1, 500), 2),
+                              now - timedelta(seconds=rows - i), rng.choice(statuses)))
+            cursor.executemany(
+                "INSERT INTO transactions (sender_id, receiver_id, amount, date, status, recurring, currency_id) "
+                "VALUES (?, ?, ?, ?, ?, 0, 1)", batch)
+            raw.commit()
+            print(f"  seeded {min(rows, start + CHUNK):,} rows", end="\r")
+        cursor.execute("ANALYZE")
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"Seeded {rows:,} transactions for {users:,} users in {time.perf_counter() - started:.1f}s")
+
+
+def or_page(user_id: int, limit: int, offset: int):
+    builder = UserTransactionsQuery(user_id)
+    return (select(Transaction)
+            .where(or_(Transaction.sender_id == user_id, Transaction.receiver_id == user_id))
+            .order_by(*builder.ordering())
+            .offset(offset)
+            .limit(limit))
+
+
+def union_page(user_id: int, limit: int, offset: int):
+    query, _ = UserTransactionsQuery(user_id).statement(limit, offset)
+    return query
+
+
+def measure(engine, build, user_ids, limit: int, offset: int, repeat: int) -> list:
+    latencies = []
+    with Session(engine) as db:
+        for _ in range(repeat):
+            for user_id in user_ids:
+                query = build(user_id, limit, offset)
+                start = time.perf_counter()
+                db.execute(query).scalars().all()
+                latencies.append((time.perf_counter() - start) * 1000)
+                db.expunge_all()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--hot-share", type=float, default=0.02, help="share of rows involving the hot user")
+    parser.add_argument("--db", default="/tmp/wallet_history_bench.db")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    run_migrations(engine)
+    seed(engine, args.rows, args.users, args.hot_share)
+
+    typical = random.Random(7).sample(range(2, args.users + 1), 20)
+    scenarios = [("hot user, first page", [HOT_USER], 0, args.repeat),
+                 ("hot user, page 50", [HOT_USER], 49 * args.limit, args.repeat),
+                 ("20 typical users, first page", typical, 0, max(1, args.repeat // 4))]
+
+    print(f"\n{'scenario':<30} {'query':<10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, user_ids, offset, repeat in scenarios:
+        for label, build in (("OR", or_page), ("UNION ALL", union_page)):
+            latencies = measure(engine, build, user_ids, args.limit, offset, repeat)
+            print(f"{name:<30} {label:<10} {statistics.median(latencies):>9.2f} {percentile(latencies, 99):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
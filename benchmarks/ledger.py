@@ -0,0 +1,117 @@
+"""
+Cost of the ledger: accept_transaction latency with and without the journal insert, and historical balance
+latency with and without snapshots.
+
+Seeds a SQLite file with `--users` users, then confirms and accepts `--transfers` transfers between random users
+through TransactionService, once with LedgerService.record disabled and once writing the journal, and reports the
+accept latency percentiles. Afterwards it seeds `--history` ledger entries for one user and times
+LedgerService.balance_at before and after taking snapshots.
+
+    python -m benchmarks.ledger --transfers 2000 --history 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.business.payment.ledger import LedgerService
+from app.business.transaction import TransactionService
+from app.infrestructure import Base
+from app.models import Currency, LedgerEntry, Transaction, User
+from app.models.transaction import TransactionStatus
+from app.models.user import UserStatus
+
+
+def seed(db, users: int) -> list:
+    db.add(Currency(id=1, code="EUR"))
+    accounts = [User(username=f"user{i}", hashed_password="x", email=f"user{i}@example.com",
+                     phone_number=f"{i:010d}", balance=1_000_000, status=UserStatus.ACTIVE)
+                for i in range(users)]
+    db.add_all(accounts)
+    db.commit()
+    return accounts
+
+
+def accept_latencies(db, accounts: list, transfers: int) -> list:
+    rng = random.Random(7)
+    latencies = []
+    for _ in range(transfers):
+        sender, receiver = rng.sample(accounts, 2)
+        transaction = Transaction(sender_id=sender.id, receiver_id=receiver.id, amount=float(rng.randint(1, 100)),
+                                  date=datetime.now(), status=TransactionStatus.PENDING, recurring=False,
+                                  currency_id=1)
+        db.add(transaction)
+        db.commit()
+        TransactionService.confirm_transaction(db, sender, transaction.id)
+
+        started = time.perf_counter()
+        TransactionService.accept_transaction(db, receiver, transaction.id)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    print(f"{name:>16} {statistics.mean(latencies):>9.2f} {latencies[len(latencies) // 2]:>9.2f} "
+          f"{latencies[int(len(latencies) * 0.99)]:>9.2f}")
+
+
+def historical(db, user: User, entries: int):
+    rng = random.Random(11)
+    start = datetime(2024, 1, 1)
+    step = timedelta(days=365) / entries
+    rows = [{"user_id": user.id, "account": "wallet", "kind": "transfer", "reference_id": None,
+             "amount": float(rng.randint(-50, 60)), "created_at": start + step * i} for i in range(entries)]
+    for low in range(0, entries, 50_000):
+        db.execute(insert(LedgerEntry.__table__), rows[low:low + 50_000])
+    db.commit()
+
+    at = start + timedelta(days=360)
+
+    def timed() -> float:
+        started = time.perf_counter()
+        LedgerService.balance_at(db, user.id, at)
+        return (time.perf_counter() - started) * 1000
+
+    print(f"\nbalance_at over {entries:,} entries")
+    print(f"{'no snapshot':>16} {statistics.median(timed() for _ in range(5)):>9.2f} ms")
+    for taken_on in (300, 359):
+        LedgerService.take_snapshots(db, now=start + timedelta(days=taken_on), min_entries=1, settle_seconds=0)
+    print(f"{'with snapshots':>16} {statistics.median(timed() for _ in range(5)):>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--transfers", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=200_000)
+    parser.add_argument("--db", default="/tmp/wallet_ledger_bench.db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        accounts = seed(db, args.users)
+        print(f"\naccept_transaction latency over {args.transfers:,} transfers (ms)")
+        print(f"{'':>16} {'mean':>9} {'p50':>9} {'p99':>9}")
+        with patch.object(LedgerService, "record"):
+            report("without ledger", accept_latencies(db, accounts, args.transfers))
+        report("with ledger", accept_latencies(db, accounts, args.transfers))
+        historical(db, accounts[0], args.history)
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
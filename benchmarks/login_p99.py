@@ -0,0 +1,106 @@
+"""
+Login latency under mixed concurrent traffic, bcrypt inline vs. the hashing process pool.
+
+Requests are dispatched like FastAPI dispatches them: sync endpoints (the inline login and the light requests) on
+starlette's run_in_threadpool, 40 threads by default, and the pooled login on the event loop, awaiting the hashing
+pool like the async login endpoint. Logins verify a bcrypt hash, light requests simulate a short DB-bound endpoint.
+Logins beyond `--max-pending` queued hashes (HASH_POOL_MAX_PENDING by default) are shed with 503, the login
+percentiles cover the served ones and are printed next to the shed rate.
+
+    python -m benchmarks.login_p99 --logins 200 --light 400
+    python -m benchmarks.login_p99 --logins 100 --max-pending 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.config import HASH_POOL_MAX_PENDING
+from app.infrestructure import auth
+from app.infrestructure.hashing import HashingPool, bcrypt_context, bcrypt_hash
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def light_endpoint():
+    sum(range(20_000))
+    time.sleep(0.002)
+
+
+async def run_mode(name: str, login_fn, logins: int, light: int, spacing: float):
+    latencies = {"login": [], "light": []}
+    shed = 0
+
+    async def timed(kind, fn, *args):
+        nonlocal shed
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                await fn(*args)
+            else:
+                await run_in_threadpool(fn, *args)
+        except HTTPException:
+            shed += 1
+            return
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    tasks = []
+    kinds = ["login"] * logins + ["light"] * light
+    kinds = [kinds[i] for i in sorted(range(len(kinds)), key=lambda i: (i * 7919) % len(kinds))]
+    for kind in kinds:
+        if kind == "login":
+            tasks.append(asyncio.create_task(timed("login", login_fn)))
+        else:
+            tasks.append(asyncio.create_task(timed("light", light_endpoint)))
+        await asyncio.sleep(spacing)
+
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    # Login percentiles only cover the logins that were served, read them together with the shed rate
+    print(f"{name:>8} | login p50 {statistics.median(latencies['login'] or [0]):8.1f} ms"
+          f" p99 {percentile(latencies['login'], 99):8.1f} ms"
+          f" shed {shed}/{logins} ({shed / logins:.0%} 503)"
+          f" | light p50 {statistics.median(latencies['light'] or [0]):7.1f} ms"
+          f" p99 {percentile(latencies['light'], 99):8.1f} ms"
+          f" | drain {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--light", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=HASH_POOL_MAX_PENDING)
+    parser.add_argument("--spacing", type=float, default=0.005, help="Seconds between request arrivals")
+    args = parser.parse_args()
+
+    hashed = bcrypt_hash("ValidPass123!")
+
+    def inline_login():
+        bcrypt_context.verify("ValidPass123!", hashed)
+
+    pool = HashingPool(workers=args.workers, max_pending=args.max_pending)
+    auth.hashing_pool = pool
+    pool.call(bcrypt_hash, "warmup")
+
+    async def pooled_login():
+        await auth.check_hashed_password_async("ValidPass123!", hashed)
+
+    asyncio.run(run_mode("inline", inline_login, args.logins, args.light, args.spacing))
+    asyncio.run(run_mode("pool", pooled_login, args.logins, args.light, args.spacing))
+    print(pool.stats())
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
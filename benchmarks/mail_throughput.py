@@ -0,0 +1,110 @@
+"""
+Mail sending throughput, one requests.post per message vs. the pooled MailTransport.
+
+Starts a local stand-in for the Mailgun messages API that answers every POST after `--latency` seconds
+and counts the TCP connections it accepts, then sends `--messages` e-mails with each strategy:
+
+    python -m benchmarks.mail_throughput --messages 500 --latency 0.02 --concurrency 10
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.infrestructure.mail_transport import MailTransport
+
+
+class StandInMailServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), MailHandler)
+        self.latency = latency
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class MailHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        body = b'{"message": "Queued. Thank you."}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def message(i: int) -> dict:
+    return {"from": "VWallet <admin@vwallet.ninja>",
+            "to": f"user{i} <user{i}@example.com>",
+            "subject": "Transaction Completed",
+            "text": "Your transaction has been completed." * 5}
+
+
+def legacy_post(url: str, i: int):
+    return requests.post(url=f"{url}v3/vwallet.ninja/messages", auth=("api", "key"), data=message(i))
+
+
+def run(name: str, server: StandInMailServer, messages: int, send):
+    server.connections = 0
+    start = time.perf_counter()
+    statuses = send()
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for status in statuses if status == 200)
+    print(f"{name:<40} {messages / elapsed:>10.1f} {server.connections:>12} {ok:>6}/{messages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in server response time in seconds")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    server = StandInMailServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = server.url
+
+    transport = MailTransport(base_url=url, api_key="key",
+                              max_connections=args.concurrency, concurrency=args.concurrency)
+    n = args.messages
+
+    print(f"{'strategy':<40} {'msg/s':>10} {'connections':>12} {'ok':>10}")
+    try:
+        run("requests.post, sequential", server, n,
+            lambda: [legacy_post(url, i).status_code for i in range(n)])
+        run(f"requests.post, {args.concurrency} threads", server, n,
+            lambda: [r.status_code for r in ThreadPoolExecutor(args.concurrency).map(
+                lambda i: legacy_post(url, i), range(n))])
+        run("MailTransport.send_sync, sequential", server, n,
+            lambda: [transport.send_sync(message(i)).status_code for i in range(n)])
+        run(f"MailTransport.send_many, {args.concurrency} in flight", server, n,
+            lambda: [r.status_code for r in asyncio.run(transport.send_many(message(i) for i in range(n)))])
+    finally:
+        transport.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
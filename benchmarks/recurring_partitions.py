@@ -0,0 +1,66 @@
+"""
+Recurring transaction run scaling across 1-16 workers, partitioned by sender_id.
+
+Reuses the seeded database of `recurring_executor` and runs RecurringService.execute_partitioned on a fresh
+copy for every worker count, reporting total throughput and the fastest/slowest partition.
+SQLite serialises writers, so the file database shows partitioning overhead rather than speed-up;
+point `--db-url` at a PostgreSQL copy of the seeded schema to measure real scaling.
+
+    python -m benchmarks.recurring_partitions --schedules 100000 --workers 1 2 4 8 16
+    python -m benchmarks.recurring_partitions --pool process --workers 1 4
+"""
+import argparse
+import os
+import shutil
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.business.transaction.transactions_recurring import RecurringService
+from benchmarks.recurring_executor import NOW, seed
+
+
+def run(workers: int, pool: str, db_url: str, chunk_size: int):
+    engine = create_engine(db_url, connect_args={"timeout": 60} if db_url.startswith("sqlite") else {})
+    try:
+        results = RecurringService.execute_partitioned(workers=workers, now=NOW, pool=pool,
+                                                       session_factory=sessionmaker(bind=engine),
+                                                       db_url=db_url, chunk_size=chunk_size)
+    finally:
+        engine.dispose()
+
+    timings = [p["seconds"] for p in results["partitions"]]
+    print(f"{workers:>8} {pool:>8} {results['due']:>10,} {results['seconds']:>9.2f} "
+          f"{results['per_second']:>13,.0f} {min(timings):>9.2f} {max(timings):>9.2f} {results['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--db", default="/tmp/wallet_recurring_bench.db")
+    parser.add_argument("--db-url", help="pre-seeded database to run against instead of a SQLite copy")
+    args = parser.parse_args()
+
+    if not args.db_url:
+        seed(args.db, args.schedules, args.users, due_share=1.0)
+
+    print(f"\n{'workers':>8} {'pool':>8} {'schedules':>10} {'seconds':>9} {'schedules/s':>13} "
+          f"{'min part':>9} {'max part':>9} {'errors':>7}")
+    for workers in args.workers:
+        if args.db_url:
+            run(workers, args.pool, args.db_url, args.chunk_size)
+            continue
+        path = f"{args.db}.{workers}"
+        shutil.copy(args.db, path)
+        try:
+            run(workers, args.pool, f"sqlite:///{path}", args.chunk_size)
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Accepting many pending requests: one update_transaction_status call per transaction vs. one batch.
+
+Seeds a SQLite file with one receiver and `--senders` senders, each with confirmed transfers awaiting the
+receiver, then accepts `--requests` of them one at a time through TransactionService and another
+`--requests` with TransactionBatchService. Reports wall time, SQL statements and commits for each.
+
+    python -m benchmarks.status_batch --requests 50
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.business.transaction import TransactionBatchService, TransactionService
+from app.infrestructure import Base
+from app.models import Currency, Transaction, User
+from app.models.transaction import TransactionStatus, TransactionUpdateStatus
+from app.models.user import UserStatus
+from app.schemas.transaction import TransactionBatchItem, TransactionStatusUpdate
+
+
+def seed(db, senders: int, requests: int):
+    db.add(Currency(id=1, code="EUR"))
+    accounts = [User(username=f"user{i}", hashed_password="x", email=f"user{i}@example.com",
+                     phone_number=f"{i:010d}", balance=1_000_000, reserved_balance=10_000, status=UserStatus.ACTIVE)
+                for i in range(senders + 1)]
+    db.add_all(accounts)
+    db.commit()
+    receiver, senders = accounts[0], accounts[1:]
+    db.execute(insert(Transaction), [{"sender_id": senders[i % len(senders)].id, "receiver_id": receiver.id,
+                                      "amount": 10.0, "date": datetime.now(), "currency_id": 1, "recurring": False,
+                                      "status": TransactionStatus.AWAITING_ACCEPTANCE} for i in range(2 * requests)])
+    db.commit()
+    return receiver
+
+
+def one_by_one(db, receiver: User, transaction_ids: list):
+    for transaction_id in transaction_ids:
+        TransactionService.update_transaction_status(db, receiver, transaction_id,
+                                                     TransactionStatusUpdate(action=TransactionUpdateStatus.ACCEPT))
+
+
+def batch(db, receiver: User, transaction_ids: list):
+    TransactionBatchService.update_statuses(db, receiver, [
+        TransactionBatchItem(transaction_id=transaction_id, action=TransactionUpdateStatus.ACCEPT)
+        for transaction_id in transaction_ids])
+
+
+def measure(name: str, engine, db, receiver: User, transaction_ids: list, run):
+    counts = {"statements": 0, "commits": 0}
+    on_statement = lambda *_: counts.__setitem__("statements", counts["statements"] + 1)
+    on_commit = lambda *_: counts.__setitem__("commits", counts["commits"] + 1)
+    event.listen(engine, "before_cursor_execute", on_statement)
+    event.listen(engine, "commit", on_commit)
+    started = time.perf_counter()
+    run(db, receiver, transaction_ids)
+    elapsed = (time.perf_counter() - started) * 1000
+    event.remove(engine, "before_cursor_execute", on_statement)
+    event.remove(engine, "commit", on_commit)
+    print(f"{name:>12} {elapsed:>9.1f} {counts['statements']:>11,} {counts['commits']:>8,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--senders", type=int, default=10)
+    parser.add_argument("--db", default="/tmp/wallet_status_batch_bench.db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        receiver = seed(db, args.senders, args.requests)
+        transaction_ids = list(range(1, 2 * args.requests + 1))
+        print(f"\naccepting {args.requests:,} requests from {args.senders:,} senders")
+        print(f"{'':>12} {'ms':>9} {'statements':>11} {'commits':>8}")
+        measure("one by one", engine, db, receiver, transaction_ids[:args.requests], one_by_one)
+        measure("batch", engine, db, receiver, transaction_ids[args.requests:], batch)
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
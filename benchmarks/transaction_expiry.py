@@ -0,0 +1,116 @@
+"""
+Expiry sweep throughput and lock footprint on a large backlog of transfers awaiting acceptance.
+
+Seeds a SQLite file with `--transfers` expired transfers from `--senders` senders, then expires them with
+TransactionService.cancel_transaction one at a time (on the first `--baseline` transfers only) and with
+TransactionExpiryService at several batch sizes, restoring the backlog between runs. For each run it reports
+transfers/s and how long the write transactions stayed open, which is how long other writers wait on SQLite
+and how long the cancelled rows and their senders stay locked on PostgreSQL.
+
+    python -m benchmarks.transaction_expiry --transfers 200000 --batches 100,1000,10000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app.business.transaction import TransactionService
+from app.business.transaction.transaction_expiry import TransactionExpiryService
+from app.infrestructure import Base
+from app.models import Currency, NotificationOutbox, Transaction, User
+from app.models.transaction import TransactionStatus
+from app.models.user import UserStatus
+
+RESERVED = 1_000_000
+
+
+def seed(db, senders: int, transfers: int):
+    db.add(Currency(id=1, code="EUR"))
+    db.add_all([User(username=f"user{i}", hashed_password="x", email=f"user{i}@example.com",
+                     phone_number=f"{i:010d}", balance=2 * RESERVED, reserved_balance=RESERVED,
+                     status=UserStatus.ACTIVE)
+                for i in range(senders + 1)])
+    db.commit()
+
+    rng = random.Random(3)
+    start = datetime.now() - timedelta(days=60)
+    rows = [{"sender_id": rng.randint(2, senders + 1), "receiver_id": 1, "amount": float(rng.randint(1, 50)),
+             "date": start + timedelta(seconds=i), "awaiting_since": start + timedelta(seconds=i),
+             "currency_id": 1, "recurring": False,
+             "status": TransactionStatus.AWAITING_ACCEPTANCE} for i in range(transfers)]
+    for low in range(0, transfers, 50_000):
+        db.execute(insert(Transaction), rows[low:low + 50_000])
+    db.commit()
+
+
+def reset(db):
+    db.execute(update(Transaction).values(status=TransactionStatus.AWAITING_ACCEPTANCE)
+               .execution_options(synchronize_session=False))
+    db.execute(update(User).values(reserved_balance=RESERVED).execution_options(synchronize_session=False))
+    db.query(NotificationOutbox).delete()
+    db.commit()
+    db.expunge_all()
+
+
+def one_by_one(db, limit: int) -> int:
+    transactions = db.query(Transaction).order_by(Transaction.id).limit(limit).all()
+    # cancel_transaction prints every cancellation
+    with contextlib.redirect_stdout(io.StringIO()):
+        for transaction in transactions:
+            TransactionService.cancel_transaction(db, transaction.sender, transaction.id)
+    return len(transactions)
+
+
+def measure(name: str, engine, run):
+    durations, opened = [], []
+    on_begin = lambda conn: opened.append(time.perf_counter())
+    on_commit = lambda conn: durations.append((time.perf_counter() - opened.pop()) * 1000) if opened else None
+    event.listen(engine, "begin", on_begin)
+    event.listen(engine, "commit", on_commit)
+    started = time.perf_counter()
+    expired = run()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "begin", on_begin)
+    event.remove(engine, "commit", on_commit)
+    print(f"{name:>14} {expired:>9,} {expired / elapsed:>12,.0f} {len(durations):>9,} "
+          f"{statistics.median(durations):>9.2f} {max(durations):>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transfers", type=int, default=200_000)
+    parser.add_argument("--senders", type=int, default=2000)
+    parser.add_argument("--baseline", type=int, default=2000)
+    parser.add_argument("--batches", default="100,1000,10000")
+    parser.add_argument("--db", default="/tmp/wallet_expiry_bench.db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        seed(db, args.senders, args.transfers)
+        print(f"\n{args.transfers:,} expired transfers from {args.senders:,} senders")
+        print(f"{'':>14} {'expired':>9} {'transfers/s':>12} {'commits':>9} {'p50 ms':>9} {'max ms':>9}")
+        measure("one by one", engine, lambda: one_by_one(db, args.baseline))
+        for batch_size in map(int, args.batches.split(",")):
+            reset(db)
+            measure(f"batch {batch_size:,}", engine,
+                    lambda: TransactionExpiryService.expire(db, ttl=86400, batch_size=batch_size)["expired"])
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
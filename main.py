@@ -5,27 +5,45 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
 from app import *
+from app.business.transaction.transaction_outbox import outbox_dispatcher
+from app.business.payment.ledger import LedgerService
+from app.business.user.balance_shards import BalanceShardService
 from app.business.transaction.transactions_recurring import RecurringService
-from app.infrestructure.database import Base, engine
-from app.infrestructure.scheduler import init_scheduler
+from app.business.transaction.transaction_expiry import TransactionExpiryService
+from app.config import OUTBOX_DISPATCHER_ENABLED
+from app.infrestructure.database import engine
+from app.infrestructure.hashing import hashing_pool
+from app.infrestructure.mail_transport import mail_transport
+from app.infrestructure.migrations import run_migrations
+from app.infrestructure.scheduler import init_scheduler, scheduler_leader
 from fastapi.middleware.cors import CORSMiddleware
 
-# Ensure the database is not missing tables
-Base.metadata.create_all(bind=engine, checkfirst=True)
+# Bring the database schema up to date
+run_migrations(engine)
 
 
 # Create lifespan event handler for FastAPI
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
+    # Jobs are (re-)registered by whichever worker wins the scheduler lease
+    scheduler_leader.on_elected(RecurringService.register_recurring_transactions)
+    scheduler_leader.on_elected(BalanceShardService.register_compactor)
+    scheduler_leader.on_elected(LedgerService.register_snapshots)
+    scheduler_leader.on_elected(TransactionExpiryService.register_expiry)
     scheduler = init_scheduler()
-    RecurringService.register_recurring_transactions()
+    if OUTBOX_DISPATCHER_ENABLED:
+        outbox_dispatcher.start()
     try:
         yield
     finally:
         # Shutdown logic
+        await outbox_dispatcher.stop()
+        scheduler_leader.stop()
         if scheduler.running:
             scheduler.shutdown()
+        hashing_pool.shutdown()
+        mail_transport.close()
 
 
 # FastAPI app
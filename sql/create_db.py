@@ -1,16 +1,7 @@
-from app.infrestructure.database import Base, engine
-import app.models.user
-import app.models.card
-import app.models.category
-import app.models.contact
-import app.models.currency
-import app.models.deposit
-import app.models.recurring_transaction_history
-import app.models.recurring_transation
-import app.models.transaction
-import app.models.withdrawal
+from app.infrestructure.database import engine
+from app.infrestructure.migrations import run_migrations
 
 if __name__ == "__main__":
-    print("Creating all tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Database schema created successfully.") 
\ No newline at end of file
+    print("Applying migrations...")
+    run_migrations(engine)
+    print("Database schema created successfully.")
@@ -2,12 +2,17 @@
 Base test class with common utilities and mocks for all test cases.
 """
 import unittest
+from contextlib import contextmanager
 from unittest.mock import Mock, MagicMock, patch
 from typing import Any, Dict
 from datetime import datetime
 
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.infrestructure import Base
 from app.models import User, Transaction, Card, Category, Contact
+from app.models.transaction import TransactionStatus
 from app.models.user import UserStatus as UStatus
 
 
@@ -354,6 +359,68 @@ class BaseTestCase(unittest.TestCase):
         return self.mock_notifications
 
 
+class DatabaseTestCase(BaseTestCase):
+    """Base test case backed by an in-memory SQLite database, for tests that need real SQL."""
+
+    def setUp(self):
+        super().setUp()
+        self.engine = create_engine("sqlite://",
+                                    connect_args={"check_same_thread": False},
+                                    poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine, autoflush=False)()
+        self._users_created = 0
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        super().tearDown()
+
+    def _create_user(self, username: str = None, balance: float = 0.0, **kwargs) -> User:
+        """Insert a user with unique credentials."""
+        self._users_created += 1
+        username = username or f"user{self._users_created}"
+        user = User(username=username,
+                    email=f"{username}@example.com",
+                    phone_number=f"{self._users_created:010d}",
+                    hashed_password="hashed",
+                    balance=balance,
+                    status=kwargs.pop("status", UStatus.ACTIVE),
+                    **kwargs)
+        self.db.add(user)
+        self.db.commit()
+        return user
+
+    def _create_transaction(self, sender: User, receiver: User, amount: float = 10.0,
+                            date: datetime = None, status: TransactionStatus = TransactionStatus.COMPLETED,
+                            **kwargs) -> Transaction:
+        """Insert a transaction between two users."""
+        transaction = Transaction(sender_id=sender.id,
+                                  receiver_id=receiver.id,
+                                  amount=amount,
+                                  date=date or datetime.now(),
+                                  status=status,
+                                  currency_id=kwargs.pop("currency_id", 1),
+                                  **kwargs)
+        self.db.add(transaction)
+        self.db.commit()
+        return transaction
+
+    @contextmanager
+    def count_queries(self):
+        """Collect the SQL statements executed inside the block."""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(self.engine, "before_cursor_execute", before_cursor_execute)
+
+
 class MockDBSession:
     """Mock database session context manager."""
     
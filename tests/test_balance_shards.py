@@ -0,0 +1,157 @@
+"""
+Tests for sharded credits of hot receiving accounts and the BalanceShardService compactor.
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction.transaction_validators import TransactionValidators
+from app.business.user.balance_shards import BalanceShardService
+from app.infrestructure import Base
+from app.models import BalanceShard, User
+
+
+class TestBalanceShards(DatabaseTestCase):
+    """Test cases for User.credit with sharded credits, the fold on read and the compactor."""
+
+    def setUp(self):
+        super().setUp()
+        self.merchant = self._create_user("merchant", balance=10)
+        self.alice = self._create_user("alice", balance=100)
+
+    def _shards(self, user) -> dict:
+        return dict(self.db.execute(select(BalanceShard.shard, BalanceShard.amount)
+                                    .where(BalanceShard.user_id == user.id)).all())
+
+    def _credit(self, user, *amounts):
+        for amount in amounts:
+            user.credit(amount)
+        self.db.commit()
+
+    def test_credits_land_in_shards(self):
+        """Test credits of a sharded user go to its shard rows and leave the users row alone."""
+        status = BalanceShardService.set_credit_shards(self.db, self.merchant.id, 4)
+        self._credit(self.merchant, 5, 7, 8)
+
+        self.assertEqual(status, {"user_id": self.merchant.id, "credit_shards": 4, "balance": 10,
+                                  "pending_credits": 0})
+        self.assertEqual(len(self._shards(self.merchant)), 4)
+        self.assertEqual(sum(self._shards(self.merchant).values()), 20)
+        self.assertEqual(self.merchant.balance, 10)
+
+        self.assertEqual(self.merchant.fold_credit_shards(), 20)
+        self.db.commit()
+        self.assertEqual(self.merchant.balance, 30)
+        self.assertEqual(set(self._shards(self.merchant).values()), {0})
+
+    def test_balance_checks_fold_pending_credits(self):
+        """Test reservations and balance validation count credits that are still in the shards."""
+        BalanceShardService.set_credit_shards(self.db, self.merchant.id, 2)
+        self._credit(self.merchant, 15, 15)
+
+        TransactionValidators.validate_sufficient_available_balance(self.merchant, 35)
+        self.merchant.reserve_funds(40)
+        self.db.commit()
+
+        self.assertEqual((self.merchant.balance, self.merchant.reserved_balance), (40, 40))
+        with self.assertRaises(ValueError):
+            self.merchant.reserve_funds(1)
+
+    def test_compact_folds_every_user(self):
+        """Test the compactor folds the shards of all users in batches and skips users without credits."""
+        BalanceShardService.set_credit_shards(self.db, self.merchant.id, 3)
+        BalanceShardService.set_credit_shards(self.db, self.alice.id, 3)
+        idle = self._create_user("idle")
+        BalanceShardService.set_credit_shards(self.db, idle.id, 3)
+        self._credit(self.merchant, 1, 2, 3)
+        self._credit(self.alice, 4)
+
+        with self.count_queries() as statements:
+            result = BalanceShardService.compact(self.db, batch_size=1)
+
+        self.assertEqual(result, {"users": 2, "folded": 10})
+        # per batch: pick the users, claim their shards, reset the claimed shards, add to the balances
+        self.assertEqual(len(statements), 2 * 4 + 1)
+        self.db.refresh(self.merchant)
+        self.db.refresh(self.alice)
+        self.assertEqual((self.merchant.balance, self.alice.balance), (16, 104))
+        self.assertEqual(BalanceShardService.compact(self.db), {"users": 0, "folded": 0})
+
+    def test_disabling_folds_and_removes_shards(self):
+        """Test switching back to direct credits keeps the pending credits and drops the empty shard rows."""
+        BalanceShardService.set_credit_shards(self.db, self.merchant.id, 4)
+        self._credit(self.merchant, 6, 6)
+
+        status = BalanceShardService.set_credit_shards(self.db, self.merchant.id, 0)
+        self._credit(self.merchant, 3)
+
+        self.assertEqual(status["credit_shards"], 0)
+        self.assertEqual(self._shards(self.merchant), {})
+        self.assertEqual(self.merchant.balance, 25)
+
+    def test_shard_count_is_bounded(self):
+        """Test a shard count outside 0..BALANCE_SHARDS_MAX is rejected."""
+        with self.assertRaises(HTTPException) as context:
+            BalanceShardService.set_credit_shards(self.db, self.merchant.id, -1)
+
+        self.assertEqual(context.exception.status_code, 400)
+
+
+class TestConcurrentFolds(DatabaseTestCase):
+    """Test cases for folds of the same user from concurrent sessions, on a file database shared by the threads."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        super().setUp()
+        self.db.close()
+        self.engine.dispose()
+        self.engine = create_engine(f"sqlite:///{self.path}", connect_args={"timeout": 30})
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, autoflush=False)
+        self.db = self.session_factory()
+        self._users_created = 0
+        self.merchant = self._create_user("merchant", balance=10)
+        BalanceShardService.set_credit_shards(self.db, self.merchant.id, 2)
+        self.merchant.credit(5)
+        self.merchant.credit(7)
+        self.db.commit()
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.path)
+
+    def test_concurrent_folds_move_the_credits_once(self):
+        """Test a fold started while another one is uncommitted waits for it and finds nothing left."""
+        folded = []
+
+        def fold():
+            with self.session_factory() as db:
+                folded.append(db.get(User, self.merchant.id).fold_credit_shards())
+                db.commit()
+
+        first = self.session_factory()
+        self.addCleanup(first.close)
+        self.assertEqual(first.get(User, self.merchant.id).fold_credit_shards(), 12)
+        second = threading.Thread(target=fold)
+        second.start()
+        # Let the second fold reach the shards before the first one commits
+        time.sleep(0.5)
+        first.commit()
+        second.join()
+
+        self.assertEqual(folded, [0.0])
+        self.db.expire_all()
+        self.assertEqual(self.db.get(User, self.merchant.id).balance, 22)
+        self.assertEqual(set(self.db.execute(select(BalanceShard.amount)).scalars()), {0})
+
+
+if __name__ == "__main__":
+    unittest.main()
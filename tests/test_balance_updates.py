@@ -0,0 +1,172 @@
+"""
+Tests for the conditional balance UPDATEs of User and the guarded status transitions of TransactionService.
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction import TransactionService
+from app.infrestructure import Base
+from app.models import User
+from app.models.transaction import TransactionStatus
+
+
+class TestBalanceUpdates(DatabaseTestCase):
+    """Test cases for reserve_funds, release_reserved_funds, transfer_from_reserved and credit."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+
+    def test_reserve_checks_available_balance_in_the_update(self):
+        """Test a reservation above the available balance matches no row and leaves the balances untouched."""
+        self.alice.reserve_funds(60)
+        self.db.commit()
+
+        with self.assertRaises(ValueError) as context:
+            self.alice.reserve_funds(50)
+
+        self.assertIn("Available: $40.00", str(context.exception))
+        self.assertEqual((self.alice.balance, self.alice.reserved_balance), (100, 60))
+
+    def test_stale_session_does_not_overwrite_other_reservations(self):
+        """Test a session holding an outdated copy of the user still sees reservations made elsewhere."""
+        other = sessionmaker(bind=self.engine, autoflush=False)()
+        self.addCleanup(other.close)
+        other.get(User, self.alice.id).reserve_funds(70)
+        other.commit()
+
+        self.assertEqual(self.alice.__dict__["reserved_balance"], 0)
+        with self.assertRaises(ValueError):
+            self.alice.reserve_funds(40)
+        self.alice.reserve_funds(30)
+        self.db.commit()
+
+        self.assertEqual(self.alice.reserved_balance, 100)
+
+    def test_transfer_and_release_require_reserved_funds(self):
+        """Test reserved funds can be moved or released once, and never more than were reserved."""
+        self.alice.reserve_funds(30)
+        self.alice.transfer_from_reserved(20)
+        self.bob.credit(20)
+        self.db.commit()
+
+        with self.assertRaises(ValueError):
+            self.alice.transfer_from_reserved(20)
+        with self.assertRaises(ValueError):
+            self.alice.release_reserved_funds(20)
+        self.alice.release_reserved_funds(10)
+        self.db.commit()
+
+        self.assertEqual((self.alice.balance, self.alice.reserved_balance, self.bob.balance), (80, 0, 20))
+
+
+class TestTransactionStatusTransitions(DatabaseTestCase):
+    """Test cases for TransactionService status changes racing on the same transaction."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+        self.transaction = self._create_transaction(self.alice, self.bob, amount=25,
+                                                    status=TransactionStatus.PENDING, recurring=False)
+
+    def test_accept_twice_transfers_once(self):
+        """Test a second accept of the same transaction is rejected instead of failing the completed transfer."""
+        TransactionService.confirm_transaction(self.db, self.alice, self.transaction.id)
+        TransactionService.accept_transaction(self.db, self.bob, self.transaction.id)
+        self.db.refresh(self.transaction)
+        self.transaction.status = TransactionStatus.AWAITING_ACCEPTANCE  # stale copy of a concurrent request
+
+        with self.assertRaises(HTTPException) as context:
+            TransactionService.accept_transaction(self.db, self.bob, self.transaction.id)
+
+        self.assertEqual(context.exception.status_code, 409)
+        self.db.refresh(self.transaction)
+        self.assertEqual(self.transaction.status, TransactionStatus.COMPLETED)
+        self.assertEqual((self.alice.balance, self.alice.reserved_balance, self.bob.balance), (75, 0, 25))
+
+    def test_transition_needs_no_extra_update(self):
+        """Test the status is changed by the guarded UPDATE only, not flushed again on commit."""
+        with self.count_queries() as statements:
+            TransactionService.confirm_transaction(self.db, self.alice, self.transaction.id)
+
+        self.assertEqual(sum(s.startswith("UPDATE transactions") for s in statements), 1)
+        self.assertEqual(self.transaction.status, TransactionStatus.AWAITING_ACCEPTANCE)
+        self.assertEqual(self.alice.reserved_balance, 25)
+
+    def test_cancel_releases_only_confirmed_transactions(self):
+        """Test cancelling a pending transaction leaves other reservations of the sender alone."""
+        self.alice.reserve_funds(40)
+        self.db.commit()
+
+        TransactionService.cancel_transaction(self.db, self.alice, self.transaction.id)
+        self.assertEqual(self.alice.reserved_balance, 40)
+
+        confirmed = self._create_transaction(self.alice, self.bob, amount=10, status=TransactionStatus.PENDING,
+                                             recurring=False)
+        TransactionService.confirm_transaction(self.db, self.alice, confirmed.id)
+        TransactionService.cancel_transaction(self.db, self.alice, confirmed.id)
+
+        self.assertEqual(self.alice.reserved_balance, 40)
+        self.assertEqual(confirmed.status, TransactionStatus.CANCELLED)
+
+
+class TestConcurrentBalanceUpdates(DatabaseTestCase):
+    """Test cases for reservations from concurrent sessions, on a file database shared by the threads."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        super().setUp()
+        self.db.close()
+        self.engine.dispose()
+        self.engine = create_engine(f"sqlite:///{self.path}", connect_args={"timeout": 30})
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, autoflush=False)
+        self.db = self.session_factory()
+        self._users_created = 0
+        self.alice = self._create_user("alice", balance=50)
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.path)
+
+    def test_concurrent_reservations_never_overdraw(self):
+        """Test every reservation is kept and none goes past the balance."""
+        reserved, rejected, lock = [], [], threading.Lock()
+
+        def reserve():
+            with self.session_factory() as db:
+                user = db.get(User, self.alice.id)
+                for _ in range(10):
+                    try:
+                        user.reserve_funds(1)
+                        db.commit()
+                        outcome = reserved
+                    except ValueError:
+                        db.rollback()
+                        outcome = rejected
+                    with lock:
+                        outcome.append(1)
+
+        threads = [threading.Thread(target=reserve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.db.refresh(self.alice)
+        self.assertEqual((len(reserved), len(rejected)), (50, 30))
+        self.assertEqual(self.alice.reserved_balance, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
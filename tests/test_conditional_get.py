@@ -0,0 +1,145 @@
+"""
+Tests for the per-user data version and the conditional GETs of the polled read endpoints.
+"""
+import unittest
+from datetime import date
+
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from tests.base_test import DatabaseTestCase
+from app.api.v1.users import get_user
+from app.business.transaction import TransactionService
+from app.business.user.balance_shards import BalanceShardService
+from app.dependencies import conditional_get
+from app.models import Category, Deposit, User, Withdrawal
+from app.models.transaction import TransactionStatus
+from app.models.withdrawal import WithdrawalMethod, WithdrawalStatus, WithdrawalType
+from app.schemas.router import TransactionHistoryFilter
+
+
+def make_request(path: str = "/api/v1/transactions/", query: str = "", if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+                    "headers": headers})
+
+
+class TestDataVersion(DatabaseTestCase):
+    """Test cases for User.data_version and app.dependencies.conditional_get."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=100)
+        self.carol = self._create_user("carol", balance=100)
+
+    def _versions(self) -> tuple:
+        return tuple(self.db.execute(select(User.data_version).order_by(User.id)).scalars())
+
+    def test_writes_advance_the_versions_of_the_users_involved(self):
+        """Test transactions, balances, deposits, withdrawals, categories and profiles bump their users only."""
+        transaction = self._create_transaction(self.alice, self.bob, status=TransactionStatus.AWAITING_ACCEPTANCE)
+        self.assertEqual(self._versions(), (1, 1, 0))
+        self.alice.reserve_funds(transaction.amount)
+        self.db.commit()
+        self.assertEqual(self._versions(), (2, 1, 0))
+
+        TransactionService.accept_transaction(self.db, self.bob, transaction.id)
+        self.assertGreater(self._versions()[:2], (2, 1))
+        self.assertEqual(self._versions()[2], 0)
+
+        before = self._versions()
+        self.db.add(Deposit(user_id=self.carol.id, payment_method_last_four="4242", currency_id=1,
+                            amount=5, amount_cents=500))
+        self.db.commit()
+        self.assertEqual(self._versions(), (before[0], before[1], 1))
+
+        withdrawal = Withdrawal(user_id=self.carol.id, currency_id=1, amount=5, amount_cents=500,
+                                withdrawal_type=WithdrawalType.PAYOUT, method=WithdrawalMethod.STANDARD,
+                                status=WithdrawalStatus.PENDING)
+        self.db.add(withdrawal)
+        self.db.commit()
+        withdrawal.status = WithdrawalStatus.COMPLETED
+        self.db.commit()
+        self.assertEqual(self._versions(), (before[0], before[1], 3))
+
+        category = Category(name="Rent", user_id=self.alice.id)
+        self.db.add(category)
+        self.db.commit()
+        transaction.category_id = category.id
+        self.db.commit()
+        before = self._versions()
+        category.name = "Housing"
+        self.db.commit()
+        # The other party sees the category name in their history too
+        self.assertEqual(self._versions(), (before[0] + 1, before[1] + 1, before[2]))
+
+        self.bob.avatar = "https://example.com/bob.png"
+        self.db.commit()
+        self.assertEqual(self._versions(), (before[0] + 1, before[1] + 2, before[2]))
+
+    def test_reads_keep_the_version(self):
+        """Test polling the history and the user does not advance the version."""
+        self._create_transaction(self.alice, self.bob)
+        before = self._versions()
+
+        TransactionService.get_user_transaction_history(self.db, self.alice, TransactionHistoryFilter())
+        self.alice.fold_credit_shards()
+        self.db.commit()
+
+        self.assertEqual(self._versions(), before)
+
+    def test_etag_round_trip(self):
+        """Test a matching If-None-Match gets 304 until the data, the query or the scope changes."""
+        response = Response()
+        self.assertIsNone(conditional_get(make_request(query="limit=10"), response, self.alice))
+        etag = response.headers["etag"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        not_modified = conditional_get(make_request(query="limit=10", if_none_match=f'"x", {etag}'), Response(),
+                                       self.alice)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.headers["etag"], etag)
+        # Weak comparison, and the ETag of another query or scope does not match
+        self.assertIsNotNone(conditional_get(make_request(query="limit=10", if_none_match=etag.removeprefix("W/")),
+                                             Response(), self.alice))
+        self.assertIsNone(conditional_get(make_request(query="limit=20", if_none_match=etag), Response(), self.alice))
+        self.assertIsNone(conditional_get(make_request(query="limit=10", if_none_match=etag), Response(), self.alice,
+                                          date.today()))
+        self.assertIsNone(conditional_get(make_request(query="limit=10", if_none_match=etag), Response(), self.bob))
+
+        self._create_transaction(self.bob, self.alice)
+        self.db.expire_all()
+        self.assertIsNone(conditional_get(make_request(query="limit=10", if_none_match=etag), Response(), self.alice))
+
+    def test_sharded_credits_are_not_hidden_behind_304(self):
+        """Test /users/me of a user with credit shards answers 200 with the new balance after an incoming credit."""
+        BalanceShardService.set_credit_shards(self.db, self.bob.id, 4)
+        response = Response()
+        get_user(make_request("/api/v1/users/me"), response, self.bob, self.db)
+        etag = response.headers["etag"]
+
+        # The receiving half of an incoming transfer, it lands in a shard and leaves the users row alone
+        self.bob.credit(25)
+        self.db.commit()
+        user = get_user(make_request("/api/v1/users/me", if_none_match=etag), Response(), self.bob, self.db)
+
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.balance, 125)
+
+    def test_not_modified_reads_only_the_version(self):
+        """Test the 304 path costs the single primary key read of the version."""
+        response = Response()
+        conditional_get(make_request(), response, self.alice)
+        self.db.expire_all()
+
+        with self.count_queries() as statements:
+            not_modified = conditional_get(make_request(if_none_match=response.headers["etag"]), Response(),
+                                           self.alice)
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(len(statements), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
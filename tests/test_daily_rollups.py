@@ -0,0 +1,127 @@
+"""
+Tests for the per-user daily rollups and the history totals read from them.
+"""
+import unittest
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction import TransactionBatchService
+from app.business.transaction.transaction_expiry import TransactionExpiryService
+from app.business.transaction.transaction_service import TransactionService
+from app.models import Transaction, UserDailyRollup
+from app.models.transaction import TransactionStatus, TransactionUpdateStatus
+from app.schemas.router import TransactionHistoryFilter
+from app.schemas.transaction import TransactionBatchItem
+
+BASE = datetime(2024, 1, 1, 0, 0, 0)
+
+
+class TestDailyRollups(DatabaseTestCase):
+    """Test cases for UserDailyRollup and the rollup path of get_user_transaction_history."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=10_000)
+        self.bob = self._create_user("bob", balance=10_000)
+        self.carol = self._create_user("carol", balance=10_000)
+
+    def _rollups(self) -> dict:
+        return {(row.user_id, row.day, row.direction, row.status): (row.transaction_count, round(row.amount, 2))
+                for row in self.db.execute(select(UserDailyRollup)).scalars()
+                if row.transaction_count or round(row.amount, 2)}
+
+    def _recomputed(self) -> dict:
+        expected = defaultdict(lambda: [0, 0.0])
+        for transaction in self.db.execute(select(Transaction)).scalars():
+            for user_id, direction in ((transaction.sender_id, "out"), (transaction.receiver_id, "in")):
+                row = expected[(user_id, transaction.date.date(), direction, transaction.status.value)]
+                row[0] += 1
+                row[1] += transaction.amount
+        return {key: (count, round(amount, 2)) for key, (count, amount) in expected.items()}
+
+    def test_rollups_follow_every_status_change(self):
+        """Test inserts and status changes through the services, batches and the sweeper keep the rollups exact."""
+        pending = [self._create_transaction(self.alice, self.bob, amount=10.5 + i, date=BASE + timedelta(hours=i),
+                                            status=TransactionStatus.PENDING) for i in range(6)]
+        old = self._create_transaction(self.carol, self.alice, amount=7, date=BASE - timedelta(days=30),
+                                       status=TransactionStatus.AWAITING_ACCEPTANCE, recurring=False,
+                                       awaiting_since=BASE - timedelta(days=30))
+        self.carol.reserved_balance = 7
+        self.db.commit()
+        self.assertEqual(self._rollups(), self._recomputed())
+
+        TransactionService.confirm_transaction(self.db, self.alice, pending[0].id)
+        TransactionService.accept_transaction(self.db, self.bob, pending[0].id)
+        TransactionService.confirm_transaction(self.db, self.alice, pending[1].id)
+        TransactionService.decline_transaction(self.db, self.bob, pending[1].id)
+        TransactionService.cancel_transaction(self.db, self.alice, pending[2].id)
+        TransactionBatchService.update_statuses(self.db, self.alice, [
+            TransactionBatchItem(transaction_id=transaction.id, action=TransactionUpdateStatus.CONFIRM)
+            for transaction in pending[3:]])
+        TransactionExpiryService.expire(self.db, now=BASE, ttl=86400, batch_size=10)
+        self.db.delete(pending[5])
+        self.db.commit()
+
+        self.db.refresh(old)
+        self.assertEqual(old.status, TransactionStatus.CANCELLED)
+        self.assertEqual(self._rollups(), self._recomputed())
+
+    def test_totals_from_rollups_match_the_transactions(self):
+        """Test totals over ranges with partial edge days, directions and statuses match a recount of the rows."""
+        statuses = [TransactionStatus.COMPLETED, TransactionStatus.AWAITING_ACCEPTANCE,
+                    TransactionStatus.PENDING, TransactionStatus.DENIED]
+        for i in range(120):
+            sender, receiver = (self.alice, self.bob) if i % 3 else (self.carol, self.alice)
+            self._create_transaction(sender, receiver, amount=round(1.25 * (i % 17) + 1, 2),
+                                     date=BASE + timedelta(hours=7 * i), status=statuses[i % 4])
+        transactions = self.db.execute(select(Transaction)).scalars().all()
+
+        ranges = [(None, None),
+                  (BASE + timedelta(days=3, hours=5), None),
+                  (None, BASE + timedelta(days=20, hours=13)),
+                  (BASE + timedelta(days=2), BASE + timedelta(days=30)),
+                  (BASE + timedelta(days=2, hours=9), BASE + timedelta(days=30, hours=2, minutes=30)),
+                  (BASE + timedelta(days=4, hours=1), BASE + timedelta(days=4, hours=23)),
+                  (BASE + timedelta(days=4, hours=22), BASE + timedelta(days=5, hours=8))]
+        for date_from, date_to in ranges:
+            for direction in (None, "in", "out"):
+                for status in (None, "completed", "denied"):
+                    history_filter = TransactionHistoryFilter(limit=10, date_from=date_from, date_to=date_to,
+                                                              direction=direction, status=status)
+                    with self.subTest(date_from=date_from, date_to=date_to, direction=direction, status=status):
+                        page = TransactionService.get_user_transaction_history(self.db, self.alice, history_filter)
+                        matching = [t for t in transactions
+                                    if (date_from is None or t.date >= date_from)
+                                    and (date_to is None or t.date <= date_to)
+                                    and (direction != "in" or t.receiver_id == self.alice.id)
+                                    and (direction != "out" or t.sender_id == self.alice.id)
+                                    and (status is None or t.status.value == status)
+                                    and self.alice.id in (t.sender_id, t.receiver_id)]
+                        completed = [t for t in matching if t.status in (TransactionStatus.COMPLETED,
+                                                                        TransactionStatus.AWAITING_ACCEPTANCE)]
+                        self.assertEqual(page.total, len(matching))
+                        self.assertEqual(page.total_completed, len(completed))
+                        self.assertAlmostEqual(page.outgoing_total,
+                                               sum(t.amount for t in completed if t.sender_id == self.alice.id))
+                        self.assertAlmostEqual(page.incoming_total,
+                                               sum(t.amount for t in completed if t.receiver_id == self.alice.id))
+
+    def test_whole_days_are_not_read_from_transactions(self):
+        """Test totals over whole days come from the rollups even when the transactions are gone."""
+        for i in range(4):
+            self._create_transaction(self.alice, self.bob, amount=5, date=BASE + timedelta(days=i, hours=12))
+        # Rows removed behind the unit of work's back stay in the rollups
+        self.db.execute(Transaction.__table__.delete())
+        self.db.commit()
+
+        page = TransactionService.get_user_transaction_history(self.db, self.alice, TransactionHistoryFilter(
+            date_from=BASE + timedelta(days=1), date_to=BASE + timedelta(days=3, hours=6)))
+
+        self.assertEqual((page.total, page.outgoing_total), (2, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
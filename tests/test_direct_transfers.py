@@ -0,0 +1,94 @@
+"""
+Tests for direct transfers to trusted contacts.
+"""
+import unittest
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction import TransactionService
+from app.business.user.user_contacts import UserContacts
+from app.models import Contact, LedgerEntry, NotificationOutbox, Transaction
+from app.models.transaction import TransactionStatus
+from app.schemas.transaction import DirectTransferCreate
+
+
+class TestDirectTransfers(DatabaseTestCase):
+    """Test cases for TransactionService.create_direct_transaction."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+        self.alice_contact = Contact(user_id=self.alice.id, contact_id=self.bob.id)
+        self.bob_contact = Contact(user_id=self.bob.id, contact_id=self.alice.id)
+        self.db.add_all([self.alice_contact, self.bob_contact])
+        self.db.commit()
+
+    def _count(self, model) -> int:
+        return self.db.execute(select(func.count()).select_from(model)).scalar()
+
+    def test_transfer_completes_in_one_commit(self):
+        """Test a transfer to a contact who opted in moves the funds, journals them and completes at once."""
+        UserContacts.set_auto_accept(self.db, self.bob, self.bob_contact.id, True)
+        alice_id = self.alice.id
+
+        with self.count_queries() as statements:
+            transaction = TransactionService.create_direct_transaction(
+                self.db, self.alice, DirectTransferCreate(identifier="bob@example.com", amount=30.5))
+
+        self.assertEqual(transaction.status, TransactionStatus.COMPLETED)
+        self.assertEqual((transaction.sender_id, transaction.receiver_id), (alice_id, self.bob.id))
+        self.assertEqual((self.alice.balance, self.alice.reserved_balance, self.bob.balance), (69.5, 0, 30.5))
+        self.assertEqual(self.db.execute(select(LedgerEntry.user_id, LedgerEntry.amount)
+                                         .where(LedgerEntry.reference_id == transaction.id)
+                                         .order_by(LedgerEntry.id)).all(),
+                         [(alice_id, -30.5), (self.bob.id, 30.5)])
+        self.assertEqual(self._count(NotificationOutbox), 2)
+        # receiver, two balance updates, transaction, daily rollups, data versions, ledger, two notifications
+        # and the refresh
+        self.assertEqual(len(statements), 10)
+
+    def test_transfer_requires_opt_in(self):
+        """Test contacts who did not opt in, or one-sided contacts, cannot be paid directly."""
+        transfer = DirectTransferCreate(identifier="bob", amount=10)
+        with self.assertRaises(HTTPException) as context:
+            TransactionService.create_direct_transaction(self.db, self.alice, transfer)
+        self.assertEqual(context.exception.status_code, 403)
+
+        UserContacts.set_auto_accept(self.db, self.bob, self.bob_contact.id, True)
+        UserContacts.remove_contact(self.db, self.alice, self.alice_contact.id)
+        with self.assertRaises(HTTPException) as context:
+            TransactionService.create_direct_transaction(self.db, self.alice, transfer)
+        self.assertEqual(context.exception.status_code, 403)
+
+        self.assertEqual(self._count(Transaction), 0)
+        self.assertEqual((self.alice.balance, self.bob.balance), (100, 0))
+
+    def test_reserved_funds_are_not_available(self):
+        """Test funds reserved for transfers awaiting acceptance cannot be sent directly."""
+        UserContacts.set_auto_accept(self.db, self.bob, self.bob_contact.id, True)
+        self.alice.reserve_funds(80)
+        self.db.commit()
+
+        with self.assertRaises(HTTPException) as context:
+            TransactionService.create_direct_transaction(self.db, self.alice,
+                                                         DirectTransferCreate(identifier="bob", amount=30))
+
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(self._count(Transaction), 0)
+        self.assertEqual((self.alice.balance, self.alice.reserved_balance, self.bob.balance), (100, 80, 0))
+
+    def test_auto_accept_is_set_on_own_contacts_only(self):
+        """Test a user cannot enable auto-accept on somebody else's contact."""
+        with self.assertRaises(HTTPException) as context:
+            UserContacts.set_auto_accept(self.db, self.alice, self.bob_contact.id, True)
+
+        self.assertEqual(context.exception.status_code, 404)
+        self.db.refresh(self.bob_contact)
+        self.assertFalse(self.bob_contact.auto_accept)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Unit tests for the bcrypt hashing pool and email verification keys.
+"""
+import asyncio
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+from fastapi import HTTPException
+
+from tests.base_test import BaseTestCase
+from app.infrestructure import auth
+from app.infrestructure.hashing import HashingPool, bcrypt_hash, bcrypt_verify
+
+
+class TestHashingPool(BaseTestCase):
+    """Test cases for HashingPool."""
+
+    def test_inline_pool_hash_and_verify(self):
+        """Test a pool without workers hashes in the calling thread."""
+        pool = HashingPool(workers=0)
+
+        hashed = pool.call(bcrypt_hash, "ValidPass123!")
+
+        self.assertTrue(pool.call(bcrypt_verify, "ValidPass123!", hashed))
+        self.assertFalse(pool.call(bcrypt_verify, "WrongPass123!", hashed))
+        self.assertEqual(pool.stats()["completed"], 3)
+
+    def test_process_pool_hash_and_verify(self):
+        """Test hashing round trip through worker processes."""
+        pool = HashingPool(workers=1, max_pending=4)
+        try:
+            hashed = pool.call(bcrypt_hash, "ValidPass123!")
+            future = pool.submit(bcrypt_verify, "ValidPass123!", hashed)
+            # Callbacks run in order, so the pool has counted the call once this one fired
+            done = threading.Event()
+            future.add_done_callback(lambda _: done.set())
+            done.wait(30)
+            result = future.result()
+        finally:
+            pool.shutdown()
+
+        self.assertTrue(result)
+        stats = pool.stats()
+        self.assertEqual(stats["submitted"], 2)
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_rejects_when_queue_is_full(self):
+        """Test calls beyond max_pending are rejected with 503."""
+        pool = HashingPool(workers=1, max_pending=2)
+        pool._executor = Mock()
+        pool._executor.submit.side_effect = lambda *args: Future()
+
+        pool.submit(bcrypt_hash, "a")
+        pool.submit(bcrypt_hash, "b")
+
+        with self.assertRaises(HTTPException) as context:
+            pool.submit(bcrypt_hash, "c")
+
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(pool.stats()["rejected"], 1)
+        self.assertEqual(pool.stats()["max_queue_depth"], 2)
+
+    def test_queue_depth_released_on_completion(self):
+        """Test finished calls free their queue slot."""
+        pool = HashingPool(workers=1, max_pending=1)
+        future = Future()
+        pool._executor = Mock()
+        pool._executor.submit.return_value = future
+
+        pool.submit(bcrypt_hash, "a")
+        future.set_result("hashed")
+
+        self.assertEqual(pool.stats()["queue_depth"], 0)
+        pool.submit(bcrypt_hash, "b")
+
+    def test_awaited_calls_queue_without_threads(self):
+        """Test awaited calls wait on the pool from the event loop and calls beyond max_pending are shed."""
+        pool = HashingPool(workers=1, max_pending=2)
+        futures = []
+        pool._executor = Mock()
+        pool._executor.submit.side_effect = lambda *args: futures.append(Future()) or futures[-1]
+
+        async def burst():
+            waiting = [asyncio.create_task(pool.run(bcrypt_hash, password)) for password in ("a", "b")]
+            await asyncio.sleep(0)
+            with self.assertRaises(HTTPException) as context:
+                await pool.run(bcrypt_hash, "c")
+            for index, future in enumerate(futures):
+                future.set_result(f"hashed{index}")
+            return context.exception.status_code, await asyncio.gather(*waiting)
+
+        self.assertEqual(asyncio.run(burst()), (503, ["hashed0", "hashed1"]))
+        self.assertEqual((pool.stats()["queue_depth"], pool.stats()["rejected"]), (0, 1))
+
+
+class TestAuthHashing(BaseTestCase):
+    """Test cases for auth helpers built on the hashing pool."""
+
+    def test_check_hashed_password_unknown_hash(self):
+        """Test malformed hashes are reported as invalid credentials."""
+        with patch('app.infrestructure.auth.hashing_pool', HashingPool(workers=0)):
+            with self.assertRaises(HTTPException) as context:
+                auth.check_hashed_password("ValidPass123!", "not-a-bcrypt-hash")
+
+        self.assertEqual(context.exception.status_code, 403)
+
+    def test_generate_email_key(self):
+        """Test email keys are random and URL safe."""
+        keys = {auth.generate_email_key() for _ in range(50)}
+
+        self.assertEqual(len(keys), 50)
+        for key in keys:
+            self.assertGreaterEqual(len(key), 40)
+            self.assertNotIn("/", key)
+            self.assertNotIn(".", key)
+
+    @patch('app.business.user.user_auth.NotificationService')
+    @patch('app.business.user.user_auth.hash_password_async')
+    @patch('app.business.user.user_validators.UserValidators.validate_unique_user_data')
+    def test_register_hashes_password_once(self, mock_validate_unique, mock_hash_password, mock_notifications):
+        """Test registration runs bcrypt for the password only."""
+        from app.business.user.user_auth import UserAuthService
+        from app.schemas.user import UserCreate
+
+        mock_validate_unique.return_value = False
+        mock_hash_password.return_value = "hashed"
+        user_data = UserCreate(username='newuser', email='newuser@example.com',
+                               password='ValidPass123!', phone_number="9876543210")
+
+        user = asyncio.run(UserAuthService.register(user_data, self.mock_db))
+
+        mock_hash_password.assert_called_once_with('ValidPass123!')
+        self.assertTrue(user.email_key)
+        self.assertNotIn("$2b$", user.email_key)
+
+
+if __name__ == '__main__':
+    unittest.main()
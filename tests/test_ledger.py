@@ -0,0 +1,111 @@
+"""
+Tests for the double-entry ledger, its snapshots and historical balances.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from tests.base_test import DatabaseTestCase
+from app.business.payment.ledger import LedgerService
+from app.business.transaction import TransactionService
+from app.business.transaction.transactions_recurring import RecurringService
+from app.models import LedgerEntry, LedgerSnapshot, RecurringTransaction
+from app.models.recurring_transation import RecurringInterval
+from app.models.transaction import TransactionStatus
+
+NOW = datetime(2025, 3, 10, 8, 0, 0)
+
+
+class TestLedger(DatabaseTestCase):
+    """Test cases for LedgerService."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+        LedgerService.record(self.db, LedgerService.journal("opening", self.alice.id, 100, None, self.alice.id,
+                                                            external="equity", now=NOW - timedelta(days=30)))
+        self.db.commit()
+
+    def _entries(self, **filters) -> list:
+        return self.db.execute(select(LedgerEntry.user_id, LedgerEntry.account, LedgerEntry.amount)
+                               .filter_by(**filters).order_by(LedgerEntry.id)).all()
+
+    def _move(self, amount: float, days_ago: int, sender=None, receiver=None):
+        LedgerService.record(self.db, LedgerService.journal("transfer", None, amount, (sender or self.alice).id,
+                                                            (receiver or self.bob).id,
+                                                            now=NOW - timedelta(days=days_ago)))
+        self.db.commit()
+
+    def test_accepted_transfer_is_journaled(self):
+        """Test accepting a transfer writes two opposite entries in the same commit as the balances."""
+        transaction = self._create_transaction(self.alice, self.bob, amount=30, status=TransactionStatus.PENDING,
+                                               recurring=False)
+        TransactionService.confirm_transaction(self.db, self.alice, transaction.id)
+        self.assertEqual(self._entries(kind="transfer"), [])
+
+        TransactionService.accept_transaction(self.db, self.bob, transaction.id)
+
+        self.assertEqual(self._entries(kind="transfer", reference_id=transaction.id),
+                         [(self.alice.id, "wallet", -30), (self.bob.id, "wallet", 30)])
+        self.assertEqual(LedgerService.check(self.db), [])
+
+    def test_recurring_run_is_journaled(self):
+        """Test the recurring executor journals every completed schedule with its batch."""
+        transaction = self._create_transaction(self.alice, self.bob, amount=40, date=NOW - timedelta(days=60),
+                                               status=TransactionStatus.ACCEPTED, recurring=True)
+        self.db.add(RecurringTransaction(transaction_id=transaction.id, interval=RecurringInterval.DAILY,
+                                         is_active=True, next_run_at=datetime(2025, 3, 10)))
+        self.db.commit()
+
+        RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual(self._entries(kind="recurring", reference_id=transaction.id),
+                         [(self.alice.id, "wallet", -40), (self.bob.id, "wallet", 40)])
+        self.assertEqual(LedgerService.check(self.db), [])
+
+    def test_check_reports_unjournaled_balance_changes(self):
+        """Test a balance changed outside the ledger is reported, with credits in balance shards counted."""
+        self.bob.balance = 5
+        self.db.commit()
+
+        self.assertEqual(LedgerService.check(self.db),
+                         [{"id": self.bob.id, "balance": 5, "pending": 0, "ledger": 0}])
+
+    def test_balance_at_uses_snapshot_and_later_entries(self):
+        """Test historical balances are the last snapshot plus the entries written after it."""
+        self._move(10, days_ago=20)
+        self._move(20, days_ago=10)
+        self.assertEqual(LedgerService.take_snapshots(self.db, now=NOW - timedelta(days=5), min_entries=1,
+                                                      settle_seconds=0), 2)
+        self._move(5, days_ago=2)
+
+        # entries folded into the snapshot are not read again
+        self.db.execute(delete(LedgerEntry).where(LedgerEntry.created_at < NOW - timedelta(days=10)))
+        self.db.commit()
+        alice_id = self.alice.id
+        with self.count_queries() as statements:
+            balance = LedgerService.balance_at(self.db, alice_id, NOW)
+
+        self.assertEqual((balance, len(statements)), (65, 2))
+        self.assertEqual(LedgerService.balance_at(self.db, self.bob.id, NOW - timedelta(days=3)), 30)
+        self.assertEqual(LedgerService.balance_at(self.db, self.bob.id, NOW - timedelta(days=40)), 0)
+
+    def test_snapshots_are_incremental(self):
+        """Test snapshots skip recent entries and users below the threshold, and build on the previous one."""
+        self._move(10, days_ago=20)
+        self._move(1, days_ago=1)
+
+        taken = LedgerService.take_snapshots(self.db, now=NOW, min_entries=2, settle_seconds=2 * 86400)
+        self.assertEqual(taken, 1)
+        self._move(7, days_ago=0, sender=self.bob, receiver=self.alice)
+        LedgerService.take_snapshots(self.db, now=NOW + timedelta(days=1), min_entries=1, settle_seconds=0)
+
+        snapshots = self.db.execute(select(LedgerSnapshot.user_id, LedgerSnapshot.balance)
+                                    .order_by(LedgerSnapshot.id)).all()
+        self.assertEqual(snapshots, [(self.alice.id, 90), (self.alice.id, 96), (self.bob.id, 4)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Unit tests for the pooled mail transport.
+"""
+import asyncio
+import base64
+import unittest
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import httpx
+
+from tests.base_test import BaseTestCase
+from app.business.utils import NotificationService
+from app.infrestructure.mail_transport import MailTransport
+
+
+class TestMailTransport(BaseTestCase):
+    """Test cases for MailTransport."""
+
+    def setUp(self):
+        super().setUp()
+        self.requests = []
+        self.in_flight, self.peak = 0, 0
+
+    def _transport(self, **kwargs) -> MailTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return httpx.Response(200, json={"message": "Queued. Thank you."})
+
+        transport = MailTransport(base_url="https://mail.test/", api_key="secret",
+                                  transport=httpx.MockTransport(handler), **kwargs)
+        self.addCleanup(transport.close)
+        return transport
+
+    def test_send_sync_posts_message(self):
+        """Test the synchronous facade posts the form to the messages endpoint with the API key."""
+        transport = self._transport()
+
+        response = transport.send_sync({"to": "alice <alice@example.com>", "subject": "Hi", "text": "Hello"})
+
+        self.assertEqual(response.status_code, 200)
+        request, = self.requests
+        self.assertEqual(str(request.url), "https://mail.test/v3/vwallet.ninja/messages")
+        self.assertEqual(request.headers["authorization"], "Basic " + base64.b64encode(b"api:secret").decode())
+        self.assertEqual(parse_qs(request.content.decode())["subject"], ["Hi"])
+        self.assertEqual(transport.stats()["sent"], 1)
+
+    def test_send_many_is_bounded(self):
+        """Test concurrent sends never exceed the configured concurrency."""
+        transport = self._transport(concurrency=3)
+
+        responses = asyncio.run(transport.send_many({"text": str(i)} for i in range(12)))
+
+        self.assertEqual([r.status_code for r in responses], [200] * 12)
+        self.assertEqual(self.peak, 3)
+        self.assertEqual(transport.stats()["max_in_flight"], 3)
+
+    def test_client_is_shared_across_calls(self):
+        """Test one pooled client serves every message until the transport is closed."""
+        transport = self._transport()
+
+        transport.send_sync({"text": "a"})
+        client = transport._client
+        asyncio.run(transport.send({"text": "b"}))
+
+        self.assertIs(transport._client, client)
+        transport.close()
+        self.assertIsNone(transport._client)
+
+    def test_notification_service_uses_transport(self):
+        """Test send_email goes through the shared transport."""
+        user = self._create_mock_user()
+        transport = self._transport()
+
+        with patch('app.business.utils.notification_service.mail_transport', transport):
+            response = NotificationService.send_email(user, "Subject", "Body")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(user.email, parse_qs(self.requests[0].content.decode())["to"][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
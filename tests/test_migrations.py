@@ -0,0 +1,122 @@
+"""
+Tests for the Alembic migration chain and the indexes used by the hot transaction queries.
+"""
+import unittest
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.pool import StaticPool
+
+from tests.base_test import BaseTestCase
+from app.infrestructure import Base
+from app.infrestructure.migrations import BASELINE_REVISION, alembic_config, include_object, run_migrations
+from app.models import User
+from app.models.transaction import Transaction, TransactionStatus
+
+
+class TestMigrationChain(BaseTestCase):
+    """Test cases for upgrading and downgrading the schema with Alembic."""
+
+    def setUp(self):
+        super().setUp()
+        self.engine = create_engine("sqlite://",
+                                    connect_args={"check_same_thread": False},
+                                    poolclass=StaticPool)
+
+    def tearDown(self):
+        self.engine.dispose()
+        super().tearDown()
+
+    def test_upgrade_matches_models(self):
+        """Test the migrated schema has no differences from the models."""
+        run_migrations(self.engine)
+
+        with self.engine.connect() as connection:
+            diff = compare_metadata(MigrationContext.configure(connection, opts={"include_object": include_object}),
+                                    Base.metadata)
+
+        self.assertEqual(diff, [])
+
+    def test_downgrade_to_base(self):
+        """Test every revision can be rolled back."""
+        run_migrations(self.engine)
+
+        with self.engine.begin() as connection:
+            command.downgrade(alembic_config(connection), "base")
+
+        self.assertEqual(inspect(self.engine).get_table_names(), ["alembic_version"])
+
+    def test_unversioned_database_is_stamped(self):
+        """Test a schema built by create_all before the migrations existed is adopted and upgraded."""
+        with self.engine.begin() as connection:
+            command.upgrade(alembic_config(connection), BASELINE_REVISION)
+            connection.exec_driver_sql("DROP TABLE alembic_version")
+
+        run_migrations(self.engine)
+
+        indexes = {index["name"] for index in inspect(self.engine).get_indexes("transactions")}
+        self.assertIn("ix_transactions_sender_id_date", indexes)
+        self.assertIn("ix_transactions_awaiting_receiver_id_date", indexes)
+
+
+class TestTransactionIndexes(BaseTestCase):
+    """Test cases asserting the query planner picks the transaction indexes."""
+
+    def setUp(self):
+        super().setUp()
+        self.engine = create_engine("sqlite://",
+                                    connect_args={"check_same_thread": False},
+                                    poolclass=StaticPool)
+        run_migrations(self.engine)
+        self.user = User(id=1)
+
+    def tearDown(self):
+        self.engine.dispose()
+        super().tearDown()
+
+    def _plan(self, query) -> str:
+        # Literal values, like a custom plan on PostgreSQL, so partial index predicates can be matched
+        sql = str(query.compile(self.engine, compile_kwargs={"literal_binds": True}))
+        with self.engine.connect() as connection:
+            return "\n".join(row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+    def test_history_uses_participant_indexes(self):
+        """Test the user history is answered from both composite indexes."""
+        plan = self._plan(self.user.get_transactions(None, legacy_query=False).limit(20))
+
+        self.assertIn("ix_transactions_sender_id_date", plan)
+        self.assertIn("ix_transactions_receiver_id_date", plan)
+        self.assertNotIn("SCAN transactions", plan)
+
+    def test_outgoing_history_is_index_ordered(self):
+        """Test one direction of the history is read in index order without a sort."""
+        query = (select(Transaction)
+                 .where(Transaction.sender_id == self.user.id)
+                 .order_by(Transaction.date.desc())
+                 .limit(20))
+
+        plan = self._plan(query)
+
+        self.assertIn("ix_transactions_sender_id_date", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_pending_lists_use_partial_indexes(self):
+        """Test the pending and awaiting acceptance lists use the partial indexes."""
+        cases = {
+            "ix_transactions_pending_receiver_id": (Transaction.receiver_id, TransactionStatus.PENDING),
+            "ix_transactions_pending_sender_id": (Transaction.sender_id, TransactionStatus.PENDING),
+            "ix_transactions_awaiting_sender_id": (Transaction.sender_id, TransactionStatus.AWAITING_ACCEPTANCE),
+            "ix_transactions_awaiting_receiver_id_date": (Transaction.receiver_id,
+                                                          TransactionStatus.AWAITING_ACCEPTANCE),
+        }
+        for index_name, (column, status) in cases.items():
+            with self.subTest(index=index_name):
+                query = select(Transaction).where(column == self.user.id, Transaction.status == status)
+
+                self.assertIn(f"USING INDEX {index_name}", self._plan(query))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Unit tests for the authenticated principal cache and its use in the dependency chain.
+"""
+import unittest
+from unittest.mock import Mock, patch
+
+from fastapi import HTTPException
+
+from tests.base_test import BaseTestCase
+from app.dependencies import getValidUser
+from app.infrestructure.principal_cache import PrincipalCache
+from app.models.user import UserStatus as UStatus
+
+
+class TestPrincipalCache(BaseTestCase):
+    """Test cases for PrincipalCache."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = PrincipalCache(max_size=2, ttl=60)
+        self.mock_user.forced_password_reset = False
+
+    def test_get_miss_then_hit(self):
+        """Test a cached user is served from the cache and counters are updated."""
+        self.assertIsNone(self.cache.get("testuser"))
+        self.cache.put(self.mock_user)
+
+        principal = self.cache.get("testuser")
+
+        self.assertEqual(principal.id, self.mock_user.id)
+        self.assertEqual(principal.status, "active")
+        self.assertFalse(principal.admin)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        """Test the least recently used principal is evicted when the cache is full."""
+        self.cache.put(self._create_mock_user(user_id=1, username="first"))
+        self.cache.put(self._create_mock_user(user_id=2, username="second"))
+        self.cache.get("first")
+        self.cache.put(self._create_mock_user(user_id=3, username="third"))
+
+        self.assertIsNotNone(self.cache.get("first"))
+        self.assertIsNone(self.cache.get("second"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    @patch('app.infrestructure.principal_cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        """Test expired principals are treated as misses."""
+        mock_monotonic.return_value = 100.0
+        self.cache.put(self.mock_user)
+
+        mock_monotonic.return_value = 161.0
+
+        self.assertIsNone(self.cache.get("testuser"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_invalidate_by_user_and_username(self):
+        """Test invalidation accepts both a User object and a username."""
+        self.cache.put(self.mock_user)
+        self.cache.invalidate(self.mock_user)
+        self.assertIsNone(self.cache.get("testuser"))
+
+        self.cache.put(self.mock_user)
+        self.cache.invalidate("testuser")
+        self.assertIsNone(self.cache.get("testuser"))
+
+
+class TestGetValidUserCache(BaseTestCase):
+    """Test cases for getValidUser with the principal cache."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = PrincipalCache(max_size=10, ttl=60)
+        self.mock_user.forced_password_reset = False
+        self.mock_user.status = UStatus.ACTIVE
+
+    @patch('app.dependencies.verify_token')
+    def test_miss_queries_and_populates_cache(self, mock_verify_token):
+        """Test a cache miss loads the user from the database and caches it."""
+        mock_verify_token.return_value = "testuser"
+        self.setup_db_query_mock(None, self.mock_user)
+
+        with patch('app.dependencies.principal_cache', self.cache):
+            result = getValidUser("token", self.mock_db)
+
+        self.assertEqual(result, self.mock_user)
+        self.mock_db.query.assert_called_once()
+        self.assertIsNotNone(self.cache.get("testuser"))
+
+    @patch('app.dependencies.attach_cached_user')
+    @patch('app.dependencies.verify_token')
+    def test_hit_skips_users_query(self, mock_verify_token, mock_attach):
+        """Test a cache hit does not query the users table."""
+        mock_verify_token.return_value = "testuser"
+        mock_attach.return_value = self.mock_user
+        self.cache.put(self.mock_user)
+
+        with patch('app.dependencies.principal_cache', self.cache):
+            result = getValidUser("token", self.mock_db)
+
+        self.assertEqual(result, self.mock_user)
+        self.mock_db.query.assert_not_called()
+
+    @patch('app.dependencies.attach_cached_user')
+    @patch('app.dependencies.verify_token')
+    def test_hit_still_enforces_status(self, mock_verify_token, mock_attach):
+        """Test cached deactivated users are still rejected."""
+        mock_verify_token.return_value = "testuser"
+        self.mock_user.status = UStatus.DEACTIVATED
+        mock_attach.return_value = self.mock_user
+        self.cache.put(self.mock_user)
+
+        with patch('app.dependencies.principal_cache', self.cache):
+            with self.assertRaises(HTTPException) as context:
+                getValidUser("token", self.mock_db)
+
+        self.assertEqual(context.exception.status_code, 403)
+
+
+class TestPrincipalCacheInvalidation(BaseTestCase):
+    """Test cases for explicit invalidation on account changes."""
+
+    @patch('app.business.user.user_admin.principal_cache')
+    @patch('app.business.user.user_admin.NotificationService')
+    def test_update_user_status_invalidates(self, mock_notifications, mock_cache):
+        """Test blocking a user drops them from the principal cache."""
+        from app.business.user.user_admin import AdminService
+        from app.models import User
+
+        user = Mock(spec=User)
+        user.status = UStatus.ACTIVE
+        update_data = Mock()
+        update_data.status = UStatus.BLOCKED.value
+
+        AdminService.update_user_status(self.mock_db, user, update_data, self.mock_admin)
+
+        mock_cache.invalidate.assert_called_once_with(user)
+
+    @patch('app.business.user.user_admin.principal_cache')
+    @patch('app.business.user.user_admin.UserValidators.search_user_by_identifier')
+    @patch('app.business.user.user_admin.auth.hash_password')
+    def test_promote_user_to_admin_invalidates(self, mock_hash, mock_search, mock_cache):
+        """Test promoting a user drops them from the principal cache."""
+        from app.business.user.user_admin import AdminService
+
+        mock_hash.return_value = "hashed"
+        mock_search.return_value = self.mock_user
+
+        AdminService.promote_user_to_admin(self.mock_db, self.mock_admin, 1)
+
+        mock_cache.invalidate.assert_called_once_with(self.mock_user)
+
+    @patch('app.business.user.user_auth.principal_cache')
+    @patch('app.business.user.user_auth.auth')
+    def test_change_password_invalidates(self, mock_auth, mock_cache):
+        """Test a password change drops the user from the principal cache."""
+        from app.business.user.user_auth import UserAuthService
+
+        mock_auth.check_hashed_password.return_value = True
+        mock_auth.hash_password.return_value = "hashed"
+
+        UserAuthService.change_user_password(self.mock_db, self.mock_user, "NewPass123!", "OldPass123!")
+
+        mock_cache.invalidate.assert_called_once_with(self.mock_user)
+
+
+if __name__ == '__main__':
+    unittest.main()
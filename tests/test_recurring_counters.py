@@ -0,0 +1,100 @@
+"""
+Tests for the incrementally maintained recurring transaction counters.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction.recurring_counters import RecurringCountersService
+from app.business.transaction.transactions_recurring import RecurringService
+from app.models import RecurringTransaction, RecurringTransactionHistory
+from app.models.recurring_transation import RecurringInterval
+from app.models.transaction import TransactionStatus
+
+NOW = datetime(2025, 3, 10, 8, 0, 0)
+TODAY = datetime(2025, 3, 10)
+
+
+class TestRecurringCounters(DatabaseTestCase):
+    """Test cases for the execution counters and RecurringCountersService."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+
+    def _schedule(self, amount: float, sender=None) -> RecurringTransaction:
+        transaction = self._create_transaction(sender or self.alice, self.bob, amount=amount,
+                                               date=NOW - timedelta(days=60), status=TransactionStatus.ACCEPTED,
+                                               recurring=True)
+        schedule = RecurringTransaction(transaction_id=transaction.id, interval=RecurringInterval.DAILY,
+                                        is_active=True, next_run_at=TODAY)
+        self.db.add(schedule)
+        self.db.commit()
+        return schedule
+
+    def _log(self, schedule, *statuses: TransactionStatus):
+        for days, status in enumerate(statuses):
+            self.db.add(RecurringTransactionHistory(recurring_transaction_id=schedule.id, status=status,
+                                                    execution_date=NOW - timedelta(days=len(statuses) - days)))
+        self.db.commit()
+
+    def _counters(self, schedule) -> tuple:
+        self.db.refresh(schedule)
+        return (schedule.execution_count, schedule.failure_count, schedule.last_executed_at,
+                schedule.total_transferred)
+
+    def test_executor_increments_counters(self):
+        """Test every run adds to the counters of the schedules it executed."""
+        paid, unpaid = self._schedule(60), self._schedule(50)
+
+        RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual(self._counters(paid), (1, 0, NOW, 60))
+        self.assertEqual(self._counters(unpaid), (0, 1, NOW, 0))
+        self.assertEqual(paid.executions, 1)
+
+    def test_backfill_rebuilds_counters_from_history(self):
+        """Test the backfill recomputes every schedule, batch by batch."""
+        first, second, never = self._schedule(10), self._schedule(2.5), self._schedule(1)
+        self._log(first, TransactionStatus.COMPLETED, TransactionStatus.FAILED, TransactionStatus.COMPLETED)
+        self._log(second, TransactionStatus.COMPLETED)
+
+        updated = RecurringCountersService.backfill(self.db, batch_size=2)
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(self._counters(first), (2, 1, NOW - timedelta(days=1), 20))
+        self.assertEqual(self._counters(second), (1, 0, NOW - timedelta(days=1), 2.5))
+        self.assertEqual(self._counters(never), (0, 0, None, 0))
+
+    def test_check_reports_and_fixes_drift(self):
+        """Test the checker lists only schedules whose counters disagree with the history."""
+        consistent, drifted = self._schedule(10), self._schedule(5)
+        self._log(drifted, TransactionStatus.COMPLETED)
+        RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual(RecurringCountersService.check(self.db, fix=True)[0]["id"], drifted.id)
+
+        self.assertEqual(self._counters(drifted), (2, 0, NOW, 10))
+        self.assertEqual(self._counters(consistent), (1, 0, NOW, 10))
+        self.assertEqual(RecurringCountersService.check(self.db), [])
+
+    def test_check_detects_each_counter(self):
+        """Test a difference in any single counter is reported."""
+        schedule = self._schedule(10)
+        RecurringService.execute_due(self.db, NOW)
+
+        for column, value in (("execution_count", 5), ("failure_count", 1),
+                              ("total_transferred", 10.5), ("last_executed_at", None)):
+            with self.subTest(column=column):
+                original = getattr(schedule, column)
+                setattr(schedule, column, value)
+                self.db.commit()
+                inconsistent, = RecurringCountersService.check(self.db)
+                self.assertEqual(inconsistent[f"expected_{column}"], original)
+                setattr(schedule, column, original)
+                self.db.commit()
+
+
+if __name__ == '__main__':
+    unittest.main()
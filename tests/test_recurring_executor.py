@@ -0,0 +1,344 @@
+"""
+Tests for the set-based recurring transaction executor.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from tests.base_test import DatabaseTestCase
+from app.infrestructure import Base
+from app.business.transaction.transactions_recurring import RecurringService
+from app.models import NotificationOutbox, RecurringRun, RecurringTransaction, RecurringTransactionHistory, User, UStatus
+from app.models.recurring_transation import RecurringInterval
+from app.models.transaction import TransactionStatus
+
+NOW = datetime(2025, 3, 10, 8, 0, 0)
+TODAY = datetime(2025, 3, 10)
+
+
+class RecurringExecutorTestCase(DatabaseTestCase):
+    """Users and schedule helpers shared by the executor tests."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+
+    def _schedule(self, sender: User, receiver: User, amount: float,
+                  interval: RecurringInterval = RecurringInterval.DAILY, next_run_at: datetime = TODAY):
+        transaction = self._create_transaction(sender, receiver, amount=amount, date=NOW - timedelta(days=60),
+                                               status=TransactionStatus.ACCEPTED, recurring=True)
+        schedule = RecurringTransaction(transaction_id=transaction.id, interval=interval, is_active=True,
+                                        next_run_at=next_run_at)
+        self.db.add(schedule)
+        self.db.commit()
+        return schedule
+
+    def _balances(self) -> dict:
+        self.db.expire_all()
+        return {u.username: u.balance for u in self.db.execute(select(User)).scalars()}
+
+    def _history(self, schedule) -> list:
+        return self.db.execute(select(RecurringTransactionHistory)
+                               .where(RecurringTransactionHistory.recurring_transaction_id == schedule.id,
+                                      RecurringTransactionHistory.execution_date == NOW)).scalars().all()
+
+
+class TestRecurringExecutor(RecurringExecutorTestCase):
+    """Test cases for RecurringService.execute_due."""
+
+    def test_moves_balances_and_logs_history(self):
+        """Test due schedules move money and write one history row each."""
+        first = self._schedule(self.alice, self.bob, 30)
+        second = self._schedule(self.alice, self.bob, 20, next_run_at=TODAY - timedelta(hours=12))
+
+        results = RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual((results["due"], results["completed"], results["failed"]), (2, 2, 0))
+        self.assertEqual(self._balances(), {"alice": 50, "bob": 50})
+        for schedule in (first, second):
+            history, = self._history(schedule)
+            self.assertEqual(history.status, TransactionStatus.COMPLETED)
+
+    def test_insufficient_balance_fails_in_order(self):
+        """Test schedules of one sender are debited in order until the balance runs out."""
+        paid = self._schedule(self.alice, self.bob, 80)
+        unpaid = self._schedule(self.alice, self.bob, 30)
+
+        results = RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual((results["completed"], results["failed"]), (1, 1))
+        self.assertEqual(self._balances(), {"alice": 20, "bob": 80})
+        self.assertEqual(self._history(paid)[0].status, TransactionStatus.COMPLETED)
+        failed, = self._history(unpaid)
+        self.assertEqual((failed.status, failed.reason), (TransactionStatus.FAILED, "Insufficient balance"))
+        notice, = self.db.execute(select(NotificationOutbox)).scalars()
+        self.assertEqual(notice.event, "recurring_transaction_failed")
+
+    def test_missing_sender_fails_without_notice(self):
+        """Test a schedule whose sender row is gone fails with its own reason and queues no failure e-mail."""
+        ghost = self._create_user("ghost", balance=100)
+        schedule = self._schedule(ghost, self.bob, 10)
+        self.db.execute(delete(User).where(User.id == ghost.id))
+        self.db.commit()
+
+        results = RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual((results["completed"], results["failed"]), (0, 1))
+        self.assertEqual(self._history(schedule)[0].reason, "Sender account not found")
+        self.assertEqual(self.db.execute(select(NotificationOutbox)).scalars().all(), [])
+        self.assertEqual(self._balances()["bob"], 0)
+
+    def test_blocked_user_cannot_transact(self):
+        """Test a blocked receiver fails the execution without moving money."""
+        blocked = self._create_user("carol", status=UStatus.BLOCKED)
+        schedule = self._schedule(self.alice, blocked, 10)
+
+        RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual(self._history(schedule)[0].reason, "Account has suspended rights to transact")
+        self.assertEqual(self._balances()["alice"], 100)
+
+    def test_only_due_schedules_run(self):
+        """Test schedules scheduled later or inactive are not selected, executed ones move to their next run."""
+        self._schedule(self.alice, self.bob, 1, next_run_at=TODAY + timedelta(days=1))
+        inactive = self._schedule(self.alice, self.bob, 1)
+        inactive.deactivate()
+        self.db.commit()
+        weekly = self._schedule(self.alice, self.bob, 1, RecurringInterval.WEEKLY)
+        monthly = self._schedule(self.alice, self.bob, 1, RecurringInterval.MONTHLY)
+
+        results = RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual(results["due"], 2)
+        self.db.expire_all()
+        self.assertEqual(weekly.next_run_at, TODAY + timedelta(days=7))
+        self.assertEqual(monthly.next_run_at, TODAY + timedelta(days=30))
+        self.assertEqual(RecurringService.execute_due(self.db, NOW)["due"], 0)
+
+    def test_missed_runs_are_skipped_without_catch_up(self):
+        """Test a schedule behind by several runs executes once and reports the runs it skipped."""
+        schedule = self._schedule(self.alice, self.bob, 1, next_run_at=TODAY - timedelta(days=3))
+
+        results = RecurringService.execute_due(self.db, NOW)
+
+        self.assertEqual((results["due"], results["skipped"]), (1, 3))
+        self.db.expire_all()
+        self.assertEqual(schedule.next_run_at, TODAY + timedelta(days=1))
+
+    def test_catch_up_replays_missed_runs_in_bounded_batches(self):
+        """Test catch-up executes every missed run, at most max_batches batches of replays per call."""
+        schedule = self._schedule(self.alice, self.bob, 1, next_run_at=TODAY - timedelta(days=4))
+        self._schedule(self.alice, self.bob, 1, RecurringInterval.WEEKLY, next_run_at=TODAY - timedelta(days=14))
+
+        first = RecurringService.execute_due(self.db, NOW, chunk_size=2, catch_up=True, max_batches=2)
+        rest = RecurringService.execute_due(self.db, NOW, chunk_size=2, catch_up=True)
+
+        # Two batches of replays, then the weekly run due today, the daily one still has missed runs
+        self.assertEqual((first["due"], first["batches"], first["remaining"]), (5, 3, 1))
+        # 5 daily runs (4 days ago up to today) and 3 weekly runs (14 and 7 days ago, today)
+        self.assertEqual(first["due"] + rest["due"], 8)
+        self.assertEqual((rest["skipped"], rest["remaining"]), (0, 0))
+        self.assertEqual(self._balances(), {"alice": 92, "bob": 8})
+        self.db.expire_all()
+        self.assertEqual(schedule.next_run_at, TODAY + timedelta(days=1))
+
+    def test_catch_up_cap_leaves_runs_due_now_alone(self):
+        """Test the replay cap does not hold back schedules due today beyond chunk_size * max_batches."""
+        self.alice.balance = 1000
+        self.db.commit()
+        for _ in range(7):
+            self._schedule(self.alice, self.bob, 1)
+        missed = self._schedule(self.alice, self.bob, 1, next_run_at=TODAY - timedelta(days=9))
+
+        result = RecurringService.execute_due(self.db, NOW, chunk_size=2, catch_up=True, max_batches=2)
+
+        # Two batches share the cap between the oldest runs, then the rest due today runs past it
+        self.assertEqual((result["due"], result["batches"], result["remaining"]), (9, 5, 1))
+        self.db.expire_all()
+        self.assertEqual(missed.next_run_at, TODAY - timedelta(days=7))
+        self.assertEqual(self.db.execute(select(RecurringTransaction.id)
+                                         .where(RecurringTransaction.next_run_at <= NOW)).scalars().all(),
+                         [missed.id])
+
+    def test_batches_lock_their_schedules(self):
+        """Test batches skip the schedules another run holds, while the counts of due schedules take no locks."""
+        locked = str(RecurringService.due_schedules_query(NOW, 10, lock=True).compile(dialect=postgresql.dialect()))
+        counted = str(RecurringService.due_schedules_query(NOW).compile(dialect=postgresql.dialect()))
+
+        self.assertTrue(locked.endswith("FOR UPDATE OF recurring_transactions SKIP LOCKED"))
+        self.assertNotIn("FOR UPDATE", counted)
+
+    def test_lifecycle_maintains_next_run_at(self):
+        """Test activating schedules the first run today and deactivating unschedules it."""
+        schedule = self._schedule(self.alice, self.bob, 1, next_run_at=None)
+
+        schedule.activate(NOW)
+        self.assertEqual((schedule.is_active, schedule.next_run_at), (True, TODAY))
+
+        schedule.deactivate()
+        self.assertEqual((schedule.is_active, schedule.next_run_at), (False, None))
+
+    def test_statements_scale_with_chunks(self):
+        """Test a run issues a fixed number of statements per chunk, not per schedule."""
+        users = [self._create_user(balance=100) for _ in range(6)]
+        for i in range(30):
+            self._schedule(users[i % 6], users[(i + 1) % 6], 1)
+
+        with self.count_queries() as statements:
+            results = RecurringService.execute_due(self.db, NOW, chunk_size=10)
+
+        self.assertEqual(results["completed"], 30)
+        # Per batch: due schedules, lock users, update balances, update next runs, insert history, insert ledger
+        # entries; then the empty batch and the remaining count
+        self.assertEqual(len(statements), 3 * 6 + 2)
+
+
+class TestSpreadRecurringExecutor(RecurringExecutorTestCase):
+    """Test cases for RecurringService.execute_spread, on a fake clock advanced by the pacing sleeps."""
+
+    def setUp(self):
+        super().setUp()
+        self.clock = NOW
+        self.sleeps = []
+        self.alice.balance = 1000
+        self.db.commit()
+
+    def _now(self) -> datetime:
+        return self.clock
+
+    def _sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.clock += timedelta(seconds=seconds)
+
+    def _spread(self, **options) -> dict:
+        return RecurringService.execute_spread(self.db, clock=self._now, sleep=self._sleep, **options)
+
+    def test_transfers_are_paced_over_the_window(self):
+        """Test the rate fitting the window starts one second of transfers per batch, one second apart."""
+        for _ in range(20):
+            self._schedule(self.alice, self.bob, 1)
+
+        results = self._spread(window=10)
+
+        self.assertEqual((results["due"], results["completed"], results["rate"]), (20, 20, 2.0))
+        self.assertEqual((results["batches"], results["finished"]), (10, True))
+        self.assertEqual(self.sleeps, [1.0] * 9)
+        self.assertEqual(self._balances(), {"alice": 980, "bob": 20})
+
+    def test_explicit_rate_stops_pacing_after_the_window(self):
+        """Test a rate too low for the window runs the rest unpaced once the window is over."""
+        for _ in range(12):
+            self._schedule(self.alice, self.bob, 1)
+
+        with self.assertLogs("app.business.transaction.transactions_recurring", "WARNING"):
+            results = self._spread(window=3, rate=2, chunk_size=100)
+
+        self.assertEqual((results["due"], results["batches"]), (12, 6))
+        self.assertEqual(self.sleeps, [1.0, 1.0])
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        """Test a run stopped mid-window keeps its cut-off and counters and resumes without re-executing."""
+        schedules = [self._schedule(self.alice, self.bob, 1) for _ in range(10)]
+        batches = iter(range(4))
+
+        first = self._spread(window=10, proceed=lambda: next(batches, None) is not None)
+        self.clock += timedelta(seconds=30)
+        late = self._schedule(self.alice, self.bob, 1, next_run_at=TODAY + timedelta(hours=9))
+        rest = self._spread(resume=True)
+
+        self.assertEqual((first["due"], first["finished"], first["remaining"]), (4, False, 6))
+        run, = self.db.execute(select(RecurringRun)).scalars()
+        self.assertEqual((run.due, run.completed, run.scheduled_for, run.finished_at), (10, 10, NOW, self.clock))
+        self.assertEqual((rest["due"], rest["batches"]), (10, 6))
+        self.assertEqual(self._balances(), {"alice": 990, "bob": 10})
+        self.assertTrue(all(len(self._history(schedule)) == 1 for schedule in schedules))
+        self.assertIsNone(self._spread(resume=True))
+        self.db.expire_all()
+        self.assertEqual(late.next_run_at, TODAY + timedelta(hours=9))
+
+    def test_new_run_supersedes_unfinished_run(self):
+        """Test the next daily run closes an unfinished run and executes its leftovers at the later cut-off."""
+        self._schedule(self.alice, self.bob, 1)
+        self._schedule(self.alice, self.bob, 1)
+        self._spread(window=10, proceed=iter([True, False]).__next__)
+
+        results = RecurringService.execute_spread(self.db, NOW + timedelta(days=1), window=10,
+                                                  clock=lambda: NOW + timedelta(days=1), sleep=self._sleep)
+
+        self.assertEqual(results["due"], 2)
+        runs = self.db.execute(select(RecurringRun).order_by(RecurringRun.id)).scalars().all()
+        self.assertEqual([(r.due, r.finished_at is not None) for r in runs], [(1, True), (2, True)])
+
+
+class TestPartitionedRecurringExecutor(RecurringExecutorTestCase):
+    """Test cases for RecurringService.execute_partitioned, on a file database shared by the worker threads."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        super().setUp()
+        self.db.close()
+        self.engine.dispose()
+        self.engine = create_engine(f"sqlite:///{self.path}", connect_args={"timeout": 30})
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, autoflush=False)
+        self.db = self.session_factory()
+        self._users_created = 0
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.path)
+
+    def _seed(self) -> list:
+        # every sender covers its own schedules, so outcomes do not depend on credits from other partitions
+        users = [self._create_user(balance=20) for _ in range(7)]
+        for i in range(42):
+            self._schedule(users[i % 7], users[(i * 3 + 1) % 7], 1 + i % 4)
+        return users
+
+    def test_partitions_split_senders(self):
+        """Test every due schedule lands in exactly one partition, with all of a sender's schedules together."""
+        self._seed()
+        partitions = [self.db.execute(RecurringService.due_schedules_query(NOW, partition=(i, 3))).all()
+                      for i in range(3)]
+
+        ids = [row.id for rows in partitions for row in rows]
+        self.assertEqual(sorted(ids), sorted(r.id for r in self.db.execute(RecurringService.due_schedules_query(NOW))))
+        senders = [{row.sender_id for row in rows} for rows in partitions]
+        self.assertFalse(senders[0] & senders[1] or senders[0] & senders[2] or senders[1] & senders[2])
+
+    def test_parallel_run_matches_sequential(self):
+        """Test worker threads produce the same balances and history as a single sequential run."""
+        self._seed()
+        snapshot = self.path + ".sequential"
+        shutil.copy(self.path, snapshot)
+        self.addCleanup(os.remove, snapshot)
+
+        results = RecurringService.execute_partitioned(workers=3, now=NOW, session_factory=self.session_factory,
+                                                       chunk_size=4)
+
+        sequential = create_engine(f"sqlite:///{snapshot}")
+        with sessionmaker(bind=sequential)() as db:
+            expected = RecurringService.execute_due(db, NOW, chunk_size=4)
+            expected_balances = {u.username: u.balance for u in db.execute(select(User)).scalars()}
+        sequential.dispose()
+
+        self.assertEqual(len(results["partitions"]), 3)
+        self.assertEqual((results["due"], results["completed"], results["failed"]),
+                         (expected["due"], expected["completed"], expected["failed"]))
+        self.assertEqual(sum(p["due"] for p in results["partitions"]), 42)
+        self.assertTrue(all(p["seconds"] >= 0 for p in results["partitions"]))
+        self.assertEqual(self._balances(), expected_balances)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests for the scheduler leader election over the lease row.
+"""
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from sqlalchemy.orm import sessionmaker
+
+from tests.base_test import DatabaseTestCase
+from app.infrestructure.scheduler import SchedulerLeader
+from app.models import SchedulerLease
+
+NOW = datetime(2025, 3, 10, 8, 0, 0)
+
+
+class TestSchedulerLeader(DatabaseTestCase):
+    """Test cases for SchedulerLeader."""
+
+    def setUp(self):
+        super().setUp()
+        self.session_factory = sessionmaker(bind=self.engine)
+
+    def _worker(self, holder: str) -> SchedulerLeader:
+        scheduler = Mock(running=False)
+        scheduler.start.side_effect = lambda: setattr(scheduler, "running", True)
+        return SchedulerLeader(session_factory=self.session_factory, ttl=30, renew_interval=10,
+                               holder=holder, scheduler=lambda: scheduler)
+
+    def _lease(self) -> SchedulerLease:
+        self.db.expire_all()
+        return self.db.get(SchedulerLease, "scheduler")
+
+    def test_exactly_one_worker_leads(self):
+        """Test the first heartbeat takes the lease, registers jobs and starts only the leader's scheduler."""
+        first, second = self._worker("worker-1"), self._worker("worker-2")
+        registered = Mock()
+        first.on_elected(registered)
+        second.on_elected(registered)
+
+        self.assertTrue(first.heartbeat(NOW))
+        self.assertFalse(second.heartbeat(NOW + timedelta(seconds=1)))
+
+        registered.assert_called_once_with()
+        first._scheduler().start.assert_called_once_with()
+        second._scheduler().start.assert_not_called()
+        self.assertEqual(self._lease().holder, "worker-1")
+
+    def test_renewal_extends_the_lease(self):
+        """Test the leader's heartbeats push the expiry ahead without re-running the election."""
+        leader = self._worker("worker-1")
+        leader.heartbeat(NOW)
+
+        self.assertTrue(leader.heartbeat(NOW + timedelta(seconds=10)))
+
+        lease = self._lease()
+        self.assertEqual((lease.acquired_at, lease.expires_at), (NOW, NOW + timedelta(seconds=40)))
+        self.assertEqual(leader.elections, 1)
+
+    def test_follower_takes_over_an_expired_lease(self):
+        """Test a follower wins once the leader stops renewing, and the old leader pauses its scheduler."""
+        leader, follower = self._worker("worker-1"), self._worker("worker-2")
+        leader.heartbeat(NOW)
+
+        self.assertFalse(follower.heartbeat(NOW + timedelta(seconds=30)))
+        self.assertTrue(follower.heartbeat(NOW + timedelta(seconds=31)))
+        self.assertFalse(leader.heartbeat(NOW + timedelta(seconds=32)))
+
+        leader._scheduler().pause.assert_called_once_with()
+        self.assertEqual((self._lease().holder, self._lease().acquired_at),
+                         ("worker-2", NOW + timedelta(seconds=31)))
+
+    def test_release_hands_over_immediately(self):
+        """Test a stopping leader frees the lease for the next heartbeat of a follower."""
+        leader, follower = self._worker("worker-1"), self._worker("worker-2")
+        leader.heartbeat(NOW)
+
+        leader.release()
+
+        self.assertFalse(leader.is_leader)
+        self.assertTrue(follower.heartbeat(datetime.now()))
+
+    def test_database_error_demotes(self):
+        """Test a leader that cannot renew its lease stops running jobs."""
+        leader = self._worker("worker-1")
+        leader.heartbeat(NOW)
+        leader.session_factory = Mock(side_effect=RuntimeError("database is down"))
+
+        self.assertFalse(leader.heartbeat(NOW + timedelta(seconds=10)))
+
+        self.assertEqual((leader.is_leader, leader.errors), (False, 1))
+        leader._scheduler().pause.assert_called_once_with()
+
+    def test_status_reports_holder(self):
+        """Test the status shows the live holder as seen by any worker."""
+        leader, follower = self._worker("worker-1"), self._worker("worker-2")
+        leader.heartbeat(datetime.now())
+
+        status = follower.status(self.db)
+
+        self.assertEqual((status["holder"], status["worker"], status["is_leader"]), ("worker-1", "worker-2", False))
+
+
+if __name__ == '__main__':
+    unittest.main()
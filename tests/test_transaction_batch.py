@@ -0,0 +1,112 @@
+"""
+Tests for batch status updates with TransactionBatchService.
+"""
+import unittest
+
+from sqlalchemy import event, func, select
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction import TransactionBatchService
+from app.models import LedgerEntry, NotificationOutbox
+from app.models.transaction import TransactionStatus, TransactionUpdateStatus
+from app.schemas.transaction import TransactionBatchItem
+
+ACCEPT = TransactionUpdateStatus.ACCEPT
+CONFIRM = TransactionUpdateStatus.CONFIRM
+DECLINE = TransactionUpdateStatus.DECLINE
+CANCEL = TransactionUpdateStatus.CANCEL
+
+
+class TestTransactionBatch(DatabaseTestCase):
+    """Test cases for TransactionBatchService."""
+
+    def setUp(self):
+        super().setUp()
+        self.receiver = self._create_user("receiver", balance=0)
+        self.senders = [self._create_user(f"sender{i}", balance=100, reserved_balance=50) for i in range(3)]
+
+    def _awaiting(self, sender, amount: float = 10, **kwargs):
+        return self._create_transaction(sender, self.receiver, amount=amount,
+                                        status=TransactionStatus.AWAITING_ACCEPTANCE, recurring=False, **kwargs)
+
+    def _count(self, model) -> int:
+        return self.db.execute(select(func.count()).select_from(model)).scalar()
+
+    def _batch(self, user, *items):
+        return TransactionBatchService.update_statuses(
+            self.db, user, [TransactionBatchItem(transaction_id=transaction_id, action=action)
+                            for transaction_id, action in items])
+
+    def test_receiver_accepts_and_declines_in_one_batch(self):
+        """Test valid items are applied with balances summed per user, and invalid items are reported."""
+        first, second, third = (self._awaiting(sender, amount=20) for sender in self.senders)
+        declined = self._awaiting(self.senders[0], amount=5)
+        pending = [self._create_transaction(self.senders[1], self.receiver, status=TransactionStatus.PENDING,
+                                            recurring=False) for _ in range(2)]
+        ids = [first.id, second.id, third.id, declined.id] + [t.id for t in pending]
+
+        report = self._batch(self.receiver, (ids[0], ACCEPT), (ids[1], ACCEPT), (ids[2], ACCEPT),
+                             (ids[3], DECLINE), (ids[4], ACCEPT), (ids[5], CONFIRM), (ids[0], ACCEPT), (999, ACCEPT))
+
+        self.assertEqual((report.applied, report.rejected), (4, 4))
+        self.assertEqual([(r.outcome, r.status) for r in report.results[:4]],
+                         [("applied", TransactionStatus.COMPLETED)] * 3 + [("applied", TransactionStatus.DENIED)])
+        self.assertEqual([r.error for r in report.results[4:]],
+                         ["Cannot accept transaction with status: pending",
+                          "Only the sender can confirm this transaction",
+                          "Transaction appears more than once in the batch",
+                          "Transaction not found"])
+
+        self.assertEqual(self.receiver.balance, 60)
+        self.assertEqual([(s.balance, s.reserved_balance) for s in self.senders], [(80, 25), (80, 30), (80, 30)])
+        self.assertEqual(self._count(LedgerEntry), 6)
+        self.assertEqual(self._count(NotificationOutbox), 8)
+
+    def test_statements_do_not_grow_with_items(self):
+        """Test a batch costs one statement per kind of transition and per user, not per transaction."""
+        items = [(self._awaiting(self.senders[i % 3], amount=1).id, ACCEPT) for i in range(30)]
+        self.db.refresh(self.receiver)
+
+        with self.count_queries() as statements:
+            report = self._batch(self.receiver, *items)
+
+        self.assertEqual(report.applied, 30)
+        # load, status update, daily rollups, data versions, 4 balance updates, ledger, 2 notification events
+        self.assertEqual(len(statements), 11)
+
+    def test_balances_are_updated_in_user_id_order(self):
+        """Test the balance UPDATEs lock users in id order whatever the order of the items."""
+        items = [(self._awaiting(sender, amount=1).id, ACCEPT) for sender in reversed(self.senders)]
+        updated = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE users SET balance"):
+                updated.append(parameters[3])
+
+        event.listen(self.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            self._batch(self.receiver, *items)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertEqual(updated, sorted(user.id for user in [self.receiver, *self.senders]))
+
+    def test_confirmations_stop_at_the_available_balance(self):
+        """Test a sender's confirmations reserve funds in order until the available balance runs out."""
+        sender = self.senders[0]
+        pending = [self._create_transaction(sender, self.receiver, amount=20, status=TransactionStatus.PENDING,
+                                            recurring=False) for _ in range(3)]
+        awaiting = self._awaiting(sender, amount=15)
+        recurring = self._create_transaction(sender, self.receiver, status=TransactionStatus.PENDING, recurring=True)
+
+        report = self._batch(sender, *((t.id, CONFIRM) for t in pending), (awaiting.id, CANCEL),
+                             (recurring.id, CONFIRM))
+
+        self.assertEqual([r.outcome for r in report.results], ["applied", "applied", "rejected", "applied", "rejected"])
+        self.assertEqual(report.results[2].error, "Insufficient available balance. Available: $10.00, Required: $20.00")
+        self.assertEqual(report.results[4].error, "Recurring transactions must be updated one at a time")
+        self.assertEqual((sender.balance, sender.reserved_balance), (100, 75))
+
+
+if __name__ == "__main__":
+    unittest.main()
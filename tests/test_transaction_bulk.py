@@ -0,0 +1,119 @@
+"""
+Tests for bulk transfers created with TransactionBulkService.
+"""
+import unittest
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction import TransactionBulkService
+from app.models import Category, NotificationOutbox, Transaction
+from app.models.transaction import TransactionStatus
+from app.schemas.transaction import BulkTransferItem
+
+
+class TestTransactionBulk(DatabaseTestCase):
+    """Test cases for TransactionBulkService."""
+
+    def setUp(self):
+        super().setUp()
+        self.payer = self._create_user("payer", balance=1000)
+        self.staff = [self._create_user(f"staff{i}") for i in range(5)]
+
+    def _count(self, model) -> int:
+        return self.db.execute(select(func.count()).select_from(model)).scalar()
+
+    def test_report_covers_every_row(self):
+        """Test valid rows are created awaiting acceptance and invalid rows are reported without stopping the batch."""
+        items = [BulkTransferItem(identifier="staff0", amount=100, description="March"),
+                 BulkTransferItem(identifier="staff1@example.com", amount=50.556),
+                 BulkTransferItem(identifier="nobody", amount=10),
+                 BulkTransferItem(identifier="payer", amount=10),
+                 BulkTransferItem(identifier="staff2", amount=-5),
+                 BulkTransferItem(identifier=self.staff[3].phone_number, amount=25)]
+
+        report = TransactionBulkService.create_bulk(self.db, self.payer, items)
+
+        self.assertEqual((report.rows, report.created, report.rejected, report.total_amount), (6, 3, 3, 175.56))
+        self.assertEqual([r.status for r in report.results],
+                         ["created", "created", "rejected", "rejected", "rejected", "created"])
+        self.assertEqual([r.error for r in report.results if r.error],
+                         ["User with these details does not exist", "Cannot send money to yourself",
+                          "Transaction amount must be positive"])
+
+        transactions = self.db.execute(select(Transaction).order_by(Transaction.id)).scalars().all()
+        self.assertEqual([t.id for t in transactions], [r.transaction_id for r in report.results if r.transaction_id])
+        self.assertEqual([(t.receiver_id, t.amount, t.status) for t in transactions],
+                         [(self.staff[0].id, 100, TransactionStatus.AWAITING_ACCEPTANCE),
+                          (self.staff[1].id, 50.56, TransactionStatus.AWAITING_ACCEPTANCE),
+                          (self.staff[3].id, 25, TransactionStatus.AWAITING_ACCEPTANCE)])
+        self.assertEqual(self.payer.reserved_balance, 175.56)
+        self.assertEqual(self._count(NotificationOutbox), 3)
+
+    def test_unknown_categories_are_row_errors(self):
+        """Test rows tagged with a missing or foreign category are rejected before anything is inserted."""
+        own = Category(name="Payroll", user_id=self.payer.id)
+        foreign = Category(name="Rent", user_id=self.staff[0].id)
+        self.db.add_all([own, foreign])
+        self.db.commit()
+        items = [BulkTransferItem(identifier="staff0", amount=100, category_id=own.id),
+                 BulkTransferItem(identifier="staff1", amount=50, category_id=foreign.id),
+                 BulkTransferItem(identifier="staff2", amount=25, category_id=999)]
+        self.db.refresh(self.payer)
+
+        with self.count_queries() as statements:
+            report = TransactionBulkService.create_bulk(self.db, self.payer, items)
+
+        self.assertEqual((report.created, report.rejected, report.total_amount), (1, 2, 100))
+        self.assertEqual([r.error for r in report.results if r.error],
+                         [f"Category with ID {foreign.id} not found or you don't have permission to access it.",
+                          "Category with ID 999 not found or you don't have permission to access it."])
+        self.assertEqual(self.db.execute(select(Transaction.category_id)).scalars().all(), [own.id])
+        # the statements of a batch plus one to resolve the categories
+        self.assertEqual(len(statements), 7)
+
+    def test_statements_do_not_grow_with_rows(self):
+        """Test a batch resolves, reserves, inserts and notifies with a fixed number of statements."""
+        items = [BulkTransferItem(identifier=f"staff{i % 5}", amount=1) for i in range(200)]
+        payer_id = self.payer.id
+
+        with self.count_queries() as statements:
+            report = TransactionBulkService.create_bulk(self.db, self.payer, items)
+
+        self.assertEqual(report.created, 200)
+        self.assertEqual(self._count(Transaction), 200)
+        self.assertEqual(self.payer.id, payer_id)
+        # resolve recipients, reserve the total, insert transactions, daily rollups, data versions,
+        # insert notifications
+        self.assertEqual(len(statements), 6)
+
+    def test_insufficient_total_creates_nothing(self):
+        """Test a batch whose total exceeds the available balance is rejected as a whole."""
+        items = [BulkTransferItem(identifier=f"staff{i}", amount=300) for i in range(4)]
+
+        with self.assertRaises(HTTPException) as context:
+            TransactionBulkService.create_bulk(self.db, self.payer, items)
+
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertIn("Required: $1200.00", context.exception.detail)
+        self.assertEqual(self._count(Transaction), 0)
+        self.assertEqual(self.payer.reserved_balance, 0)
+
+    def test_csv_rows_are_parsed_with_row_errors(self):
+        """Test CSV batches report unreadable rows and reject files without the required columns."""
+        items, errors = TransactionBulkService.parse_csv("identifier,amount,description\n"
+                                                         "staff0,12.5,Bonus\n"
+                                                         "staff1,twelve,\n")
+        report = TransactionBulkService.create_bulk(self.db, self.payer, items, errors=errors)
+
+        self.assertEqual((report.created, report.rejected), (1, 1))
+        self.assertEqual(report.results[0].amount, 12.5)
+        self.assertIn("amount", report.results[1].error)
+
+        with self.assertRaises(HTTPException):
+            TransactionBulkService.parse_csv("user,amount\nstaff0,1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
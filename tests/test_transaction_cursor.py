@@ -0,0 +1,110 @@
+"""
+Tests for keyset (cursor) pagination of the transaction history.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction.transaction_cursor import TransactionCursor
+from app.business.transaction.transaction_service import TransactionService
+from app.schemas.router import TransactionHistoryFilter
+
+
+class TestTransactionCursorPagination(DatabaseTestCase):
+    """Test cases for cursor mode of TransactionService.get_user_transaction_history."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_user("alice", balance=1000)
+        self.other = self._create_user("bob", balance=1000)
+
+        base = datetime(2025, 1, 1, 12, 0, 0)
+        # Duplicated dates and amounts force the id tie-breaker
+        for i in range(35):
+            sender, receiver = (self.user, self.other) if i % 2 else (self.other, self.user)
+            self._create_transaction(sender, receiver,
+                                     amount=float(i % 4 + 1),
+                                     date=base + timedelta(days=i // 3))
+
+    def _walk(self, order_by: str) -> list:
+        ids = []
+        cursor = None
+        for _ in range(10):
+            history_filter = TransactionHistoryFilter(limit=10, order_by=order_by,
+                                                      pagination="cursor", cursor=cursor)
+            page = TransactionService.get_user_transaction_history(self.db, self.user, history_filter)
+            ids.extend(t.id for t in page.transactions)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        return ids
+
+    def _expected(self, order_by: str) -> list:
+        column, descending = TransactionCursor.SORT_COLUMNS[order_by]
+        rows = [(getattr(t, column), t.id) for t in
+                TransactionService.get_user_transaction_history(
+                    self.db, self.user, TransactionHistoryFilter(limit=100, order_by=order_by)).transactions]
+        return [row_id for _, row_id in sorted(rows, reverse=descending)]
+
+    def test_cursor_walk_matches_full_ordering(self):
+        """Test walking every page returns each transaction once in sort order for every order_by."""
+        for order_by in TransactionCursor.SORT_COLUMNS:
+            with self.subTest(order_by=order_by):
+                ids = self._walk(order_by)
+                self.assertEqual(len(ids), 35)
+                self.assertEqual(ids, self._expected(order_by))
+
+    def test_last_page_has_no_cursor(self):
+        """Test the final page does not return a next cursor."""
+        history_filter = TransactionHistoryFilter(limit=50, pagination="cursor")
+
+        page = TransactionService.get_user_transaction_history(self.db, self.user, history_filter)
+
+        self.assertEqual(len(page.transactions), 35)
+        self.assertIsNone(page.next_cursor)
+
+    def test_cursor_mode_uses_keyset_predicate(self):
+        """Test deep pages are fetched with a keyset predicate on (date, id)."""
+        first = TransactionService.get_user_transaction_history(
+            self.db, self.user, TransactionHistoryFilter(limit=10, pagination="cursor"))
+
+        with self.count_queries() as statements:
+            TransactionService.get_user_transaction_history(
+                self.db, self.user, TransactionHistoryFilter(limit=10, cursor=first.next_cursor))
+
+        page_query = next(statement for statement in statements if "LIMIT" in statement)
+        self.assertIn("transactions.id <", page_query)
+        self.assertIn("ORDER BY transactions.date DESC, transactions.id DESC", page_query)
+
+    def test_offset_mode_unchanged(self):
+        """Test page based pagination keeps working for old clients."""
+        page = TransactionService.get_user_transaction_history(
+            self.db, self.user, TransactionHistoryFilter(limit=10, page=4))
+
+        self.assertEqual(len(page.transactions), 5)
+        self.assertEqual(page.pages, 4)
+        self.assertIsNone(page.next_cursor)
+
+    def test_cursor_for_other_order_rejected(self):
+        """Test a cursor cannot be reused with a different sort order."""
+        first = TransactionService.get_user_transaction_history(
+            self.db, self.user, TransactionHistoryFilter(limit=10, pagination="cursor", order_by="amount_desc"))
+
+        with self.assertRaises(HTTPException) as context:
+            TransactionService.get_user_transaction_history(
+                self.db, self.user, TransactionHistoryFilter(limit=10, cursor=first.next_cursor))
+
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_malformed_cursor_rejected(self):
+        """Test garbage cursors are reported as bad requests."""
+        with self.assertRaises(HTTPException) as context:
+            TransactionCursor.decode("not-a-cursor", "date_desc")
+
+        self.assertEqual(context.exception.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
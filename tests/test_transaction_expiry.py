@@ -0,0 +1,119 @@
+"""
+Tests for the sweeper expiring transfers left awaiting acceptance.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction import TransactionService
+from app.business.transaction.transaction_batch import TransactionBatchService
+from app.business.transaction.transaction_expiry import TransactionExpiryService
+from app.models import NotificationOutbox, Transaction
+from app.models.transaction import TransactionStatus, TransactionUpdateStatus
+from app.schemas.transaction import TransactionBatchItem
+
+NOW = datetime(2025, 3, 10, 8, 0, 0)
+DAY = 86400
+
+
+class TestTransactionExpiry(DatabaseTestCase):
+    """Test cases for TransactionExpiryService."""
+
+    def setUp(self):
+        super().setUp()
+        self.receiver = self._create_user("receiver")
+        self.senders = [self._create_user(f"sender{i}", balance=100, reserved_balance=60) for i in range(2)]
+
+    def _awaiting(self, sender, amount: float, days_ago: int, **kwargs) -> Transaction:
+        status = kwargs.pop("status", TransactionStatus.AWAITING_ACCEPTANCE)
+        confirmed = NOW - timedelta(days=kwargs.pop("confirmed_days_ago", days_ago))
+        return self._create_transaction(sender, self.receiver, amount=amount, date=NOW - timedelta(days=days_ago),
+                                        status=status, recurring=kwargs.pop("recurring", False),
+                                        awaiting_since=confirmed if status == TransactionStatus.AWAITING_ACCEPTANCE
+                                        else None, **kwargs)
+
+    def _statuses(self) -> list:
+        return self.db.execute(select(Transaction.status).order_by(Transaction.id)).scalars().all()
+
+    def test_expired_transfers_release_reservations(self):
+        """Test transfers past the TTL are cancelled with their amounts released per sender and notices queued."""
+        first, second = self.senders
+        self._awaiting(first, 10, days_ago=9)
+        self._awaiting(first, 20, days_ago=8)
+        self._awaiting(second, 25, days_ago=8)
+        self._awaiting(first, 30, days_ago=1)
+        self._awaiting(second, 5, days_ago=30, status=TransactionStatus.PENDING)
+        self._awaiting(second, 5, days_ago=30, recurring=True)
+
+        result = TransactionExpiryService.expire(self.db, now=NOW, ttl=7 * DAY, batch_size=2)
+
+        self.assertEqual(result, {"expired": 3, "released": 55, "batches": 2})
+        self.assertEqual(self._statuses(), [TransactionStatus.CANCELLED] * 3 + [
+            TransactionStatus.AWAITING_ACCEPTANCE, TransactionStatus.PENDING, TransactionStatus.AWAITING_ACCEPTANCE])
+        self.assertEqual([(s.balance, s.reserved_balance) for s in self.senders], [(100, 30), (100, 35)])
+        self.assertEqual(self.db.execute(select(NotificationOutbox.event, NotificationOutbox.transaction_id)
+                                         .order_by(NotificationOutbox.id)).all(),
+                         [("transaction_expired", 1), ("transaction_expired", 1), ("transaction_expired", 2),
+                          ("transaction_expired", 2), ("transaction_expired", 3), ("transaction_expired", 3)])
+
+    def test_age_counts_from_confirmation(self):
+        """Test a transfer created long ago but confirmed recently is kept, through both confirmation paths."""
+        self._awaiting(self.senders[0], 10, days_ago=30, confirmed_days_ago=1)
+        created = datetime.now() - timedelta(days=30)
+        single = self._create_transaction(self.senders[1], self.receiver, amount=5, date=created,
+                                          status=TransactionStatus.PENDING, recurring=False)
+        batched = self._create_transaction(self.senders[1], self.receiver, amount=5, date=created,
+                                           status=TransactionStatus.PENDING, recurring=False)
+        TransactionService.confirm_transaction(self.db, self.senders[1], single.id)
+        TransactionBatchService.update_statuses(self.db, self.senders[1], [TransactionBatchItem(
+            transaction_id=batched.id, action=TransactionUpdateStatus.CONFIRM)])
+
+        self.assertEqual(TransactionExpiryService.expire(self.db, now=NOW, ttl=7 * DAY)["expired"], 0)
+        # Only the transfer confirmed at NOW - 1 day is older than a week today
+        self.assertEqual(TransactionExpiryService.expire(self.db, ttl=7 * DAY)["expired"], 1)
+        result = TransactionExpiryService.expire(self.db, now=datetime.now() + timedelta(days=8), ttl=7 * DAY)
+        self.assertEqual(result["expired"], 2)
+
+    def test_batch_statements_are_constant(self):
+        """Test each batch reads, cancels, rolls up, bumps versions, releases and notifies with one statement each."""
+        for i in range(40):
+            self._awaiting(self.senders[i % 2], 1, days_ago=10)
+
+        with self.count_queries() as statements:
+            result = TransactionExpiryService.expire(self.db, now=NOW, ttl=7 * DAY, batch_size=100)
+
+        self.assertEqual((result["expired"], result["batches"]), (40, 1))
+        self.assertEqual(len(statements), 6)
+
+    def test_transfers_resolved_meanwhile_are_skipped(self):
+        """Test a transfer accepted after it was read is not cancelled and its reservation is kept."""
+        accepted = self._awaiting(self.senders[0], 10, days_ago=10)
+        self._awaiting(self.senders[0], 20, days_ago=10)
+        accepted_id = accepted.id
+        cutoff = NOW - timedelta(days=7)
+
+        # the receiver accepts between the read and the UPDATE of the sweep
+        original = self.db.execute
+
+        def execute(statement, *args, **kwargs):
+            result = original(statement, *args, **kwargs)
+            if getattr(statement, "is_select", False) and not args:
+                original(Transaction.__table__.update().where(Transaction.id == accepted_id)
+                         .values(status=TransactionStatus.COMPLETED))
+            return result
+
+        self.db.execute = execute
+        try:
+            result = TransactionExpiryService.expire_batch(self.db, cutoff, batch_size=10)
+        finally:
+            del self.db.execute
+
+        self.assertEqual((result["read"], result["expired"], result["released"]), (2, 1, 20))
+        self.assertEqual(self._statuses(), [TransactionStatus.COMPLETED, TransactionStatus.CANCELLED])
+        self.assertEqual(self.senders[0].reserved_balance, 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the balance forecast and its per-user projection cache.
+"""
+import unittest
+from datetime import date, datetime, timedelta
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction import TransactionService
+from app.business.transaction.transaction_forecast import ForecastService, add_months, forecast_cache
+from app.business.transaction.transactions_recurring import RecurringService
+from app.models import RecurringTransaction
+from app.models.recurring_transation import RecurringInterval
+from app.models.transaction import TransactionStatus
+
+TODAY = date(2025, 3, 10)
+MIDNIGHT = datetime(2025, 3, 10)
+
+
+class TestTransactionForecast(DatabaseTestCase):
+    """Test cases for ForecastService."""
+
+    def setUp(self):
+        super().setUp()
+        forecast_cache.clear()
+        self.addCleanup(forecast_cache.clear)
+        self.alice = self._create_user("alice", balance=100)
+        self.bob = self._create_user("bob", balance=0)
+
+    def _schedule(self, sender, receiver, amount: float, interval: RecurringInterval = RecurringInterval.DAILY,
+                  next_run_at: datetime = MIDNIGHT) -> RecurringTransaction:
+        transaction = self._create_transaction(sender, receiver, amount=amount, date=MIDNIGHT - timedelta(days=30),
+                                               status=TransactionStatus.ACCEPTED, recurring=True)
+        schedule = RecurringTransaction(transaction_id=transaction.id, interval=interval, is_active=True,
+                                        next_run_at=next_run_at)
+        self.db.add(schedule)
+        self.db.commit()
+        return schedule
+
+    def _forecast(self, user, **options):
+        return ForecastService.forecast(self.db, user, today=TODAY, **options)
+
+    def test_projects_recurring_flows_in_both_directions(self):
+        """Test sent schedules lower and received schedules raise the balance on their run days."""
+        self._schedule(self.alice, self.bob, 10)
+        self._schedule(self.bob, self.alice, 50, RecurringInterval.WEEKLY, next_run_at=MIDNIGHT + timedelta(days=2))
+
+        forecast = self._forecast(self.alice, months=1)
+
+        self.assertEqual((forecast.start, forecast.end), (TODAY, date(2025, 4, 10)))
+        self.assertEqual([p.balance for p in forecast.points[:4]], [90, 80, 120, 110])
+        # 32 daily runs and 5 weekly ones (12th, 19th, 26th, 2nd, 9th)
+        self.assertEqual((forecast.recurring_out, forecast.recurring_in), (320, 250))
+        self.assertEqual(forecast.points[-1].balance, 30)
+
+    def test_overdue_schedule_runs_today_then_on_its_days(self):
+        """Test a schedule missed for days runs on the first day and then on its regular interval."""
+        self._schedule(self.alice, self.bob, 5, RecurringInterval.WEEKLY, next_run_at=MIDNIGHT - timedelta(days=3))
+
+        forecast = self._forecast(self.alice, months=1)
+
+        run_days = [p.date for p in forecast.points if p.recurring_out]
+        self.assertEqual(run_days, [TODAY, date(2025, 3, 14), date(2025, 3, 21), date(2025, 3, 28),
+                                    date(2025, 4, 4)])
+
+    def test_history_average_and_lowest_balance(self):
+        """Test one-off history adds its daily average and the first negative day is reported."""
+        self._create_transaction(self.bob, self.alice, amount=90, date=MIDNIGHT - timedelta(days=10),
+                                 status=TransactionStatus.COMPLETED)
+        self._schedule(self.alice, self.bob, 30, RecurringInterval.WEEKLY)
+
+        forecast = self._forecast(self.alice, months=1)
+
+        self.assertEqual(forecast.average_daily_net, 1.0)
+        self.assertEqual(forecast.points[0].balance, 71)
+        self.assertEqual(forecast.first_negative_on, date(2025, 4, 7))
+        self.assertEqual((forecast.lowest_balance, forecast.lowest_balance_on), (-21, date(2025, 4, 7)))
+
+    def test_granularity_sums_periods(self):
+        """Test weekly and monthly points carry the period's flows and the balance at its end."""
+        self._schedule(self.alice, self.bob, 1)
+        daily = self._forecast(self.alice, months=2)
+
+        for granularity, expected_dates in (("week", [date(2025, 3, 16), date(2025, 3, 23)]),
+                                            ("month", [date(2025, 3, 31), date(2025, 4, 30), date(2025, 5, 10)])):
+            with self.subTest(granularity=granularity):
+                forecast = self._forecast(self.alice, months=2, granularity=granularity)
+                self.assertEqual([p.date for p in forecast.points][:len(expected_dates)], expected_dates)
+                self.assertEqual(sum(p.recurring_out for p in forecast.points), daily.recurring_out)
+                self.assertEqual(forecast.points[-1].balance, daily.points[-1].balance)
+
+    def test_statements_do_not_grow_with_schedules(self):
+        """Test a projection reads grouped schedules and history with two statements, then serves from the cache."""
+        for i in range(40):
+            self._schedule(self.alice, self.bob, 1, RecurringInterval.DAILY if i % 2 else RecurringInterval.MONTHLY)
+        self.db.refresh(self.alice)
+
+        with self.count_queries() as statements:
+            first = self._forecast(self.alice, months=12)
+        with self.count_queries() as cached:
+            second = self._forecast(self.alice, months=12)
+
+        self.assertEqual((len(statements), len(cached)), (2, 0))
+        self.assertEqual(first, second)
+
+    def test_schedule_changes_invalidate_the_cache(self):
+        """Test activating, cancelling and executing schedules drop the cached projection of both users."""
+        schedule = self._schedule(self.alice, self.bob, 10)
+        self._forecast(self.alice)
+        self._forecast(self.bob)
+
+        RecurringService.execute_due(self.db, MIDNIGHT + timedelta(hours=8))
+
+        self.assertEqual(forecast_cache.stats()["size"], 0)
+        self.db.refresh(schedule)
+        self.assertEqual(self._forecast(self.alice, months=1).points[0].recurring_out, 0)
+
+        TransactionService.cancel_recurring_transaction(self.db, self.alice, schedule.transaction)
+
+        self.assertEqual(forecast_cache.stats()["size"], 0)
+        self.assertEqual(self._forecast(self.alice, months=1).recurring_out, 0)
+
+    def test_add_months_clamps_to_month_end(self):
+        """Test month arithmetic keeps the day of the month where it exists."""
+        self.assertEqual(add_months(date(2025, 1, 31), 1), date(2025, 2, 28))
+        self.assertEqual(add_months(date(2024, 11, 30), 3), date(2025, 2, 28))
+        self.assertEqual(add_months(date(2025, 3, 10), 24), date(2027, 3, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
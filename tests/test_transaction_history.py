@@ -0,0 +1,124 @@
+"""
+Tests for the single round trip transaction history query.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction.transaction_service import TransactionService
+from app.models import Category
+from app.models.transaction import TransactionStatus
+from app.schemas.router import TransactionHistoryFilter
+
+
+class TestTransactionHistoryQuery(DatabaseTestCase):
+    """Test cases for totals and query budget of TransactionService.get_user_transaction_history."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_user("alice", balance=1000)
+        self.other = self._create_user("bob", balance=1000)
+        self.third = self._create_user("carol", balance=1000)
+
+        category = Category(name="Groceries", user_id=self.user.id)
+        self.db.add(category)
+        self.db.commit()
+
+        base = datetime(2025, 1, 1, 12, 0, 0)
+        statuses = [TransactionStatus.COMPLETED, TransactionStatus.AWAITING_ACCEPTANCE,
+                    TransactionStatus.PENDING, TransactionStatus.DENIED]
+        for i in range(24):
+            sender, receiver = (self.user, self.other) if i % 2 else (self.third, self.user)
+            self._create_transaction(sender, receiver,
+                                     amount=float(i + 1),
+                                     date=base + timedelta(days=i),
+                                     status=statuses[i % 4],
+                                     category_id=category.id if i % 3 == 0 else None)
+        # Not part of alice's history
+        self._create_transaction(self.other, self.third, amount=500.0, date=base)
+
+        self.user_id = self.user.id
+        self.db.expire_all()
+
+    def _expected_totals(self, transactions) -> dict:
+        completed = [t for t in transactions
+                     if t.status in (TransactionStatus.COMPLETED, TransactionStatus.AWAITING_ACCEPTANCE)]
+        outgoing = [t.amount for t in completed if t.sender_id == self.user_id]
+        incoming = [t.amount for t in completed if t.receiver_id == self.user_id]
+        return {"total": len(transactions),
+                "total_completed": len(completed),
+                "outgoing_total": sum(outgoing),
+                "incoming_total": sum(incoming),
+                "avg_outgoing_transaction": round(sum(outgoing) / len(outgoing), 2),
+                "avg_incoming_transaction": round(sum(incoming) / len(incoming), 2)}
+
+    def _assert_totals(self, page, expected: dict):
+        for field, value in expected.items():
+            self.assertEqual(getattr(page, field), value, field)
+
+    def test_history_is_a_single_statement(self):
+        """Test the page, totals and categories are loaded with one statement."""
+        user = self.db.get(type(self.user), self.user_id)
+
+        with self.count_queries() as statements:
+            page = TransactionService.get_user_transaction_history(
+                self.db, user, TransactionHistoryFilter(limit=10, page=2))
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(page.transactions), 10)
+        self.assertIn("Groceries", [t.category_name for t in page.transactions])
+
+    def test_totals_cover_whole_filtered_history(self):
+        """Test totals are computed over every matching row, not the returned page."""
+        user = self.db.get(type(self.user), self.user_id)
+        everything = TransactionService.get_user_transaction_history(
+            self.db, user, TransactionHistoryFilter(limit=100)).transactions
+
+        page = TransactionService.get_user_transaction_history(
+            self.db, user, TransactionHistoryFilter(limit=10, pagination="cursor"))
+
+        self.assertEqual(len(everything), 24)
+        self.assertEqual(page.pages, 3)
+        self._assert_totals(page, self._expected_totals(everything))
+
+    def test_totals_respect_filters(self):
+        """Test totals follow date and direction filters."""
+        user = self.db.get(type(self.user), self.user_id)
+        history_filter = TransactionHistoryFilter(limit=10, direction="out",
+                                                  date_from=datetime(2025, 1, 5),
+                                                  date_to=datetime(2025, 1, 20))
+        matching = [t for t in TransactionService.get_user_transaction_history(
+            self.db, user, TransactionHistoryFilter(limit=100)).transactions
+            if t.sender_id == self.user_id and datetime(2025, 1, 5) <= t.date <= datetime(2025, 1, 20)]
+
+        page = TransactionService.get_user_transaction_history(self.db, user, history_filter)
+
+        self.assertEqual(page.total, len(matching))
+        self.assertEqual(page.outgoing_total, sum(t.amount for t in matching if t.status in (
+            TransactionStatus.COMPLETED, TransactionStatus.AWAITING_ACCEPTANCE)))
+        self.assertEqual(page.incoming_total, 0)
+
+    def test_page_past_the_end_keeps_totals(self):
+        """Test an empty page still reports totals for the filtered history."""
+        user = self.db.get(type(self.user), self.user_id)
+
+        page = TransactionService.get_user_transaction_history(
+            self.db, user, TransactionHistoryFilter(limit=10, page=10))
+
+        self.assertEqual(page.transactions, [])
+        self.assertEqual(page.total, 24)
+        self.assertEqual(page.pages, 3)
+
+    def test_empty_history(self):
+        """Test a user without transactions gets zeroed totals."""
+        lonely = self._create_user("dave")
+
+        page = TransactionService.get_user_transaction_history(self.db, lonely, TransactionHistoryFilter())
+
+        self.assertEqual(page.total, 0)
+        self.assertEqual(page.pages, 0)
+        self.assertEqual(page.outgoing_total, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Tests for the transaction notification outbox and its dispatcher.
+"""
+import asyncio
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction.transaction_notifications import TransactionNotificationService
+from app.business.transaction.transaction_outbox import TransactionOutboxDispatcher
+from app.models.notification_outbox import NotificationOutbox, OutboxStatus
+from app.models.transaction import TransactionStatus
+
+DELIVER = 'app.business.transaction.transaction_outbox.TransactionNotificationService.deliver'
+NOTIFY = 'app.business.transaction.transaction_notifications.NotificationService.notify'
+NOTIFY_TEMPLATE = 'app.business.transaction.transaction_notifications.NotificationService.notify_from_template'
+
+
+class TestTransactionOutbox(DatabaseTestCase):
+    """Test cases for enqueueing and dispatching transaction notifications."""
+
+    def setUp(self):
+        super().setUp()
+        self.sender = self._create_user("alice", balance=1000)
+        self.receiver = self._create_user("bob")
+        self.transaction = self._create_transaction(self.sender, self.receiver, status=TransactionStatus.PENDING)
+        self.dispatcher = TransactionOutboxDispatcher(session_factory=sessionmaker(bind=self.engine),
+                                                      batch_size=10, concurrency=2, poll_interval=1,
+                                                      max_attempts=3, claim_timeout=60)
+
+    def _entries(self) -> list:
+        self.db.expire_all()
+        return self.db.execute(select(NotificationOutbox).order_by(NotificationOutbox.id)).scalars().all()
+
+    def _enqueue(self, *events, **payload):
+        TransactionNotificationService.enqueue(self.db, self.transaction, *events, **payload)
+        self.db.commit()
+
+    def test_enqueue_shares_the_callers_transaction(self):
+        """Test queued notifications are rolled back and committed with the state change."""
+        self.transaction.status = TransactionStatus.CANCELLED
+        TransactionNotificationService.enqueue(self.db, self.transaction, "transaction_cancelled")
+        self.db.rollback()
+
+        self.assertEqual(self._entries(), [])
+
+        self._enqueue("transaction_declined", reason="Not interested")
+
+        entries = self._entries()
+        self.assertTrue(all(entry.status == OutboxStatus.PENDING for entry in entries))
+        self.assertEqual([entry.payload for entry in entries],
+                         [{"reason": "Not interested", "recipient": "sender"},
+                          {"reason": "Not interested", "recipient": "receiver"}])
+
+    def test_enqueue_rejects_unknown_event(self):
+        """Test a typo in an event name fails at enqueue time rather than in the dispatcher."""
+        with self.assertRaises(ValueError):
+            TransactionNotificationService.enqueue(self.db, self.transaction, "transaction_teleported")
+
+    def test_dispatch_sends_and_marks_sent(self):
+        """Test a batch is delivered with its transaction loaded and marked as sent."""
+        self._enqueue("sender_transaction_created", "transaction_received")
+        delivered = []
+
+        def deliver(event, transaction, payload):
+            delivered.append((event, transaction.sender.username, transaction.receiver.username))
+            return True
+
+        with patch(DELIVER, side_effect=deliver):
+            handled = asyncio.run(self.dispatcher.dispatch_once())
+
+        self.assertEqual(handled, 2)
+        self.assertCountEqual(delivered, [("sender_transaction_created", "alice", "bob"),
+                                          ("transaction_received", "alice", "bob")])
+        self.assertTrue(all(e.status == OutboxStatus.SENT and e.sent_at for e in self._entries()))
+        self.assertEqual(self.dispatcher.stats()["sent"], 2)
+
+    def test_failures_back_off_then_give_up(self):
+        """Test a failing send is retried later and marked failed after max_attempts."""
+        self._enqueue("transaction_completed")
+
+        with patch(DELIVER, side_effect=RuntimeError("mailgun down")):
+            asyncio.run(self.dispatcher.dispatch_once())
+            entry, = self._entries()
+            self.assertEqual(entry.status, OutboxStatus.PENDING)
+            self.assertEqual(entry.attempts, 1)
+            self.assertEqual(entry.last_error, "mailgun down")
+            self.assertGreater(entry.available_at, datetime.now())
+
+            # Not due yet
+            self.assertEqual(asyncio.run(self.dispatcher.dispatch_once()), 0)
+
+            for _ in range(2):
+                entry.available_at = datetime.now() - timedelta(seconds=1)
+                self.db.commit()
+                asyncio.run(self.dispatcher.dispatch_once())
+                entry, = self._entries()
+
+        self.assertEqual(entry.status, OutboxStatus.FAILED)
+        self.assertEqual(entry.attempts, 3)
+
+    def test_stale_claims_are_reclaimed(self):
+        """Test rows left in SENDING by a dead worker are sent again after the claim timeout."""
+        self._enqueue("transaction_completed")
+        entry, = self._entries()
+        entry.status = OutboxStatus.SENDING
+        entry.claimed_at = datetime.now() - timedelta(seconds=30)
+        self.db.commit()
+
+        with patch(DELIVER, return_value=True) as deliver:
+            self.assertEqual(asyncio.run(self.dispatcher.dispatch_once()), 0)
+
+            entry.claimed_at = datetime.now() - timedelta(seconds=120)
+            self.db.commit()
+            self.assertEqual(asyncio.run(self.dispatcher.dispatch_once()), 1)
+
+        deliver.assert_called_once()
+        self.assertEqual(self._entries()[0].status, OutboxStatus.SENT)
+
+    def test_retry_resends_only_the_failed_recipient(self):
+        """Test a two-party notice whose receiver e-mail failed does not e-mail the sender again."""
+        self._enqueue("transaction_failed", error_message="boom")
+        sent = []
+
+        def send(user, **kwargs):
+            sent.append(user.username)
+            return Mock(status_code=500 if user.username == "bob" and len(sent) < 3 else 200)
+
+        with patch(NOTIFY, side_effect=send), patch(NOTIFY_TEMPLATE, side_effect=send), patch('builtins.print'):
+            self.assertEqual(asyncio.run(self.dispatcher.dispatch_once()), 2)
+            self.assertEqual([entry.status for entry in self._entries()], [OutboxStatus.SENT, OutboxStatus.PENDING])
+
+            retry = self._entries()[1]
+            retry.available_at = datetime.now() - timedelta(seconds=1)
+            self.db.commit()
+            self.assertEqual(asyncio.run(self.dispatcher.dispatch_once()), 1)
+
+        self.assertCountEqual(sent, ["alice", "bob", "bob"])
+        self.assertTrue(all(entry.status == OutboxStatus.SENT for entry in self._entries()))
+
+    def test_concurrency_is_bounded(self):
+        """Test no more than `concurrency` sends are in flight at once."""
+        self._enqueue(*["transaction_completed"] * 6)
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        def deliver(event, transaction, payload):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return True
+
+        with patch(DELIVER, side_effect=deliver):
+            asyncio.run(self.dispatcher.dispatch_once())
+
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(self.dispatcher.backlog(self.db)["sent"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
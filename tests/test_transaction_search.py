@@ -0,0 +1,89 @@
+"""
+Tests for full-text search over transaction descriptions in the transaction history.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from tests.base_test import DatabaseTestCase
+from app.business.transaction.transaction_service import TransactionService
+from app.models import Transaction
+from app.models.transaction import TransactionStatus
+from app.schemas.router import TransactionHistoryFilter
+
+BASE = datetime(2025, 2, 1, 12, 0, 0)
+
+
+class TestTransactionSearch(DatabaseTestCase):
+    """Test cases for the q parameter of TransactionService.get_user_transaction_history."""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self._create_user("alice", balance=1000)
+        self.bob = self._create_user("bob", balance=1000)
+        self.carol = self._create_user("carol", balance=1000)
+        descriptions = [(self.alice, self.bob, "Rent for March"),
+                        (self.bob, self.alice, "Pizza night"),
+                        (self.alice, self.carol, "Café crème and pizza"),
+                        (self.carol, self.alice, "Rent share, March"),
+                        (self.alice, self.bob, None),
+                        (self.alice, self.bob, "pizza pizza pizza"),
+                        (self.bob, self.carol, "Pizza with carol")]
+        self.ids = [self._create_transaction(sender, receiver, amount=10.0 * (i + 1), date=BASE + timedelta(days=i),
+                                             description=description).id
+                    for i, (sender, receiver, description) in enumerate(descriptions)]
+
+    def _search(self, user=None, **kwargs):
+        return TransactionService.get_user_transaction_history(self.db, user or self.alice,
+                                                               TransactionHistoryFilter(**kwargs))
+
+    def _found(self, **kwargs) -> list:
+        return [transaction.id for transaction in self._search(**kwargs).transactions]
+
+    def test_every_word_must_match(self):
+        """Test words match in any order and case, accents are ignored and other users' rows are not searched."""
+        self.assertEqual(self._found(q="march RENT", order_by="date_asc"), [self.ids[0], self.ids[3]])
+        self.assertEqual(self._found(q="cafe", order_by="date_asc"), [self.ids[2]])
+        self.assertEqual(self._found(q="pizza", order_by="date_asc"), [self.ids[1], self.ids[2], self.ids[5]])
+        self.assertEqual(self._found(q="pizza carol"), [])
+
+    def test_search_is_combined_with_filters_and_totals(self):
+        """Test the search narrows the other filters and the totals cover the matching rows only."""
+        page = self._search(q="pizza", direction="out", date_from=BASE + timedelta(days=2), order_by="date_asc")
+
+        self.assertEqual([transaction.id for transaction in page.transactions], [self.ids[2], self.ids[5]])
+        self.assertEqual((page.total, page.outgoing_total, page.incoming_total), (2, 90.0, 0))
+        self.assertEqual(self._found(q="rent", sender_id=self.carol.id), [self.ids[3]])
+
+    def test_relevance_order(self):
+        """Test relevance puts the best match first and cannot be paged with a cursor."""
+        self.assertEqual(self._found(q="pizza", order_by="relevance")[0], self.ids[5])
+        # Without a search, relevance falls back to the newest first
+        self.assertEqual(self._found(order_by="relevance")[0], self.ids[5])
+
+        with self.assertRaises(HTTPException) as raised:
+            self._search(q="pizza", order_by="relevance", pagination="cursor")
+        self.assertEqual(raised.exception.status_code, 400)
+
+    def test_index_follows_description_changes(self):
+        """Test edited and deleted descriptions leave the index and status updates keep the rows searchable."""
+        edited, deleted = (self.db.get(Transaction, transaction_id) for transaction_id in self.ids[:2])
+        edited.description = "Deposit for April"
+        self.db.delete(deleted)
+        self.db.execute(Transaction.__table__.update().values(status=TransactionStatus.CANCELLED))
+        self.db.commit()
+
+        self.assertEqual(self._found(q="rent"), [self.ids[3]])
+        self.assertEqual(self._found(q="april"), [self.ids[0]])
+        self.assertEqual(self._found(q="pizza", order_by="date_asc"), [self.ids[2], self.ids[5]])
+
+    def test_query_syntax_is_ignored(self):
+        """Test quotes and FTS operators in the query are searched as plain words."""
+        self.assertEqual(self._found(q='"rent" (march*'), [self.ids[3], self.ids[0]])
+        self.assertEqual(self._found(q="NOT pizza"), [])
+        self.assertEqual(len(self._found(q='*"-:')), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
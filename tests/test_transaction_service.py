@@ -2,7 +2,7 @@
 Unit tests for TransactionService business logic.
 """
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import ANY, Mock, patch, MagicMock
 from fastapi import HTTPException
 from datetime import datetime
 
@@ -31,9 +31,8 @@ class TestTransactionService(BaseTestCase):
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_self_transaction')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_amount')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_sufficient_available_balance')
-    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.notify_sender_transaction_created')
-    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.notify_transaction_received')
-    def test_create_pending_transaction_success(self, mock_notify_received, mock_notify_created,
+    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.enqueue')
+    def test_create_pending_transaction_success(self, mock_enqueue,
                                               mock_validate_balance, mock_validate_amount,
                                               mock_validate_self, mock_search_user):
         """Test successful creation of a pending transaction."""
@@ -61,8 +60,8 @@ class TestTransactionService(BaseTestCase):
         self.assert_db_add_called_with_type(Transaction)
         self.assert_db_operations_called(add=True, commit=True, refresh=True)
         
-        mock_notify_created.assert_called_once()
-        mock_notify_received.assert_called_once()
+        mock_enqueue.assert_called_once_with(self.mock_db, ANY,
+                                             "sender_transaction_created", "transaction_received")
 
     @patch('app.business.user.user_validators.UserValidators.search_user_by_identifier')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_self_transaction')
@@ -83,9 +82,8 @@ class TestTransactionService(BaseTestCase):
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_ownership')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_confirmable')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_sufficient_available_balance')
-    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.notify_sender_transaction_confirmed')
-    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.notify_transaction_awaiting_acceptance')
-    def test_confirm_transaction_success(self, mock_notify_awaiting, mock_notify_confirmed,
+    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.enqueue')
+    def test_confirm_transaction_success(self, mock_enqueue,
                                        mock_validate_balance, mock_validate_confirmable,
                                        mock_validate_ownership, mock_validate_exists):
         """Test successful transaction confirmation."""
@@ -108,8 +106,8 @@ class TestTransactionService(BaseTestCase):
         self.assertEqual(mock_transaction.status, TransactionStatus.AWAITING_ACCEPTANCE)
         
         self.assert_db_operations_called(add=False, commit=True, refresh=True)
-        mock_notify_confirmed.assert_called_once()
-        mock_notify_awaiting.assert_called_once()
+        mock_enqueue.assert_called_once_with(self.mock_db, mock_transaction,
+                                             "sender_transaction_confirmed", "transaction_awaiting_acceptance")
 
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_exists')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_ownership')
@@ -134,9 +132,8 @@ class TestTransactionService(BaseTestCase):
 
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_exists')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_acceptable')
-    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.notify_sender_transaction_completed')
-    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.notify_transaction_completed')
-    def test_accept_transaction_success(self, mock_notify_completed, mock_notify_sender_completed,
+    @patch('app.business.transaction.transaction_notifications.TransactionNotificationService.enqueue')
+    def test_accept_transaction_success(self, mock_enqueue,
                                       mock_validate_acceptable, mock_validate_exists):
         """Test successful transaction acceptance."""
         # Arrange
@@ -146,8 +143,6 @@ class TestTransactionService(BaseTestCase):
         mock_transaction.recurring = False
         mock_validate_exists.return_value = mock_transaction
 
-        initial_receiver_balance = self.receiver.balance
-
         # Act
         result = TransactionService.accept_transaction(self.mock_db, self.receiver, 1)
 
@@ -156,12 +151,12 @@ class TestTransactionService(BaseTestCase):
         mock_validate_acceptable.assert_called_once_with(mock_transaction, self.receiver)
         
         self.sender.transfer_from_reserved.assert_called_once_with(mock_transaction.amount)
-        self.assertEqual(self.receiver.balance, initial_receiver_balance + mock_transaction.amount)
+        self.receiver.credit.assert_called_once_with(mock_transaction.amount)
         self.assertEqual(mock_transaction.status, TransactionStatus.COMPLETED)
         
         self.assert_db_operations_called(add=False, commit=True, refresh=True)
-        mock_notify_sender_completed.assert_called_once()
-        mock_notify_completed.assert_called_once()
+        mock_enqueue.assert_called_once_with(self.mock_db, mock_transaction,
+                                             "sender_transaction_completed", "transaction_completed")
 
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_exists')
     @patch('app.business.transaction.transaction_validators.TransactionValidators.validate_transaction_acceptable')
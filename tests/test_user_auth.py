@@ -1,6 +1,7 @@
 """
 Unit tests for UserAuthService business logic.
 """
+import asyncio
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 from fastapi import HTTPException
@@ -34,7 +35,7 @@ class TestUserAuthService(BaseTestCase):
         mock_validate_unique.return_value = False  # No duplicate user
 
         # Act
-        result = UserAuthService.register(user_data, self.mock_db)
+        result = asyncio.run(UserAuthService.register(user_data, self.mock_db))
 
         # Assert
         mock_validate_unique.assert_called_once()
@@ -55,7 +56,7 @@ class TestUserAuthService(BaseTestCase):
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            UserAuthService.register(user_data, self.mock_db)
+            asyncio.run(UserAuthService.register(user_data, self.mock_db))
 
         self.assertEqual(context.exception.status_code, 400)
         self.assertIn("already in use", context.exception.detail)
@@ -76,7 +77,7 @@ class TestUserAuthService(BaseTestCase):
         login_form.password = 'hashedpassword123'  # Match the mock user's password
 
         # Act
-        result = UserAuthService.login(self.mock_db, login_form)
+        result = asyncio.run(UserAuthService.login(self.mock_db, login_form))
 
         # Assert
         mock_find_user.assert_called_once()
@@ -96,7 +97,7 @@ class TestUserAuthService(BaseTestCase):
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            UserAuthService.login(self.mock_db, login_form)
+            asyncio.run(UserAuthService.login(self.mock_db, login_form))
 
         self.assertEqual(context.exception.status_code, 400)
         self.assertIn("Incorrect username or password", context.exception.detail)
@@ -113,7 +114,7 @@ class TestUserAuthService(BaseTestCase):
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            UserAuthService.login(self.mock_db, login_form)
+            asyncio.run(UserAuthService.login(self.mock_db, login_form))
 
         self.assertEqual(context.exception.status_code, 400)
         self.assertIn("Incorrect username or password", context.exception.detail)
@@ -131,7 +132,7 @@ class TestUserAuthService(BaseTestCase):
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            UserAuthService.login(self.mock_db, login_form)
+            asyncio.run(UserAuthService.login(self.mock_db, login_form))
 
         self.assertEqual(context.exception.status_code, 403)
         self.assertIn("account is blocked", context.exception.detail)
@@ -149,7 +150,7 @@ class TestUserAuthService(BaseTestCase):
 
         # Act & Assert
         with self.assertRaises(HTTPException) as context:
-            UserAuthService.login(self.mock_db, login_form)
+            asyncio.run(UserAuthService.login(self.mock_db, login_form))
 
         self.assertEqual(context.exception.status_code, 400)
         self.assertIn("account is deactivated", context.exception.detail)
@@ -0,0 +1,106 @@
+"""
+Tests for the UNION ALL "transactions of a user" query builder.
+"""
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select
+
+from tests.base_test import DatabaseTestCase
+from app.business.user.user_admin import AdminService
+from app.models.transaction import Transaction, TransactionStatus, UserTransactionsQuery
+
+
+class TestUserTransactionsQuery(DatabaseTestCase):
+    """Test cases for UserTransactionsQuery."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_user("alice", balance=1000)
+        self.other = self._create_user("bob", balance=1000)
+        self.third = self._create_user("carol", balance=1000)
+
+        base = datetime(2025, 1, 1, 12, 0, 0)
+        pairs = [(self.user, self.other), (self.other, self.user), (self.third, self.user),
+                 (self.other, self.third), (self.user, self.third)]
+        for i in range(40):
+            sender, receiver = pairs[i % len(pairs)]
+            self._create_transaction(sender, receiver,
+                                     amount=float(i % 7 + 1),
+                                     date=base + timedelta(days=i // 2),
+                                     status=TransactionStatus.PENDING if i % 4 else TransactionStatus.COMPLETED)
+        self.user_id = self.user.id
+
+    def _or_query(self, order_by: str, *criteria) -> list:
+        builder = UserTransactionsQuery(self.user_id, order_by=order_by)
+        query = (select(Transaction)
+                 .where(or_(Transaction.sender_id == self.user_id, Transaction.receiver_id == self.user_id), *criteria)
+                 .order_by(*builder.ordering()))
+        return [t.id for t in self.db.execute(query).scalars()]
+
+    def _ids(self, builder: UserTransactionsQuery, limit: int = None, offset: int = 0) -> list:
+        query, _ = builder.statement(limit, offset)
+        return [t.id for t in self.db.execute(query).scalars()]
+
+    def test_matches_or_predicate_for_every_order(self):
+        """Test every page of the UNION ALL equals the same page of the OR query."""
+        for order_by in UserTransactionsQuery.SORT_COLUMNS:
+            expected = self._or_query(order_by)
+            for offset in (0, 10, 20, 30):
+                with self.subTest(order_by=order_by, offset=offset):
+                    ids = self._ids(UserTransactionsQuery(self.user_id, order_by=order_by), 10, offset)
+
+                    self.assertEqual(ids, expected[offset:offset + 10])
+
+    def test_filters_are_applied_to_both_branches(self):
+        """Test criteria restrict both the sent and received rows."""
+        criteria = (Transaction.status == TransactionStatus.PENDING, Transaction.date >= datetime(2025, 1, 5))
+
+        ids = self._ids(UserTransactionsQuery(self.user_id).where(*criteria))
+
+        self.assertEqual(ids, self._or_query("date_desc", *criteria))
+
+    def test_direction_selects_one_branch(self):
+        """Test direction limits the query to sent or received transactions."""
+        sent = self._ids(UserTransactionsQuery(self.user_id, direction="out"))
+        received = self._ids(UserTransactionsQuery(self.user_id, direction="in"))
+
+        self.assertEqual(sent, self._or_query("date_desc", Transaction.sender_id == self.user_id))
+        self.assertEqual(received, self._or_query("date_desc", Transaction.receiver_id == self.user_id))
+
+    def test_transfer_to_self_is_listed_once(self):
+        """Test a row where the user is both sender and receiver is not duplicated."""
+        own = self._create_transaction(self.user, self.user, date=datetime(2030, 1, 1))
+
+        ids = self._ids(UserTransactionsQuery(self.user_id), 5)
+
+        self.assertEqual(ids.count(own.id), 1)
+
+    def test_branches_are_limited_before_the_merge(self):
+        """Test ORDER BY and LIMIT are pushed into each branch."""
+        query, _ = UserTransactionsQuery(self.user_id).statement(10, 20)
+
+        sql = str(query.compile(self.engine))
+
+        self.assertEqual(sql.count("ORDER BY transactions.date DESC, transactions.id DESC"), 2)
+        self.assertEqual(sql.count("LIMIT"), 3)
+        self.assertNotIn(" OR ", sql)
+
+    def test_admin_listing_uses_builder(self):
+        """Test the admin transaction listing pages and filters through the builder."""
+        user = self.db.get(type(self.user), self.user_id)
+        search_data = {"user_id": self.user_id, "page": 2, "limit": 10, "order_by": "amount_desc"}
+
+        with patch('app.business.user.user_admin.UVal.find_user_with_or_raise_exception', return_value=user):
+            page = AdminService.get_user_transactions(self.db, None, search_data)
+            outgoing = AdminService.get_user_transactions(self.db, None, {**search_data, "page": 1,
+                                                                          "search_by": "direction",
+                                                                          "search_query": "outgoing"})
+
+        self.assertEqual([t.id for t in page["transactions"]], self._or_query("amount_desc")[10:20])
+        self.assertTrue(all(t.sender.id == self.user_id for t in outgoing["transactions"]))
+
+
+if __name__ == '__main__':
+    unittest.main()